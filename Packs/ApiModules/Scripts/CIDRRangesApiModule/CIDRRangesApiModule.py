@@ -0,0 +1,123 @@
+from CommonServerPython import *
+
+''' IMPORTS '''
+import hashlib
+import ipaddress
+import socket
+import types
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+''' CONSTANTS '''
+# the compiled ranges are kept in a module of their own, which outlives the re-execution of the script in the docker loop
+COMPILED_RANGES_CACHE_MODULE = '_cidr_ranges_api_module_cache'
+COMPILED_RANGES_CACHE_SIZE = 32
+
+
+def ip_to_int(ip: str) -> Tuple[int, int]:
+    """
+    Parses an IP address
+    :param ip: IPv4 or IPv6 address
+    :return: the IP version and the IP as an integer
+    """
+    ip = ip.strip()
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except OSError:
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    except OSError:
+        pass
+    address = ipaddress.ip_address(ip)
+    return address.version, int(address)
+
+
+def merge_intervals(intervals: List[Tuple[int, int]]) -> Tuple[List[int], List[int]]:
+    """
+    Merges overlapping and adjacent intervals
+    :param intervals: inclusive (start, end) intervals
+    :return: the sorted starts and ends of the merged intervals
+    """
+    starts: List[int] = []
+    ends: List[int] = []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class CIDRRangesMatcher:
+    """
+    Matches IP addresses against a set of CIDR ranges. The ranges of every IP version are merged into sorted interval
+    arrays, so an IP is matched by a binary search, regardless of the number of ranges.
+
+    Usage:
+        matcher = CIDRRangesMatcher.compile(argToList(demisto.args()['cidr_ranges']))
+        matching_ips = matcher.filter(argToList(demisto.args()['value']))
+    """
+
+    def __init__(self, cidr_ranges: Iterable[str]):
+        """
+        :param cidr_ranges: ranges in CIDR notation, or single IP addresses
+        """
+        intervals: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+        for cidr_range in cidr_ranges:
+            network = ipaddress.ip_network(cidr_range.strip(), strict=False)
+            intervals[network.version].append((int(network.network_address), int(network.broadcast_address)))
+        self._intervals = {version: merge_intervals(version_intervals)
+                           for version, version_intervals in intervals.items()}
+
+    @staticmethod
+    def _get_compiled_ranges_cache() -> 'OrderedDict[str, CIDRRangesMatcher]':
+        cache_module = sys.modules.get(COMPILED_RANGES_CACHE_MODULE)
+        if cache_module is None:
+            cache_module = types.ModuleType(COMPILED_RANGES_CACHE_MODULE)
+            cache_module.cache = OrderedDict()  # type: ignore[attr-defined]
+            sys.modules[COMPILED_RANGES_CACHE_MODULE] = cache_module
+        return cache_module.cache  # type: ignore[attr-defined]
+
+    @classmethod
+    def compile(cls, cidr_ranges: Iterable[str]) -> 'CIDRRangesMatcher':
+        """
+        Returns the matcher of the given ranges, which is compiled once per process for the same ranges
+        :param cidr_ranges: ranges in CIDR notation, or single IP addresses
+        :return: matcher of the ranges
+        """
+        cidr_ranges = [cidr_range.strip() for cidr_range in cidr_ranges]
+        ranges_hash = hashlib.sha256('\n'.join(cidr_ranges).encode('utf-8')).hexdigest()
+        cache = cls._get_compiled_ranges_cache()
+        matcher = cache.get(ranges_hash)
+        if matcher is None:
+            matcher = cls(cidr_ranges)
+            cache[ranges_hash] = matcher
+            if len(cache) > COMPILED_RANGES_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(ranges_hash)
+        return matcher
+
+    def __contains__(self, ip: str) -> bool:
+        version, ip_int = ip_to_int(ip)
+        starts, ends = self._intervals[version]
+        i = bisect_right(starts, ip_int) - 1
+        return i >= 0 and ip_int <= ends[i]
+
+    def match(self, ips: Iterable[str]) -> List[bool]:
+        """
+        :param ips: IP addresses
+        :return: whether every IP address is in the ranges
+        """
+        return [ip in self for ip in ips]
+
+    def filter(self, ips: Iterable[str], inverse: bool = False) -> List[str]:
+        """
+        :param ips: IP addresses
+        :param inverse: whether to keep the IP addresses which are not in the ranges instead
+        :return: the IP addresses which are in the ranges
+        """
+        return [ip for ip in ips if (ip in self) != inverse]
@@ -0,0 +1,104 @@
+import random
+import time
+
+import pytest
+
+from CIDRRangesApiModule import CIDRRangesMatcher, merge_intervals
+
+
+@pytest.mark.parametrize('ip, expected', [
+    ('10.0.0.0', True),
+    ('10.255.255.255', True),
+    ('11.0.0.0', False),
+    ('172.16.5.4', True),
+    ('172.32.0.0', False),
+    ('192.168.1.1', True),
+    ('192.168.2.0', False),
+    ('8.8.8.8', True),
+    ('8.8.4.4', False),
+    ('2001:db8::1', True),
+    ('2001:db9::1', False),
+    ('::ffff:10.0.0.1', False),
+])
+def test_contains(ip, expected):
+    """
+    Given:
+    - IPv4 and IPv6 ranges, some of them overlapping, with host bits set or single addresses
+
+    When:
+    - Checking whether an IP address is in the ranges
+
+    Then:
+    - Ensure the IP address is matched as by its network membership
+    """
+    matcher = CIDRRangesMatcher(['10.0.0.0/8', '10.1.0.0/16', '172.16.0.0/12', '192.168.1.7/24', '8.8.8.8',
+                                 '2001:db8::/32'])
+    assert (ip in matcher) is expected
+
+
+def test_merge_intervals():
+    assert merge_intervals([(10, 20), (0, 5), (6, 8), (15, 30), (40, 40)]) == ([0, 10, 40], [8, 30, 40])
+
+
+def test_match_and_filter():
+    matcher = CIDRRangesMatcher(['10.0.0.0/8'])
+    ips = ['10.0.0.1', '11.0.0.1', '10.5.5.5']
+    assert matcher.match(ips) == [True, False, True]
+    assert matcher.filter(ips) == ['10.0.0.1', '10.5.5.5']
+    assert matcher.filter(ips, inverse=True) == ['11.0.0.1']
+
+
+def test_invalid_ip():
+    matcher = CIDRRangesMatcher(['10.0.0.0/8'])
+    with pytest.raises(ValueError):
+        _ = 'not an ip' in matcher
+    with pytest.raises(ValueError):
+        CIDRRangesMatcher(['10.0.0.0/33'])
+
+
+def test_compile_cache():
+    """
+    Given:
+    - A set of ranges which were compiled
+
+    When:
+    - Compiling the same ranges again, and other ranges
+
+    Then:
+    - Ensure the same ranges are compiled once, and different ranges are compiled again
+    """
+    matcher = CIDRRangesMatcher.compile(['10.0.0.0/8', '192.168.0.0/16'])
+    assert CIDRRangesMatcher.compile([' 10.0.0.0/8', '192.168.0.0/16 ']) is matcher
+    assert CIDRRangesMatcher.compile(['10.0.0.0/8']) is not matcher
+
+
+@pytest.mark.benchmark
+def test_benchmark():
+    """
+    Given:
+    - 10,000 random IPv4 ranges
+
+    When:
+    - Filtering 100,000 random IP addresses by the ranges
+
+    Then:
+    - Ensure the IP addresses are filtered as by a linear scan of the ranges, in a few seconds
+    """
+    rand = random.Random(0)
+    ranges = [f'{rand.randrange(1, 224)}.{rand.randrange(256)}.{rand.randrange(256)}.0/{rand.randrange(12, 25)}'
+              for _ in range(10000)]
+    ips = [f'{rand.randrange(1, 224)}.{rand.randrange(256)}.{rand.randrange(256)}.{rand.randrange(256)}'
+           for _ in range(100000)]
+
+    start = time.time()
+    matching_ips = CIDRRangesMatcher(ranges).filter(ips)
+    assert time.time() - start < 10
+
+    networks = [CIDRRangesMatcher([cidr_range])._intervals[4] for cidr_range in ranges]
+    sample = ips[:200]
+
+    def in_any_range(ip):
+        ip_int = int.from_bytes(bytes(int(octet) for octet in ip.split('.')), 'big')
+        return any(starts[0] <= ip_int <= ends[0] for starts, ends in networks)
+
+    assert [ip for ip in sample if in_any_range(ip)] == [ip for ip in matching_ips if ip in set(sample)]
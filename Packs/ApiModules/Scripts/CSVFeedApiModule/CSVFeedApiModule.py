@@ -305,7 +305,7 @@ def get_indicators_command(client, args: dict, tags: Optional[List[str]] = None)
     return hr, {}, indicators_list
 
 
-def feed_main(feed_name, params=None, prefix=''):
+def feed_main(feed_name, params=None, prefix='', indicators_delta_engine=None):
     if not params:
         params = {k: v for k, v in demisto.params().items() if v is not None}
     handle_proxy()
@@ -328,9 +328,14 @@ def feed_main(feed_name, params=None, prefix=''):
                 params.get('auto_detect_type'),
                 params.get('limit'),
             )
+            if indicators_delta_engine:
+                # only the new and changed indicators are submitted
+                indicators = list(indicators_delta_engine.filter_indicators(indicators))
             # we submit the indicators in batches
             for b in batch(indicators, batch_size=2000):
                 demisto.createIndicators(b)  # type: ignore
+            if indicators_delta_engine:
+                indicators_delta_engine.commit()
         else:
             args = demisto.args()
             args['feed_name'] = feed_name
@@ -410,7 +410,7 @@ def test_module(client: Client, args):
     return 'ok', {}, {}
 
 
-def feed_main(feed_name, params=None, prefix=''):
+def feed_main(feed_name, params=None, prefix='', indicators_delta_engine=None):
     if not params:
         params = assign_params(**demisto.params())
     if 'feed_name' not in params:
@@ -432,9 +432,14 @@ def feed_main(feed_name, params=None, prefix=''):
         if command == 'fetch-indicators':
             indicators = fetch_indicators_command(client, feed_tags, tlp_color, params.get('indicator_type'),
                                                   params.get('auto_detect_type'))
+            if indicators_delta_engine:
+                # only the new and changed indicators are submitted
+                indicators = list(indicators_delta_engine.filter_indicators(indicators))
             # we submit the indicators in batches
             for b in batch(indicators, batch_size=2000):
                 demisto.createIndicators(b)
+            if indicators_delta_engine:
+                indicators_delta_engine.commit()
         else:
             args = demisto.args()
             args['feed_name'] = feed_name
@@ -0,0 +1,273 @@
+from CommonServerPython import *
+
+''' IMPORTS '''
+import hashlib
+import zlib
+from array import array
+from typing import Iterable, Iterator, Optional, Tuple
+
+''' CONSTANTS '''
+DELTA_STORE_CONTEXT_KEY = 'indicators_delta_store'
+DELTA_STORE_VERSION = 1
+DFLT_FULL_REFRESH_INTERVAL = '1 day'
+# the indicator keys which are sent to the server, except for the value
+DFLT_FINGERPRINT_KEYS = ('type', 'fields', 'score')
+SUDDEN_DEATH_EXPIRATION_POLICY = 'suddenDeath'
+INTERVAL_EXPIRATION_POLICY = 'interval'
+
+
+class FingerprintTable:
+    """
+    A compact map of 64 bit value hashes to 64 bit fingerprints, kept in an open addressing table of two arrays.
+    Every entry takes 16 bytes per slot, so millions of entries fit in tens of megabytes.
+    """
+    MAX_LOAD_FACTOR = 0.75
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: the initial number of slots, must be a power of 2
+        """
+        self._keys = array('Q', bytes(8 * capacity))
+        self._values = array('Q', bytes(8 * capacity))
+        self._mask = capacity - 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._keys)
+
+    def _find_slot(self, key: int) -> int:
+        keys = self._keys
+        mask = self._mask
+        i = key & mask
+        while True:
+            slot_key = keys[i]
+            if not slot_key or slot_key == key:
+                return i
+            i = (i + 1) & mask
+
+    def get(self, key: int) -> Optional[int]:
+        """
+        :param key: value hash
+        :return: the fingerprint of the value hash, or None if it isn't in the table
+        """
+        i = self._find_slot(key)
+        return self._values[i] if self._keys[i] else None
+
+    def put(self, key: int, value: int) -> Optional[int]:
+        """
+        Sets the fingerprint of a value hash
+        :param key: value hash
+        :param value: fingerprint
+        :return: the previous fingerprint of the value hash, or None if it wasn't in the table
+        """
+        i = self._find_slot(key)
+        if self._keys[i]:
+            previous_value = self._values[i]
+            self._values[i] = value
+            return previous_value
+        self._keys[i] = key
+        self._values[i] = value
+        self._size += 1
+        if self._size > self.MAX_LOAD_FACTOR * len(self._keys):
+            self._grow()
+        return None
+
+    def keys(self) -> Iterator[int]:
+        return (key for key in self._keys if key)
+
+    def _grow(self):
+        old_keys = self._keys
+        old_values = self._values
+        self._keys = array('Q', bytes(16 * len(old_keys)))
+        self._values = array('Q', bytes(16 * len(old_keys)))
+        self._mask = 2 * len(old_keys) - 1
+        for key, value in zip(old_keys, old_values):
+            if key:
+                i = self._find_slot(key)
+                self._keys[i] = key
+                self._values[i] = value
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(self._keys.tobytes() + self._values.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'FingerprintTable':
+        data = zlib.decompress(data)
+        table = cls(capacity=1)
+        table._keys = array('Q')
+        table._keys.frombytes(data[:len(data) // 2])
+        table._values = array('Q')
+        table._values.frombytes(data[len(data) // 2:])
+        table._mask = len(table._keys) - 1
+        table._size = sum(1 for _ in table.keys())
+        return table
+
+
+def hash64(data: bytes) -> int:
+    """
+    Stable 64 bit hash (the builtin hash is salted per process), 0 is reserved for empty slots
+    """
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little') or 1
+
+
+class IndicatorsDeltaEngine:
+    """
+    Filters the indicators of a feed fetch, so only new and changed indicators are submitted to the server.
+    A fingerprint of every indicator (a hash of its value and a hash of its fingerprint keys) is kept per instance,
+    in the integration context or in a local file. All the indicators are submitted on a full refresh - on the first
+    fetch, once in `full_refresh_interval`, and on every fetch of a feed with the sudden death expiration policy
+    (as it expires the indicators which are not submitted). With the interval expiration policy, the full refresh is
+    done before the indicators expire, even if `full_refresh_interval` is longer than the expiration interval.
+
+    Usage:
+        delta_engine = IndicatorsDeltaEngine.from_params(demisto.params())
+        for b in batch(list(delta_engine.filter_indicators(indicators)), batch_size=2000):
+            demisto.createIndicators(b)
+        delta_engine.commit()
+    """
+
+    def __init__(self, full_refresh_interval: Optional[str] = DFLT_FULL_REFRESH_INTERVAL,
+                 fingerprint_keys: Tuple[str, ...] = DFLT_FINGERPRINT_KEYS, store_path: Optional[str] = None,
+                 expiration_policy: Optional[str] = None, expiration_interval: Optional[int] = None,
+                 fetch_interval: Optional[int] = None):
+        """
+        :param full_refresh_interval: how often all the indicators are submitted (<number> <time unit>, e.g. 1 day)
+        :param fingerprint_keys: the indicator keys a change in which is submitted
+        :param store_path: local file to keep the fingerprints in, instead of the integration context
+        :param expiration_policy: the feed expiration policy
+        :param expiration_interval: the feed expiration interval in minutes, of the interval expiration policy
+        :param fetch_interval: the feed fetch interval in minutes
+        """
+        self.full_refresh_interval = full_refresh_interval
+        self.fingerprint_keys = fingerprint_keys
+        self.store_path = store_path
+        self.expiration_policy = expiration_policy
+        self.expiration_interval = expiration_interval
+        self.fetch_interval = fetch_interval
+
+        self.new_count = 0
+        self.changed_count = 0
+        self.unchanged_count = 0
+        self.expired_count = 0
+        self.full_refresh = False
+        self._last_full_refresh: Optional[int] = None
+        self._fetch_table: Optional[FingerprintTable] = None
+
+    @classmethod
+    def from_params(cls, params: dict) -> Optional['IndicatorsDeltaEngine']:
+        """
+        Creates a delta engine from the integration params
+        :param params: integration params
+        :return: delta engine, or None if the `feedDeltaFetch` param is off
+        """
+        if not argToBoolean(params.get('feedDeltaFetch') or False):
+            return None
+        return cls(
+            full_refresh_interval=params.get('feedDeltaFullRefreshInterval') or DFLT_FULL_REFRESH_INTERVAL,
+            store_path=params.get('feedDeltaStorePath') or None,
+            expiration_policy=params.get('feedExpirationPolicy'),
+            expiration_interval=int(params.get('feedExpirationInterval') or 0) or None,
+            fetch_interval=int(params.get('feedFetchInterval') or 0) or None,
+        )
+
+    def _load_store(self) -> Optional[dict]:
+        if self.store_path:
+            if not os.path.exists(self.store_path):
+                return None
+            with open(self.store_path, 'r') as f:
+                return json.load(f)
+        return get_integration_context().get(DELTA_STORE_CONTEXT_KEY)
+
+    def _save_store(self, store: dict):
+        if self.store_path:
+            with open(self.store_path, 'w') as f:
+                json.dump(store, f)
+        else:
+            integration_context = get_integration_context()
+            integration_context[DELTA_STORE_CONTEXT_KEY] = store
+            set_integration_context(integration_context)
+
+    def _is_full_refresh_due(self) -> bool:
+        if self.expiration_policy == SUDDEN_DEATH_EXPIRATION_POLICY:
+            return True
+        if not self._last_full_refresh:
+            return True
+        refresh_before = None
+        if self.full_refresh_interval:
+            refresh_before, _ = parse_date_range(self.full_refresh_interval, to_timestamp=True)
+        if self.expiration_policy == INTERVAL_EXPIRATION_POLICY and self.expiration_interval:
+            # the indicators expire once they were not submitted for the expiration interval,
+            # so they are all submitted on the last fetch before then
+            minutes = max(self.expiration_interval - (self.fetch_interval or 0), 0)
+            expire_before = int(time.time() * 1000) - minutes * 60 * 1000
+            refresh_before = max(refresh_before or expire_before, expire_before)
+        if refresh_before is None:
+            return False
+        return self._last_full_refresh <= refresh_before
+
+    def fingerprint(self, indicator: dict) -> Tuple[int, int]:
+        """
+        :param indicator: indicator to submit
+        :return: the value hash and the fingerprint of the indicator
+        """
+        value_hash = hash64(str(indicator.get('value')).encode('utf-8'))
+        fields = json.dumps([indicator.get(key) for key in self.fingerprint_keys], sort_keys=True, default=str)
+        return value_hash, hash64(fields.encode('utf-8'))
+
+    def filter_indicators(self, indicators: Iterable[dict]) -> Iterator[dict]:
+        """
+        Yields the indicators which should be submitted, all of them on a full refresh.
+        The fingerprints of the fetch are kept only once `commit` is called.
+        :param indicators: all the indicators of the fetch
+        :return: the new and changed indicators
+        """
+        store = self._load_store()
+        previous_table = None
+        if store and store.get('version') == DELTA_STORE_VERSION:
+            previous_table = FingerprintTable.from_bytes(base64.b64decode(store['table']))
+            self._last_full_refresh = store.get('last_full_refresh')
+        self.full_refresh = previous_table is None or self._is_full_refresh_due()
+
+        # the fetch table is sized as the previous one, so it isn't grown while it is filled
+        fetch_table = FingerprintTable(previous_table.capacity if previous_table else 1024)
+        self._fetch_table = fetch_table
+        self.new_count = self.changed_count = self.unchanged_count = 0
+        for indicator in indicators:
+            value_hash, fingerprint = self.fingerprint(indicator)
+            fetch_table.put(value_hash, fingerprint)
+            previous_fingerprint = previous_table.get(value_hash) if previous_table is not None else None
+            if previous_fingerprint is None:
+                self.new_count += 1
+            else:
+                if previous_fingerprint == fingerprint:
+                    self.unchanged_count += 1
+                    if not self.full_refresh:
+                        continue
+                else:
+                    self.changed_count += 1
+            yield indicator
+
+        # the values which are no longer in the feed are expired by the server expiration policy
+        self.expired_count = sum(1 for key in previous_table.keys() if fetch_table.get(key) is None) \
+            if previous_table is not None else 0
+        demisto.debug(
+            f'Indicators delta: {self.new_count} new, {self.changed_count} changed, {self.unchanged_count} unchanged, '
+            f'{self.expired_count} expired, full refresh: {self.full_refresh}'
+        )
+
+    def commit(self):
+        """
+        Keeps the fingerprints of the filtered fetch, should be called once its indicators were submitted
+        """
+        if self._fetch_table is None:
+            raise DemistoException('Indicators delta: commit was called before filter_indicators')
+        self._save_store({
+            'version': DELTA_STORE_VERSION,
+            'last_full_refresh': int(time.time() * 1000) if self.full_refresh else self._last_full_refresh,
+            'table': base64.b64encode(self._fetch_table.to_bytes()).decode('utf-8'),
+        })
+        self._fetch_table = None
@@ -0,0 +1,254 @@
+import json
+
+import pytest
+
+import IndicatorsDeltaApiModule
+from IndicatorsDeltaApiModule import FingerprintTable, IndicatorsDeltaEngine, DELTA_STORE_CONTEXT_KEY, hash64
+
+
+def get_indicators(count, changed=(), score=1):
+    return [{
+        'value': f'1.1.{i // 256}.{i % 256}',
+        'type': 'IP',
+        'score': score,
+        'rawJSON': {'value': f'1.1.{i // 256}.{i % 256}', 'fetched': 'now'},
+        'fields': {'tags': ['changed' if i in changed else 'tag']},
+    } for i in range(count)]
+
+
+@pytest.fixture
+def integration_context(mocker):
+    context: dict = {}
+    mocker.patch.object(IndicatorsDeltaApiModule, 'get_integration_context', side_effect=lambda: dict(context))
+    mocker.patch.object(IndicatorsDeltaApiModule, 'set_integration_context', side_effect=context.update)
+    return context
+
+
+def fetch(engine, indicators):
+    submitted = list(engine.filter_indicators(indicators))
+    engine.commit()
+    return submitted
+
+
+class TestFingerprintTable:
+    def test_put_and_get(self):
+        """
+        Given:
+        - A fingerprint table with 8 slots
+
+        When:
+        - Putting 10000 value hashes, and then updating one of them
+
+        Then:
+        - Ensure the table grows, every value hash keeps its fingerprint and the update returns the previous one
+        """
+        table = FingerprintTable(capacity=8)
+        for i in range(10000):
+            assert table.put(hash64(str(i).encode()), i + 1) is None
+        assert len(table) == 10000
+        assert table.capacity == 16384
+        assert all(table.get(hash64(str(i).encode())) == i + 1 for i in range(10000))
+        assert table.get(hash64(b'missing')) is None
+        assert table.put(hash64(b'5'), 1) == 6
+
+    def test_serialization(self):
+        """
+        Given:
+        - A fingerprint table with 1000 value hashes
+
+        When:
+        - Serializing and deserializing the table
+
+        Then:
+        - Ensure the table is the same
+        """
+        table = FingerprintTable()
+        for i in range(1000):
+            table.put(hash64(str(i).encode()), i + 1)
+        loaded_table = FingerprintTable.from_bytes(table.to_bytes())
+        assert len(loaded_table) == 1000
+        assert sorted(loaded_table.keys()) == sorted(table.keys())
+        assert all(loaded_table.get(key) == table.get(key) for key in table.keys())
+
+
+class TestIndicatorsDeltaEngine:
+    def test_delta_fetch(self, integration_context):
+        """
+        Given:
+        - A feed which fetched 1000 indicators
+
+        When:
+        - Fetching again, when 10 indicators changed, 5 are new and 20 are no longer in the feed
+
+        Then:
+        - Ensure the first fetch submits all the indicators
+        - Ensure the second fetch submits only the changed and new indicators and counts the expired ones
+        """
+        engine = IndicatorsDeltaEngine()
+        assert len(fetch(engine, get_indicators(1000))) == 1000
+        assert engine.full_refresh
+        assert DELTA_STORE_CONTEXT_KEY in integration_context
+
+        indicators = get_indicators(1005, changed=range(100, 110))[20:]
+        submitted = fetch(engine, indicators)
+
+        assert not engine.full_refresh
+        assert [ioc['value'] for ioc in submitted] == [ioc['value'] for ioc in indicators[80:90] + indicators[-5:]]
+        assert (engine.new_count, engine.changed_count, engine.unchanged_count, engine.expired_count) == \
+            (5, 10, 970, 20)
+
+    def test_raw_json_is_not_fingerprinted(self, integration_context):
+        """
+        Given:
+        - A feed which fetched 10 indicators
+
+        When:
+        - Fetching again, when only the rawJSON changed, and then when the score changed
+
+        Then:
+        - Ensure no indicator is submitted when only the rawJSON changed, and all are submitted when the score changed
+        """
+        engine = IndicatorsDeltaEngine()
+        fetch(engine, get_indicators(10))
+        indicators = get_indicators(10)
+        for indicator in indicators:
+            indicator['rawJSON']['fetched'] = 'later'
+        assert fetch(engine, indicators) == []
+        assert len(fetch(engine, get_indicators(10, score=3))) == 10
+
+    def test_not_committed(self, integration_context):
+        """
+        Given:
+        - A feed which fetched 10 indicators
+
+        When:
+        - Fetching 10 new indicators without committing, and fetching them again
+
+        Then:
+        - Ensure the indicators which weren't committed are submitted again
+        """
+        engine = IndicatorsDeltaEngine()
+        fetch(engine, get_indicators(10))
+        assert len(list(engine.filter_indicators(get_indicators(20)))) == 10
+        assert len(fetch(engine, get_indicators(20))) == 10
+        assert fetch(engine, get_indicators(20)) == []
+
+    def test_full_refresh_interval(self, mocker, integration_context):
+        """
+        Given:
+        - A feed with a full refresh interval of 1 hour, which fetched 10 indicators 2 hours ago
+
+        When:
+        - Fetching the same indicators again
+
+        Then:
+        - Ensure all the indicators are submitted, and the next fetch submits none
+        """
+        engine = IndicatorsDeltaEngine(full_refresh_interval='1 hour')
+        mocker.patch.object(IndicatorsDeltaApiModule.time, 'time', return_value=1600000000)
+        fetch(engine, get_indicators(10))
+        mocker.patch.object(IndicatorsDeltaApiModule.time, 'time', return_value=1600000000 + 2 * 60 * 60)
+        mocker.patch.object(IndicatorsDeltaApiModule, 'parse_date_range',
+                            return_value=((1600000000 + 60 * 60) * 1000, None))
+
+        assert len(fetch(engine, get_indicators(10))) == 10
+        assert engine.full_refresh
+        assert fetch(engine, get_indicators(10)) == []
+
+    @pytest.mark.parametrize('fetch_interval, minutes_later, expected_count', [
+        (None, 59, 0),
+        (None, 60, 10),
+        (10, 49, 0),
+        (10, 50, 10),  # the last fetch before the indicators expire
+    ])
+    def test_full_refresh_before_expiration(self, mocker, integration_context, fetch_interval, minutes_later,
+                                            expected_count):
+        """
+        Given:
+        - A feed with a full refresh interval of 1 day, and the interval expiration policy of 1 hour
+
+        When:
+        - Fetching the same indicators again, before and after the expiration interval, less the fetch interval
+
+        Then:
+        - Ensure all the indicators are submitted only once the expiration interval is due
+        """
+        engine = IndicatorsDeltaEngine(full_refresh_interval='1 day', expiration_policy='interval',
+                                       expiration_interval=60, fetch_interval=fetch_interval)
+        mocker.patch.object(IndicatorsDeltaApiModule.time, 'time', return_value=1600000000)
+        fetch(engine, get_indicators(10))
+        mocker.patch.object(IndicatorsDeltaApiModule.time, 'time', return_value=1600000000 + minutes_later * 60)
+        mocker.patch.object(IndicatorsDeltaApiModule, 'parse_date_range',
+                            return_value=((1600000000 + minutes_later * 60 - 24 * 60 * 60) * 1000, None))
+
+        assert len(fetch(engine, get_indicators(10))) == expected_count
+
+    def test_sudden_death(self, integration_context):
+        """
+        Given:
+        - A feed with the sudden death expiration policy
+
+        When:
+        - Fetching the same indicators twice
+
+        Then:
+        - Ensure all the indicators are submitted on every fetch
+        """
+        engine = IndicatorsDeltaEngine(expiration_policy='suddenDeath')
+        fetch(engine, get_indicators(10))
+        assert len(fetch(engine, get_indicators(10))) == 10
+
+    def test_store_path(self, tmp_path, integration_context):
+        """
+        Given:
+        - A local file to keep the fingerprints in
+
+        When:
+        - Fetching the same indicators twice
+
+        Then:
+        - Ensure the fingerprints are kept in the file and not in the integration context
+        """
+        store_path = str(tmp_path / 'fingerprints.json')
+        fetch(IndicatorsDeltaEngine(store_path=store_path), get_indicators(10))
+        assert fetch(IndicatorsDeltaEngine(store_path=store_path), get_indicators(10)) == []
+        assert integration_context == {}
+        with open(store_path) as f:
+            assert json.load(f)['version'] == 1
+
+    @pytest.mark.parametrize('params, expected', [
+        ({}, None),
+        ({'feedDeltaFetch': False}, None),
+        ({'feedDeltaFetch': True, 'feedExpirationPolicy': 'indicatorType'}, ('1 day', None, 'indicatorType', None, None)),
+        ({'feedDeltaFetch': 'true', 'feedDeltaFullRefreshInterval': '6 hours', 'feedDeltaStorePath': '/tmp/f'},
+         ('6 hours', '/tmp/f', None, None, None)),
+        ({'feedDeltaFetch': True, 'feedExpirationPolicy': 'interval', 'feedExpirationInterval': '20160',
+          'feedFetchInterval': '240'}, ('1 day', None, 'interval', 20160, 240)),
+    ])
+    def test_from_params(self, params, expected):
+        engine = IndicatorsDeltaEngine.from_params(params)
+        if expected is None:
+            assert engine is None
+        else:
+            assert (engine.full_refresh_interval, engine.store_path, engine.expiration_policy,
+                    engine.expiration_interval, engine.fetch_interval) == expected
+
+    @pytest.mark.parametrize('indicators_count', [10000, 100000])
+    def test_write_volume(self, integration_context, indicators_count):
+        """
+        Given:
+        - A feed which fetched all of its indicators
+
+        When:
+        - Fetching again, when 1% of the indicators changed
+
+        Then:
+        - Ensure the submitted write volume (indicators and bytes) is about 1% of a full fetch
+        """
+        engine = IndicatorsDeltaEngine()
+        full_fetch = fetch(engine, get_indicators(indicators_count))
+        changed = range(0, indicators_count, 100)
+        delta_fetch = fetch(engine, get_indicators(indicators_count, changed=changed))
+
+        assert len(delta_fetch) == len(changed)
+        assert len(json.dumps(delta_fetch)) < 0.02 * len(json.dumps(full_fetch))
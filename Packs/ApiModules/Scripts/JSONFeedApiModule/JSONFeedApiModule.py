@@ -208,7 +208,7 @@ def extract_all_fields_from_indicator(indicator, indicator_key):
     return fields
 
 
-def feed_main(params, feed_name, prefix):
+def feed_main(params, feed_name, prefix, indicators_delta_engine=None):
     handle_proxy()
 
     client = Client(**params)
@@ -226,8 +226,13 @@ def feed_main(params, feed_name, prefix):
         elif command == 'fetch-indicators':
             indicators = fetch_indicators_command(client, params.get('indicator_type'), feedTags,
                                                   params.get('auto_detect_type'))
+            if indicators_delta_engine:
+                # only the new and changed indicators are submitted
+                indicators = list(indicators_delta_engine.filter_indicators(indicators))
             for b in batch(indicators, batch_size=2000):
                 demisto.createIndicators(b)
+            if indicators_delta_engine:
+                indicators_delta_engine.commit()
 
         elif command == f'{prefix}get-indicators':
             # dummy command for testing
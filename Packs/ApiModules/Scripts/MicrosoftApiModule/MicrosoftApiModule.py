@@ -6,7 +6,7 @@ from CommonServerUserPython import *
 import requests
 import base64
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from typing import Dict, Tuple, List, Optional
+from typing import Any, Dict, Tuple, List, Optional
 
 
 class Scopes:
@@ -23,6 +23,12 @@ CLIENT_CREDENTIALS = 'client_credentials'
 AUTHORIZATION_CODE = 'authorization_code'
 REFRESH_TOKEN = 'refresh_token'  # guardrails-disable-line
 
+# Microsoft Graph JSON batching
+# For more information: https://docs.microsoft.com/en-us/graph/json-batching
+MAX_BATCH_REQUESTS = 20
+BATCH_MAX_RETRIES = 3
+BATCH_DEFAULT_RETRY_AFTER = 5  # seconds to wait for a throttled request without Retry-After header
+
 
 class MicrosoftClient(BaseClient):
     def __init__(self, tenant_id: str = '',
@@ -90,6 +96,9 @@ class MicrosoftClient(BaseClient):
             self.resources = resources if resources else []
             self.resource_to_access_token: Dict[str, str] = {}
 
+        # In-memory copy of the tokens stored in the integration context, loaded on the first token request.
+        self._token_cache: Optional[Dict[str, Any]] = None
+
     def http_request(
             self, *args, resp_type='json', headers=None,
             return_empty_response=False, scope: Optional[str] = None,
@@ -138,12 +147,176 @@ class MicrosoftClient(BaseClient):
         except ValueError as exception:
             raise DemistoException('Failed to parse json object from response: {}'.format(response.content), exception)
 
+    def batch_request(self, requests_data: List[Dict[str, Any]], url_suffix: str = '$batch',
+                      max_retries: int = BATCH_MAX_RETRIES, scope: Optional[str] = None,
+                      resource: str = '') -> List[Dict[str, Any]]:
+        """
+        Sends multiple requests using Microsoft Graph JSON batching, up to MAX_BATCH_REQUESTS requests per call.
+        Requests which depend on each other are sent in the same batch.
+        Requests throttled by the API (status 429) are sent again after the Retry-After period, together with the
+        requests that failed because they depend on them.
+
+        Args:
+            requests_data: The requests to send. Each request is a dict with the `method` and `url` (relative to the
+                API version, e.g. `/users/{user_id}`) keys, and optionally `headers`, `body` and `depends_on` keys.
+                `depends_on` is a list of indexes (in requests_data) of requests that must be completed first.
+            url_suffix: The batch endpoint.
+            max_retries: Maximal number of times to send again throttled requests.
+            scope: A scope to request. Currently will work only with self-deployed app.
+            resource: The resource to request a token for.
+
+        Returns:
+            list: A response per request, in the order of requests_data.
+                Each response is a dict with the `id`, `status`, `headers` and `body` keys.
+        """
+        for index, request in enumerate(requests_data):
+            for dependency in request.get('depends_on', []):
+                if not isinstance(dependency, int) or not 0 <= dependency < len(requests_data) or dependency == index:
+                    raise DemistoException(f'Request {index} has an invalid dependency: {dependency}')
+
+        responses: List[Dict[str, Any]] = [{} for _ in requests_data]
+        pending = list(range(len(requests_data)))
+        for attempt in range(max_retries + 1):
+            retry_after = 0
+            for batch in self._split_to_batches(requests_data, pending):
+                batch_indexes = set(batch)
+                json_data = {
+                    'requests': [self._build_batch_sub_request(index, requests_data[index], batch_indexes)
+                                 for index in batch]
+                }
+                batch_response = self.http_request('POST', url_suffix, json_data=json_data, scope=scope,
+                                                   resource=resource)
+                for sub_response in batch_response.get('responses', []):
+                    responses[int(sub_response.get('id'))] = sub_response
+                    if sub_response.get('status') == 429:
+                        retry_after = max(retry_after, self._get_retry_after(sub_response))
+
+            pending = self._get_throttled_requests(requests_data, responses, pending)
+            if not pending or attempt == max_retries:
+                break
+            demisto.debug(f'{len(pending)} batch requests were throttled, retrying in {retry_after} seconds.')
+            time.sleep(retry_after)
+
+        return responses
+
+    @staticmethod
+    def _split_to_batches(requests_data: List[Dict[str, Any]], indexes: List[int]) -> List[List[int]]:
+        """
+        Splits requests to batches of up to MAX_BATCH_REQUESTS requests, keeping dependent requests in the same batch.
+
+        Args:
+            requests_data: All the requests.
+            indexes: Indexes of the requests to split.
+
+        Returns:
+            list: Batches of request indexes.
+        """
+        indexes_set = set(indexes)
+        groups: Dict[int, List[int]] = {index: [index] for index in indexes}
+        group_of: Dict[int, int] = {index: index for index in indexes}
+        for index in indexes:
+            for dependency in requests_data[index].get('depends_on', []):
+                if dependency not in indexes_set or group_of[dependency] == group_of[index]:
+                    continue
+                merged, removed = sorted((group_of[index], group_of[dependency]))
+                for member in groups.pop(removed):
+                    group_of[member] = merged
+                    groups[merged].append(member)
+
+        batches: List[List[int]] = []
+        current_batch: List[int] = []
+        for group_id in sorted(groups):
+            group = sorted(groups[group_id])
+            if len(group) > MAX_BATCH_REQUESTS:
+                raise DemistoException(f'Cannot send more than {MAX_BATCH_REQUESTS} dependent requests in a batch.')
+            if len(current_batch) + len(group) > MAX_BATCH_REQUESTS:
+                batches.append(current_batch)
+                current_batch = []
+            current_batch.extend(group)
+        if current_batch:
+            batches.append(current_batch)
+
+        return batches
+
+    @staticmethod
+    def _build_batch_sub_request(index: int, request: Dict[str, Any], batch_indexes: set) -> Dict[str, Any]:
+        """
+        Builds a single request of a JSON batch.
+
+        Args:
+            index: The index of the request, used as its id.
+            request: The request data.
+            batch_indexes: The indexes of all the requests in the batch.
+
+        Returns:
+            dict: The batch request.
+        """
+        sub_request: Dict[str, Any] = {
+            'id': str(index),
+            'method': request.get('method', 'GET').upper(),
+            'url': request['url']
+        }
+        headers = dict(request.get('headers') or {})
+        if request.get('body') is not None:
+            sub_request['body'] = request['body']
+            headers.setdefault('Content-Type', 'application/json')
+        if headers:
+            sub_request['headers'] = headers
+        # dependencies which were already completed in a previous batch are omitted
+        depends_on = [str(dependency) for dependency in request.get('depends_on', []) if dependency in batch_indexes]
+        if depends_on:
+            sub_request['dependsOn'] = depends_on
+        return sub_request
+
+    @staticmethod
+    def _get_throttled_requests(requests_data: List[Dict[str, Any]], responses: List[Dict[str, Any]],
+                                indexes: List[int]) -> List[int]:
+        """
+        Gets the requests to send again - throttled requests and requests that failed due to a throttled dependency.
+
+        Args:
+            requests_data: All the requests.
+            responses: The responses of the requests.
+            indexes: Indexes of the requests which were sent in the last attempt.
+
+        Returns:
+            list: Indexes of the requests to send again.
+        """
+        throttled = {index for index in indexes if responses[index].get('status') == 429}
+        failed_dependency = [index for index in indexes if responses[index].get('status') == 424]
+        found_new = True
+        while found_new:
+            found_new = False
+            for index in failed_dependency:
+                if index not in throttled and throttled.intersection(requests_data[index].get('depends_on', [])):
+                    throttled.add(index)
+                    found_new = True
+        return sorted(throttled)
+
+    @staticmethod
+    def _get_retry_after(response: Dict[str, Any]) -> int:
+        """
+        Gets the number of seconds to wait before sending a throttled request again.
+
+        Args:
+            response: The throttled batch response.
+
+        Returns:
+            int: Seconds to wait.
+        """
+        headers = response.get('headers') or {}
+        try:
+            return int(headers.get('Retry-After', BATCH_DEFAULT_RETRY_AFTER))
+        except (TypeError, ValueError):
+            return BATCH_DEFAULT_RETRY_AFTER
+
     def get_access_token(self, resource: str = '', scope: Optional[str] = None):
         """
         Obtains access and refresh token from oproxy server or just a token from a self deployed app.
-        Access token is used and stored in the integration context
-        until expiration time. After expiration, new refresh token and access token are obtained and stored in the
-        integration context.
+        Access token is kept in memory and stored in the integration context until expiration time.
+        The integration context is read only once per client, when the first token is requested, and is written
+        only when a new token is obtained. After expiration, new refresh token and access token are obtained and
+        stored in the integration context.
 
         Args:
             scope: A scope to get instead of the default on the API.
@@ -151,23 +324,25 @@ class MicrosoftClient(BaseClient):
         Returns:
             str: Access token that will be added to authorization header.
         """
-        integration_context = demisto.getIntegrationContext()
-        refresh_token = integration_context.get('current_refresh_token', '')
         # Set keywords. Default without the scope prefix.
         access_token_keyword = f'{scope}_access_token' if scope else 'access_token'
         valid_until_keyword = f'{scope}_valid_until' if scope else 'valid_until'
-
-        if self.multi_resource:
-            access_token = integration_context.get(resource)
-        else:
-            access_token = integration_context.get(access_token_keyword)
-
-        valid_until = integration_context.get(valid_until_keyword)
-
-        if access_token and valid_until:
-            if self.epoch_seconds() < valid_until:
+        token_key = resource if self.multi_resource else access_token_keyword
+
+        is_cache_loaded = self._token_cache is not None
+        integration_context = self._get_token_cache()
+        access_token = self._get_valid_cached_token(integration_context, token_key, valid_until_keyword)
+        if access_token:
+            return access_token
+
+        if is_cache_loaded:
+            # The in-memory token has expired, another execution might have already refreshed it.
+            integration_context = self._get_token_cache(reload=True)
+            access_token = self._get_valid_cached_token(integration_context, token_key, valid_until_keyword)
+            if access_token:
                 return access_token
 
+        refresh_token = integration_context.get('current_refresh_token', '')
         auth_type = self.auth_type
         if auth_type == OPROXY_AUTH_TYPE:
             if self.multi_resource:
@@ -203,6 +378,38 @@ class MicrosoftClient(BaseClient):
 
         return access_token
 
+    def _get_token_cache(self, reload: bool = False) -> Dict[str, Any]:
+        """
+        Gets the in-memory copy of the tokens stored in the integration context.
+
+        Args:
+            reload: Whether to read the integration context again even if it was already loaded.
+
+        Returns:
+            dict: The cached integration context.
+        """
+        if self._token_cache is None or reload:
+            self._token_cache = demisto.getIntegrationContext() or {}
+        return self._token_cache
+
+    def _get_valid_cached_token(self, integration_context: dict, token_key: str, valid_until_keyword: str) -> str:
+        """
+        Gets an access token from the cached integration context if it is not about to expire.
+
+        Args:
+            integration_context: The cached integration context.
+            token_key: The key of the access token.
+            valid_until_keyword: The key of the access token expiration time.
+
+        Returns:
+            str: The access token if it is still valid, otherwise an empty string.
+        """
+        access_token = integration_context.get(token_key)
+        valid_until = integration_context.get(valid_until_keyword)
+        if access_token and valid_until and self.epoch_seconds() < valid_until:
+            return access_token
+        return ''
+
     def _oproxy_authorize(self, resource: str = '', scope: Optional[str] = None) -> Tuple[str, int, str]:
         """
         Gets a token by authorizing with oproxy.
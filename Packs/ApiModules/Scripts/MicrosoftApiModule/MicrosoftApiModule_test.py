@@ -238,3 +238,167 @@ def test_self_deployed_request(requests_mock):
     req_body = requests_mock._adapter.last_request._request.body
     assert req_body == urllib.parse.urlencode(body)
     assert req_res == (TOKEN, 3600, '')
+
+
+def test_get_access_token_reads_context_once(mocker):
+    """
+    Given:
+        - A valid access token stored in the integration context.
+    When:
+        - Requesting an access token several times with the same client.
+    Then:
+        - Ensure the integration context is read only once and is not written.
+    """
+    client = self_deployed_client()
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value={'access_token': TOKEN, 'valid_until': 3605})
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    mocker.patch.object(client, '_get_self_deployed_token')
+    mocker.patch.object(client, 'epoch_seconds', return_value=3600)
+
+    for _ in range(10):
+        assert client.get_access_token() == TOKEN
+
+    assert demisto.getIntegrationContext.call_count == 1
+    assert demisto.setIntegrationContext.call_count == 0
+    assert client._get_self_deployed_token.call_count == 0
+
+
+def test_get_access_token_cache_expired_refreshed_elsewhere(mocker):
+    """
+    Given:
+        - An access token cached in memory which has expired.
+        - A newer valid access token stored in the integration context by another execution.
+    When:
+        - Requesting an access token.
+    Then:
+        - Ensure the newer access token is taken from the integration context without authenticating again.
+    """
+    client = self_deployed_client()
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=[
+        {'access_token': TOKEN, 'valid_until': 3605},
+        {'access_token': 'new_token', 'valid_until': 8595}
+    ])
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    mocker.patch.object(client, '_get_self_deployed_token')
+    mocker.patch.object(client, 'epoch_seconds', side_effect=[3600, 4000, 4000])
+
+    assert client.get_access_token() == TOKEN
+    assert client.get_access_token() == 'new_token'
+
+    assert demisto.getIntegrationContext.call_count == 2
+    assert demisto.setIntegrationContext.call_count == 0
+    assert client._get_self_deployed_token.call_count == 0
+
+
+def test_get_access_token_cache_updated_on_refresh(mocker):
+    """
+    Given:
+        - An expired access token stored in the integration context.
+    When:
+        - Requesting an access token several times.
+    Then:
+        - Ensure a new token is obtained once, written once to the integration context and served from memory after.
+    """
+    client = self_deployed_client()
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value={'access_token': TOKEN, 'valid_until': 3605})
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    mocker.patch.object(client, '_get_self_deployed_token', return_value=('new_token', 3600, REFRESH_TOKEN))
+    mocker.patch.object(client, 'epoch_seconds', return_value=4000)
+
+    for _ in range(10):
+        assert client.get_access_token() == 'new_token'
+
+    assert demisto.getIntegrationContext.call_count == 1
+    assert demisto.setIntegrationContext.call_count == 1
+    assert client._get_self_deployed_token.call_count == 1
+
+
+def mock_batch_endpoint(requests_mock, responder):
+    """
+    Registers a stub $batch endpoint which answers every sub request using responder, in reversed order.
+    """
+    def batch_callback(request, context):
+        responses = [responder(sub_request) for sub_request in request.json()['requests']]
+        return {'responses': list(reversed(responses))}
+
+    return requests_mock.post(f'{BASE_URL}$batch', json=batch_callback)
+
+
+def test_batch_request_order_and_round_trips(mocker, requests_mock):
+    """
+    Given:
+        - 45 requests to send.
+    When:
+        - Sending the requests using JSON batching.
+    Then:
+        - Ensure 3 batch calls are made instead of 45 calls and the responses are returned in the input order.
+    """
+    client = self_deployed_client()
+    mocker.patch.object(client, 'get_access_token', return_value=TOKEN)
+    batch_mock = mock_batch_endpoint(requests_mock, lambda sub_request: {
+        'id': sub_request['id'], 'status': 200, 'body': {'url': sub_request['url']}
+    })
+    requests_data = [{'method': 'GET', 'url': f'/users/{i}'} for i in range(45)]
+
+    responses = client.batch_request(requests_data)
+
+    assert batch_mock.call_count == 3
+    assert [len(request.json()['requests']) for request in batch_mock.request_history] == [20, 20, 5]
+    assert [response['body']['url'] for response in responses] == [f'/users/{i}' for i in range(45)]
+
+
+def test_batch_request_throttled(mocker, requests_mock):
+    """
+    Given:
+        - A request which is throttled once, and a request which depends on it.
+    When:
+        - Sending the requests using JSON batching.
+    Then:
+        - Ensure the throttled request and its dependent request are sent again after the Retry-After period.
+    """
+    client = self_deployed_client()
+    mocker.patch.object(client, 'get_access_token', return_value=TOKEN)
+    sleep_mock = mocker.patch('MicrosoftApiModule.time.sleep')
+    throttled = []
+
+    def responder(sub_request):
+        if sub_request['id'] == '1' and not throttled:
+            throttled.append(sub_request)
+            return {'id': '1', 'status': 429, 'headers': {'Retry-After': '7'}}
+        if sub_request['id'] == '2' and len(throttled) == 1 and sub_request.get('dependsOn'):
+            throttled.append(sub_request)
+            return {'id': '2', 'status': 424}
+        return {'id': sub_request['id'], 'status': 200, 'body': {}}
+
+    batch_mock = mock_batch_endpoint(requests_mock, responder)
+    requests_data = [
+        {'method': 'GET', 'url': '/users/a'},
+        {'method': 'GET', 'url': '/users/b'},
+        {'method': 'PATCH', 'url': '/users/b', 'body': {'a': 'b'}, 'depends_on': [1]}
+    ]
+
+    responses = client.batch_request(requests_data)
+
+    assert [response['status'] for response in responses] == [200, 200, 200]
+    assert batch_mock.call_count == 2
+    assert sorted(r['id'] for r in batch_mock.request_history[1].json()['requests']) == ['1', '2']
+    assert batch_mock.request_history[1].json()['requests'][1]['dependsOn'] == ['1']
+    assert batch_mock.request_history[1].json()['requests'][1]['headers'] == {'Content-Type': 'application/json'}
+    sleep_mock.assert_called_once_with(7)
+
+
+def test_split_to_batches_keeps_dependencies():
+    """
+    Given:
+        - 19 independent requests and a chain of 3 dependent requests.
+    When:
+        - Splitting the requests to batches.
+    Then:
+        - Ensure the dependent requests are kept in the same batch.
+    """
+    requests_data = [{'url': f'/users/{i}'} for i in range(19)]
+    requests_data += [{'url': '/a'}, {'url': '/b', 'depends_on': [19]}, {'url': '/c', 'depends_on': [20]}]
+
+    batches = MicrosoftClient._split_to_batches(requests_data, list(range(len(requests_data))))
+
+    assert batches == [list(range(19)), [19, 20, 21]]
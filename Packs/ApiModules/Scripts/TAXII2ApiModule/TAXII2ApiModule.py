@@ -2,10 +2,11 @@ import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
 
-from typing import Union, Optional, List, Dict, Tuple
+from typing import Union, Optional, List, Dict, Tuple, Iterator
 from requests.sessions import merge_setting, CaseInsensitiveDict
 import re
-import copy
+import queue
+import threading
 import types
 import urllib3
 from taxii2client import v20, v21
@@ -19,6 +20,9 @@ TAXII_VER_2_0 = "2.0"
 TAXII_VER_2_1 = "2.1"
 
 DFLT_LIMIT_PER_REQUEST = 100
+DFLT_POLL_WORKERS = 4
+POLL_QUEUE_PAGES_PER_WORKER = 2
+POLL_QUEUE_PUT_TIMEOUT = 0.1
 API_USERNAME = "_api_token_key"
 HEADER_USERNAME = "_header:"
 
@@ -94,6 +98,7 @@ class Taxii2FeedClient:
         self.api_root = None
         self.collections = None
         self.last_fetched_indicator__modified = None
+        self.collections_last_modified: Dict[str, str] = {}
 
         self.collection_to_fetch = collection_to_fetch
         self.skip_complex_mode = skip_complex_mode
@@ -314,6 +319,132 @@ class Taxii2FeedClient:
             envelope = get_objects(limit=page_size, **kwargs)
         return envelope
 
+    def iter_collection_pages(
+            self, collection: Union[v20.Collection, v21.Collection], page_size: int, **kwargs
+    ) -> Iterator[List[Dict[str, str]]]:
+        """
+        Polls a taxii collection page by page
+        :param collection: collection to poll
+        :param page_size: size of the request page
+        :return: generator of the stix objects of each page
+        """
+        if isinstance(collection, v20.Collection):
+            for envelope in v20.as_pages(collection.get_objects, per_request=page_size, **kwargs):
+                stix_objects = envelope.get("objects")
+                if not stix_objects:
+                    # no fetched objects
+                    break
+                yield stix_objects
+            return
+
+        envelope = collection.get_objects(limit=page_size, **kwargs)
+        while True:
+            if not isinstance(envelope, Dict):
+                raise DemistoException(
+                    "Error: TAXII 2 client received the following response while requesting "
+                    f"indicators: {str(envelope)}\n\nExpected output is json"
+                )
+            stix_objects = envelope.get("objects")
+            if stix_objects:
+                yield stix_objects
+            if not envelope.get("more", False):
+                break
+            envelope = collection.get_objects(limit=page_size, next=envelope.get("next", ""))
+
+    def poll_collections(
+            self,
+            collections: Optional[list] = None,
+            limit: int = -1,
+            max_workers: int = DFLT_POLL_WORKERS,
+            collections_filter_args: Optional[Dict[str, dict]] = None,
+            **kwargs,
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Polls several taxii collections concurrently and yields the parsed cortex indicators as the pages arrive.
+        The pages are fetched by worker threads and parsed by the caller, the latest modified time of every
+        collection is kept in client.collections_last_modified
+        :param collections: collections to poll, defaults to all the available collections
+        :param limit: max amount of indicators to fetch
+        :param max_workers: max amount of collections polled at the same time
+        :param collections_filter_args: filter args of specific collections ({collection_id: filter_args})
+        :param kwargs: filter args of all the collections
+        :return: Cortex indicators generator
+        """
+        if collections is None:
+            collections = self.collections or []
+        if limit is None:
+            limit = -1
+        page_size = self.get_page_size(limit, limit)
+        if page_size <= 0 or not collections:
+            return
+        collections_filter_args = collections_filter_args or {}
+
+        collections_to_poll: queue.Queue = queue.Queue()
+        for collection in collections:
+            collections_to_poll.put(collection)
+        # bounded, so the workers don't get ahead of the parsing
+        pages: queue.Queue = queue.Queue(maxsize=max_workers * POLL_QUEUE_PAGES_PER_WORKER)
+        stop_polling = threading.Event()
+
+        def put_page(item) -> bool:
+            while not stop_polling.is_set():
+                try:
+                    pages.put(item, timeout=POLL_QUEUE_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def poll_worker():
+            try:
+                while not stop_polling.is_set():
+                    try:
+                        collection = collections_to_poll.get_nowait()
+                    except queue.Empty:
+                        break
+                    filter_args = dict(kwargs, **collections_filter_args.get(collection.id, {}))
+                    for stix_objects in self.iter_collection_pages(collection, page_size, **filter_args):
+                        if not put_page((collection, stix_objects)):
+                            return
+            except Exception as e:
+                put_page(e)
+            finally:
+                # signals that the worker is done
+                put_page(None)
+
+        workers = [threading.Thread(target=poll_worker, daemon=True) for _ in range(min(max_workers, len(collections)))]
+        for worker in workers:
+            worker.start()
+
+        running_workers = len(workers)
+        obj_cnt = 0
+        indicators_cnt = 0
+        try:
+            while running_workers:
+                page = pages.get()
+                if page is None:
+                    running_workers -= 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+                collection, stix_objects = page
+                obj_cnt += len(stix_objects)
+                self.last_fetched_indicator__modified = self.collections_last_modified.get(collection.id)
+                indicators = self.parse_indicators_list(self.extract_indicators_from_stix_objects(stix_objects))
+                if self.last_fetched_indicator__modified:
+                    self.collections_last_modified[collection.id] = self.last_fetched_indicator__modified
+                for indicator in indicators:
+                    yield indicator
+                    indicators_cnt += 1
+                    if indicators_cnt == limit:
+                        return
+        finally:
+            stop_polling.set()
+            demisto.debug(
+                f"TAXII 2 Feed has extracted {indicators_cnt} indicators / {obj_cnt} stix objects "
+                f"from {len(collections)} collections"
+            )
+
     def get_page_size(self, max_limit: int, cur_limit: int) -> int:
         """
         Get a page size given the limit on entries `max_limit` and the limit on the current poll
@@ -354,20 +485,26 @@ class Taxii2FeedClient:
         if indicators_objs:
             for indicator_obj in indicators_objs:
                 indicators.extend(self.parse_single_indicator(indicator_obj))
-                indicator_modified_str = indicator_obj.get("modified")
-                if self.last_fetched_indicator__modified is None:
-                    self.last_fetched_indicator__modified = indicator_modified_str  # type: ignore[assignment]
-                else:
-                    last_datetime = self.stix_time_to_datetime(
-                        self.last_fetched_indicator__modified
-                    )
-                    indicator_created_datetime = self.stix_time_to_datetime(
-                        indicator_modified_str
-                    )
-                    if indicator_created_datetime > last_datetime:
-                        self.last_fetched_indicator__modified = indicator_modified_str
+                self.update_last_fetched_indicator_modified(indicator_obj.get("modified"))
         return indicators
 
+    def update_last_fetched_indicator_modified(self, indicator_modified_str: Optional[str]):
+        """
+        Updates client.last_fetched_indicator__modified if the given modified time is later
+        :param indicator_modified_str: modified time of an indicator in STIX format
+        """
+        last_modified_str = self.last_fetched_indicator__modified
+        if last_modified_str is None:
+            self.last_fetched_indicator__modified = indicator_modified_str  # type: ignore[assignment]
+        elif not indicator_modified_str or indicator_modified_str == last_modified_str:
+            return
+        elif len(indicator_modified_str) == len(last_modified_str):
+            # STIX times are UTC with a fixed width format, so same length times are ordered as strings
+            if indicator_modified_str > last_modified_str:
+                self.last_fetched_indicator__modified = indicator_modified_str  # type: ignore[assignment]
+        elif self.stix_time_to_datetime(indicator_modified_str) > self.stix_time_to_datetime(last_modified_str):
+            self.last_fetched_indicator__modified = indicator_modified_str  # type: ignore[assignment]
+
     def parse_single_indicator(
             self, indicator_obj: Dict[str, str]
     ) -> List[Dict[str, str]]:
@@ -452,9 +589,8 @@ class Taxii2FeedClient:
         :param field_map: field map used for mapping fields ({field_name: field_value})
         :return: Cortex indicator
         """
-        ioc_obj_copy = copy.deepcopy(indicator_obj)
-        ioc_obj_copy["value"] = value
-        ioc_obj_copy["type"] = type_
+        # only the top level of the object is changed, so there is no need to copy the nested values
+        ioc_obj_copy = dict(indicator_obj, value=value, type=type_)
         indicator = {
             "value": value,
             "type": type_,
@@ -3,6 +3,8 @@ from TAXII2ApiModule import Taxii2FeedClient, TAXII_VER_2_1, HEADER_USERNAME
 from taxii2client import v20, v21
 import pytest
 import json
+import threading
+import time
 
 with open('test_data/stix_envelope_no_indicators.json', 'r') as f:
     STIX_ENVELOPE_NO_IOCS = json.load(f)
@@ -320,3 +322,279 @@ class TestExtractIndicatorsAndParse:
 
         assert len(actual) == 14
         assert actual == expected
+
+
+def get_stix_objects(collection_id, count):
+    """
+    Creates `count` STIX2 indicators of a collection, and a non indicator object every 10 objects
+    """
+    stix_objects = []
+    for i in range(count):
+        stix_objects.append({
+            'type': 'indicator',
+            'id': f'indicator--{collection_id}-{i}',
+            'pattern': f"[ipv4-addr:value = '10.{collection_id}.{i // 256 % 256}.{i % 256}']",
+            'labels': ['malicious-activity'],
+            'modified': f'2020-01-01T00:00:{i % 60:02d}.{i % 1000:03d}Z',
+        })
+        if i % 10 == 0:
+            stix_objects.append({'type': 'malware', 'id': f'malware--{collection_id}-{i}'})
+    return stix_objects
+
+
+class MockTaxiiServer:
+    """
+    In-process stand-in of a TAXII 2.0 (range paging) / 2.1 (limit and next paging) server
+    """
+    def __init__(self, mocker, version, collections_objects, latency=0.0):
+        self.version = version
+        self.latency = latency
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.failing_collections = set()
+        self.lock = threading.Lock()
+        collection_spec = v20.Collection if version == '2.0' else v21.Collection
+        self.collections = []
+        for collection_id, stix_objects in collections_objects.items():
+            collection = mocker.MagicMock(spec=collection_spec)
+            collection.id = collection_id
+            collection.title = f'title {collection_id}'
+            collection.get_objects.side_effect = self.get_objects_handler(collection_id, stix_objects)
+            self.collections.append(collection)
+        if version == '2.0':
+            mocker.patch.object(v20, 'as_pages', side_effect=self.as_pages)
+
+    def get_objects_handler(self, collection_id, stix_objects):
+        def get_objects(limit=0, next=None, start=0, per_request=0, **filter_args):
+            with self.lock:
+                self.requests.append((collection_id, filter_args))
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                time.sleep(self.latency)
+                if collection_id in self.failing_collections:
+                    raise DemistoException(f'Collection {collection_id} is not available')
+                if self.version == '2.0':
+                    return {'objects': stix_objects[start:start + per_request]}
+                offset = int(next or 0)
+                return {
+                    'objects': stix_objects[offset:offset + limit],
+                    'more': offset + limit < len(stix_objects),
+                    'next': str(offset + limit),
+                }
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+        return get_objects
+
+    @staticmethod
+    def as_pages(func, start=0, per_request=0, **filter_args):
+        while True:
+            envelope = func(start=start, per_request=per_request, **filter_args)
+            yield envelope
+            if not envelope.get('objects'):
+                break
+            start += per_request
+
+
+class TestPollCollections:
+    """
+    Scenario: Poll several collections concurrently via poll_collections
+    """
+    @pytest.mark.parametrize('version', ['2.0', '2.1'])
+    def test_all_indicators(self, mocker, version):
+        """
+        Given:
+        - 3 collections with 250 STIX2 indicators each (and non indicator objects)
+
+        When:
+        - poll_collections is called with 2 workers and page size 40
+
+        Then:
+        - Ensure all the indicators are yielded, parsed the same way as parse_indicators_list
+        - Ensure the latest modified time of every collection is kept
+        """
+        collections_objects = {collection_id: get_stix_objects(collection_id, 250) for collection_id in range(3)}
+        server = MockTaxiiServer(mocker, version, collections_objects)
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False,
+                                       limit_per_request=40)
+        mock_client.collections = server.collections
+
+        actual = list(mock_client.poll_collections(max_workers=2))
+
+        expected_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False)
+        expected = []
+        for stix_objects in collections_objects.values():
+            expected.extend(expected_client.parse_indicators_list(
+                expected_client.extract_indicators_from_stix_objects(stix_objects)))
+        assert len(actual) == 750
+        assert sorted(actual, key=lambda ioc: ioc['value']) == sorted(expected, key=lambda ioc: ioc['value'])
+        assert mock_client.collections_last_modified == {
+            collection_id: '2020-01-01T00:00:59.239Z' for collection_id in range(3)
+        }
+
+    def test_limit(self, mocker):
+        """
+        Given:
+        - 4 collections with 1000 STIX2 indicators each
+
+        When:
+        - poll_collections is called with limit 150
+
+        Then:
+        - Ensure only 150 indicators are yielded and the polling stops
+        """
+        collections_objects = {collection_id: get_stix_objects(collection_id, 1000) for collection_id in range(4)}
+        server = MockTaxiiServer(mocker, '2.1', collections_objects)
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False)
+        mock_client.collections = server.collections
+
+        actual = list(mock_client.poll_collections(limit=150))
+
+        assert len(actual) == 150
+        assert len(server.requests) < 40
+
+    def test_concurrent_requests(self, mocker):
+        """
+        Given:
+        - 4 collections which respond slowly
+
+        When:
+        - poll_collections is called with 4 workers
+
+        Then:
+        - Ensure the collections are requested at the same time
+        """
+        collections_objects = {collection_id: get_stix_objects(collection_id, 30) for collection_id in range(4)}
+        server = MockTaxiiServer(mocker, '2.1', collections_objects, latency=0.05)
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False,
+                                       limit_per_request=10)
+
+        actual = list(mock_client.poll_collections(server.collections, max_workers=4))
+
+        assert len(actual) == 120
+        assert server.max_in_flight > 1
+
+    def test_filter_args(self, mocker):
+        """
+        Given:
+        - 2 collections, one with specific filter args
+
+        When:
+        - poll_collections is called
+
+        Then:
+        - Ensure the collection filter args override the common filter args
+        """
+        collections_objects = {collection_id: get_stix_objects(collection_id, 5) for collection_id in range(2)}
+        server = MockTaxiiServer(mocker, '2.0', collections_objects)
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False)
+
+        list(mock_client.poll_collections(server.collections, added_after='a',
+                                          collections_filter_args={1: {'added_after': 'b'}}))
+
+        assert {(collection_id, filter_args['added_after']) for collection_id, filter_args in server.requests} == \
+            {(0, 'a'), (1, 'b')}
+
+    def test_failed_collection(self, mocker):
+        """
+        Given:
+        - 2 collections, one of them fails
+
+        When:
+        - poll_collections is called
+
+        Then:
+        - Ensure the error is raised
+        """
+        collections_objects = {collection_id: get_stix_objects(collection_id, 5) for collection_id in range(2)}
+        server = MockTaxiiServer(mocker, '2.1', collections_objects)
+        server.failing_collections.add(1)
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False)
+
+        with pytest.raises(DemistoException, match='Collection 1 is not available'):
+            list(mock_client.poll_collections(server.collections))
+
+    @pytest.mark.benchmark
+    def test_poll_collections_benchmark(self, mocker):
+        """
+        Given:
+        - 4 collections with 250K STIX2 indicators each, which respond to every page after 20ms
+
+        When:
+        - The collections are polled one after the other by build_iterator, and concurrently by poll_collections
+
+        Then:
+        - Ensure both yield all the 1M indicators, and poll_collections requests the collections at the same time and
+          takes less time
+        """
+        collections_objects = {collection_id: get_stix_objects(collection_id, 250000) for collection_id in range(4)}
+        server = MockTaxiiServer(mocker, '2.1', collections_objects, latency=0.02)
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False,
+                                       limit_per_request=1000)
+
+        start = time.time()
+        sequential_count = 0
+        for collection in server.collections:
+            mock_client.collection_to_fetch = collection
+            sequential_count += len(mock_client.build_iterator())
+        sequential_duration = time.time() - start
+        assert server.max_in_flight == 1
+
+        start = time.time()
+        concurrent_count = sum(1 for _ in mock_client.poll_collections(server.collections, max_workers=4))
+        concurrent_duration = time.time() - start
+
+        assert sequential_count == concurrent_count == 1000000
+        assert server.max_in_flight > 1
+        # the page latency of the collections is waited at the same time
+        assert concurrent_duration < sequential_duration
+
+
+class TestParseIndicators:
+    """
+    Scenario: Parse indicators without copying the STIX2 objects
+    """
+    def test_create_indicator_keeps_object(self):
+        """
+        Given:
+        - A STIX2 indicator object
+
+        When:
+        - create_indicator is called
+
+        Then:
+        - Ensure the object isn't changed and the rawJSON holds the cortex value and type
+        """
+        stix_object = get_stix_objects(1, 1)[0]
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False, tags=['tag'])
+
+        indicator = mock_client.create_indicator(stix_object, 'IP', '10.1.0.0', {})
+
+        assert stix_object['type'] == 'indicator'
+        assert indicator['rawJSON'] == dict(stix_object, value='10.1.0.0', type='IP')
+        assert indicator['fields']['tags'] == ['tag', 'malicious-activity']
+
+    @pytest.mark.parametrize('modified_times, expected', [
+        (['2020-01-01T00:00:01.000Z', '2020-01-01T00:00:02.000Z', '2020-01-01T00:00:00.000Z'],
+         '2020-01-01T00:00:02.000Z'),
+        (['2020-01-01T00:00:01.5Z', '2020-01-01T00:00:01.25Z'], '2020-01-01T00:00:01.5Z'),
+        (['2020-01-01T00:00:01.000Z', '2020-01-01T00:00:02Z'], '2020-01-01T00:00:02Z'),
+        (['2020-01-01T00:00:02Z', '2020-01-01T00:00:01.999Z'], '2020-01-01T00:00:02Z'),
+    ])
+    def test_last_fetched_indicator_modified(self, modified_times, expected):
+        """
+        Given:
+        - Modified times with and without milliseconds
+
+        When:
+        - update_last_fetched_indicator_modified is called for every time
+
+        Then:
+        - Ensure the latest time is kept
+        """
+        mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False)
+        for modified in modified_times:
+            mock_client.update_last_fetched_indicator_modified(modified)
+        assert mock_client.last_fetched_indicator__modified == expected
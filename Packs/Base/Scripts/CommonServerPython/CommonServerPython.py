@@ -6,6 +6,7 @@ Note that adding code to CommonServerUserPython can override functions in Common
 from __future__ import print_function
 
 import base64
+import itertools
 import json
 import logging
 import os
@@ -14,6 +15,7 @@ import socket
 import sys
 import time
 import traceback
+import zlib
 from random import randint
 import xml.etree.cElementTree as ET
 from collections import OrderedDict
@@ -1295,15 +1297,16 @@ def appendContext(key, data, dedup=False):
         demisto.setContext(key, data)
 
 
-def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None):
+def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None, max_rows=None):
     """
        Converts a demisto table in JSON form to a Markdown table
 
        :type name: ``str``
        :param name: The name of the table (required)
 
-       :type t: ``dict`` or ``list``
-       :param t: The JSON table - List of dictionaries with the same keys or a single dictionary (required)
+       :type t: ``dict`` or ``list`` or ``generator``
+       :param t: The JSON table - List of dictionaries with the same keys or a single dictionary (required).
+            A generator (or any other iterator) of rows is consumed lazily, only the rendered rows are formatted.
 
        :type headers: ``list`` or ``string``
        :keyword headers: A list of headers to be presented in the output table (by order). If string will be passed
@@ -1318,24 +1321,45 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
        :type metadata: ``str``
        :param metadata: Metadata about the table contents
 
+       :type max_rows: ``int``
+       :keyword max_rows: The maximal number of rows to render. If the table has more rows, a footer with the number
+            of rows which were not rendered is added. Default is None (all the rows are rendered).
+
        :return: A string representation of the markdown table
        :rtype: ``str``
     """
 
-    mdResult = ''
+    md_parts = []
     if name:
-        mdResult = '### ' + name + '\n'
+        md_parts.append('### ' + name + '\n')
 
     if metadata:
-        mdResult += metadata + '\n'
+        md_parts.append(metadata + '\n')
+
+    rows = None  # type: Any
+    if isinstance(t, dict):
+        t = [t] if t else []
+    elif not isinstance(t, list) and hasattr(t, '__iter__') and iter(t) is t:
+        # lazy mode (iterators only) - peek the first row, the rest of the rows are consumed only when rendered
+        rows = t
+        first_row = next(rows, None)
+        t = [first_row] if first_row is not None else []
 
     if not t or len(t) == 0:
-        mdResult += '**No entries.**\n'
-        return mdResult
+        md_parts.append('**No entries.**\n')
+        return ''.join(md_parts)
 
     if not isinstance(t, list):
         t = [t]
 
+    if rows is None:
+        rows = t
+    else:
+        rows = itertools.chain(t, rows)
+        if removeNull:
+            # all the rows are needed to find the empty columns
+            rows = t = list(rows)
+
     if headers and isinstance(headers, STRING_TYPES):
         headers = [headers]
 
@@ -1344,7 +1368,9 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
         # should be only one header
         if headers and len(headers) > 0:
             header = headers[0]
-            t = map(lambda item: dict((h, item) for h in [header]), t)
+            rows = ({header: item} for item in rows)
+            if removeNull:
+                rows = t = list(rows)
         else:
             raise Exception("Missing headers param for tableToMarkdown. Example: headers=['Some Header']")
 
@@ -1359,36 +1385,65 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
             if all(obj.get(header) in ('', None, [], {}) for obj in t):
                 headers.remove(header)
 
-    if t and len(headers) > 0:
+    if len(headers) > 0:
         newHeaders = []
         if headerTransform is None:  # noqa
             def headerTransform(s): return s  # noqa
         for header in headers:
             newHeaders.append(headerTransform(header))
-        mdResult += '|'
+        md_parts.append('|')
         if len(newHeaders) == 1:
-            mdResult += newHeaders[0]
+            md_parts.append(newHeaders[0])
         else:
-            mdResult += '|'.join(newHeaders)
-        mdResult += '|\n'
+            md_parts.append('|'.join(newHeaders))
+        md_parts.append('|\n')
         sep = '---'
-        mdResult += '|' + '|'.join([sep] * len(headers)) + '|\n'
-        for entry in t:
-            vals = [stringEscapeMD((formatCell(entry.get(h, ''), False) if entry.get(h) is not None else ''),
-                                   True, True) for h in headers]
+        md_parts.append('|' + '|'.join([sep] * len(headers)) + '|\n')
+
+        rows = iter(rows)
+        rendered_rows = rows if max_rows is None else itertools.islice(rows, max_rows)
+        for entry in rendered_rows:
+            vals = [_escape_md_table_cell(_format_md_table_cell(entry.get(h))) for h in headers]
             # this pipe is optional
-            mdResult += '| '
             try:
-                mdResult += ' | '.join(vals)
+                md_parts.append('| ' + ' | '.join(vals) + ' |\n')
             except UnicodeDecodeError:
                 vals = [str(v) for v in vals]
-                mdResult += ' | '.join(vals)
-            mdResult += ' |\n'
+                md_parts.append('| ' + ' | '.join(vals) + ' |\n')
+
+        # the rows which were not rendered are only counted
+        not_rendered_rows = sum(1 for _ in rows) if max_rows is not None else 0
+        if not_rendered_rows:
+            md_parts.append('\n**{} more rows.**\n'.format(not_rendered_rows))
 
     else:
-        mdResult += '**No entries.**\n'
+        md_parts.append('**No entries.**\n')
+
+    return ''.join(md_parts)
+
+
+def _format_md_table_cell(value):
+    """
+       Formats a value of a markdown table cell, same as formatCell without prettifying.
+    """
+    if isinstance(value, STRING_TYPES):
+        return value
+    if value is None:
+        return ''
+    if type(value) is int:
+        return str(value)
+    return formatCell(value, False)
 
-    return mdResult
+
+def _escape_md_table_cell(st):
+    """
+       Escapes a markdown table cell, same as stringEscapeMD with minimal escaping of a multiline string.
+    """
+    if '\n' in st or '\r' in st:
+        st = st.replace('\r\n', '<br>').replace('\r', '<br>').replace('\n', '<br>')
+    if '|' in st:
+        st = st.replace('|', '\\|')
+    return st
 
 
 tblToMd = tableToMarkdown
@@ -4117,6 +4172,8 @@ def dict_safe_get(dict_object, keys, default_return_value=None, return_type=None
 
 CONTEXT_UPDATE_RETRY_TIMES = 3
 MIN_VERSION_FOR_VERSIONED_CONTEXT = '6.0.0'
+INTEGRATION_CONTEXT_LOG_MAX_SIZE = 1000
+COMPRESSED_CONTEXT_VALUE_PREFIX = 'zlib+base64:'
 
 
 def merge_lists(original_list, updated_list, key):
@@ -4171,7 +4228,7 @@ def set_integration_context(context, sync=True, version=-1):
     :rtype: ``dict``
     :return: The new integration context
     """
-    demisto.debug('Setting integration context {}:'.format(str(context)))
+    demisto.debug('Setting integration context {}:'.format(get_integration_context_log_preview(context)))
     if is_versioned_context_available():
         demisto.debug('Updating integration context with version {}. Sync: {}'.format(version, sync))
         return demisto.setIntegrationContextVersioned(context, version, sync)
@@ -4190,7 +4247,7 @@ def get_integration_context(sync=True, with_version=False):
     :param with_version: Whether to return the version.
 
     :rtype: ``dict``
-    :return: The integration context.
+    :return: The integration context. Compressed values are decompressed, unless the version is returned.
     """
     if is_versioned_context_available():
         integration_context = demisto.getIntegrationContextVersioned(sync)
@@ -4198,9 +4255,103 @@ def get_integration_context(sync=True, with_version=False):
         if with_version:
             return integration_context
         else:
-            return integration_context.get('context', {})
+            return decompress_integration_context(integration_context.get('context', {}))
     else:
-        return demisto.getIntegrationContext()
+        integration_context = demisto.getIntegrationContext()
+        if with_version:
+            return integration_context
+        return decompress_integration_context(integration_context)
+
+
+def get_integration_context_log_preview(context, max_size=INTEGRATION_CONTEXT_LOG_MAX_SIZE):
+    """
+    Gets a size-capped representation of the integration context to write to the log.
+    Only the beginning of string values is used, and lists and dicts are replaced by their size,
+    so large values are never converted to strings.
+
+    :type context: ``dict``
+    :param context: The integration context.
+
+    :type max_size: ``int``
+    :param max_size: The maximal size of the representation.
+
+    :rtype: ``str``
+    :return: The representation of the integration context.
+    """
+    if not isinstance(context, dict):
+        return str(context)[:max_size]
+
+    parts = []
+    size = 0
+    for key, value in context.items():
+        if size >= max_size:
+            parts.append('...')
+            break
+        if isinstance(value, STRING_TYPES):
+            preview = value[:max_size - size]
+            if len(preview) < len(value):
+                preview = '{}...({} characters)'.format(preview, len(value))
+        elif isinstance(value, (dict, list)):
+            preview = '<{} of {} items>'.format(type(value).__name__, len(value))
+        else:
+            preview = str(value)[:max_size - size]
+        part = '{}: {}'.format(key, preview)
+        size += len(part)
+        parts.append(part)
+
+    return '{' + ', '.join(parts) + '}'
+
+
+def compress_integration_context_value(value):
+    """
+    Compresses a JSON encoded integration context value.
+
+    :type value: ``str``
+    :param value: The JSON encoded value.
+
+    :rtype: ``str``
+    :return: The compressed value.
+    """
+    compressed = base64.b64encode(zlib.compress(value.encode('utf-8')))
+    return COMPRESSED_CONTEXT_VALUE_PREFIX + compressed.decode('ascii')
+
+
+def decompress_integration_context_value(value):
+    """
+    Decompresses an integration context value if it is compressed.
+
+    :type value: ``Any``
+    :param value: The integration context value.
+
+    :rtype: ``Any``
+    :return: The JSON encoded value if it was compressed, otherwise the given value.
+    """
+    if isinstance(value, STRING_TYPES) and value.startswith(COMPRESSED_CONTEXT_VALUE_PREFIX):
+        compressed = value[len(COMPRESSED_CONTEXT_VALUE_PREFIX):]
+        return zlib.decompress(base64.b64decode(compressed)).decode('utf-8')
+    return value
+
+
+def decompress_integration_context(context):
+    """
+    Decompresses the compressed values of the integration context.
+
+    :type context: ``dict``
+    :param context: The integration context.
+
+    :rtype: ``dict``
+    :return: The integration context with the compressed values decompressed.
+    """
+    if not isinstance(context, dict):
+        return context
+    compressed_keys = [key for key, value in context.items()
+                       if isinstance(value, STRING_TYPES) and value.startswith(COMPRESSED_CONTEXT_VALUE_PREFIX)]
+    if not compressed_keys:
+        return context
+    context = dict(context)
+    for key in compressed_keys:
+        context[key] = decompress_integration_context_value(context[key])
+    return context
 
 
 def is_versioned_context_available():
@@ -4214,7 +4365,7 @@ def is_versioned_context_available():
 
 
 def set_to_integration_context_with_retries(context, object_keys=None, sync=True,
-                                            max_retry_times=CONTEXT_UPDATE_RETRY_TIMES):
+                                            max_retry_times=CONTEXT_UPDATE_RETRY_TIMES, compress_min_size=None):
     """
     Update the integration context with a dictionary of keys and values with multiple attempts.
     The function supports merging the context keys using the provided object_keys parameter.
@@ -4233,10 +4384,16 @@ def set_to_integration_context_with_retries(context, object_keys=None, sync=True
     :type max_retry_times: ``int``
     :param max_retry_times: The maximum number of attempts to try.
 
+    :type compress_min_size: ``int``
+    :param compress_min_size: If set, values which are longer than this size when JSON encoded are stored
+     compressed. Compressed values are decompressed by get_integration_context.
+
     :rtype: ``None``
     :return: None
     """
     attempt = 0
+    # The encoded values are kept between attempts, so only keys which were changed in the meantime are encoded again
+    encoded_values = {}  # type: dict
 
     # do while...
     while True:
@@ -4244,7 +4401,9 @@ def set_to_integration_context_with_retries(context, object_keys=None, sync=True
             raise Exception('Failed updating integration context. Max retry attempts exceeded.')
 
         # Update the latest context and get the new version
-        integration_context, version = update_integration_context(context, object_keys, sync)
+        integration_context, version = update_integration_context(context, object_keys, sync,
+                                                                  encoded_values=encoded_values,
+                                                                  compress_min_size=compress_min_size)
 
         demisto.debug('Attempting to update the integration context with version {}.'.format(version))
 
@@ -4272,7 +4431,7 @@ def get_integration_context_with_version(sync=True):
     :param sync: Whether to get the context directly from the DB.
 
     :rtype: ``tuple``
-    :return: The latest integration context with version.
+    :return: The latest integration context with version. Compressed values are not decompressed.
     """
     latest_integration_context_versioned = get_integration_context(sync, with_version=True)
     version = -1
@@ -4286,7 +4445,7 @@ def get_integration_context_with_version(sync=True):
     return integration_context, version
 
 
-def update_integration_context(context, object_keys=None, sync=True):
+def update_integration_context(context, object_keys=None, sync=True, encoded_values=None, compress_min_size=None):
     """
     Update the integration context with a given dictionary after merging it with the latest integration context.
 
@@ -4300,6 +4459,13 @@ def update_integration_context(context, object_keys=None, sync=True):
     :type sync: ``bool``
     :param sync: Whether to use the context directly from the DB.
 
+    :type encoded_values: ``dict``
+    :param encoded_values: The values encoded in a previous call with the same context, which are updated by this
+     call. A value is encoded again only if its key was changed in the latest integration context since.
+
+    :type compress_min_size: ``int``
+    :param compress_min_size: If set, values which are longer than this size when JSON encoded are compressed.
+
     :rtype: ``tuple``
     :return: The updated integration context along with the current version.
 
@@ -4307,15 +4473,26 @@ def update_integration_context(context, object_keys=None, sync=True):
     integration_context, version = get_integration_context_with_version(sync)
     if not object_keys:
         object_keys = {}
+    if encoded_values is None:
+        encoded_values = {}
+
+    for key, updated_object in context.items():
+        # Only merged values depend on the latest integration context
+        latest_value = integration_context.get(key, '[]') if key in object_keys else None
+        if key in encoded_values and encoded_values[key][0] == latest_value:
+            integration_context[key] = encoded_values[key][1]
+            continue
 
-    for key, _ in context.items():
-        latest_object = json.loads(integration_context.get(key, '[]'))
-        updated_object = context[key]
         if key in object_keys:
-            merged_list = merge_lists(latest_object, updated_object, object_keys[key])
-            integration_context[key] = json.dumps(merged_list)
+            latest_object = json.loads(decompress_integration_context_value(latest_value))
+            encoded_value = json.dumps(merge_lists(latest_object, updated_object, object_keys[key]))
         else:
-            integration_context[key] = json.dumps(updated_object)
+            encoded_value = json.dumps(updated_object)
+        if compress_min_size is not None and len(encoded_value) > compress_min_size:
+            encoded_value = compress_integration_context_value(encoded_value)
+
+        encoded_values[key] = (latest_value, encoded_value)
+        integration_context[key] = encoded_value
 
     return integration_context, version
 
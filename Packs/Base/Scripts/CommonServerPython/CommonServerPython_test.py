@@ -342,6 +342,102 @@ def test_tbl_to_md_header_with_special_character():
     assert table_with_character == expected_string_with_special_character
 
 
+def test_tbl_to_md_max_rows():
+    """
+    Given:
+      - A list of 5 rows and max_rows=2
+    When:
+      - Converting the list to a markdown table
+    Then:
+      - Only the first 2 rows are rendered and a footer with the number of the rest of the rows is added
+    """
+    data = [{'header_1': i} for i in range(5)]
+    table = tableToMarkdown('tableToMarkdown test with max rows', data, max_rows=2)
+    expected_table = '''### tableToMarkdown test with max rows
+|header_1|
+|---|
+| 0 |
+| 1 |
+
+**3 more rows.**
+'''
+    assert table == expected_table
+    assert tableToMarkdown('tableToMarkdown test with max rows', data, max_rows=5) == \
+        tableToMarkdown('tableToMarkdown test with max rows', data)
+
+
+def test_tbl_to_md_generator():
+    """
+    Given:
+      - A generator of rows
+    When:
+      - Converting the generator to a markdown table, with and without max_rows and removeNull
+    Then:
+      - The table is the same as the table of the rows list
+    """
+    data = [{'header_1': i, 'header_2': None, 'header_3': 'a|b\nc'} for i in range(10)]
+    assert tableToMarkdown('gen', (row for row in data)) == tableToMarkdown('gen', data)
+    assert tableToMarkdown('gen', (row for row in data), removeNull=True) == \
+        tableToMarkdown('gen', data, removeNull=True)
+    assert tableToMarkdown('gen', (row for row in data), max_rows=3) == tableToMarkdown('gen', data, max_rows=3)
+    assert tableToMarkdown('gen', (row for row in [])) == '### gen\n**No entries.**\n'
+    assert tableToMarkdown('gen', (s for s in ['foo', 'bar']), 'header_1') == \
+        tableToMarkdown('gen', ['foo', 'bar'], 'header_1')
+
+
+@pytest.mark.parametrize('data, expected_row', [
+    ('hello world', '| hello world |'),
+    (('foo', 'bar'), '| ["foo", "bar"] |'),
+])
+def test_tbl_to_md_single_value(data, expected_row):
+    """
+    Given:
+      - A string or a tuple, which is iterable but is not a list or an iterator of rows
+    When:
+      - Converting it to a markdown table with a single header
+    Then:
+      - The value is rendered as a single row
+    """
+    assert tableToMarkdown('Result', data, headers=['Value']) == \
+        '### Result\n|Value|\n|---|\n' + expected_row + '\n'
+
+
+def test_tbl_to_md_list_of_strings_remove_null():
+    """
+    Given:
+      - A list of strings with a single header and removeNull=True
+    When:
+      - Converting the list to a markdown table
+    Then:
+      - All the rows are rendered
+    """
+    table = tableToMarkdown('strings', ['foo', 'bar'], 'header_1', removeNull=True)
+    assert table == '### strings\n|header_1|\n|---|\n| foo |\n| bar |\n'
+
+
+@pytest.mark.parametrize('rows_count', [1000, 10000, 100000])
+def test_tbl_to_md_large_table(rows_count):
+    """
+    Given:
+      - A large list of rows with escaped values, lists and empty values
+    When:
+      - Converting the list to a markdown table, with and without max_rows
+    Then:
+      - All the rows are rendered (with escaping) and max_rows renders only the requested rows
+    """
+    data = [{'id': i, 'name': 'host|{}'.format(i), 'desc': 'line1\nline2', 'tags': ['a', 'b'], 'none': None}
+            for i in range(rows_count)]
+    headers = ['id', 'name', 'desc', 'tags', 'none']
+    table = tableToMarkdown('large', data, headers=headers)
+    lines = table.splitlines()
+    assert len(lines) == rows_count + 3
+    assert lines[-1] == '| {} | host\\|{} | line1<br>line2 | a,<br>b |  |'.format(rows_count - 1, rows_count - 1)
+
+    capped_table = tableToMarkdown('large', iter(data), headers=headers, max_rows=100)
+    assert capped_table.startswith('\n'.join(lines[:103]) + '\n')
+    assert capped_table.endswith('\n**{} more rows.**\n'.format(rows_count - 100))
+
+
 def test_flatten_cell():
     # sanity
     utf8_to_flatten = b'abcdefghijklmnopqrstuvwxyz1234567890!'.decode('utf8')
@@ -2612,6 +2708,98 @@ def test_set_latest_integration_context_es(mocker):
     assert int_context_args_2[1:] == (True, es_inv_context_version_second)
 
 
+def test_set_integration_context_log_preview(mocker):
+    """
+    Given:
+        - An integration context of 10 MB.
+    When:
+        - Setting the integration context.
+    Then:
+        - Ensure the debug log of the integration context is capped.
+    """
+    import CommonServerPython
+
+    users = [{'id': str(i), 'name': 'user{}'.format(i), 'profile': {'email': 'user{}@example.com'.format(i)}}
+             for i in range(150000)]
+    context = {'users': json.dumps(users), 'questions': users, 'bot_id': 'W12345678'}
+    assert len(context['users']) > 10 * 1024 * 1024
+    mocker.patch.object(demisto, 'debug')
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    mocker.patch.object(CommonServerPython, 'is_versioned_context_available', return_value=False)
+
+    CommonServerPython.set_integration_context(context)
+
+    log = demisto.debug.call_args_list[0][0][0]
+    assert len(log) < 2 * CommonServerPython.INTEGRATION_CONTEXT_LOG_MAX_SIZE
+    assert '...({} characters)'.format(len(context['users'])) in log
+    assert demisto.setIntegrationContext.call_args[0][0] is context
+
+
+def test_set_to_integration_context_with_retries_encodes_once(mocker):
+    """
+    Given:
+        - An integration context of 10 MB.
+    When:
+        - Updating the integration context and the first attempt fails on a version mismatch.
+    Then:
+        - Ensure the updated keys are merged and encoded only once when the latest context was not changed.
+    """
+    import CommonServerPython
+
+    users = [{'id': str(i), 'name': 'user{}'.format(i)} for i in range(300000)]
+    set_integration_context_versioned({'users': json.dumps(users), 'conversations': CONVERSATIONS})
+    mocker.patch.object(demisto, 'getIntegrationContextVersioned',
+                        side_effect=lambda sync: {'context': dict(get_integration_context_versioned()['context']),
+                                                  'version': get_integration_context_versioned()['version']})
+    mocker.patch.object(demisto, 'setIntegrationContextVersioned', side_effect=[ValueError, None])
+    mocker.patch.object(CommonServerPython, 'is_versioned_context_available', return_value=True)
+    merge_spy = mocker.spy(CommonServerPython, 'merge_lists')
+    dumps_spy = mocker.spy(CommonServerPython.json, 'dumps')
+
+    CommonServerPython.set_to_integration_context_with_retries(
+        {'users': [{'id': 'new', 'name': 'new'}], 'bot_id': 'W12345678'}, OBJECTS_TO_KEYS)
+
+    assert demisto.setIntegrationContextVersioned.call_count == 2
+    assert merge_spy.call_count == 1
+    assert dumps_spy.call_count == 2
+    new_users = json.loads(demisto.setIntegrationContextVersioned.call_args[0][0]['users'])
+    assert len(new_users) == len(users) + 1
+
+
+def test_set_to_integration_context_with_retries_compressed(mocker):
+    """
+    Given:
+        - A large value to store in the integration context with compression enabled.
+    When:
+        - Updating the integration context twice and getting it.
+    Then:
+        - Ensure the large value is stored compressed, merged correctly and decompressed when getting the context.
+    """
+    import CommonServerPython
+
+    set_integration_context_versioned({'conversations': CONVERSATIONS})
+    mocker.patch.object(demisto, 'getIntegrationContextVersioned',
+                        side_effect=lambda sync=False: get_integration_context_versioned())
+    mocker.patch.object(demisto, 'setIntegrationContextVersioned',
+                        side_effect=lambda context, version, sync: set_integration_context_versioned(context))
+    mocker.patch.object(CommonServerPython, 'is_versioned_context_available', return_value=True)
+    users = [{'id': str(i), 'name': 'user{}'.format(i)} for i in range(1000)]
+
+    CommonServerPython.set_to_integration_context_with_retries({'users': users}, OBJECTS_TO_KEYS,
+                                                               compress_min_size=1024)
+    CommonServerPython.set_to_integration_context_with_retries({'users': [{'id': 'new'}], 'bot_id': 'W1'},
+                                                               OBJECTS_TO_KEYS, compress_min_size=1024)
+
+    stored_context = get_integration_context_versioned()['context']
+    assert stored_context['users'].startswith(CommonServerPython.COMPRESSED_CONTEXT_VALUE_PREFIX)
+    assert stored_context['bot_id'] == '"W1"'
+    assert stored_context['conversations'] == CONVERSATIONS
+
+    context = CommonServerPython.get_integration_context()
+    assert json.loads(context['users']) == users + [{'id': 'new'}]
+    assert context['conversations'] == CONVERSATIONS
+
+
 def test_set_latest_integration_context_fail(mocker):
     import CommonServerPython
 
@@ -2,15 +2,11 @@ import demistomock as demisto
 from CommonServerPython import *
 import json
 import re
-import tempfile
 from datetime import datetime
+from io import BytesIO
+from xml.etree import cElementTree as ElementTree
 
-from stix.core import STIXPackage
-import warnings
-warnings.filterwarnings("ignore", message="The use of this field has been deprecated. Received 'VocabList' object.")
-warnings.filterwarnings("ignore", message="The use of this field has been deprecated. Received 'str' object.")
-warnings.filterwarnings("ignore", message="The use of this field has been deprecated. Received 'datetime' object.")
-warnings.filterwarnings("ignore", message="The use of this field has been deprecated. Received 'StructuredTextList' object.")
+from dateutil import parser as date_parser
 
 
 """ GLOBAL PARAMS """
@@ -24,6 +20,30 @@ PATTERNS_DICT = {
     "registry-key:key": "Registry Path Reputation",
     "user-account": "Username"
 }
+PATTERN_REGEX = re.compile("(\\w.*?) = '(.*?)'")
+MUST_HAVE_IN_STIX = [
+    "created",
+    "id",
+    "labels",
+    "modified",
+    "pattern",
+    "score",
+    "source",
+    "type",
+    "valid_from"
+]
+
+JSON_DECODER = json.JSONDecoder()
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+STIX_NS = "http://stix.mitre.org/stix-1"
+CYBOX_NS = "http://cybox.mitre.org/cybox-2"
+CYBOX_COMMON_NS = "http://cybox.mitre.org/common-2"
+XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+# xs:dateTime, the time zone is dropped as by the STIX1 timestamps format of the entries
+STIX1_TIMESTAMP_REGEX = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d{1,6}))?(?:Z|[+-]\d{2}:\d{2})?$")
+# cybox properties hold a list of values as a single value, delimited by this delimiter
+CYBOX_VALUES_DELIMITER = "##comma##"
 
 """ HELPER FUNCTIONS"""
 
@@ -45,23 +65,6 @@ def ip_parser(ip):
     return ip
 
 
-def convert_to_json(string):
-    """Will try to convert given string to json.
-
-    Args:
-        string: str of stix/json file. may be xml, then function will fail
-
-    Returns:
-        json object if succeed
-        False if failed
-    """
-    try:
-        js = json.loads(string)
-        return js
-    except ValueError:
-        return None
-
-
 def create_timestamp(timestamp):
     """Takes a timestamp and checks if it matches pattern.
 
@@ -152,47 +155,34 @@ def dbot_score(score):
     return 0
 
 
-def build_entry(indicators_dict, stix_indicators_dict, pkg_id):
-    """Extracting all pattern from stix object
-    function will take care of one bundle only.
+def iter_object_indicators(stix_indicator):
+    """Extracting the indicators of a single STIX2 object
+
     Args:
-        pkg_id (str):
-        stix_indicators_dict (dict):
-        indicators_dict (dict):
+        stix_indicator (dict): STIX2 object
 
     Returns:
-        list: Results output
-
+        generator of (str, str): indicator type and indicator value, in the order of `PATTERNS_DICT`
     """
-    results_list = list()
-    for key, indicators_list in indicators_dict.items():
-        for indicator in indicators_list:
-            obj = stix_indicators_dict.get(indicator)
-            if isinstance(obj, dict):
-                # Creating parameters
-                ind_id = obj.get("id")
-                source = obj.get("source")
-                # times
-                timestamp = obj.get("created")
-
-                score = (
-                    dbot_score(obj.get("score"))
-                    if "score" in obj
-                    else get_score(obj.get("description"))
-                )
-
-                result = create_indicator_entry(
-                    indicator_type=key,
-                    value=indicator,
-                    pkg_id=pkg_id,
-                    ind_id=ind_id,
-                    timestamp=timestamp,
-                    source=source,
-                    score=score
-                )
-                if result:
-                    results_list.append(result)
-    return results_list
+    pattern = stix_indicator.get("pattern")
+    if pattern:
+        groups = PATTERN_REGEX.findall(pattern)
+        for key, value in PATTERNS_DICT.items():
+            for term in groups:
+                '''
+                term should be list with 2 argument parsed with regex
+                [`pattern`, `indicator`]
+                '''
+                if len(term) == 2 and key in term[0]:
+                    new_indicator = term[1]
+                    if value in ("IP", "URL", "Domain"):
+                        new_indicator = ip_parser(new_indicator)
+                    yield value, new_indicator
+    # Handle CVE
+    elif stix_indicator.get("description") == "cve cvss score":
+        new_indicator = stix_indicator.get("name")
+        if new_indicator:
+            yield "CVE CVSS Score", new_indicator
 
 
 def get_indicators(indicators):
@@ -215,37 +205,6 @@ def get_indicators(indicators):
             }
         )
     """
-
-    def indicators_parser(stix_indicator):
-        # type: (dict) -> None
-        """
-        Args:
-            stix_indicator (dict):
-        """
-        pattern = stix_indicator.get("pattern")
-        if pattern:
-            groups = regex.findall(pattern)
-            if groups:
-                for key, value in PATTERNS_DICT.items():
-                    for term in groups:
-                        '''
-                        term should be list with 2 argument parsed with regex
-                        [`pattern`, `indicator`]
-                        '''
-                        if len(term) == 2 and key in term[0]:
-                            new_indicator = term[1]
-                            if value in ("IP", "URL", "Domain"):
-                                new_indicator = ip_parser(new_indicator)
-                            patterns_lists[value].append(new_indicator)
-                            entries_dict[new_indicator] = stix_indicator
-        # Handle CVE
-        elif stix_indicator.get("description") == "cve cvss score":
-            new_indicator = stix_indicator.get("name")
-            if new_indicator:
-                patterns_lists["CVE CVSS Score"].append(new_indicator)
-                entries_dict[new_indicator] = stix_indicator
-
-    regex = re.compile("(\\w.*?) = '(.*?)'")
     patterns_lists = {
         "File": list(),
         "IP": list(),
@@ -260,158 +219,297 @@ def get_indicators(indicators):
     # Will hold values for package {"KEY": <STIX OBJECT>}
     entries_dict = dict()  # type: dict
 
-    if isinstance(indicators, list):
-        for indicator in indicators:
-            indicators_parser(indicator)
-    else:
-        indicators_parser(indicators)
+    if not isinstance(indicators, list):
+        indicators = [indicators]
+    for indicator in indicators:
+        for indicator_type, value in iter_object_indicators(indicator):
+            patterns_lists[indicator_type].append(value)
+            entries_dict[value] = indicator
     return patterns_lists, entries_dict
 
 
-def extract_indicators(data):
-    """Gets dict of STIX2.0 object (one in a time)
+def iter_stix2_object_entries(stix_indicator, pkg_id, seen):
+    """Creates the entries of the indicators of a single STIX2 object, which were not seen yet in the document
 
     Args:
-        data: (dict) of STIX2 object. can be
+        stix_indicator (dict): STIX2 object
+        pkg_id (str): the id of the bundle of the object
+        seen (set): (indicator type, value) of the entries created so far, updated with the new entries
 
     Returns:
-        (dict, dict):
-            First dict contains indicator types to indicator value
-            Second dict contains indicators value to STIX object defining them
+        generator of dict: the entries, as created by `create_indicator_entry`
+    """
+    if not isinstance(stix_indicator, dict):
+        return
+    for indicator_type, value in iter_object_indicators(stix_indicator):
+        if (indicator_type, value) in seen:
+            continue
+        seen.add((indicator_type, value))
+        yield create_indicator_entry(
+            indicator_type=indicator_type,
+            value=value,
+            pkg_id=pkg_id,
+            ind_id=stix_indicator.get("id"),
+            timestamp=stix_indicator.get("created"),
+            source=stix_indicator.get("source"),
+            score=(
+                dbot_score(stix_indicator.get("score"))
+                if "score" in stix_indicator
+                else get_score(stix_indicator.get("description"))
+            )
+        )
+
+
+class JSONStream(object):
+    """Decodes a JSON document one value at a time, so the objects of a large STIX2 bundle are decoded (and released)
+    one by one, instead of decoding the whole document at once.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.index = 0
+
+    def peek(self):
+        """Skips whitespace, and returns the next character of the document ('' at its end)"""
+        self.index = JSON_WHITESPACE.match(self.text, self.index).end()
+        return self.text[self.index:self.index + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expecting '{}' at position {}".format(char, self.index))
+        self.index += 1
+
+    def decode_value(self):
+        self.peek()
+        value, self.index = JSON_DECODER.raw_decode(self.text, self.index)
+        return value
+
+    def iter_array(self):
+        """Yields the positions of the items of the next JSON array, every item must be consumed before the next one"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.index += 1
+            return
+        while True:
+            yield self.index
+            if self.peek() != ",":
+                self.expect("]")
+                return
+            self.index += 1
+
+    def iter_object(self):
+        """Yields the keys of the next JSON object, the value of every key must be consumed before the next key"""
+        self.expect("{")
+        if self.peek() == "}":
+            self.index += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            if self.peek() != ",":
+                self.expect("}")
+                return
+            self.index += 1
+
+
+def iter_stix2_bundle_entries(stream, seen):
+    """Streams the entries of the STIX2 bundle (or single STIX2 object) which is next in the stream
+
+    Args:
+        stream (JSONStream): the document, positioned at the bundle
+        seen (set): (indicator type, value) of the entries created so far in the document
 
+    Returns:
+        generator of dict: the entries of the bundle
     """
-    must_have_in_stix = [
-        "created",
-        "id",
-        "labels",
-        "modified",
-        "pattern",
-        "score",
-        "source",
-        "type",
-        "valid_from"
-    ]
-    if isinstance(data, dict):
-        # Check if is `objects` keyword exists
-        if "objects" in data:
-            objects = data.get("objects")
+    if stream.peek() != "{":
+        stream.decode_value()
+        return_error("No STIX2 object could be parsed")
+    bundle = dict()  # type: dict
+    # the entries of objects which appear before the id of the bundle, kept until it is known
+    pending_entries = list()  # type: list
+    has_objects = False
+    for key in stream.iter_object():
+        if key != "objects":
+            bundle[key] = stream.decode_value()
+            continue
+        has_objects = True
+        if stream.peek() == "[":
+            objects = (stream.decode_value() for _ in stream.iter_array())
+        else:
+            objects = iter([stream.decode_value()])
+        for stix_indicator in objects:
+            for entry in iter_stix2_object_entries(stix_indicator, bundle.get("id"), seen):
+                if "id" in bundle:
+                    yield entry
+                else:
+                    pending_entries.append(entry)
+
+    for entry in pending_entries:
+        entry["CustomFields"]["stixPackageId"] = bundle.get("id")
+        yield entry
+    if not has_objects:
         # If its STIX
-        elif all(key in data for key in must_have_in_stix):
-            objects = data
+        if all(key in bundle for key in MUST_HAVE_IN_STIX):
+            for entry in iter_stix2_object_entries(bundle, bundle.get("id"), seen):
+                yield entry
         else:
             return_error("No STIX2 object could be parsed")
-        # Use regex to extract indicators
-        patterns_lists, entries_dict = get_indicators(objects)
 
-        # Make all the values unique
-        for key, value in patterns_lists.items():
-            patterns_lists[key] = list(set(value))  # type: ignore
 
-        return patterns_lists, entries_dict
+def iter_stix2_entries(stream):
+    """Streams the entries of a STIX2 document - a bundle, a single STIX2 object or a list of bundles.
+    Every indicator is returned once in the document, with the first object which defines it.
+
+    Args:
+        stream (JSONStream): the document
+
+    Returns:
+        generator of dict: the entries of the document
+    """
+    seen = set()  # type: set
+    if stream.peek() == "[":
+        for _ in stream.iter_array():
+            for entry in iter_stix2_bundle_entries(stream, seen):
+                yield entry
     else:
-        return_error("No STIX2 object could be parsed")
+        for entry in iter_stix2_bundle_entries(stream, seen):
+            yield entry
+    if stream.peek():
+        raise ValueError("Extra data at position {}".format(stream.index))
+
+
+def dump_entries(entries):
+    """Dumps the entries as a JSON list, one entry at a time"""
+    return "[" + ", ".join(json.dumps(entry) for entry in entries) + "]"
 
 
 def stix2_to_demisto(stx_obj):
     """Converts stix2 json to demisto object
 
     Args:
-        stx_obj: json object
+        stx_obj: json object, or the STIX2 document as a string
     """
-    data = list()
-    if isinstance(stx_obj, dict):
-        indicators, indicators_dict = extract_indicators(stx_obj)
-        entry = build_entry(indicators, indicators_dict, stx_obj.get("id"))
-        if isinstance(entry, list):
-            data.extend(entry)
-        else:
-            data.append(entry)
-    elif isinstance(stx_obj, list):
-        for obj in stx_obj:
-            indicators, indicators_dict = extract_indicators(obj)
-            entry = build_entry(obj, indicators, obj.get("id"))
-            if entry:
-                if isinstance(entry, list):
-                    data.extend(entry)
-                else:
-                    data.append(entry)
-    dumped = json.dumps(data)
-    demisto.results(dumped)
+    if not isinstance(stx_obj, STRING_TYPES):
+        stx_obj = json.dumps(stx_obj)
+    demisto.results(dump_entries(iter_stix2_entries(JSONStream(stx_obj))))
 
 
 """ STIX 1 """
 
 
-def create_new_ioc(data, i, timestamp, pkg_id, ind_id):
-    data.append({})
-    data[i]["CustomFields"] = {"indicatorId": ind_id, "stixPackageId": pkg_id}
-    data[i]["source"] = ind_id.split(":")[0]
+def create_stix1_timestamp(timestamp):
+    """Formats a STIX1 timestamp as `%Y-%m-%dT%H:%M:%S.%fZ`, without parsing the common xs:dateTime form"""
+    match = STIX1_TIMESTAMP_REGEX.match(timestamp)
+    if match:
+        return "{}.{}Z".format(match.group(1), (match.group(2) or "").ljust(6, "0"))
+    return date_parser.parse(timestamp).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def create_stix1_entry(indicator_type, value, timestamp, pkg_id, ind_id):
+    entry = {
+        "CustomFields": {"indicatorId": ind_id, "stixPackageId": pkg_id},
+        "source": (ind_id or "").split(":")[0],
+        "indicator_type": indicator_type,
+        "value": value
+    }
     if timestamp:
-        data[i]["timestamp"] = timestamp.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        entry["timestamp"] = create_stix1_timestamp(timestamp)
+    return entry
+
+
+def get_local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def get_cybox_values(element):
+    """Returns the values of a cybox property, which may hold a list of values"""
+    if element is None or not element.text or not element.text.strip():
+        return []
+    return [value.strip() for value in element.text.split(CYBOX_VALUES_DELIMITER) if value.strip()]
+
+
+def find_child(element, local_name):
+    for child in element:
+        if get_local_name(child.tag) == local_name:
+            return child
+    return None
+
+
+def iter_stix1_indicator_values(indicator):
+    """Extracting the indicators of the observables of a single STIX1 indicator
+
+    Args:
+        indicator (Element): the `stix:Indicator` element
+
+    Returns:
+        generator of (str, str): indicator type and indicator value
+    """
+    for properties in indicator.iter("{%s}Properties" % CYBOX_NS):
+        object_type = properties.get(XSI_TYPE, "").split(":")[-1]
+        hashes = find_child(properties, "Hashes")
+        if hashes is not None:
+            # File object
+            for hash_value in hashes.iter("{%s}Simple_Hash_Value" % CYBOX_COMMON_NS):
+                for value in get_cybox_values(hash_value):
+                    yield "File", value
+        elif object_type == "AddressObjectType":
+            if properties.get("category", "ipv4-addr").startswith("ip"):
+                for value in get_cybox_values(find_child(properties, "Address_Value")):
+                    yield "IP", value
+        elif object_type == "DomainNameObjectType":
+            for value in get_cybox_values(find_child(properties, "Value")):
+                yield "Domain", value
+        elif object_type == "URIObjectType" or properties.get("type"):
+            # URI object, and the other objects with a type, which are returned as URLs as well
+            for value in get_cybox_values(find_child(properties, "Value")):
+                yield "URL", value
+
+
+def iter_stix1_entries(xml_file):
+    """Streams the entries of the indicators of a STIX1 package, parsing one indicator at a time.
+    Every indicator is returned once in the package, with the first STIX indicator which defines it.
+
+    Args:
+        xml_file: file-like object of the STIX1 XML
+
+    Returns:
+        generator of dict: the entries of the package
+    """
+    seen = set()  # type: set
+    pkg_id = None
+    # the elements from the root to the current element
+    path = list()  # type: list
+    for event, element in ElementTree.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            if not path:
+                pkg_id = element.get("id")
+            path.append(element)
+            continue
+
+        path.pop()
+        if len(path) == 2 and element.tag == "{%s}Indicator" % STIX_NS \
+                and path[1].tag == "{%s}Indicators" % STIX_NS:
+            ind_id = element.get("id")
+            for indicator_type, value in iter_stix1_indicator_values(element):
+                if (indicator_type, value) in seen:
+                    continue
+                seen.add((indicator_type, value))
+                yield create_stix1_entry(indicator_type, value, element.get("timestamp"), pkg_id, ind_id)
+        if len(path) in (1, 2):
+            # the parsed sections of the package (and indicators) are released, so only one is kept at a time
+            element.clear()
+            path[-1].remove(element)
 
 
 def main():
-    txt = demisto.args().get("iocXml").encode("utf-8")
-    stx = convert_to_json(txt)
-    if stx:
-        stix2_to_demisto(stx)
+    txt = demisto.args().get("iocXml")
+    if txt.lstrip()[:1] in ("{", "["):
+        stix2_to_demisto(txt)
     else:
-        with tempfile.NamedTemporaryFile() as temp:
-            temp.write(demisto.args()["iocXml"].encode("utf-8"))
-            temp.flush()
-            stix_package = STIXPackage.from_xml(temp.name)
-        data = list()  # type: list
-        i = 0
-
-        stix_id = stix_package.id_
-        if stix_package.indicators:
-            for ind in stix_package.indicators:
-                ind_id = ind.id_
-                for obs in ind.observables:
-                    if hasattr(obs.object_.properties, "hashes"):
-                        # File object
-                        for digest in obs.object_.properties.hashes:
-                            if hasattr(digest, "simple_hash_value"):
-                                if isinstance(digest.simple_hash_value.value, list):
-                                    for hash in digest.simple_hash_value.value:
-                                        create_new_ioc(
-                                            data, i, ind.timestamp, stix_id, ind_id
-                                        )
-                                        data[i]["indicator_type"] = "File"
-                                        data[i]["value"] = hash
-                                        i = i + 1
-                                else:
-                                    create_new_ioc(data, i, ind.timestamp, stix_id, ind_id)
-                                    data[i]["indicator_type"] = "File"
-                                    data[i][
-                                        "value"
-                                    ] = digest.simple_hash_value.value.strip()
-                                    i = i + 1
-                    elif hasattr(obs.object_.properties, "category"):
-                        # Address object
-                        category = obs.object_.properties.category
-                        if category.startswith("ip"):
-                            for ip in obs.object_.properties.address_value.values:
-                                create_new_ioc(data, i, ind.timestamp, stix_id, ind_id)
-                                data[i]["indicator_type"] = "IP"
-                                data[i]["value"] = ip
-                                i = i + 1
-                    elif hasattr(obs.object_.properties, "type_"):
-                        if obs.object_.properties.type_ == "URL":
-                            # URI object
-                            create_new_ioc(data, i, ind.timestamp, stix_id, ind_id)
-                            data[i]["indicator_type"] = "URL"
-                            data[i]["value"] = obs.object_.properties.value.value
-                            i = i + 1
-                        elif hasattr(obs.object_.properties.value, "values"):
-                            for url in obs.object_.properties.value.values:
-                                # URI object
-                                create_new_ioc(data, i, ind.timestamp, stix_id, ind_id)
-                                data[i]["indicator_type"] = "URL"
-                                data[i]["value"] = url
-                                i = i + 1
-        json_data = json.dumps(data)
-        demisto.results(json_data)
+        xml = txt if isinstance(txt, bytes) else txt.encode("utf-8")
+        demisto.results(dump_entries(iter_stix1_entries(BytesIO(xml))))
 
 
 # SCRIPT START
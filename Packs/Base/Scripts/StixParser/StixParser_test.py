@@ -1,4 +1,5 @@
 import json
+import time
 
 import pytest
 
@@ -122,20 +123,6 @@ class TestHelperFunctions:
         result = ip_parser(expected_value)
         assert result == expected_value, self.err_msg.format(expected_value, result)
 
-    def test_convert_to_json(self):
-        from StixParser import convert_to_json
-        js = "[]"
-        expected = []
-        result = convert_to_json(js)
-        assert result == expected, self.err_msg.format(expected, result)
-
-    def test_convert_to_json_false(self):
-        from StixParser import convert_to_json
-        js = "notjsonable"
-        expected = None
-        result = convert_to_json(js)
-        assert result == expected, self.err_msg.format(expected, result)
-
     def test_create_timestamp(self):
         from StixParser import create_timestamp
         timestamp = "2019-05-28T16:38:17.845Z"
@@ -239,3 +226,201 @@ def test_missing_firstSeen(mocker):
     from StixParser import main
     TestStix1.mock_demisto_with_file("./TestData/missing_firstSeen.json", mocker)
     main()
+
+
+def _stix2_indicator(i, pattern, source="test"):
+    return {
+        "created": "2019-05-26T16:17:08.000Z",
+        "id": "indicator--{}".format(i),
+        "labels": ["ip"],
+        "modified": "2019-05-26T16:17:08.000Z",
+        "pattern": pattern,
+        "score": "High",
+        "source": source,
+        "type": "indicator",
+        "valid_from": "2019-05-28T16:38:17.850114Z"
+    }
+
+
+def test_stix2_dedup_across_bundles(mocker):
+    """
+    Given:
+    - A list of bundles, where indicators appear in several objects and bundles, and the id of the first bundle
+      appears after its objects
+
+    When:
+    - Parsing the document
+
+    Then:
+    - Ensure every indicator is returned once, with the first object which defines it and the id of its bundle
+    """
+    from StixParser import main
+    first_bundle = json.dumps({"objects": [
+        _stix2_indicator(1, "[ipv4-addr:value = '1.1.1.1']"),
+        _stix2_indicator(2, "[ipv4-addr:value = '1.1.1.1'] OR [url:value = 'http://example.com']")
+    ]})
+    second_bundle = {"type": "bundle", "id": "bundle--2", "objects": [
+        _stix2_indicator(3, "[url:value = 'http://example.com'] OR [ipv4-addr:value = '2.2.2.2']")
+    ]}
+    document = '[{}, "id": "bundle--1"}}, {}]'.format(first_bundle[:-1], json.dumps(second_bundle))
+    mock_demisto(mocker)
+    mocker.patch.object(demisto, "args", return_value={"iocXml": document})
+
+    main()
+
+    results = json.loads(demisto.results.call_args[0][0])
+    assert [(entry["indicator_type"], entry["value"], entry["CustomFields"]) for entry in results] == [
+        ("IP", "1.1.1.1", {"indicatorId": "indicator--1", "stixPackageId": "bundle--1"}),
+        ("URL", "http://example.com", {"indicatorId": "indicator--2", "stixPackageId": "bundle--1"}),
+        ("IP", "2.2.2.2", {"indicatorId": "indicator--3", "stixPackageId": "bundle--2"})
+    ]
+
+
+STIX1_HEADER = '<stix:STIX_Package xmlns:stix="http://stix.mitre.org/stix-1" ' \
+               'xmlns:indicator="http://stix.mitre.org/Indicator-2" xmlns:cybox="http://cybox.mitre.org/cybox-2" ' \
+               'xmlns:cyboxCommon="http://cybox.mitre.org/common-2" ' \
+               'xmlns:FileObj="http://cybox.mitre.org/objects#FileObject-2" ' \
+               'xmlns:AddressObj="http://cybox.mitre.org/objects#AddressObject-2" ' \
+               'xmlns:URIObj="http://cybox.mitre.org/objects#URIObject-2" ' \
+               'xmlns:DomainNameObj="http://cybox.mitre.org/objects#DomainNameObject-1" ' \
+               'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" id="example:Package-1" version="1.2">' \
+               '<stix:Indicators>'
+STIX1_FOOTER = '</stix:Indicators></stix:STIX_Package>'
+STIX1_INDICATOR = '<stix:Indicator id="example:indicator-{i}" timestamp="2015-07-20T19:52:13.8+02:00" ' \
+                  'xsi:type="indicator:IndicatorType"><indicator:Title>{title}</indicator:Title>' \
+                  '<indicator:Observable><cybox:Object><cybox:Properties xsi:type="FileObj:FileObjectType">' \
+                  '<FileObj:Hashes><cyboxCommon:Hash><cyboxCommon:Simple_Hash_Value>{hash:064x}' \
+                  '</cyboxCommon:Simple_Hash_Value></cyboxCommon:Hash></FileObj:Hashes></cybox:Properties>' \
+                  '</cybox:Object></indicator:Observable></stix:Indicator>' \
+                  '<stix:Indicator id="example:indicator-a{i}" xsi:type="indicator:IndicatorType">' \
+                  '<indicator:Observable><cybox:Object><cybox:Properties category="ipv4-addr" ' \
+                  'xsi:type="AddressObj:AddressObjectType"><AddressObj:Address_Value>10.0.{a}.{b}##comma##' \
+                  '10.1.{a}.{b}</AddressObj:Address_Value></cybox:Properties></cybox:Object>' \
+                  '</indicator:Observable></stix:Indicator>' \
+                  '<stix:Indicator id="example:indicator-u{i}" xsi:type="indicator:IndicatorType">' \
+                  '<indicator:Observable><cybox:Object><cybox:Properties type="URL" ' \
+                  'xsi:type="URIObj:URIObjectType"><URIObj:Value>http://example.com/{url}</URIObj:Value>' \
+                  '</cybox:Properties></cybox:Object></indicator:Observable></stix:Indicator>'
+
+
+def _get_stix1(count, title="", unique_hashes=None, unique_urls=None):
+    return STIX1_HEADER + ''.join(STIX1_INDICATOR.format(
+        i=i, title=title, hash=i % (unique_hashes or count), a=i // 256 % 256, b=i % 256, url=i % (unique_urls or count)
+    ) for i in range(count)) + STIX1_FOOTER
+
+
+def test_stix1_dedup(mocker):
+    """
+    Given:
+    - A STIX1 package of file, address and URI indicators, where the hashes and URLs repeat
+
+    When:
+    - Parsing the package
+
+    Then:
+    - Ensure every indicator is returned once, with the first indicator which defines it, in the order of the package
+    """
+    from StixParser import main
+    mock_demisto(mocker)
+    mocker.patch.object(demisto, "args", return_value={"iocXml": _get_stix1(4, unique_hashes=2, unique_urls=1)})
+
+    main()
+
+    results = json.loads(demisto.results.call_args[0][0])
+    assert [(entry["indicator_type"], entry["value"], entry["CustomFields"]["indicatorId"]) for entry in results] == [
+        ("File", "{:064x}".format(0), "example:indicator-0"),
+        ("IP", "10.0.0.0", "example:indicator-a0"),
+        ("IP", "10.1.0.0", "example:indicator-a0"),
+        ("URL", "http://example.com/0", "example:indicator-u0"),
+        ("File", "{:064x}".format(1), "example:indicator-1"),
+        ("IP", "10.0.0.1", "example:indicator-a1"),
+        ("IP", "10.1.0.1", "example:indicator-a1"),
+        ("IP", "10.0.0.2", "example:indicator-a2"),
+        ("IP", "10.1.0.2", "example:indicator-a2"),
+        ("IP", "10.0.0.3", "example:indicator-a3"),
+        ("IP", "10.1.0.3", "example:indicator-a3")
+    ]
+    assert results[0]["timestamp"] == "2015-07-20T19:52:13.800000Z"
+    assert results[0]["source"] == "example"
+    assert results[0]["CustomFields"]["stixPackageId"] == "example:Package-1"
+
+
+def test_stix1_typed_objects(mocker):
+    """
+    Given:
+    - A STIX1 package of a domain name indicator, and of an indicator of another object with a type
+
+    When:
+    - Parsing the package
+
+    Then:
+    - Ensure the domain name is returned as a domain, and the value of the other object as a URL
+    """
+    from StixParser import main
+    mock_demisto(mocker)
+    indicators = '<stix:Indicator id="example:indicator-d" xsi:type="indicator:IndicatorType"><indicator:Observable>' \
+                 '<cybox:Object><cybox:Properties type="FQDN" xsi:type="DomainNameObj:DomainNameObjectType">' \
+                 '<DomainNameObj:Value>example.com</DomainNameObj:Value></cybox:Properties></cybox:Object>' \
+                 '</indicator:Observable></stix:Indicator>' \
+                 '<stix:Indicator id="example:indicator-o" xsi:type="indicator:IndicatorType"><indicator:Observable>' \
+                 '<cybox:Object><cybox:Properties type="General URN" xsi:type="URIObj:OtherObjectType">' \
+                 '<URIObj:Value>urn:example</URIObj:Value></cybox:Properties></cybox:Object>' \
+                 '</indicator:Observable></stix:Indicator>'
+    mocker.patch.object(demisto, "args", return_value={"iocXml": STIX1_HEADER + indicators + STIX1_FOOTER})
+
+    main()
+
+    results = json.loads(demisto.results.call_args[0][0])
+    assert [(entry["indicator_type"], entry["value"]) for entry in results] == [
+        ("Domain", "example.com"),
+        ("URL", "urn:example"),
+    ]
+
+
+@pytest.mark.parametrize('timestamp, expected', [
+    ("2015-07-20T19:52:13.853585+00:00", "2015-07-20T19:52:13.853585Z"),
+    ("2014-05-08T09:00:00", "2014-05-08T09:00:00.000000Z"),
+    ("2014-05-08T09:00:00.5Z", "2014-05-08T09:00:00.500000Z"),
+    ("May 8 2014 09:00", "2014-05-08T09:00:00.000000Z"),
+])
+def test_create_stix1_timestamp(timestamp, expected):
+    from StixParser import create_stix1_timestamp
+    assert create_stix1_timestamp(timestamp) == expected
+
+
+@pytest.mark.benchmark
+def test_benchmark(mocker):
+    """
+    Given:
+    - A 100MB STIX2 bundle and a 100MB STIX1 package, where some of the indicators repeat
+
+    When:
+    - Parsing the documents
+
+    Then:
+    - Ensure all the unique indicators are returned, in less than a minute for each document
+    """
+    from StixParser import main
+    mock_demisto(mocker)
+    objects = [json.dumps(_stix2_indicator(
+        i, "[ipv4-addr:value = '10.{}.{}.{}'] OR [file:hashes.'SHA-256' = '{:064x}']".format(
+            i // 65536, i // 256 % 256, i % 256, i % 50000), source="x" * 300
+    )) for i in range(200000)]
+    stix2 = '{"type": "bundle", "id": "bundle--1", "objects": [' + ',\n'.join(objects) + ']}'
+    del objects
+    assert len(stix2) > 100 * 1000 * 1000
+    mocker.patch.object(demisto, "args", return_value={"iocXml": stix2})
+
+    start = time.time()
+    main()
+    assert time.time() - start < 60
+    assert len(json.loads(demisto.results.call_args[0][0])) == 250000
+
+    stix1 = _get_stix1(160000, title="x" * 100, unique_hashes=40000, unique_urls=30000)
+    assert len(stix1) > 100 * 1000 * 1000
+    mocker.patch.object(demisto, "args", return_value={"iocXml": stix1})
+
+    start = time.time()
+    main()
+    assert time.time() - start < 60
+    assert len(json.loads(demisto.results.call_args[0][0])) == 40000 + 2 * 65536 + 30000
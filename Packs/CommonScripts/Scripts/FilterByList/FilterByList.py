@@ -2,6 +2,17 @@ import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
 
+import hashlib
+import types
+from collections import OrderedDict
+
+# the compiled lists are kept in a module of their own, which outlives the re-execution of the script in the docker loop
+COMPILED_LISTS_CACHE_MODULE = '_filter_by_list_cache'
+COMPILED_LISTS_CACHE_SIZE = 8
+REGEX_SPECIAL_CHARS = set('.^$*+?{}[]\\|()')
+# a regex without these characters can't match across the new lines the list entries are joined with
+SINGLE_LINE_REGEX_CHARS = REGEX_SPECIAL_CHARS - {'.'}
+
 
 def empty_list_context(items, list_name):
     ec = {'List.In': [], 'List.NotIn': items}
@@ -10,36 +21,92 @@ def empty_list_context(items, list_name):
     return human_readable, ec
 
 
-def build_filtered_data(lst, items, ignore_case, match_exact, regex_ignore_case_flag):
+def is_ascii(text):
+    try:
+        text.encode('ascii')
+    except UnicodeError:
+        return False
+    return True
+
+
+class CompiledList(object):
+    """
+    A list compiled once for all the items it is matched with: a set of the entries for an exact match, and the
+    entries joined by new lines for a substring match.
+    """
+
+    def __init__(self, lst, ignore_case):
+        self.ignore_case = ignore_case
+        self.exact_entries = set(list_item.lower().strip() for list_item in lst) if ignore_case else set(lst)
+        self.entries = [list_item for list_item in lst if list_item]
+        self.joined_entries = '\n'.join(self.entries)
+        # ascii entries are matched case insensitively by their lower case, which is faster than an ignore case regex
+        self.lower_joined_entries = None
+        if ignore_case and is_ascii(self.joined_entries):
+            self.lower_joined_entries = self.joined_entries.lower()
+
+    def match_exact(self, item):
+        return (item.lower() if self.ignore_case else item) in self.exact_entries
+
+    def search(self, item):
+        """
+        Whether any of the list entries matches the item regex
+        """
+        if not self.entries:
+            return False
+        if '\n' not in item and not SINGLE_LINE_REGEX_CHARS.intersection(item):
+            # an item of literal characters and dots can't match across entries, so it is searched in all of them at once
+            joined_entries = self.joined_entries
+            flags = re.IGNORECASE if self.ignore_case else 0
+            if self.lower_joined_entries is not None and is_ascii(item):
+                joined_entries, item, flags = self.lower_joined_entries, item.lower(), 0
+            if not flags and '.' not in item:
+                return item in joined_entries
+            return re.search(item, joined_entries, flags) is not None
+        pattern = re.compile(item, re.IGNORECASE if self.ignore_case else 0)
+        return any(pattern.search(list_item) for list_item in self.entries)
+
+
+def get_compiled_lists_cache():
+    cache_module = sys.modules.get(COMPILED_LISTS_CACHE_MODULE)
+    if cache_module is None:
+        cache_module = types.ModuleType(COMPILED_LISTS_CACHE_MODULE)
+        cache_module.cache = OrderedDict()
+        sys.modules[COMPILED_LISTS_CACHE_MODULE] = cache_module
+    return cache_module.cache
+
+
+def compile_list(list_name, contents, delimiter, ignore_case):
+    """
+    Returns the compiled list, which is compiled once per process for the same list name and content
+    """
+    contents_bytes = contents if isinstance(contents, bytes) else contents.encode('utf-8')
+    cache_key = (list_name, hashlib.sha256(contents_bytes).hexdigest(), delimiter, ignore_case)
+    cache = get_compiled_lists_cache()
+    compiled_list = cache.pop(cache_key, None)
+    if compiled_list is None:
+        compiled_list = CompiledList(contents.split(delimiter), ignore_case)
+    cache[cache_key] = compiled_list
+    if len(cache) > COMPILED_LISTS_CACHE_SIZE:
+        cache.popitem(last=False)
+    return compiled_list
+
+
+def build_filtered_data(compiled_list, items, match_exact):
     not_white_listed = []  # type: list
     white_listed = []  # type: list
-    human_readable = ''
 
-    # fill whitelisted array with all the the values that match the regex items in listname argument
-    list_to_lowercase = [list_item.lower().strip() for list_item in lst]
+    # every item is matched once, against all the list entries
     for item in items:
-        if match_exact:
-            if ignore_case:
-                if item.lower() not in list_to_lowercase:
-                    continue
-            else:
-                if item not in lst:
-                    continue
-
-            human_readable += item + ' is in the list\n'
+        if compiled_list.match_exact(item) if match_exact else compiled_list.search(item):
             white_listed.append(item)
         else:
-            for list_item in lst:
-                if list_item and re.search(item, list_item, regex_ignore_case_flag):
-                    human_readable += item + ' is in the list\n'
-                    white_listed.append(item)
-
-    # fill not_white_listed array with all the the values that not in whitelisted
-    for item in items:
-        if item not in white_listed:
-            human_readable += item + ' is not part of the list\n'
             not_white_listed.append(item)
 
+    human_readable_lines = [item + ' is in the list' for item in white_listed]
+    human_readable_lines.extend(item + ' is not part of the list' for item in not_white_listed)
+    human_readable = ''.join(line + '\n' for line in human_readable_lines)
+
     return white_listed, not_white_listed, human_readable
 
 
@@ -48,11 +115,9 @@ def filter_list(lst, items, ignore_case, match_exact, list_name, delimiter):
     if not lst[0]['Contents']:
         return empty_list_context(items, list_name)
 
-    lst = lst[0]['Contents'].split(delimiter)
-    regex_ignore_case_flag = re.IGNORECASE if ignore_case else 0
+    compiled_list = compile_list(list_name, lst[0]['Contents'], delimiter, ignore_case)
 
-    white_listed, not_white_listed, human_readable = build_filtered_data(lst, items, ignore_case, match_exact,
-                                                                         regex_ignore_case_flag)
+    white_listed, not_white_listed, human_readable = build_filtered_data(compiled_list, items, match_exact)
 
     ec = {
         'List': {
@@ -1,4 +1,6 @@
 from __future__ import print_function
+import time
+
 import pytest
 from FilterByList import filter_list
 
@@ -156,3 +158,54 @@ def test_no_ignore_yes_match(lst, items, ignore_case, match_exact, expected_resu
 def test_yes_ignore_yes_match(lst, items, ignore_case, match_exact, expected_result, list_name, delimiter):
     result, _ = filter_list(lst, items, ignore_case, match_exact, list_name, delimiter)
     assert result == expected_result
+
+
+def test_item_matching_several_entries():
+    """
+    Given:
+        - An item which matches several entries of the list
+    When:
+        - Filtering the item by the list
+    Then:
+        - Ensure the item is in the list once
+    """
+    human_readable, ec = filter_list([{'Contents': 'foo,food,foot'}], ['foo'], False, False, 'list', ',')
+    assert ec['List']['In'] == ['foo']
+    assert human_readable == 'foo is in the list\n'
+
+
+def test_compiled_list_cache():
+    """
+    Given:
+        - A list which was compiled
+    When:
+        - Compiling the same list again, and the list with another content
+    Then:
+        - Ensure the same list is compiled once, and the changed list is compiled again
+    """
+    from FilterByList import compile_list
+    compiled_list = compile_list('cached_list', 'a,b,c', ',', False)
+    assert compile_list('cached_list', 'a,b,c', ',', False) is compiled_list
+    assert compile_list('cached_list', 'a,b,c,d', ',', False) is not compiled_list
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('items, match_exact', [
+    (['entry{}.example.com'.format(i) for i in range(0, 100000, 100)], True),
+    (['ENTRY{}.example.com'.format(i) for i in range(0, 100000, 100)], False),
+    (['^entry{}\\.'.format(i) for i in range(0, 100000, 1000)], False),
+])
+def test_benchmark(items, match_exact):
+    """
+    Given:
+        - A list of 50,000 entries
+    When:
+        - Filtering items by the list, half of them in the list
+    Then:
+        - Ensure the items are filtered in a few seconds
+    """
+    lst = [{'Contents': ','.join('entry{}.example.com'.format(i) for i in range(50000))}]
+    start = time.time()
+    _, ec = filter_list(lst, items, True, match_exact, 'benchmark_list', ',')
+    assert time.time() - start < 10
+    assert len(ec['List']['In']) == len(ec['List']['NotIn']) == len(items) // 2
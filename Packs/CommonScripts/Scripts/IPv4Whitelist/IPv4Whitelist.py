@@ -1,21 +1,12 @@
 import demistomock as demisto
 from CommonServerPython import *
 
-from netaddr import IPAddress, IPNetwork
-
 
 def main():
     ip_addresses = argToList(demisto.args()['value'])
-    cidr_range_list = argToList(demisto.args()['cidr_ranges'])
-
-    included_addresses = []
+    matcher = CIDRRangesMatcher.compile(argToList(demisto.args()['cidr_ranges']))
 
-    for ip_address in ip_addresses:
-        ip = IPAddress(ip_address)
-
-        for cidr_range in cidr_range_list:
-            if ip in IPNetwork(cidr_range):
-                included_addresses.append(ip_address)
+    included_addresses = matcher.filter(ip_addresses)
 
     if not included_addresses:
         demisto.results(None)
@@ -23,5 +14,7 @@ def main():
         demisto.results(included_addresses)
 
 
+from CIDRRangesApiModule import *  # noqa: E402
+
 if __name__ == "__builtin__" or __name__ == "builtins":
     main()
@@ -28,3 +28,23 @@ def test_main(mocker):
     assert len(results) == 2
     assert results[0] == '10.0.0.5'
     assert results[1] == '5.6.7.8'
+
+
+def test_main_overlapping_ranges(mocker):
+    """
+    Given
+    - Overlapping CIDR ranges.
+    When
+    - Filtering IP addresses which are in more than one of the ranges.
+    Then
+    - Ensure every matching address is returned once.
+    """
+    from IPv4Whitelist import main
+
+    mocker.patch.object(demisto, 'args', return_value={
+        'value': '10.0.0.5,10.1.0.5,4.2.2.2',
+        'cidr_ranges': '10.0.0.0/8,10.0.0.0/16'
+    })
+    mocker.patch.object(demisto, 'results')
+    main()
+    assert demisto.results.call_args[0][0] == ['10.0.0.5', '10.1.0.5']
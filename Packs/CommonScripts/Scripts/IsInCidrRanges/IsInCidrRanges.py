@@ -1,20 +1,16 @@
 import demistomock as demisto
 from CommonServerPython import *
 
-from netaddr import IPAddress, IPNetwork
-
 
 def main():
-    ip_address = demisto.args()['left']
-    cidr_range_list = argToList(demisto.args()['right'])
+    ip_addresses = argToList(demisto.args()['left'])
+    matcher = CIDRRangesMatcher.compile(argToList(demisto.args()['right']))
 
-    for cidr in cidr_range_list:
-        if IPAddress(ip_address) in IPNetwork(cidr):
-            demisto.results(True)
-            return
+    results = matcher.match(ip_addresses)
+    demisto.results(results[0] if len(results) == 1 else results)
 
-    demisto.results(False)
 
+from CIDRRangesApiModule import *  # noqa: E402
 
 if __name__ == "__builtin__" or __name__ == "builtins":
     main()
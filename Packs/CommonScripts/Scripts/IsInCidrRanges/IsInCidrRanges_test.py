@@ -33,3 +33,23 @@ def test_main(mocker):
     assert demisto.results.call_count == 1
     results = demisto.results.call_args
     assert results[0][0] is True
+
+
+def test_main_multiple_ips(mocker):
+    """
+    Given
+    - A list of IPv4 and IPv6 addresses.
+    When
+    - Checking whether they are in the ranges.
+    Then
+    - Ensure a result is returned for every address, in order.
+    """
+    from IsInCidrRanges import main
+
+    mocker.patch.object(demisto, 'args', return_value={
+        'left': ['10.5.5.5', '172.16.0.1', '2001:db8::1'],
+        'right': '10.0.0.0/8,192.168.0.0/16,2001:db8::/32'
+    })
+    mocker.patch.object(demisto, 'results')
+    main()
+    assert demisto.results.call_args[0][0] == [True, False, True]
@@ -4,42 +4,252 @@ If the column is not present, simply parse the CSV into a list of lists or list
 """
 from CommonServerPython import *
 import csv
+import hashlib
+import sqlite3
+import tempfile
+from contextlib import closing, suppress
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
 
+# the column indexes are kept by the hash of the CSV file, and reused by later lookups in the same file
+INDEX_DIR = os.path.join(tempfile.gettempdir(), 'lookup_csv_indexes')
+INDEX_QUERY_BATCH_SIZE = 500
+# the least recently used indexes are removed, so the indexes take no more than this number of files and bytes
+MAX_INDEXES = 20
+MAX_INDEXES_SIZE = 1024 * 1024 * 1024
 
-def search_dicts(k, v, data):
+
+class OffsetLines:
     """
-    Search a list of dicts by key
+    Iterates the lines of a binary file, while keeping the offset of the next line - so the offset of every CSV record
+    is the offset before it is read.
     """
-    match = []
-    for row in data:
-        if k in row:
-            if v == row[k]:
-                match.append(row)
 
-    if len(match) == 1:
-        # If we only get one result: return just it as a dictr
-        return match[0]
+    def __init__(self, csv_file, offset=0):
+        self.csv_file = csv_file
+        self.offset = offset
+
+    def __iter__(self):
+        for line in self.csv_file:
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+
+def dict_row(fieldnames, values):
+    """
+    Creates a row dict as csv.DictReader does
+    """
+    row = dict(zip(fieldnames, values))
+    if len(fieldnames) < len(values):
+        row[None] = values[len(fieldnames):]
     else:
-        return match
+        for key in fieldnames[len(values):]:
+            row[key] = None
+    return row
+
+
+def get_fieldnames(csv_file, header_row, add_row) -> Optional[list]:
+    """
+    Returns the names of the columns - of the header row, or of the added header row - or None if there are none
+    """
+    if header_row:
+        csv_file.seek(0)
+        return next(csv.reader(OffsetLines(csv_file)), [])
+    if add_row:
+        return add_row.split(',')
+    return None
+
+
+def read_rows(csv_file, fieldnames, add_row, offset=0) -> Iterator[Tuple[int, Any]]:
+    """
+    Streams the rows of a CSV file
+    :param csv_file: the CSV file, opened in binary mode
+    :param fieldnames: the names of the columns, None if the file has no header row
+    :param add_row: the header row which was added to the file, if any
+    :param offset: the offset to start reading the rows from, after the header row if the file has one
+    :return: the offset of every row and the row - a dict if there are column names, else a list
+    """
+    csv_file.seek(offset)
+    lines = OffsetLines(csv_file, offset)
+    csv_reader = csv.reader(lines)
+    while True:
+        row_offset = lines.offset
+        values = next(csv_reader, None)
+        if values is None:
+            return
+        if not values:
+            continue
+        if fieldnames is None:
+            yield row_offset, values
+        else:
+            row = dict_row(fieldnames, values)
+            if add_row and len(row) != len(fieldnames):
+                return_error("Added row via add_header_row has invalid length.")
+            yield row_offset, row
 
 
-def search_lists(k, v, data):
+def read_file_rows(csv_file, header_row, add_row) -> Iterator[Tuple[int, Any]]:
     """
-    Search a list of lists by index
+    Streams all the rows of a CSV file, as dicts if there is a header row, else as lists
     """
-    match = []
+    fieldnames = get_fieldnames(csv_file, header_row, add_row)
+    # the rows start after the header row, if the file has one
+    offset = csv_file.tell() if header_row else 0
+    return read_rows(csv_file, fieldnames, add_row, offset=offset)
 
-    k = int(k)
-    for row in data:
-        row_values = list(row.values())
-        if row_values[k] == v:
-            match.append(row)
 
-    if len(match) == 1:
+def get_row_value(row, column):
+    """
+    Returns the value of a row in the searched column - by name if the row is a dict of a header row, else by index
+    """
+    if isinstance(column, int):
+        row_values = list(row.values()) if isinstance(row, dict) else row
+        return row_values[column] if -len(row_values) <= column < len(row_values) else None
+    return row.get(column)
+
+
+def search_rows(rows, column, values) -> Dict[str, list]:
+    """
+    Searches the rows for many values in a single pass
+    :param rows: the rows of the CSV file
+    :param column: the column to search - a name if the rows are dicts of a header row, else an index
+    :param values: the values to search for
+    :return: the matching rows of every value
+    """
+    matches: Dict[str, list] = {value: [] for value in values}
+    for _, row in rows:
+        row_matches = matches.get(get_row_value(row, column))  # type: ignore
+        if row_matches is not None:
+            row_matches.append(row)
+    return matches
+
+
+def get_file_hash(file_path):
+    file_hash = hashlib.sha256()
+    with open(file_path, mode='rb') as csv_file:
+        for chunk in iter(lambda: csv_file.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class ColumnIndex:
+    """
+    An on-disk index of a CSV column - a sqlite table of the values of the column and the offsets of their rows.
+    The index is kept by the hash of the file and the way it is read, so it is reused by later lookups in the same file.
+    """
+
+    def __init__(self, file_path, column, header_row, add_row):
+        self.file_path = file_path
+        self.column = column
+        self.header_row = header_row
+        self.add_row = add_row
+        index_key = json.dumps([get_file_hash(file_path), column, bool(header_row), add_row])
+        self.index_path = os.path.join(INDEX_DIR, hashlib.sha256(index_key.encode('utf-8')).hexdigest() + '.db')
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    def build(self, csv_file):
+        """
+        Builds the index in a single pass over the file
+        :param csv_file: the CSV file, opened in binary mode
+        """
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        # the index is built in a temporary file, so a concurrent lookup never reads a partial index
+        fd, tmp_index_path = tempfile.mkstemp(dir=INDEX_DIR, suffix='.tmp')
+        os.close(fd)
+        try:
+            with closing(sqlite3.connect(tmp_index_path)) as connection:
+                connection.execute('CREATE TABLE offsets (value TEXT, offset INTEGER)')
+                rows = read_file_rows(csv_file, self.header_row, self.add_row)
+                connection.executemany('INSERT INTO offsets VALUES (?, ?)', (
+                    (value, row_offset) for row_offset, value in
+                    ((row_offset, get_row_value(row, self.column)) for row_offset, row in rows) if value is not None
+                ))
+                connection.execute('CREATE INDEX offsets_value ON offsets (value)')
+                connection.commit()
+            os.replace(tmp_index_path, self.index_path)
+        finally:
+            if os.path.exists(tmp_index_path):
+                os.remove(tmp_index_path)
+        evict_indexes(self.index_path)
+
+    def search(self, csv_file, values) -> Dict[str, list]:
+        """
+        Searches the index for many values, and reads only their rows from the file
+        :param csv_file: the CSV file, opened in binary mode
+        :param values: the values to search for
+        :return: the matching rows of every value
+        """
+        matches: Dict[str, list] = {value: [] for value in values}
+        unique_values = list(matches)
+        # opened read only, so an index which was evicted in the meantime fails the search instead of being created
+        with closing(sqlite3.connect('file:{}?mode=ro'.format(quote(self.index_path)), uri=True)) as connection:
+            # the modification time of the index is the time it was last used
+            with suppress(FileNotFoundError):
+                os.utime(self.index_path)
+            value_offsets = []
+            for i in range(0, len(unique_values), INDEX_QUERY_BATCH_SIZE):
+                batch = unique_values[i:i + INDEX_QUERY_BATCH_SIZE]
+                value_offsets.extend(connection.execute(
+                    'SELECT value, offset FROM offsets WHERE value IN ({})'.format(','.join('?' * len(batch))), batch
+                ))
+        # the rows are read in the order of the file
+        fieldnames = get_fieldnames(csv_file, self.header_row, self.add_row)
+        for value, row_offset in sorted(value_offsets, key=lambda value_offset: value_offset[1]):
+            _, row = next(read_rows(csv_file, fieldnames, self.add_row, offset=row_offset))
+            matches[value].append(row)
+        return matches
+
+
+def evict_indexes(keep_path):
+    """
+    Removes the least recently used indexes, while there are more than MAX_INDEXES of them or they take more than
+    MAX_INDEXES_SIZE bytes
+    :param keep_path: the path of the index of the current lookup, which is never removed
+    """
+    indexes = []
+    for entry in os.scandir(INDEX_DIR):
+        if not entry.name.endswith('.db') or entry.path == keep_path:
+            continue
+        with suppress(FileNotFoundError):  # removed by a concurrent lookup
+            stat = entry.stat()
+            indexes.append((stat.st_mtime, stat.st_size, entry.path))
+    count = len(indexes) + 1
+    size = sum(index_size for _, index_size, _ in indexes) + os.path.getsize(keep_path)
+    for _, index_size, index_path in sorted(indexes):
+        if count <= MAX_INDEXES and size <= MAX_INDEXES_SIZE:
+            break
+        with suppress(FileNotFoundError):
+            os.remove(index_path)
+        count -= 1
+        size -= index_size
+
+
+def lookup(file_path, column, values, header_row, add_row, use_index) -> Dict[str, list]:
+    """
+    Searches the CSV file for many values - in a single pass over the file, or by the column index
+    """
+    with open(file_path, mode='rb') as csv_file:
+        if not use_index:
+            return search_rows(read_file_rows(csv_file, header_row, add_row), column, values)
+
+        column_index = ColumnIndex(file_path, column, header_row, add_row)
+        if column_index.exists():
+            try:
+                return column_index.search(csv_file, values)
+            except sqlite3.OperationalError:
+                demisto.debug('The index of the column was evicted by another lookup, rebuilding it')
+        column_index.build(csv_file)
+        return column_index.search(csv_file, values)
+
+
+def single_result(rows):
+    if len(rows) == 1:
         # If we only get one result: return just it.
-        return match[0]
+        return rows[0]
     else:
-        return match
+        return rows
 
 
 def main():
@@ -50,6 +260,8 @@ def main():
     search_column = d_args['column'] if 'column' in d_args else None
 
     search_value: str = d_args['value'] if 'value' in d_args else None
+    search_values = argToList(d_args.get('values'))
+    use_index = argToBoolean(d_args.get('use_index') or 'false')
 
     add_row = d_args['add_header_row'] if 'add_header_row' in d_args else None
 
@@ -64,41 +276,36 @@ def main():
             '"{}" is not in csv format. Please ensure the file is in correct format and has a ".csv" extension'.format(
                 file_name))
 
-    csv_data: list = []
-    with open(file_path, mode='r') as csv_file:
-        if header_row:
-            csv_reader = csv.DictReader(csv_file)
-            for line in csv_reader:
-                csv_data.append(line)
-        elif add_row:
-            headers = add_row.split(',')
-            csv_reader = csv.DictReader(csv_file, fieldnames=headers)
-            for line in csv_reader:
-                csv_data.append(line)
-                if len(line) != len(add_row.split(",")):
-                    return_error(
-                        "Added row via add_header_row has invalid length.")
-
-        else:
-            csv_reader = csv.DictReader(csv_file, fieldnames=[])
-            for line in csv_reader:
-                line_values = list(line.values())
-
-                if line_values:
-                    csv_data.append(line_values[0])
-
     # If we're searching the CSV
     if search_column:
-        if header_row:
-            csv_data = search_dicts(search_column, search_value, csv_data)
-        else:
+        if not header_row:
             # Lists are 0-indexed but this makes it more human readable (column 0 is column 1)
             try:
                 search_column = int(search_column) - 1
             except ValueError:
                 return_error(
                     "CSV column spec must be integer if header_row not supplied (got {})".format(search_column))
-            csv_data = search_lists(search_column, search_value, csv_data)
+
+        matches = lookup(file_path, search_column, search_values or [search_value], header_row, add_row, use_index)
+        if search_values:
+            # Many values are searched in one call, and every value gets its own result
+            output = [{
+                'FoundResult': True if matches[value] else False,
+                'Result': single_result(matches[value]) if matches[value] else None,
+                'SearchValue': value
+            } for value in search_values]
+            demisto.results({
+                "Type": entryTypes["note"],
+                "ContentsFormat": formats["json"],
+                "Contents": output,
+                "EntryContext": {'LookupCSV': output}
+            })
+            return
+
+        csv_data: Any = single_result(matches[search_value])
+    else:
+        with open(file_path, mode='rb') as csv_file:
+            csv_data = [row for _, row in read_file_rows(csv_file, header_row, add_row)]
 
     output = {
         'LookupCSV': {
@@ -1,4 +1,7 @@
 import json
+import os
+import time
+
 import demistomock as demisto
 import pytest
 
@@ -164,3 +167,153 @@ class TestLookupCSV:
         main()
         result = self.get_demisto_results()
         assert expected == result
+
+    def test_main_csv_search_many_values(self, mocker):
+        """
+        Given:
+            - A CSV file with a header row
+        When:
+            - Searching for many values in one call
+        Then:
+            - Ensure every value gets its own result, in the order of the values
+        """
+        from LookupCSV import main
+        args_value = {
+            "entryID": "entry_id",
+            "header_row": "true",
+            "column": "sourceIP",
+            "values": "4.4.4.4,1.1.1.1,5.5.5.5"
+        }
+        self.mock_demisto(mocker, file_obj=self.create_file_object("./TestData/simple_duplicated_cols.csv"),
+                          args_value=args_value)
+        main()
+        result = self.get_demisto_results()
+        assert result['EntryContext']['LookupCSV'] == [
+            {'FoundResult': True, 'SearchValue': '4.4.4.4',
+             'Result': [{'sourceIP': '4.4.4.4', 'count': '5'}, {'sourceIP': '4.4.4.4', 'count': '6'}]},
+            {'FoundResult': True, 'SearchValue': '1.1.1.1', 'Result': {'sourceIP': '1.1.1.1', 'count': '0'}},
+            {'FoundResult': False, 'SearchValue': '5.5.5.5', 'Result': None},
+        ]
+
+    def test_main_csv_search_no_headers(self, mocker):
+        """
+        Given:
+            - A CSV file without a header row
+        When:
+            - Searching by the column number
+        Then:
+            - Ensure the matching row is returned as a list
+        """
+        from LookupCSV import main
+        args_value = {
+            "entryID": "entry_id",
+            "column": "1",
+            "value": "2.2.2.2"
+        }
+        self.mock_demisto(mocker, file_obj=self.create_file_object("./TestData/simple_no_header.csv"),
+                          args_value=args_value)
+        main()
+        assert self.get_demisto_results()['EntryContext']['LookupCSV']['Result'] == ['2.2.2.2', '1']
+
+    @pytest.mark.parametrize('args_value, file_path', [
+        ({"header_row": "true", "column": "sourceIP"}, "./TestData/simple_duplicated_cols.csv"),
+        ({"add_header_row": "sourceIP,count", "column": "1"}, "./TestData/simple_no_header.csv"),
+        ({"column": "2"}, "./TestData/simple_no_header.csv"),
+        ({"header_row": "true", "column": "count"}, "./TestData/comma_separator.csv"),
+    ])
+    def test_main_csv_search_index(self, mocker, tmp_path, args_value, file_path):
+        """
+        Given:
+            - A CSV file
+        When:
+            - Searching with the column index, twice
+        Then:
+            - Ensure the index is built by the first search and reused by the second one
+            - Ensure the results are the same as without the index
+        """
+        import LookupCSV
+        mocker.patch.object(LookupCSV, 'INDEX_DIR', str(tmp_path))
+        args_value = dict(args_value, entryID="entry_id", values="4.4.4.4,2.2.2.2,1,3,4,5,0,1")
+
+        self.mock_demisto(mocker, file_obj=self.create_file_object(file_path), args_value=args_value)
+        LookupCSV.main()
+        expected = self.get_demisto_results()
+
+        args_value['use_index'] = 'true'
+        self.mock_demisto(mocker, file_obj=self.create_file_object(file_path), args_value=args_value)
+        LookupCSV.main()
+        assert self.get_demisto_results() == expected
+        assert len(list(tmp_path.glob('*.db'))) == 1
+
+        build = mocker.patch.object(LookupCSV.ColumnIndex, 'build')
+        LookupCSV.main()
+        assert self.get_demisto_results() == expected
+        assert not build.called
+
+
+def test_lookup_evicts_indexes(tmp_path, mocker):
+    """
+    Given:
+        - The indexes of 2 columns, where at most 2 indexes are kept
+    When:
+        - Searching by one of the indexes, and then by the index of a third column
+    Then:
+        - Ensure the index which was not used recently is removed, and the other indexes are kept
+        - Ensure a removed index is built again by the next search
+    """
+    import LookupCSV
+    mocker.patch.object(LookupCSV, 'INDEX_DIR', str(tmp_path))
+    mocker.patch.object(LookupCSV, 'MAX_INDEXES', 2)
+    file_path = './TestData/simple_no_header.csv'
+    first, second, third = (LookupCSV.ColumnIndex(file_path, column, None, None) for column in (0, 1, -1))
+
+    expected = LookupCSV.lookup(file_path, 0, ['2.2.2.2'], None, None, use_index=False)
+    assert LookupCSV.lookup(file_path, 0, ['2.2.2.2'], None, None, use_index=True) == expected
+    LookupCSV.lookup(file_path, 1, ['1'], None, None, use_index=True)
+    os.utime(first.index_path, (1000, 1000))
+    os.utime(second.index_path, (2000, 2000))
+
+    LookupCSV.lookup(file_path, 0, ['2.2.2.2'], None, None, use_index=True)
+    assert os.path.getmtime(first.index_path) > 2000
+    LookupCSV.lookup(file_path, -1, ['1'], None, None, use_index=True)
+    assert first.exists() and not second.exists() and third.exists()
+
+    build = mocker.spy(LookupCSV.ColumnIndex, 'build')
+    assert LookupCSV.lookup(file_path, 1, ['1'], None, None, use_index=True) == \
+        LookupCSV.lookup(file_path, 1, ['1'], None, None, use_index=False)
+    assert build.call_count == 1
+    assert len(list(tmp_path.glob('*.db'))) == 2
+
+
+@pytest.mark.benchmark
+def test_lookup_timing(tmp_path, mocker):
+    """
+    Given:
+        - A CSV file of 1,000,000 rows
+    When:
+        - Searching 1,000 values in a single pass over the file, and with the column index
+    Then:
+        - Ensure both searches return the same rows
+        - Ensure the search by an existing index reads only the matching rows, and takes a fraction of a second
+    """
+    import LookupCSV
+    mocker.patch.object(LookupCSV, 'INDEX_DIR', str(tmp_path / 'indexes'))
+    file_path = str(tmp_path / 'big.csv')
+    with open(file_path, 'w') as csv_file:
+        csv_file.write('id,ip,score\n')
+        csv_file.writelines(f'{i},10.{i >> 16}.{(i >> 8) & 255}.{i & 255},"{i % 100}"\n' for i in range(1000000))
+    values = [f'10.{i >> 16}.{(i >> 8) & 255}.{i & 255}' for i in range(0, 2000000, 2000)]
+
+    start = time.time()
+    single_pass_matches = LookupCSV.lookup(file_path, 'ip', values, 'true', None, use_index=False)
+    single_pass_time = time.time() - start
+    LookupCSV.lookup(file_path, 'ip', values, 'true', None, use_index=True)
+
+    start = time.time()
+    index_matches = LookupCSV.lookup(file_path, 'ip', values, 'true', None, use_index=True)
+    index_time = time.time() - start
+
+    assert index_matches == single_pass_matches
+    assert sum(len(rows) for rows in index_matches.values()) == 500
+    assert single_pass_time < 60
+    assert index_time < 1
@@ -1,19 +1,27 @@
 import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
+import calendar
 import hashlib
+import io
+import re
 import secrets
 import string
 import tempfile
 from datetime import timezone
-from typing import Dict, Optional, List, Tuple, Union
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple, Union
 from dateutil.parser import parse
 from urllib3 import disable_warnings
-from math import ceil
 
 
 disable_warnings()
 DEMISTO_TIME_FORMAT: str = '%Y-%m-%dT%H:%M:%SZ'
+# indicators per searchIndicators page
+SEARCH_PAGE_SIZE: int = 2000
+# indicators per tim_insert_jsons request, so a push of many modified indicators is sent in bounded requests
+TIM_INSERT_BATCH_SIZE: int = 10000
+# ISO 8601 dates with a timezone, as the server returns them, which are parsed without dateutil
+ISO_DATE_REGEX = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)$')
 xdr_types_to_demisto: Dict = {
     "DOMAIN_NAME": 'Domain',
     "HASH": 'File',
@@ -54,9 +62,11 @@ class Client:
 
     def http_request(self, url_suffix: str, requests_kwargs) -> Dict:
         url: str = f'{self._base_url}{url_suffix}'
+        requests_kwargs = dict(requests_kwargs)
+        headers: Dict = {**self._headers, **requests_kwargs.pop('headers', {})}
         res = requests.post(url=url,
                             verify=self._verify_cert,
-                            headers=self._headers,
+                            headers=headers,
                             **requests_kwargs)
 
         if res.status_code in self.error_codes:
@@ -88,11 +98,42 @@ def get_headers(params: Dict) -> Dict:
     return headers
 
 
+class MultipartFile:
+    """
+    A multipart/form-data body of a single file, which is read from the disk while it is sent - requests encodes
+    the files it is given in memory, which doesn't fit a sync file of millions of indicators.
+    """
+
+    def __init__(self, file_path: str, file_name: str = 'iocs.json', content_type: str = 'application/json'):
+        boundary: str = secrets.token_hex(16)
+        self.content_type: str = f'multipart/form-data; boundary={boundary}'
+        head: bytes = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+                       f'Content-Type: {content_type}\r\n\r\n').encode()
+        tail: bytes = f'\r\n--{boundary}--\r\n'.encode()
+        self._length: int = len(head) + os.path.getsize(file_path) + len(tail)
+        self._parts: List = [io.BytesIO(head), open(file_path, 'rb'), io.BytesIO(tail)]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        chunks: List[bytes] = []
+        while self._parts and size != 0:
+            chunk: bytes = self._parts[0].read(size)
+            if size < 0 or len(chunk) < size:
+                self._parts.pop(0).close()
+            if size > 0:
+                size -= len(chunk)
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+
 def get_requests_kwargs(_json=None, file_path: Optional[str] = None) -> Dict:
     if _json is not None:
         return {'data': json.dumps({"request_data": _json})}
     elif file_path is not None:
-        return {'files': [('file', ('iocs.json', open(file_path, 'rb'), 'application/json'))]}
+        body = MultipartFile(file_path)
+        return {'data': body, 'headers': {'Content-Type': body.content_type}}
     else:
         return {}
 
@@ -115,35 +156,51 @@ def prepare_disable_iocs(iocs: str) -> Tuple[str, List]:
     return url_suffix, _json
 
 
-def create_file_iocs_to_keep(file_path, batch_size: int = 200):
+def create_file_iocs_to_keep(file_path, batch_size: int = SEARCH_PAGE_SIZE):
     with open(file_path, 'a') as _file:
-        total_size: int = get_iocs_size()
-        for i in range(0, ceil(total_size / batch_size)):
-            iocs: List = get_iocs(page=i, size=batch_size)
-            for ios in map(lambda x: x.get('value', ''), iocs):
-                _file.write(ios + '\n')
+        for iocs in get_iocs_pages(size=batch_size):
+            _file.writelines([ioc.get('value', '') + '\n' for ioc in iocs])
 
 
-def create_file_sync(file_path, batch_size: int = 200):
+def create_file_sync(file_path, batch_size: int = SEARCH_PAGE_SIZE):
     with open(file_path, 'a') as _file:
-        total_size: int = get_iocs_size()
-        for i in range(0, ceil(total_size / batch_size)):
-            iocs: List = get_iocs(page=i, size=batch_size)
-            for ioc in map(lambda x: demisto_ioc_to_xdr(x), iocs):
-                if ioc:
-                    _file.write(json.dumps(ioc) + '\n')
-
-
-def get_iocs_size(query=None) -> int:
-    return demisto.searchIndicators(query=query if query else Client.query, page=0, size=1).get('total', 0)
+        for iocs in get_iocs_pages(size=batch_size):
+            _file.writelines([json.dumps(ioc) + '\n' for ioc in map(demisto_ioc_to_xdr, iocs) if ioc])
 
 
-def get_iocs(page=0, size=200, query=None) -> List:
-    return demisto.searchIndicators(query=query if query else Client.query, page=page, size=size).get('iocs', [])
+def get_iocs_pages(query=None, size: int = SEARCH_PAGE_SIZE) -> Iterator[List]:
+    """
+    Yields the pages of the indicators of the query. From server version 6.1.0, every search continues after the last
+    indicator of the previous page - so the server doesn't skip the indicators of all the previous pages on every page.
+    """
+    page: int = 0
+    search_after = None
+    search_after_supported = is_demisto_version_ge('6.1.0')
+    while True:
+        search_args: Dict = {'query': query if query else Client.query, 'page': page, 'size': size}
+        if search_after_supported:
+            search_args['searchAfter'] = search_after
+        res: Dict = demisto.searchIndicators(**search_args)
+        iocs: List = res.get('iocs') or []
+        if iocs:
+            yield iocs
+        if len(iocs) < size:
+            return
+        page += 1
+        search_after = res.get('searchAfter')
 
 
 def demisto_expiration_to_xdr(expiration) -> int:
     if expiration and not expiration.startswith('0001'):
+        match = ISO_DATE_REGEX.match(expiration)
+        if match:
+            year, month, day, hour, minute, second, fraction, tz = match.groups()
+            seconds: int = calendar.timegm((int(year), int(month), int(day), int(hour), int(minute), int(second)))
+            if tz != 'Z':
+                seconds -= (-1 if tz[0] == '-' else 1) * (int(tz[1:3]) * 3600 + int(tz[4:6]) * 60)
+            microseconds: int = seconds * 1000000 + (int(fraction[:6].ljust(6, '0')) if fraction else 0)
+            # the same float arithmetic of datetime.timestamp, so the milliseconds are as dateutil's
+            return int(microseconds / 1000000 * 1000)
         try:
             return int(parse(expiration).astimezone(timezone.utc).timestamp() * 1000)
         except ValueError:
@@ -243,17 +300,23 @@ def create_last_iocs_query(from_date, to_date):
     return f'modified:>={from_date} and modified:<{to_date} and ({Client.query})'
 
 
-def get_last_iocs(batch_size=200) -> List:
-    current_run: str = datetime.utcnow().strftime(DEMISTO_TIME_FORMAT)
-    last_run: Dict = demisto.getIntegrationContext()
-    query = create_last_iocs_query(from_date=last_run['time'], to_date=current_run)
-    total_size = get_iocs_size(query)
-    iocs: List = []
-    for i in range(0, ceil(total_size / batch_size)):
-        iocs.extend(get_iocs(query=query, page=i, size=batch_size))
-    last_run['time'] = current_run
-    demisto.setIntegrationContext(last_run)
-    return iocs
+def get_last_iocs(from_date: str, to_date: str, batch_size: int = SEARCH_PAGE_SIZE) -> Iterator[List]:
+    """
+    Yields the pages of the indicators which were modified between the dates.
+    """
+    query = create_last_iocs_query(from_date=from_date, to_date=to_date)
+    return get_iocs_pages(query=query, size=batch_size)
+
+
+def batch_iocs(iocs: Iterable[Dict], batch_size: int = TIM_INSERT_BATCH_SIZE) -> Iterator[List[Dict]]:
+    batch: List[Dict] = []
+    for ioc in iocs:
+        batch.append(ioc)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 def get_indicators(indicators: str) -> List:
@@ -275,14 +338,23 @@ def get_indicators(indicators: str) -> List:
 
 def tim_insert_jsons(client: Client):
     indicators = demisto.args().get('indicator', '')
+    last_run: Optional[Dict] = None
     if not indicators:
-        iocs = get_last_iocs()
+        current_run: str = datetime.utcnow().strftime(DEMISTO_TIME_FORMAT)
+        last_run = demisto.getIntegrationContext()
+        iocs_pages: Iterable[List] = get_last_iocs(from_date=last_run['time'], to_date=current_run)
     else:
         iocs = get_indicators(indicators)
-    if iocs:
-        path = 'tim_insert_jsons/'
-        requests_kwargs: Dict = get_requests_kwargs(_json=list(map(lambda ioc: demisto_ioc_to_xdr(ioc), iocs)))
+        iocs_pages = [iocs] if iocs else []
+    path = 'tim_insert_jsons/'
+    xdr_iocs = (demisto_ioc_to_xdr(ioc) for iocs in iocs_pages for ioc in iocs)
+    for xdr_iocs_batch in batch_iocs(xdr_iocs):
+        requests_kwargs: Dict = get_requests_kwargs(_json=xdr_iocs_batch)
         client.http_request(url_suffix=path, requests_kwargs=requests_kwargs)
+    if last_run is not None:
+        # updated once all the modified indicators were pushed
+        last_run['time'] = current_run
+        demisto.setIntegrationContext(last_run)
     return_outputs('push done.')
 
 
@@ -1,4 +1,5 @@
 from XDR_iocs import *
+import time
 import pytest
 from freezegun import freeze_time
 
@@ -90,21 +91,24 @@ class TestHttpRequest:
 
 class TestGetRequestsKwargs:
 
-    def test_with_file(self, mocker):
+    def test_with_file(self, tmp_path):
         """
             Given:
                 - file to upload
             Then:
-                - Verify output format.
-        """
-        def override_open(open_path, *_other):
-            return open_path
-
-        mocker.patch('builtins.open', side_effect=override_open)
-        path = '/Users/some_user/some_dir/some_file.file'
-        output = get_requests_kwargs(file_path=path)
-        expected_output = {'files': [('file', ('iocs.json', path, 'application/json'))]}
-        assert output == expected_output, f'get_requests_kwargs(file_path={path})\n\treturns: {output}\n\t instead: {expected_output}'  # noqa: E501
+                - Verify the file is sent as a multipart/form-data body, which is read from the file while it is sent.
+        """
+        path = tmp_path / 'some_file.file'
+        path.write_bytes(b'{"indicator": "11.11.11.11"}\n')
+        output = get_requests_kwargs(file_path=str(path))
+        body = output['data']
+        boundary = output['headers']['Content-Type'].split('boundary=')[1]
+        expected_body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="iocs.json"\r\n'
+                         f'Content-Type: application/json\r\n\r\n{{"indicator": "11.11.11.11"}}\n\r\n'
+                         f'--{boundary}--\r\n').encode()
+        assert len(body) == len(expected_body)
+        assert body.read(10) + body.read(100) + body.read() == expected_body
+        assert body.read() == b''
 
     def test_with_json(self):
         """
@@ -170,12 +174,12 @@ class TestCreateFile:
         ('File_iocs', 'File_iocs_to_keep_file')
     ]
 
-    def setup(self):
+    def setup_method(self):
         # creates the file
         with open(TestCreateFile.path, 'w') as _file:
             _file.write('')
 
-    def teardown(self):
+    def teardown_method(self):
         # removes the file when done
         os.remove(TestCreateFile.path)
 
@@ -322,6 +326,91 @@ class TestCreateFile:
         assert data == expected_data, f'create_file_iocs_to_keep with all iocs\n\tcreates: {data}\n\tinstead: {expected_data}'
 
 
+def create_search_indicators(total, page_requests):
+    """Creates a searchIndicators mock of many indicators, which continues every search from its searchAfter cursor,
+    or from its page if there is no cursor"""
+    def search_indicators(query='', page=0, size=100, searchAfter=None, **_):
+        page_requests.append((page, searchAfter))
+        start = searchAfter[0] if searchAfter else page * size
+        iocs = [{'value': f'{i}.com', 'indicator_type': 'Domain', 'score': 3,
+                 'expiration': f'2020-11-25T09:42:{i % 60:02d}.589385+02:00', 'comments': [],
+                 'moduleToFeedMap': {'Feed.instance': {'reliability': 'B - Usually reliable', 'score': 3,
+                                                       'sourceBrand': 'Feed'}}}
+                for i in range(start, min(start + size, total))]
+        return {'iocs': iocs, 'total': total, 'searchAfter': [start + len(iocs)]}
+    return search_indicators
+
+
+class TestSyncPipeline:
+
+    @pytest.mark.parametrize('search_after_supported, expected_page_requests', [
+        (True, [(0, None), (1, [2000]), (2, [4000])]),
+        (False, [(0, None), (1, None), (2, None)]),
+    ])
+    def test_get_iocs_pages(self, mocker, search_after_supported, expected_page_requests):
+        """
+            Given:
+                - 4,500 indicators
+            When:
+                - Going over the indicators pages, in server versions with and without searchAfter
+            Then:
+                - Verify every page is searched after the last indicator of the previous page from version 6.1.0,
+                  and by its page number before it.
+        """
+        page_requests: list = []
+        mocker.patch('XDR_iocs.is_demisto_version_ge', return_value=search_after_supported)
+        search_indicators = mocker.patch.object(demisto, 'searchIndicators',
+                                                side_effect=create_search_indicators(4500, page_requests))
+        pages = list(get_iocs_pages())
+        assert [len(page) for page in pages] == [2000, 2000, 500]
+        assert [ioc['value'] for page in pages for ioc in page] == [f'{i}.com' for i in range(4500)]
+        assert page_requests == expected_page_requests
+        assert ('searchAfter' in search_indicators.call_args[1]) == search_after_supported
+
+    def test_tim_insert_jsons_batches(self, mocker):
+        """
+            Given:
+                - 25,000 indicators which were modified since the last push
+            When:
+                - Pushing the modified indicators
+            Then:
+                - Verify they are pushed in bounded requests, and the last run is updated once all of them were pushed.
+        """
+        calls: list = []
+        mocker.patch.object(demisto, 'getIntegrationContext', return_value={'time': '2020-06-03T00:00:00Z'})
+        mocker.patch.object(demisto, 'searchIndicators', side_effect=create_search_indicators(25000, []))
+        mocker.patch.object(Client, 'http_request', side_effect=lambda **kwargs: calls.append(
+            ('http_request', len(json.loads(kwargs['requests_kwargs']['data'])['request_data']))))
+        mocker.patch.object(demisto, 'setIntegrationContext', side_effect=lambda context: calls.append(
+            ('setIntegrationContext', context['time'])))
+        mocker.patch('XDR_iocs.return_outputs')
+        tim_insert_jsons(client)
+        assert calls[:3] == [('http_request', 10000), ('http_request', 10000), ('http_request', 5000)]
+        assert calls[3][0] == 'setIntegrationContext' and calls[3][1] != '2020-06-03T00:00:00Z'
+
+    @pytest.mark.benchmark
+    def test_create_file_sync_benchmark(self, mocker, tmp_path):
+        """
+            Given:
+                - 2,000,000 indicators
+            When:
+                - Creating the sync file
+            Then:
+                - Verify all of them are written, with a search for every 2,000 indicators, in a bounded time.
+        """
+        page_requests: list = []
+        mocker.patch.object(demisto, 'searchIndicators', side_effect=create_search_indicators(2000000, page_requests))
+        path = tmp_path / 'sync_file.json'
+        start = time.time()
+        create_file_sync(str(path))
+        duration = time.time() - start
+        with open(path) as sync_file:
+            assert sum(1 for _ in sync_file) == 2000000
+        assert len(page_requests) == 1001
+        # searching by pages of 200 and converting with dateutil takes about 4 minutes
+        assert duration < 120
+
+
 class TestDemistoIOCToXDR:
 
     data_test_demisto_expiration_to_xdr = [
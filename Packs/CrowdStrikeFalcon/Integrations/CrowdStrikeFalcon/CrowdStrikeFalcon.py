@@ -6,9 +6,14 @@ from CommonServerUserPython import *
 import json
 import requests
 import base64
+import concurrent.futures
 import email
 import hashlib
+import re
+import threading
+import time
 from typing import List
+from datetime import timezone
 from dateutil.parser import parse
 from typing import Dict, Tuple, Any, Optional, Union
 
@@ -36,8 +41,21 @@ HEADERS = {
 # Note: True life time of token is actually 30 mins
 TOKEN_LIFE_TIME = 28
 INCIDENTS_PER_FETCH = int(demisto.params().get('incidents_per_fetch', 15))
+# Max concurrent requests of the detections, or of the incidents, which are fetched concurrently
+MAX_WORKERS = 8
+# Max ids to query, or to get the entities of, in a single request during fetch
+FETCH_IDS_PAGE_SIZE = 500
+# ISO 8601 dates as returned from the API, which are parsed without dateutil
+ISO_DATE_REGEX = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)?$')
 # Remove proxy if not set to true in params
 handle_proxy()
+# A single session for all the requests, so the connections are reused
+SESSION = requests.Session()
+SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_WORKERS * 2))
+SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_WORKERS * 2))
+# The token of this process and the time it expires at, so the integration context is read once per process
+TOKEN_CACHE: Dict[str, Any] = {}
+TOKEN_LOCK = threading.Lock()
 
 ''' KEY DICTIONARY '''
 
@@ -166,12 +184,14 @@ def http_request(method, url_suffix, params=None, data=None, files=None, headers
         :return: Returns the http request response json
         :rtype: ``dict``
     """
+    # a copy, so the headers of the caller (or the global HEADERS) are not changed
+    headers = dict(headers)
     if get_token_flag:
         token = get_token()
         headers['Authorization'] = 'Bearer {}'.format(token)
     url = SERVER + url_suffix
     try:
-        res = requests.request(
+        res = SESSION.request(
             method,
             url,
             verify=USE_SSL,
@@ -207,7 +227,8 @@ def http_request(method, url_suffix, params=None, data=None, files=None, headers
                 LOG(err_msg)
                 token = get_token(new_token=True)
                 headers['Authorization'] = 'Bearer {}'.format(token)
-                return http_request(method, url_suffix, params, data, headers, safe, get_token_flag=False)
+                return http_request(method, url_suffix, params=params, data=data, files=files, headers=headers,
+                                    safe=safe, get_token_flag=False, no_json=no_json, json=json)
             elif safe:
                 return None
             return_error(err_msg)
@@ -802,29 +823,31 @@ def list_files() -> Dict:
 
 def get_token(new_token=False):
     """
-        Retrieves the token from the server if it's expired and updates the global HEADERS to include it
+        Retrieves the token from the cache of this process, from the integration context or from the server if it's
+        expired
 
         :param new_token: If set to True will generate a new token regardless of time passed
 
         :rtype: ``str``
         :return: Token
     """
-    now = datetime.now()
-    ctx = demisto.getIntegrationContext()
-    if ctx and not new_token:
-        passed_mins = get_passed_mins(now, ctx.get('time'))
-        if passed_mins >= TOKEN_LIFE_TIME:
-            # token expired
-            auth_token = get_token_request()
-            demisto.setIntegrationContext({'auth_token': auth_token, 'time': date_to_timestamp(now) / 1000})
-        else:
+    with TOKEN_LOCK:
+        now = time.time()
+        if not new_token and TOKEN_CACHE.get('expires_at', 0) > now:
+            return TOKEN_CACHE['auth_token']
+
+        ctx = demisto.getIntegrationContext()
+        if ctx and not new_token and now - ctx.get('time', 0) < TOKEN_LIFE_TIME * 60:
             # token hasn't expired
             auth_token = ctx.get('auth_token')
-    else:
-        # there is no token
-        auth_token = get_token_request()
-        demisto.setIntegrationContext({'auth_token': auth_token, 'time': date_to_timestamp(now) / 1000})
-    return auth_token
+            token_time = ctx.get('time')
+        else:
+            # there is no token, or it expired
+            auth_token = get_token_request()
+            token_time = now
+            demisto.setIntegrationContext({'auth_token': auth_token, 'time': token_time})
+        TOKEN_CACHE.update({'auth_token': auth_token, 'expires_at': token_time + TOKEN_LIFE_TIME * 60})
+        return auth_token
 
 
 def get_token_request():
@@ -875,6 +898,54 @@ def get_detections(last_behavior_time=None, behavior_id=None, filter_arg=None):
     return response
 
 
+def run_concurrently(function, args_list):
+    """
+        Runs the function with each of the arguments, concurrently
+
+        :return: The results of the function, in the order of the arguments
+    """
+    if len(args_list) <= 1:
+        return [function(args) for args in args_list]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(args_list))) as executor:
+        return list(executor.map(function, args_list))
+
+
+def merge_resources(responses):
+    """
+        Merges the resources of the responses of several requests into the first response
+    """
+    response = responses[0]
+    if len(responses) > 1:
+        response['resources'] = [resource for response_ in responses for resource in
+                                 (response_ or {}).get('resources') or []]
+    return response
+
+
+def query_ids(endpoint_url, params, offset, limit):
+    """
+        Queries ids in pages of FETCH_IDS_PAGE_SIZE, concurrently
+        :param endpoint_url: The ids query endpoint
+        :param params: The query params, without the offset and the limit
+        :param offset: The offset of the first id
+        :param limit: The number of ids to query
+        :return: Response json of the first page, with the ids of all the pages
+    """
+    pages_params = [dict(params, offset=page_offset, limit=min(FETCH_IDS_PAGE_SIZE, offset + limit - page_offset))
+                    for page_offset in range(offset, offset + limit, FETCH_IDS_PAGE_SIZE)]
+    return merge_resources(run_concurrently(
+        lambda page_params: http_request('GET', endpoint_url, page_params), pages_params))
+
+
+def get_entities(endpoint_url, ids):
+    """
+        Gets the entities of the ids in batches of FETCH_IDS_PAGE_SIZE, concurrently
+        :return: Response json of the first batch, with the entities of all the batches
+    """
+    batches = [ids[i:i + FETCH_IDS_PAGE_SIZE] for i in range(0, len(ids), FETCH_IDS_PAGE_SIZE)] or [ids]
+    return merge_resources(run_concurrently(
+        lambda batch: http_request('POST', endpoint_url, data=json.dumps({'ids': batch})), batches))
+
+
 def get_fetch_detections(last_created_timestamp=None, filter_arg=None, offset: int = 0):
     """ Sends detection request, based on the created_timestamp field. Used for fetch-incidents
     Args:
@@ -885,9 +956,7 @@ def get_fetch_detections(last_created_timestamp=None, filter_arg=None, offset: i
     """
     endpoint_url = '/detects/queries/detects/v1'
     params = {
-        'sort': 'first_behavior.asc',
-        'offset': offset,
-        'limit': INCIDENTS_PER_FETCH
+        'sort': 'first_behavior.asc'
     }
     if filter_arg:
         params['filter'] = filter_arg
@@ -895,9 +964,7 @@ def get_fetch_detections(last_created_timestamp=None, filter_arg=None, offset: i
     elif last_created_timestamp:
         params['filter'] = "created_timestamp:>'{0}'".format(last_created_timestamp)
 
-    response = http_request('GET', endpoint_url, params)
-
-    return response
+    return query_ids(endpoint_url, params, offset, INCIDENTS_PER_FETCH)
 
 
 def get_detections_entities(detections_ids):
@@ -906,23 +973,15 @@ def get_detections_entities(detections_ids):
         :param detections_ids: IDs of the requested detections.
         :return: Response json of the get detection entities endpoint (detection objects)
     """
-    ids_json = {'ids': detections_ids}
     if detections_ids:
-        response = http_request(
-            'POST',
-            '/detects/entities/summaries/GET/v1',
-            data=json.dumps(ids_json)
-        )
-        return response
+        return get_entities('/detects/entities/summaries/GET/v1', detections_ids)
     return detections_ids
 
 
 def get_incidents_ids(last_created_timestamp=None, filter_arg=None, offset: int = 0):
     get_incidents_endpoint = '/incidents/queries/incidents/v1'
     params = {
-        'sort': 'start.asc',
-        'offset': offset,
-        'limit': INCIDENTS_PER_FETCH
+        'sort': 'start.asc'
     }
     if filter_arg:
         params['filter'] = filter_arg
@@ -930,19 +989,11 @@ def get_incidents_ids(last_created_timestamp=None, filter_arg=None, offset: int
     elif last_created_timestamp:
         params['filter'] = "start:>'{0}'".format(last_created_timestamp)
 
-    response = http_request('GET', get_incidents_endpoint, params)
-
-    return response
+    return query_ids(get_incidents_endpoint, params, offset, INCIDENTS_PER_FETCH)
 
 
 def get_incidents_entities(incidents_ids):
-    ids_json = {'ids': incidents_ids}
-    response = http_request(
-        'POST',
-        '/incidents/entities/incidents/GET/v1',
-        data=json.dumps(ids_json)
-    )
-    return response
+    return get_entities('/incidents/entities/incidents/GET/v1', incidents_ids)
 
 
 def upload_ioc(ioc_type, value, policy=None, expiration_days=None,
@@ -1229,114 +1280,175 @@ def timestamp_length_equalization(timestamp1, timestamp2):
 ''' COMMANDS FUNCTIONS '''
 
 
-def get_fetch_times_and_offset(incident_type):
-    last_run = demisto.getLastRun()
+def date_to_epoch_ms(date_string):
+    """
+        Converts a date string to epoch milliseconds, as int(parse(date_string).timestamp() * 1000) does, while the
+        ISO 8601 dates of the API are converted without dateutil.
+    Args:
+        date_string: The date string to convert.
+    Returns:
+        The date in epoch milliseconds.
+    """
+    match = ISO_DATE_REGEX.match(date_string)
+    if not match:
+        return int(parse(date_string).timestamp() * 1000)
+    year, month, day, hour, minute, second, fraction, tz = match.groups()
+    if tz == 'Z':
+        tzinfo = timezone.utc  # type: Optional[timezone]
+    elif tz:
+        tz_sign = -1 if tz[0] == '-' else 1
+        tzinfo = timezone(tz_sign * timedelta(hours=int(tz[1:3]), minutes=int(tz[4:6])))
+    else:
+        tzinfo = None
+    microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+    date = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), microsecond, tzinfo)
+    return int(date.timestamp() * 1000)
+
+
+def get_fetch_times_and_offset(incident_type, last_run):
     last_fetch_time = last_run.get(f'first_behavior_{incident_type}_time')
     offset = last_run.get(f'{incident_type}_offset', 0)
     if not last_fetch_time:
         last_fetch_time, _ = parse_date_range(FETCH_TIME, date_format='%Y-%m-%dT%H:%M:%SZ')
     prev_fetch = last_fetch_time
-    last_fetch_timestamp = int(parse(last_fetch_time).timestamp() * 1000)
+    last_fetch_timestamp = date_to_epoch_ms(last_fetch_time)
     return last_fetch_time, offset, prev_fetch, last_fetch_timestamp
 
 
-def fetch_incidents():
+def fetch_detections(last_run, fetch_query):
+    """
+        Fetches the detections which were created since the last run
+    Args:
+        last_run: The last run of the fetch.
+        fetch_query: The query to filter the detections by.
+    Returns:
+        The fetched incidents, and the last run fields of the detections to update.
+    """
     incidents = []  # type:List
-    current_fetch_info = demisto.getLastRun()
-    fetch_incidents_or_detections = demisto.params().get('fetch_incidents_or_detections')
+    fetch_info = {}  # type:Dict
+    incident_type = 'detection'
+    last_fetch_time, offset, prev_fetch, last_fetch_timestamp = get_fetch_times_and_offset(incident_type, last_run)
 
-    if 'Detections' in fetch_incidents_or_detections:
-        incident_type = 'detection'
-        last_fetch_time, offset, prev_fetch, last_fetch_timestamp = get_fetch_times_and_offset(incident_type)
+    if fetch_query:
+        fetch_query = "created_timestamp:>'{time}'+{query}".format(time=last_fetch_time, query=fetch_query)
+        detections_ids = demisto.get(get_fetch_detections(filter_arg=fetch_query, offset=offset), 'resources')
+    else:
+        detections_ids = demisto.get(get_fetch_detections(last_created_timestamp=last_fetch_time, offset=offset),
+                                     'resources')
 
-        fetch_query = demisto.params().get('fetch_query')
-        if fetch_query:
-            fetch_query = "created_timestamp:>'{time}'+{query}".format(time=last_fetch_time, query=fetch_query)
-            detections_ids = demisto.get(get_fetch_detections(filter_arg=fetch_query, offset=offset), 'resources')
-        else:
-            detections_ids = demisto.get(get_fetch_detections(last_created_timestamp=last_fetch_time, offset=offset),
-                                         'resources')
+    if detections_ids:
+        raw_res = get_detections_entities(detections_ids)
 
-        if detections_ids:
-            raw_res = get_detections_entities(detections_ids)
+        if "resources" in raw_res:
+            raw_res['type'] = "detections"
+            for detection in demisto.get(raw_res, "resources"):
+                incident = detection_to_incident(detection)
+                incident_date = incident['occurred']
 
-            if "resources" in raw_res:
-                raw_res['type'] = "detections"
-                for detection in demisto.get(raw_res, "resources"):
-                    incident = detection_to_incident(detection)
-                    incident_date = incident['occurred']
+                incident_date_timestamp = date_to_epoch_ms(incident_date)
 
-                    incident_date_timestamp = int(parse(incident_date).timestamp() * 1000)
+                # make sure that the two timestamps are in the same length
+                if len(str(incident_date_timestamp)) != len(str(last_fetch_timestamp)):
+                    incident_date_timestamp, last_fetch_timestamp = timestamp_length_equalization(
+                        incident_date_timestamp, last_fetch_timestamp)
 
-                    # make sure that the two timestamps are in the same length
-                    if len(str(incident_date_timestamp)) != len(str(last_fetch_timestamp)):
-                        incident_date_timestamp, last_fetch_timestamp = timestamp_length_equalization(
-                            incident_date_timestamp, last_fetch_timestamp)
+                # Update last run and add incident if the incident is newer than last fetch
+                if incident_date_timestamp > last_fetch_timestamp:
+                    last_fetch_time = incident_date
+                    last_fetch_timestamp = incident_date_timestamp
 
-                    # Update last run and add incident if the incident is newer than last fetch
-                    if incident_date_timestamp > last_fetch_timestamp:
-                        last_fetch_time = incident_date
-                        last_fetch_timestamp = incident_date_timestamp
+                incidents.append(incident)
 
-                    incidents.append(incident)
+        if len(incidents) == INCIDENTS_PER_FETCH:
+            fetch_info['first_behavior_detection_time'] = prev_fetch
+            fetch_info['detection_offset'] = offset + INCIDENTS_PER_FETCH
+        else:
+            fetch_info['first_behavior_detection_time'] = last_fetch_time
+            fetch_info['detection_offset'] = 0
 
-            if len(incidents) == INCIDENTS_PER_FETCH:
-                current_fetch_info['first_behavior_detection_time'] = prev_fetch
-                current_fetch_info['detection_offset'] = offset + INCIDENTS_PER_FETCH
-            else:
-                current_fetch_info['first_behavior_detection_time'] = last_fetch_time
-                current_fetch_info['detection_offset'] = 0
+    return incidents, fetch_info
 
-    if 'Incidents' in fetch_incidents_or_detections:
-        incident_type = 'incident'
 
-        last_fetch_time, offset, prev_fetch, last_fetch_timestamp = get_fetch_times_and_offset(incident_type)
-        last_run = demisto.getLastRun()
-        last_incident_fetched = last_run.get('last_fetched_incident')
-        new_last_incident_fetched = ''
+def fetch_falcon_incidents(last_run, fetch_query):
+    """
+        Fetches the incidents which started since the last run
+    Args:
+        last_run: The last run of the fetch.
+        fetch_query: The query to filter the incidents by.
+    Returns:
+        The fetched incidents, and the last run fields of the incidents to update.
+    """
+    incidents = []  # type:List
+    fetch_info = {}  # type:Dict
+    incident_type = 'incident'
 
-        fetch_query = demisto.params().get('incidents_fetch_query')
+    last_fetch_time, offset, prev_fetch, last_fetch_timestamp = get_fetch_times_and_offset(incident_type, last_run)
+    last_incident_fetched = last_run.get('last_fetched_incident')
+    new_last_incident_fetched = ''
 
-        if fetch_query:
-            fetch_query = "start:>'{time}'+{query}".format(time=last_fetch_time, query=fetch_query)
-            incidents_ids = demisto.get(get_incidents_ids(filter_arg=fetch_query, offset=offset), 'resources')
+    if fetch_query:
+        fetch_query = "start:>'{time}'+{query}".format(time=last_fetch_time, query=fetch_query)
+        incidents_ids = demisto.get(get_incidents_ids(filter_arg=fetch_query, offset=offset), 'resources')
 
+    else:
+        incidents_ids = demisto.get(get_incidents_ids(last_created_timestamp=last_fetch_time, offset=offset),
+                                    'resources')
+
+    if incidents_ids:
+        raw_res = get_incidents_entities(incidents_ids)
+        if "resources" in raw_res:
+            raw_res['type'] = "incidents"
+            for incident in demisto.get(raw_res, "resources"):
+                incident_to_context = incident_to_incident_context(incident)
+                incident_date = incident_to_context['occurred']
+
+                incident_date_timestamp = date_to_epoch_ms(incident_date)
+
+                # make sure that the two timestamps are in the same length
+                if len(str(incident_date_timestamp)) != len(str(last_fetch_timestamp)):
+                    incident_date_timestamp, last_fetch_timestamp = timestamp_length_equalization(
+                        incident_date_timestamp, last_fetch_timestamp)
+
+                # Update last run and add incident if the incident is newer than last fetch
+                if incident_date_timestamp > last_fetch_timestamp:
+                    last_fetch_time = incident_date
+                    last_fetch_timestamp = incident_date_timestamp
+                    new_last_incident_fetched = incident.get('incident_id')
+
+                if last_incident_fetched != incident.get('incident_id'):
+                    incidents.append(incident_to_context)
+
+        if len(incidents) == INCIDENTS_PER_FETCH:
+            fetch_info['first_behavior_incident_time'] = prev_fetch
+            fetch_info['incident_offset'] = offset + INCIDENTS_PER_FETCH
+            fetch_info['last_fetched_incident'] = new_last_incident_fetched
         else:
-            incidents_ids = demisto.get(get_incidents_ids(last_created_timestamp=last_fetch_time, offset=offset),
-                                        'resources')
-
-        if incidents_ids:
-            raw_res = get_incidents_entities(incidents_ids)
-            if "resources" in raw_res:
-                raw_res['type'] = "incidents"
-                for incident in demisto.get(raw_res, "resources"):
-                    incident_to_context = incident_to_incident_context(incident)
-                    incident_date = incident_to_context['occurred']
-
-                    incident_date_timestamp = int(parse(incident_date).timestamp() * 1000)
-
-                    # make sure that the two timestamps are in the same length
-                    if len(str(incident_date_timestamp)) != len(str(last_fetch_timestamp)):
-                        incident_date_timestamp, last_fetch_timestamp = timestamp_length_equalization(
-                            incident_date_timestamp, last_fetch_timestamp)
-
-                    # Update last run and add incident if the incident is newer than last fetch
-                    if incident_date_timestamp > last_fetch_timestamp:
-                        last_fetch_time = incident_date
-                        last_fetch_timestamp = incident_date_timestamp
-                        new_last_incident_fetched = incident.get('incident_id')
-
-                    if last_incident_fetched != incident.get('incident_id'):
-                        incidents.append(incident_to_context)
-
-            if len(incidents) == INCIDENTS_PER_FETCH:
-                current_fetch_info['first_behavior_incident_time'] = prev_fetch
-                current_fetch_info['incident_offset'] = offset + INCIDENTS_PER_FETCH
-                current_fetch_info['last_fetched_incident'] = new_last_incident_fetched
-            else:
-                current_fetch_info['first_behavior_incident_time'] = last_fetch_time
-                current_fetch_info['incident_offset'] = 0
-                current_fetch_info['last_fetched_incident'] = new_last_incident_fetched
+            fetch_info['first_behavior_incident_time'] = last_fetch_time
+            fetch_info['incident_offset'] = 0
+            fetch_info['last_fetched_incident'] = new_last_incident_fetched
+
+    return incidents, fetch_info
+
+
+def fetch_incidents():
+    incidents = []  # type:List
+    current_fetch_info = demisto.getLastRun()
+    params = demisto.params()
+    fetch_incidents_or_detections = params.get('fetch_incidents_or_detections')
+
+    fetches = []
+    if 'Detections' in fetch_incidents_or_detections:
+        fetches.append((fetch_detections, params.get('fetch_query')))
+    if 'Incidents' in fetch_incidents_or_detections:
+        fetches.append((fetch_falcon_incidents, params.get('incidents_fetch_query')))
+
+    if len(fetches) > 1:
+        # the token is retrieved before the detections and the incidents are fetched concurrently
+        get_token()
+    for fetched_incidents, fetch_info in run_concurrently(
+            lambda fetch: fetch[0](current_fetch_info, fetch[1]), fetches):
+        incidents.extend(fetched_incidents)
+        current_fetch_info.update(fetch_info)
 
     demisto.setLastRun(current_fetch_info)
     return incidents
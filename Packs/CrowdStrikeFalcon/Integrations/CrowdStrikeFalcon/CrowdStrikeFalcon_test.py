@@ -1,6 +1,12 @@
 import pytest
 import os
 import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 import demistomock as demisto
 from CommonServerPython import outputPaths, entryTypes, DemistoException
 
@@ -2291,6 +2297,176 @@ class TestIncidentFetch:
                                                           'last_fetched_incident': 'ldt:1', 'incident_offset': 0}
 
 
+class FakeFalconHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_api_request()
+
+    def do_POST(self):
+        self.handle_api_request()
+
+    def handle_api_request(self):
+        falcon: FakeFalcon = self.server  # type: ignore
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        request_body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        falcon.requests.append(url.path)
+        time.sleep(falcon.latency)
+        if url.path == '/oauth2/token':
+            body = {'access_token': 'token'}
+        elif url.path in falcon.QUERIES:
+            id_field, time_field = falcon.QUERIES[url.path]
+            created_after = re.match(r"\w+:>'(.*)'", params['filter']).group(1)  # type: ignore
+            ids = [entity[id_field] for entity in falcon.entities[url.path] if entity[time_field] > created_after]
+            offset = int(params.get('offset', 0))
+            body = {'resources': ids[offset:offset + int(params['limit'])]}
+        elif url.path in falcon.ENTITIES:
+            entities = falcon.entities[falcon.ENTITIES[url.path]]
+            id_field = falcon.QUERIES[falcon.ENTITIES[url.path]][0]
+            ids = set(json.loads(request_body)['ids'])
+            resources = [entity for entity in entities if entity[id_field] in ids]
+            # assembling the entities takes the server time, according to their number
+            time.sleep(falcon.entity_latency * len(resources))
+            body = {'resources': resources}
+        else:
+            self.send_error(404)
+            return
+        response_body = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response_body)))
+        self.end_headers()
+        self.wfile.write(response_body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeFalcon(ThreadingHTTPServer):
+    """A local fake Falcon API, which serves the detections and incidents queries and entities the fetch uses.
+    """
+
+    daemon_threads = True
+    # query endpoint to the id field and the time field its filter is by
+    QUERIES = {'/detects/queries/detects/v1': ('detection_id', 'created_timestamp'),
+               '/incidents/queries/incidents/v1': ('incident_id', 'start')}
+    # entities endpoint to the query endpoint of its ids
+    ENTITIES = {'/detects/entities/summaries/GET/v1': '/detects/queries/detects/v1',
+                '/incidents/entities/incidents/GET/v1': '/incidents/queries/incidents/v1'}
+
+    def __init__(self, detections, incidents, latency=0.0, entity_latency=0.0):
+        super().__init__(('127.0.0.1', 0), FakeFalconHandler)
+        self.url = f'http://127.0.0.1:{self.server_port}'
+        self.entities = {'/detects/queries/detects/v1': detections, '/incidents/queries/incidents/v1': incidents}
+        self.latency = latency
+        self.entity_latency = entity_latency
+        self.requests: list = []
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def count_requests(self, path):
+        return self.requests.count(path)
+
+
+def create_detections_and_incidents(count):
+    """Creates detections and incidents, one of each created in every second"""
+    start_time = datetime(2020, 9, 4)
+    detections = []
+    incidents = []
+    for i in range(count):
+        created = (start_time + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        detections.append({'detection_id': f'ldt:{i}', 'created_timestamp': created,
+                           'max_severity_displayname': 'Low', 'behaviors': [{'behavior_id': str(i)}]})
+        incidents.append({'incident_id': f'inc:{i}', 'start': created, 'host_ids': [str(i)]})
+    return detections, incidents
+
+
+@pytest.mark.benchmark
+def test_fetch_incidents_benchmark(mocker, requests_mock):
+    """
+    Given
+    - 10,000 detections and 10,000 incidents, where every request takes 20 milliseconds and every entity
+      takes 0.1 milliseconds to assemble
+    When
+    - Fetching 10,000 of each type at once
+    Then
+    - Ensure all of them are fetched, with the ids and the entities requested concurrently in pages of 500
+    - Ensure the next fetch starts from the same time, with an offset of 10,000
+    """
+    import CrowdStrikeFalcon
+    detections, incidents = create_detections_and_incidents(10000)
+    requests_mock.real_http = True
+    mocker.patch.object(CrowdStrikeFalcon, 'INCIDENTS_PER_FETCH', 10000)
+    mocker.patch.dict(CrowdStrikeFalcon.TOKEN_CACHE, clear=True)
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value={})
+    mocker.patch.object(demisto, 'getLastRun', return_value={'first_behavior_detection_time': '2020-09-03T00:00:00Z',
+                                                             'first_behavior_incident_time': '2020-09-03T00:00:00Z'})
+    mocker.patch.object(demisto, 'setLastRun')
+    with FakeFalcon(detections, incidents, latency=0.02, entity_latency=0.0001) as falcon:
+        mocker.patch.object(CrowdStrikeFalcon, 'SERVER', falcon.url)
+        start = time.time()
+        fetched_incidents = CrowdStrikeFalcon.fetch_incidents()
+        duration = time.time() - start
+
+    assert [incident['name'] for incident in fetched_incidents] == \
+        [f'Detection ID: ldt:{i}' for i in range(10000)] + [f'Incident ID: inc:{i}' for i in range(10000)]
+    assert demisto.setLastRun.mock_calls[0][1][0] == {
+        'first_behavior_detection_time': '2020-09-03T00:00:00Z', 'detection_offset': 10000,
+        'first_behavior_incident_time': '2020-09-03T00:00:00Z', 'incident_offset': 10000,
+        'last_fetched_incident': 'inc:9999'
+    }
+    assert falcon.count_requests('/detects/queries/detects/v1') == 20
+    assert falcon.count_requests('/detects/entities/summaries/GET/v1') == 20
+    assert falcon.count_requests('/oauth2/token') == 1
+    # assembling the entities of each type in a single request takes a second alone
+    assert duration < 10
+
+
+def test_token_cache(mocker, requests_mock):
+    """
+    Given
+    - A token which was not retrieved yet by this process
+    When
+    - Sending several requests
+    Then
+    - Ensure the token is requested once, and the integration context is read once
+    - Ensure the global headers are not changed
+    """
+    import CrowdStrikeFalcon
+    mocker.patch.dict(CrowdStrikeFalcon.TOKEN_CACHE, clear=True)
+    mocker.patch.object(demisto, 'getIntegrationContext', return_value={})
+    mocker.patch.object(demisto, 'setIntegrationContext')
+    requests_mock.get(f'{SERVER_URL}/devices/queries/devices/v1', json={'resources': []})
+    headers = dict(CrowdStrikeFalcon.HEADERS)
+
+    for _ in range(3):
+        CrowdStrikeFalcon.http_request('GET', '/devices/queries/devices/v1')
+
+    token_requests = [request for request in requests_mock.request_history if request.path == '/oauth2/token']
+    assert len(token_requests) == 1
+    assert demisto.getIntegrationContext.call_count == 1
+    assert demisto.setIntegrationContext.mock_calls[0][1][0]['auth_token'] == 'token'
+    assert requests_mock.last_request.headers['Authorization'] == 'Bearer token'
+    assert CrowdStrikeFalcon.HEADERS == headers
+
+
+@pytest.mark.parametrize('date_string', ['2020-07-02T12:11:54.143806233Z', '2020-07-02T12:11:54Z',
+                                         '2020-07-02T12:11:54.1Z', '2020-07-02T12:11:54.123+03:00',
+                                         '2020-07-02T12:11:54', '2020-07-02 12:11:54', 'Jul 2 2020'])
+def test_date_to_epoch_ms(date_string):
+    from CrowdStrikeFalcon import date_to_epoch_ms
+    from dateutil.parser import parse
+    assert date_to_epoch_ms(date_string) == int(parse(date_string).timestamp() * 1000)
+
+
 def get_fetch_data():
     with open('./test_data/test_data.json', 'r') as f:
         return json.loads(f.read())
@@ -107,6 +107,8 @@ SERVER_BUILD = ""
 MARK_AS_READ = demisto.params().get('markAsRead', False)
 MAX_FETCH = min(50, int(demisto.params().get('maxFetch', 50)))
 LAST_RUN_IDS_QUEUE_SIZE = 500
+# messages per FindItem page during fetch, of which up to MAX_FETCH messages are then retrieved with all their fields
+FETCH_PAGE_SIZE = 100
 
 START_COMPLIANCE = """
 [CmdletBinding()]
@@ -468,7 +470,7 @@ def construct_config_args(context_dict, credentials):
     return config_args
 
 
-def get_account_autodiscover(account_email, access_type=ACCESS_TYPE):
+def get_account_autodiscover(account_email, access_type=ACCESS_TYPE, validate=True):
     account = None
     original_exc = None  # type: ignore
     context_dict = demisto.getIntegrationContext()
@@ -480,7 +482,8 @@ def get_account_autodiscover(account_email, access_type=ACCESS_TYPE):
                 primary_smtp_address=account_email, autodiscover=False, config=Configuration(**config_args),
                 access_type=access_type,
             )
-            account.root.effective_rights.read  # pylint: disable=E1101
+            if validate:
+                account.root.effective_rights.read  # pylint: disable=E1101
             return account
         except Exception as e:
             # fixing flake8 correction where original_exc is assigned but unused
@@ -503,12 +506,16 @@ def get_account_autodiscover(account_email, access_type=ACCESS_TYPE):
     return account
 
 
-def get_account(account_email, access_type=ACCESS_TYPE):
+def get_account(account_email, access_type=ACCESS_TYPE, validate=True):
+    """
+    Returns the account of the mailbox. With auto discovery, the configuration which was discovered (and validated) in
+    previous runs is validated again with a request to the server, unless validate is False.
+    """
     if not AUTO_DISCOVERY:
         return Account(
             primary_smtp_address=account_email, autodiscover=False, config=config, access_type=access_type,
         )
-    return get_account_autodiscover(account_email, access_type)
+    return get_account_autodiscover(account_email, access_type, validate)
 
 
 # LOGGING
@@ -899,23 +906,38 @@ def get_last_run():
     return last_run
 
 
-def fetch_last_emails(account, folder_name='Inbox', since_datetime=None, exclude_ids=None):
-    qs = get_folder_by_path(account, folder_name, is_public=IS_PUBLIC_FOLDER)
+def fetch_last_emails(account, folder_name='Inbox', since_datetime=None, exclude_ids=None, limit=None):
+    """
+    Returns the messages which were received since the given time, and are not excluded, with all their fields.
+    The messages are found page by page with their message id only, and only the first `limit` of them are then
+    retrieved with all their fields - so a mailbox with many new messages isn't retrieved entirely on every fetch.
+    """
+    folder = get_folder_by_path(account, folder_name, is_public=IS_PUBLIC_FOLDER)
+    qs = folder
     if since_datetime:
         qs = qs.filter(datetime_received__gte=since_datetime)
     else:
         if not FETCH_ALL_HISTORY:
             last_10_min = EWSDateTime.now(tz=EWSTimeZone.timezone('UTC')) - timedelta(minutes=10)
             qs = qs.filter(datetime_received__gte=last_10_min)
-    qs = qs.filter().only(*map(lambda x: x.name, Message.FIELDS))
+    qs = qs.filter().only('message_id', 'datetime_received')
     qs = qs.filter().order_by('datetime_received')
+    qs.page_size = FETCH_PAGE_SIZE
+
+    exclude_ids = set(exclude_ids or [])
+    messages = []
+    for item in qs.iterator():
+        if isinstance(item, Message) and item.message_id and item.message_id not in exclude_ids:
+            messages.append(item)
+            if limit and len(messages) >= limit:
+                break
+    if not messages:
+        return []
 
-    result = qs.all()
-    result = [x for x in result if isinstance(x, Message)]
-    if exclude_ids and len(exclude_ids) > 0:
-        exclude_ids = set(exclude_ids)
-        result = [x for x in result if x.message_id not in exclude_ids]
-    return result
+    # the id and changekey of the messages are always retrieved, and aren't requested as fields
+    only_fields = [field.name for field in Message.FIELDS if field.name not in ('id', 'changekey')]
+    items = account.fetch(ids=messages, folder=folder, only_fields=only_fields)
+    return [x for x in items if isinstance(x, Message)]
 
 
 def keys_to_camel_case(value):
@@ -1198,8 +1220,20 @@ def fetch_emails_as_incidents(account_email, folder_name):
     last_run = get_last_run()
 
     try:
-        account = get_account(account_email)
-        last_emails = fetch_last_emails(account, folder_name, last_run.get(LAST_RUN_TIME), last_run.get(LAST_RUN_IDS))
+        # the configuration which was discovered in previous runs is used without validating it first, and is
+        # validated (or discovered again) only if the fetch fails with it
+        account = get_account(account_email, validate=False)
+        try:
+            last_emails = fetch_last_emails(account, folder_name, last_run.get(LAST_RUN_TIME),
+                                            last_run.get(LAST_RUN_IDS), limit=MAX_FETCH)
+        except RateLimitError:
+            raise
+        except Exception:
+            if not AUTO_DISCOVERY:
+                raise
+            account = get_account(account_email)
+            last_emails = fetch_last_emails(account, folder_name, last_run.get(LAST_RUN_TIME),
+                                            last_run.get(LAST_RUN_IDS), limit=MAX_FETCH)
 
         ids = deque(last_run.get(LAST_RUN_IDS, []), maxlen=LAST_RUN_IDS_QUEUE_SIZE)
         incidents = []
@@ -1,5 +1,20 @@
 import EWSv2
+import base64
 import logging
+import re
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from datetime import datetime, timedelta
+from SocketServer import ThreadingMixIn
+
+import demistomock as demisto
+from exchangelib import BASIC, Configuration, Credentials, Version
+from exchangelib.errors import TransportError
+from exchangelib.version import EXCHANGE_2016
+
+SOAP_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+MESSAGES_NS = 'http://schemas.microsoft.com/exchange/services/2006/messages'
+TYPES_NS = 'http://schemas.microsoft.com/exchange/services/2006/types'
 
 
 def test_keys_to_camel_case():
@@ -18,3 +33,164 @@ def test_start_logging():
     EWSv2.start_logging()
     logging.getLogger().debug("test this")
     assert "test this" in EWSv2.log_stream.getvalue()
+
+
+class FakeEWSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        ews = self.server
+        body = self.rfile.read(int(self.headers.getheader('Content-Length')))
+        service = re.search(r'<s:Body><m:(\w+)', body).group(1)
+        ews.requests.append(service)
+        response = getattr(ews, service.lower())(body)
+        response = ('<?xml version="1.0" encoding="utf-8"?><s:Envelope xmlns:s="{}"><s:Header>'
+                    '<h:ServerVersionInfo MajorVersion="15" MinorVersion="1" MajorBuildNumber="2044" '
+                    'MinorBuildNumber="4" Version="V2017_07_11" xmlns:h="{}"/></s:Header><s:Body>'
+                    '<m:{}Response xmlns:m="{}" xmlns:t="{}"><m:ResponseMessages>{}</m:ResponseMessages>'
+                    '</m:{}Response></s:Body></s:Envelope>').format(
+            SOAP_NS, TYPES_NS, service, MESSAGES_NS, TYPES_NS, response, service).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeEWS(ThreadingMixIn, HTTPServer):
+    """A local fake EWS endpoint, of a mailbox with a single inbox folder, which serves the folders and the messages
+    of the inbox with the restriction, sorting and paging the fetch uses.
+    """
+
+    daemon_threads = True
+    FOLDERS = {'root': ('root', 'root'), 'msgfolderroot': ('tois', 'root'), 'inbox': ('inbox', 'tois')}
+
+    def __init__(self, messages, body_size=0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FakeEWSHandler)
+        self.url = 'http://127.0.0.1:{}/EWS/Exchange.asmx'.format(self.server_port)
+        self.messages = messages
+        self.messages_by_id = {message['id']: message for message in messages}
+        self.body = 'x' * body_size
+        self.requests = []
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def folder_xml(self, folder_id, parent_id):
+        return ('<t:Folder><t:FolderId Id="{0}" ChangeKey="ck"/><t:ParentFolderId Id="{1}" ChangeKey="ck"/>'
+                '<t:FolderClass>IPF.Note</t:FolderClass><t:DisplayName>{0}</t:DisplayName><t:TotalCount>0</t:TotalCount>'
+                '<t:ChildFolderCount>0</t:ChildFolderCount><t:UnreadCount>0</t:UnreadCount></t:Folder>').format(
+            folder_id, parent_id)
+
+    def getfolder(self, body):
+        return ''.join(
+            '<m:GetFolderResponseMessage ResponseClass="Success"><m:ResponseCode>NoError</m:ResponseCode><m:Folders>'
+            '{}</m:Folders></m:GetFolderResponseMessage>'.format(self.folder_xml(*self.FOLDERS[folder_id]))
+            if folder_id in self.FOLDERS else
+            '<m:GetFolderResponseMessage ResponseClass="Error"><m:MessageText>The specified folder could not be found.'
+            '</m:MessageText><m:ResponseCode>ErrorFolderNotFound</m:ResponseCode><m:DescriptiveLinkKey>0'
+            '</m:DescriptiveLinkKey></m:GetFolderResponseMessage>'
+            for folder_id in re.findall(r'FolderId Id="(\w+)"', body))
+
+    def findfolder(self, body):
+        return ('<m:FindFolderResponseMessage ResponseClass="Success"><m:ResponseCode>NoError</m:ResponseCode>'
+                '<m:RootFolder TotalItemsInView="2" IncludesLastItemInRange="true"><t:Folders>{}{}</t:Folders>'
+                '</m:RootFolder></m:FindFolderResponseMessage>').format(self.folder_xml('tois', 'root'),
+                                                                        self.folder_xml('inbox', 'tois'))
+
+    def finditem(self, body):
+        received_after = re.search(r'<t:Constant Value="([^"]+)"', body).group(1)
+        offset = int(re.search(r'Offset="(\d+)"', body).group(1))
+        max_entries = int(re.search(r'MaxEntriesReturned="(\d+)"', body).group(1))
+        messages = [message for message in self.messages if message['received'] >= received_after]
+        page = messages[offset:offset + max_entries]
+        return ('<m:FindItemResponseMessage ResponseClass="Success"><m:ResponseCode>NoError</m:ResponseCode>'
+                '<m:RootFolder IndexedPagingOffset="{}" TotalItemsInView="{}" IncludesLastItemInRange="{}"><t:Items>'
+                '{}</t:Items></m:RootFolder></m:FindItemResponseMessage>').format(
+            offset + len(page), len(messages), 'true' if offset + len(page) >= len(messages) else 'false',
+            ''.join('<t:Message><t:ItemId Id="{id}" ChangeKey="ck"/><t:DateTimeReceived>{received}'
+                    '</t:DateTimeReceived><t:InternetMessageId>{message_id}</t:InternetMessageId></t:Message>'.format(
+                        **message) for message in page))
+
+    def getitem(self, body):
+        messages = [self.messages_by_id[item_id] for item_id in re.findall(r'<t:ItemId Id="(\w+)"', body)]
+        mime_content = base64.b64encode('Subject: {}\r\n\r\n{}'.format('message', self.body))
+        return ''.join(
+            '<m:GetItemResponseMessage ResponseClass="Success"><m:ResponseCode>NoError</m:ResponseCode><m:Items>'
+            '<t:Message><t:MimeContent CharacterSet="UTF-8">{mime_content}</t:MimeContent>'
+            '<t:ItemId Id="{id}" ChangeKey="ck"/><t:ParentFolderId Id="inbox" ChangeKey="ck"/>'
+            '<t:ItemClass>IPM.Note</t:ItemClass><t:Subject>{subject}</t:Subject><t:Body BodyType="Text">{body}</t:Body>'
+            '<t:DateTimeReceived>{received}</t:DateTimeReceived><t:Size>{size}</t:Size>'
+            '<t:DateTimeSent>{received}</t:DateTimeSent><t:DateTimeCreated>{received}</t:DateTimeCreated>'
+            '<t:HasAttachments>false</t:HasAttachments>'
+            '<t:Sender><t:Mailbox><t:EmailAddress>sender@example.com</t:EmailAddress></t:Mailbox></t:Sender>'
+            '<t:ToRecipients><t:Mailbox><t:EmailAddress>user@example.com</t:EmailAddress></t:Mailbox>'
+            '</t:ToRecipients><t:InternetMessageId>{message_id}</t:InternetMessageId>'
+            '<t:IsRead>false</t:IsRead></t:Message></m:Items></m:GetItemResponseMessage>'.format(
+                mime_content=mime_content, body=self.body, size=len(self.body), **message) for message in messages)
+
+
+def create_messages(count):
+    """Creates messages, one received in every second"""
+    start_time = datetime(2020, 1, 1)
+    return [{'id': 'item{}'.format(i), 'message_id': '&lt;{}@example.com&gt;'.format(i), 'subject': 'message {}'.format(i),
+             'received': (start_time + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%SZ')} for i in range(count)]
+
+
+def test_fetch_emails_as_incidents_catch_up(mocker):
+    """
+    Given
+    - A mailbox with 2,000 new messages of 20KB, after the integration was down, 10 of them already fetched
+    When
+    - Fetching incidents
+    Then
+    - Ensure the next 50 messages are fetched, and only they are retrieved with all their fields
+    - Ensure the next fetch continues after them
+    """
+    messages = create_messages(2000)
+    mocker.patch.object(demisto, 'getLastRun', return_value={
+        'lastRunTime': '2020-01-01T00:00:00Z', 'folderName': 'Inbox',
+        'ids': ['<{}@example.com>'.format(i) for i in range(10)]
+    })
+    mocker.patch.object(demisto, 'setLastRun')
+    with FakeEWS(messages, body_size=20000) as ews:
+        mocker.patch.object(EWSv2, 'config', Configuration(
+            service_endpoint=ews.url, credentials=Credentials('user', 'password'), auth_type=BASIC,
+            version=Version(EXCHANGE_2016)), create=True)
+        incidents = EWSv2.fetch_emails_as_incidents('user@example.com', 'Inbox')
+
+    assert [incident['name'] for incident in incidents] == ['message {}'.format(i) for i in range(10, 60)]
+    last_run = demisto.setLastRun.call_args[0][0]
+    assert last_run['lastRunTime'] == '2020-01-01T00:00:59Z'
+    assert last_run['ids'][-50:] == ['<{}@example.com>'.format(i) for i in range(10, 60)]
+    # retrieving all the new messages with all their fields takes 20 FindItem and 20 GetItem requests
+    assert ews.requests.count('FindItem') == 1
+    assert ews.requests.count('GetItem') == 1
+
+
+def test_fetch_emails_as_incidents_validates_on_failure(mocker):
+    """
+    Given
+    - An auto discovered configuration, which no longer works
+    When
+    - Fetching incidents
+    Then
+    - Ensure the configuration is used without validating it first, and is validated once the fetch fails with it
+    """
+    mocker.patch.object(EWSv2, 'AUTO_DISCOVERY', True)
+    mocker.patch.object(demisto, 'getLastRun', return_value={})
+    mocker.patch.object(demisto, 'setLastRun')
+    get_account = mocker.patch.object(EWSv2, 'get_account')
+    mocker.patch.object(EWSv2, 'fetch_last_emails', side_effect=[TransportError('failed'), []])
+    assert EWSv2.fetch_emails_as_incidents('user@example.com', 'Inbox') == []
+    assert get_account.call_args_list == [mocker.call('user@example.com', validate=False),
+                                          mocker.call('user@example.com')]
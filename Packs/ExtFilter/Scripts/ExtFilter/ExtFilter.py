@@ -3,6 +3,7 @@ import copy
 import fnmatch
 import hashlib
 import json
+import operator
 import re
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
@@ -53,7 +54,8 @@ class Ddict:
         return (res[0], res[1], '.'.join(res[2]))
 
     @staticmethod
-    def set(node: Dict[str, Any], path: str, value: Any):
+    def set(node: Dict[str, Any], path: str, value: Any,
+            set_item: Callable[[Dict[str, Any], str, Any], None] = operator.setitem):
         comps = path.split('.')
         while comps:
             parent = node
@@ -64,9 +66,10 @@ class Ddict:
             else:
                 name, node, comps = res
 
-            if not isinstance(node, dict):
-                parent[name] = node = {}
-        parent[name] = value
+            if comps and not isinstance(node, dict):
+                node = {}
+                set_item(parent, name, node)
+        set_item(parent, name, value)
 
     @staticmethod
     def get_value(node: Dict[str, Any], path: str) -> Optional[Value]:
@@ -163,77 +166,337 @@ def hashdigest(value: str, algorithm: str) -> str:
     return h.hexdigest()
 
 
-def match_pattern(
+def compile_pattern(
         pattern: str,
-        value: Any,
         caseless: bool,
-        patalg: int) -> bool:
-    """ Pattern matching
+        patalg: int) -> Callable[[Any], bool]:
+    """ Compile a pattern to match many values with it
 
       :param pattern: The pattern string.
-      :param value: The value to compare with the pattern.
       :param caseless: True if the pattern matching take places in case insensitive, otherwise False.
       :param patalg: The pattern matching algorithm. Spefify any of PATALG_BINARY, PATALG_WILDCARD and PATALG_REGEX.
-      :return: Return True if the value matches the pattern, otherwise False.
+      :return: The function to match a value with the pattern, which returns True if the value matches it.
     """
+    match_string: Callable[[str], bool]
     if patalg == PATALG_BINARY:
         if caseless:
             pattern = pattern.lower()
-            if isinstance(value, list):
-                return next(
-                    filter(
-                        lambda v: isinstance(v, str) and v.lower() == pattern,
-                        value),
-                    None) is not None
-            elif isinstance(value, str):
-                return pattern == value.lower()
+
+            def match_string(v: str) -> bool:
+                return v.lower() == pattern
         else:
-            if isinstance(value, list):
-                return pattern in value
-            elif isinstance(value, str):
-                return pattern == value
-        return False
+            def match_string(v: str) -> bool:
+                return v == pattern
 
     elif patalg == PATALG_WILDCARD:
+        wildcard = re.compile(fnmatch.translate(pattern.lower() if caseless else pattern))
         if caseless:
-            pattern = pattern.lower()
-            if isinstance(value, list):
-                return next(
-                    filter(
-                        lambda v:
-                            isinstance(v, str) and fnmatch.fnmatchcase(v.lower(), pattern),
-                        value),
-                    None) is not None
-            elif isinstance(value, str):
-                return fnmatch.fnmatchcase(value.lower(), pattern)
+            def match_string(v: str) -> bool:
+                return wildcard.match(v.lower()) is not None
         else:
-            if isinstance(value, list):
-                return next(
-                    filter(
-                        lambda v:
-                        isinstance(v, str) and fnmatch.fnmatchcase(v, pattern),
-                        value),
-                    None) is not None
-            elif isinstance(value, str):
-                return fnmatch.fnmatchcase(value, pattern)
-        return False
+            def match_string(v: str) -> bool:
+                return wildcard.match(v) is not None
 
     elif patalg == PATALG_REGEX:
         flags = re.IGNORECASE if caseless else 0
+        try:
+            regex = re.compile(pattern, flags)
+        except re.error:
+            # an invalid pattern fails only when a string is matched with it
+            def match_string(v: str) -> bool:
+                return re.fullmatch(pattern, v, flags) is not None
+        else:
+            def match_string(v: str) -> bool:
+                return regex.fullmatch(v) is not None
+    else:
+        return compile_error(f"Unknown pattern algorithm: '{patalg}'")
 
+    def match(value: Any) -> bool:
         if isinstance(value, list):
-            return next(
-                filter(
-                    lambda v:
-                        isinstance(v, str) and re.fullmatch(pattern, v, flags),
-                    value),
-                None) is not None
-        elif isinstance(value, str):
-            return re.fullmatch(pattern, value, flags) is not None
+            return any(isinstance(v, str) and match_string(v) for v in value)
+        return isinstance(value, str) and match_string(value)
+    return match
+
+
+def match_pattern(
+        pattern: str,
+        value: Any,
+        caseless: bool,
+        patalg: int) -> bool:
+    """ Pattern matching
+
+      :param pattern: The pattern string.
+      :param value: The value to compare with the pattern.
+      :param caseless: True if the pattern matching take places in case insensitive, otherwise False.
+      :param patalg: The pattern matching algorithm. Spefify any of PATALG_BINARY, PATALG_WILDCARD and PATALG_REGEX.
+      :return: Return True if the value matches the pattern, otherwise False.
+    """
+    return compile_pattern(pattern, caseless, patalg)(value)
+
+
+def compile_error(err_msg: str) -> Callable[..., Any]:
+    """ Get a function which raises an error once it is called, for invalid conditions which are compiled
+        before they are applied to a value
+
+      :param err_msg: The error message.
+      :return: The function to raise the error.
+    """
+    def raise_error(*args: Any) -> Any:
+        exit_error(err_msg)
+    return raise_error
+
+
+def convert_once(convert: Callable[[Any], Any], value: Any) -> Callable[[], Any]:
+    """ Convert an operand once for all the values it is compared with
+
+      :param convert: The function to convert the operand.
+      :param value: The operand.
+      :return: The function to get the converted operand, which raises the error of the conversion if it failed.
+    """
+    try:
+        converted = convert(value)
+    except Exception as err:
+        error = err
+
+        def raise_error() -> Any:
+            raise error.with_traceback(None)
+        return raise_error
+    return lambda: converted
+
+
+def is_integer_string(value: Any) -> bool:
+    try:
+        return isinstance(int(value, 10), int)
+    except (ValueError, TypeError):
         return False
+
+
+def compile_string_match(optype: str, rhs: str) -> Callable[[str], bool]:
+    """ Compile an operator which matches a string with a string
+
+      :param optype: The conditional operator, any of STRING_MATCH_OPERATORS.
+      :param rhs: The right hand side string.
+      :return: The function to match a left hand side string.
+    """
+    if optype == "starts with":
+        return lambda lhs: lhs.startswith(rhs)
+    elif optype == "starts with caseless":
+        rhs = rhs.lower()
+        return lambda lhs: lhs.lower().startswith(rhs)
+    elif optype == "ends with":
+        return lambda lhs: lhs.endswith(rhs)
+    elif optype == "ends with caseless":
+        rhs = rhs.lower()
+        return lambda lhs: lhs.lower().endswith(rhs)
+    elif optype == "includes":
+        return lambda lhs: rhs in lhs
+    elif optype == "includes caseless":
+        rhs = rhs.lower()
+        return lambda lhs: rhs in lhs.lower()
+    elif optype == "matches":
+        return lambda lhs: lhs == rhs
+    elif optype == "matches caseless":
+        rhs = rhs.lower()
+        return lambda lhs: lhs.lower() == rhs
+    elif optype == "in list":
+        values = set(rhs.split(','))
+        return lambda lhs: lhs in values
+    elif optype == "in caseless list":
+        values = set(rhs.lower().split(','))
+        return lambda lhs: lhs.lower() in values
+    elif optype == "matches any line of":
+        values = set(rhs.splitlines())
+        return lambda lhs: lhs in values
+    elif optype == "matches any caseless line of":
+        values = {x.lower() for x in rhs.splitlines()}
+        return lambda lhs: lhs.lower() in values
+    return compile_error(f"Unknown operation name: '{optype}'")
+
+
+def compile_strict_equals(rhs: Any) -> Callable[[Any], bool]:
+    rhs_type = type(rhs)
+
+    def match(lhs: Any) -> bool:
+        try:
+            return isinstance(lhs, rhs_type) and lhs == rhs
+        except (ValueError, TypeError):
+            return False
+    return match
+
+
+def compile_strict_not_equals(rhs: Any) -> Callable[[Any], bool]:
+    rhs_type = type(rhs)
+
+    def match(lhs: Any) -> bool:
+        try:
+            return not isinstance(lhs, rhs_type) or lhs != rhs
+        except (ValueError, TypeError):
+            return False
+    return match
+
+
+def has_dt_expressions(value: Any) -> bool:
+    """ Check if a value includes dt expressions
+
+      :param value: The value parsed from JSON.
+      :return: True if any of the strings in the value includes a dt expression, otherwise False.
+    """
+    if isinstance(value, dict):
+        return any(has_dt_expressions(k) or has_dt_expressions(v) for k, v in value.items())
+    elif isinstance(value, list):
+        return any(has_dt_expressions(v) for v in value)
+    return isinstance(value, str) and '${' in value
+
+
+def get_restore_item(node: Dict[str, Any], key: str) -> Callable[[], None]:
+    """ Get a function to restore an item of a dict to its current state
+
+      :param node: The dict.
+      :param key: The key of the item.
+      :return: The function to restore the item.
+    """
+    if key in node:
+        value = node[key]
+
+        def restore():
+            node[key] = value
     else:
-        exit_error(f"Unknown pattern algorithm: '{patalg}'")
-    return False
+        def restore():
+            node.pop(key, None)
+    return restore
+
+
+# the operators which are the negation of other operators
+NEGATED_OPERATORS = {
+    "isn't": "is",
+    "doesn't equal": "equals",
+    "!=": "equals",
+    "doesn't start with": "starts with",
+    "doesn't start with caseless": "starts with caseless",
+    "doesn't end with": "ends with",
+    "doesn't end with caseless": "ends with caseless",
+    "doesn't include": "includes",
+    "doesn't include caseless": "includes caseless",
+    "doesn't match": "matches",
+    "doesn't match caseless": "matches caseless",
+    "wildcard: doesn't match": "wildcard: matches",
+    "wildcard: doesn't match caseless": "wildcard: matches caseless",
+    "regex: doesn't match": "regex: matches",
+    "regex: doesn't match caseless": "regex: matches caseless",
+    "not in list": "in list",
+    "not in caseless list": "in caseless list",
+    "doesn't match any line of": "matches any line of",
+    "doesn't match any caseless line of": "matches any caseless line of",
+    "doesn't match any string of": "matches any string of",
+    "doesn't match any caseless string of": "matches any caseless string of",
+    "wildcard: doesn't match any string of": "wildcard: matches any string of",
+    "wildcard: doesn't match any caseless string of": "wildcard: matches any caseless string of",
+    "regex: doesn't match any string of": "regex: matches any string of",
+    "regex: doesn't match any caseless string of": "regex: matches any caseless string of",
+    "doesn't find": "finds",
+    "doesn't find caseless": "finds caseless",
+    "doesn't contain": "contains",
+    "doesn't contain caseless": "contains caseless",
+    "wildcard: doesn't contain": "wildcard: contains",
+    "wildcard: doesn't contain caseless": "wildcard: contains caseless",
+    "regex: doesn't contain": "regex: contains",
+    "regex: doesn't contain caseless": "regex: contains caseless",
+    "doesn't contain any line of": "contains any line of",
+    "doesn't contain any caseless line of": "contains any caseless line of",
+    "doesn't contain any string of": "contains any string of",
+    "doesn't contain any caseless string of": "contains any caseless string of",
+    "wildcard: doesn't contain any string of": "wildcard: contains any string of",
+    "wildcard: doesn't contain any caseless string of": "wildcard: contains any caseless string of",
+    "regex: doesn't contain any string of": "regex: contains any string of",
+    "regex: doesn't contain any caseless string of": "regex: contains any caseless string of",
+}
+
+# the types of values for `is`
+VALUE_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "empty": lambda lhs: not bool(lhs),
+    "null": lambda lhs: lhs is None,
+    "string": lambda lhs: isinstance(lhs, str),
+    "integer": lambda lhs: isinstance(lhs, int),
+    "integer string": is_integer_string,
+    "any integer": lambda lhs: isinstance(lhs, int) or is_integer_string(lhs),
+}
+
+COMPARISON_OPERATORS = {
+    "greater or equal": operator.ge,
+    ">=": operator.ge,
+    "greater than": operator.gt,
+    ">": operator.gt,
+    "less or equal": operator.le,
+    "<=": operator.le,
+    "less than": operator.lt,
+    "<": operator.lt,
+}
+
+STRING_MATCH_OPERATORS = {
+    "starts with",
+    "starts with caseless",
+    "ends with",
+    "ends with caseless",
+    "includes",
+    "includes caseless",
+    "matches",
+    "matches caseless",
+    "in list",
+    "in caseless list",
+    "matches any line of",
+    "matches any caseless line of",
+}
+
+# the operators which match a value with a pattern, to (caseless, patalg)
+PATTERN_MATCH_OPERATORS = {
+    "wildcard: matches": (False, PATALG_WILDCARD),
+    "wildcard: matches caseless": (True, PATALG_WILDCARD),
+    "regex: matches": (False, PATALG_REGEX),
+    "regex: matches caseless": (True, PATALG_REGEX),
+}
+
+# the operators which match a string with any of the patterns, to (caseless, patalg)
+ANY_PATTERN_MATCH_OPERATORS = {
+    "matches any caseless string of": (True, PATALG_BINARY),
+    "wildcard: matches any string of": (False, PATALG_WILDCARD),
+    "wildcard: matches any caseless string of": (True, PATALG_WILDCARD),
+    "regex: matches any string of": (False, PATALG_REGEX),
+    "regex: matches any caseless string of": (True, PATALG_REGEX),
+}
+
+# the operators which find a pattern in an entire value, to (caseless, patalg)
+PATTERN_CONTAINS_OPERATORS = {
+    "wildcard: contains": (False, PATALG_WILDCARD),
+    "wildcard: contains caseless": (True, PATALG_WILDCARD),
+    "regex: contains": (False, PATALG_REGEX),
+    "regex: contains caseless": (True, PATALG_REGEX),
+}
+
+# the operators which find any of the patterns in an entire value, to (caseless, patalg)
+ANY_PATTERN_CONTAINS_OPERATORS = {
+    "contains any caseless string of": (True, PATALG_BINARY),
+    "wildcard: contains any string of": (False, PATALG_WILDCARD),
+    "wildcard: contains any caseless string of": (True, PATALG_WILDCARD),
+    "regex: contains any string of": (False, PATALG_REGEX),
+    "regex: contains any caseless string of": (True, PATALG_REGEX),
+}
+
+# the operators which match an entire value, rather than the individual values of a list
+ENTIRE_VALUE_OPERATORS = {
+    "finds",
+    "finds caseless",
+    "contains",
+    "contains caseless",
+    "contains any line of",
+    "contains any caseless line of",
+    "contains any string of",
+    *PATTERN_CONTAINS_OPERATORS,
+    *ANY_PATTERN_CONTAINS_OPERATORS,
+}
+ENTIRE_VALUE_OPERATORS.update(k for k, v in NEGATED_OPERATORS.items() if v in ENTIRE_VALUE_OPERATORS)
+
+# the placeholder of conditions which are not compiled yet
+NOT_COMPILED = object()
 
 
 def extract_value(source: Any,
@@ -345,9 +608,30 @@ def get_parent_child(root: dict,
         return (root, None), (parent_value, parent_name)
 
 
+class FilterPlan:
+    """ An operator compiled with its conditions, to filter many values
+
+      apply(root, inlist): Filter a value as ExtFilter.filter_value() does.
+      match(root): The predicate of an operator which either keeps a value as it is or drops it,
+                   with which the values of a list are filtered directly.
+    """
+
+    def __init__(self,
+                 apply: Callable[[Any, bool], Optional[Value]],
+                 match: Optional[Callable[[Any], bool]] = None):
+        self.apply = apply
+        self.match = match
+
+
 class ExtFilter:
     def __init__(self, dx: ContextData):
         self.__dx = dx
+        # JSON strings to their parsed values, with the number of the changes made to the values being filtered
+        # when they were parsed if they include dt expressions, which are extracted again after changes.
+        self.__parsed_conds: Dict[str, Tuple[Optional[int], Any]] = {}
+        self.__changes = 0
+        # the functions to undo the changes made to a value while it is tested with `if` conditions
+        self.__journal: Optional[List[Callable[[], None]]] = None
 
     def match_value(self, lhs: Any, optype: str, rhs: Any) -> bool:
         """ Matching with the conditional operator
@@ -358,342 +642,185 @@ class ExtFilter:
           :param rhs: The right hand side value
           :return: Return True if the lhs matches the rhs, otherwise False.
         """
-        if optype == "is":
-            if not isinstance(rhs, str):
-                return False
-            if rhs == "empty":
-                return not bool(lhs)
-            elif rhs == "null":
-                return lhs is None
-            elif rhs == "string":
-                return isinstance(lhs, str)
-            elif rhs == "integer":
-                return isinstance(lhs, int)
-            elif rhs == "integer string":
-                try:
-                    return isinstance(int(lhs, 10), int)
-                except (ValueError, TypeError):
-                    return False
-            elif rhs == "any integer":
+        return self.compile_match(optype, rhs)(lhs)
+
+    def compile_match(self, optype: str, rhs: Any) -> Callable[[Any], bool]:
+        """ Compile the conditional operator with the right hand side value
+
+          :param self: This instance.
+          :param optype: The conditional operator
+          :param rhs: The right hand side value
+          :return: The function to match a left hand side value, which returns True if it matches the rhs.
+        """
+        negated = NEGATED_OPERATORS.get(optype)
+        if negated:
+            match = self.compile_match(negated, rhs)
+            return lambda lhs: not match(lhs)
+
+        compare = COMPARISON_OPERATORS.get(optype)
+        if compare:
+            get_rhs = convert_once(float, rhs)
+
+            def compare_float(lhs: Any) -> bool:
                 try:
-                    return isinstance(lhs, int) or\
-                        isinstance(int(lhs, 10), int)
+                    return compare(float(lhs), get_rhs())
                 except (ValueError, TypeError):
-                    return False
-            exit_error(f"Unknown operation filter: '{rhs}'")
+                    pass
+                return False
+            return compare_float
 
-        elif optype == "isn't":
-            return not self.match_value(lhs, "is", rhs)
+        if optype == "is":
+            if not isinstance(rhs, str):
+                return lambda lhs: False
+            return VALUE_TYPES.get(rhs) or compile_error(f"Unknown operation filter: '{rhs}'")
 
         elif optype == "===":
-            rhs = self.parse_conds_json(rhs)
-            try:
-                return isinstance(lhs, type(rhs)) and lhs == rhs
-            except (ValueError, TypeError):
-                return False
+            return self.__compile_parsed_match(rhs, compile_strict_equals)
 
         elif optype == "!==":
-            rhs = self.parse_conds_json(rhs)
-            try:
-                return not isinstance(lhs, type(rhs)) or lhs != rhs
-            except (ValueError, TypeError):
-                return False
+            return self.__compile_parsed_match(rhs, compile_strict_not_equals)
 
         elif optype in ("equals", "=="):
-            try:
-                if isinstance(lhs, int):
-                    return lhs == int(rhs)
-                elif isinstance(lhs, float):
-                    return lhs == float(rhs)
-                elif isinstance(lhs, str):
-                    return lhs == str(rhs)
-                else:
-                    return lhs == rhs
-            except (ValueError, TypeError):
-                pass
-            return False
-
-        elif optype in ("doesn't equal", "!="):
-            return not self.match_value(lhs, "equals", rhs)
-
-        elif optype in ("greater or equal", ">="):
-            try:
-                return float(lhs) >= float(rhs)
-            except (ValueError, TypeError):
-                pass
-            return False
-
-        elif optype in ("greater than", ">"):
-            try:
-                return float(lhs) > float(rhs)
-            except (ValueError, TypeError):
-                pass
-            return False
+            get_int = convert_once(int, rhs)
+            get_float = convert_once(float, rhs)
+            get_str = convert_once(str, rhs)
 
-        elif optype in ("less or equal", "<="):
-            try:
-                return float(lhs) <= float(rhs)
-            except (ValueError, TypeError):
-                pass
-            return False
-
-        elif optype in ("less than", "<"):
-            try:
-                return float(lhs) < float(rhs)
-            except (ValueError, TypeError):
-                pass
-            return False
+            def equals(lhs: Any) -> bool:
+                try:
+                    if isinstance(lhs, int):
+                        return lhs == get_int()
+                    elif isinstance(lhs, float):
+                        return lhs == get_float()
+                    elif isinstance(lhs, str):
+                        return lhs == get_str()
+                    else:
+                        return lhs == rhs
+                except (ValueError, TypeError):
+                    pass
+                return False
+            return equals
 
         elif optype == "in range":
             if not isinstance(rhs, str):
-                return False
+                return lambda lhs: False
 
             minmax = rhs.split(',')
             if len(minmax) != 2:
-                exit_error(f'Invalid Range: {rhs}')
-
-            try:
-                lhs = float(lhs)
-            except (ValueError, TypeError):
-                return False
-            return float(minmax[0]) <= lhs and lhs <= float(minmax[1])
-
-        elif optype == "starts with":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs.startswith(rhs)
-
-        elif optype == "starts with caseless":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs.lower().startswith(rhs.lower())
-
-        elif optype == "doesn't start with":
-            return not self.match_value(lhs, 'starts with', rhs)
-
-        elif optype == "doesn't start with caseless":
-            return not self.match_value(lhs, 'starts with caseless', rhs)
-
-        elif optype == "ends with":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs.endswith(rhs)
-
-        elif optype == "ends with caseless":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs.lower().endswith(rhs.lower())
-
-        elif optype == "doesn't end with":
-            return not self.match_value(lhs, 'ends with', rhs)
-
-        elif optype == "doesn't end with caseless":
-            return not self.match_value(lhs, 'ends with caseless', rhs)
-
-        elif optype == "includes":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                rhs in lhs
+                return compile_error(f'Invalid Range: {rhs}')
+            get_min = convert_once(float, minmax[0])
+            get_max = convert_once(float, minmax[1])
 
-        elif optype == "includes caseless":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                rhs.lower() in lower(lhs)
-
-        elif optype == "doesn't include":
-            return not self.match_value(lhs, 'includes', rhs)
-
-        elif optype == "doesn't include caseless":
-            return not self.match_value(lhs, 'includes caseless', rhs)
-
-        elif optype == "matches":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs == rhs
-
-        elif optype == "matches caseless":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs.lower() == rhs.lower()
-
-        elif optype == "doesn't match":
-            return not self.match_value(lhs, 'matches', rhs)
-
-        elif optype == "doesn't match caseless":
-            return not self.match_value(lhs, 'matches caseless', rhs)
-
-        elif optype == "wildcard: matches":
-            return isinstance(rhs, str) and\
-                match_pattern(rhs, lhs, False, PATALG_WILDCARD)
-
-        elif optype == "wildcard: matches caseless":
-            return isinstance(rhs, str) and\
-                match_pattern(rhs, lhs, True, PATALG_WILDCARD)
-
-        elif optype == "wildcard: doesn't match":
-            return not isinstance(rhs, str) or\
-                not match_pattern(rhs, lhs, False, PATALG_WILDCARD)
-
-        elif optype == "wildcard: doesn't match caseless":
-            return not isinstance(rhs, str) or\
-                not match_pattern(rhs, lhs, True, PATALG_WILDCARD)
-
-        elif optype == "regex: matches":
-            return isinstance(rhs, str) and\
-                match_pattern(rhs, lhs, False, PATALG_REGEX)
-
-        elif optype == "regex: matches caseless":
-            return isinstance(rhs, str) and\
-                match_pattern(rhs, lhs, True, PATALG_REGEX)
-
-        elif optype == "regex: doesn't match":
-            return not isinstance(rhs, str) or\
-                not match_pattern(rhs, lhs, False, PATALG_REGEX)
-
-        elif optype == "regex: doesn't match caseless":
-            return not isinstance(rhs, str) or\
-                not match_pattern(rhs, lhs, True, PATALG_REGEX)
-
-        elif optype == "in list":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs in rhs.split(',')
-
-        elif optype == "in caseless list":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lower(lhs) in rhs.lower().split(',')
-
-        elif optype == "not in list":
-            return not self.match_value(lhs, "in list", rhs)
-
-        elif optype == "not in caseless list":
-            return not self.match_value(lhs, "in caseless list", rhs)
-
-        elif optype == "matches any line of":
-            return isinstance(rhs, str) and\
-                isinstance(lhs, str) and\
-                lhs in rhs.splitlines()
-
-        elif optype == "matches any caseless line of":
-            if not isinstance(rhs, str) or not isinstance(lhs, str):
-                return False
+            def in_range(lhs: Any) -> bool:
+                try:
+                    lhs = float(lhs)
+                except (ValueError, TypeError):
+                    return False
+                return get_min() <= lhs and lhs <= get_max()
+            return in_range
 
-            lhs = lhs.lower()
-            return next(
-                filter(
-                    lambda x: isinstance(
-                        x,
-                        str) and x.lower() == lhs,
-                    rhs.splitlines()),
-                None) is not None
+        elif optype in STRING_MATCH_OPERATORS:
+            if not isinstance(rhs, str):
+                return lambda lhs: False
 
-        elif optype == "doesn't match any line of":
-            return not self.match_value(lhs, "matches any line of", rhs)
+            match_string = compile_string_match(optype, rhs)
+            return lambda lhs: isinstance(lhs, str) and match_string(lhs)
 
-        elif optype == "doesn't match any caseless line of":
-            return not self.match_value(
-                lhs, "matches any caseless line of", rhs)
+        elif optype in PATTERN_MATCH_OPERATORS:
+            if not isinstance(rhs, str):
+                return lambda lhs: False
+            return compile_pattern(rhs, *PATTERN_MATCH_OPERATORS[optype])
 
         elif optype == "matches any string of":
-            if not isinstance(lhs, str):
-                return False
+            def compile_strings(rval: Any) -> Callable[[Any], bool]:
+                rval = rval if isinstance(rval, list) else [rval]
+                strings = {r for r in rval if isinstance(r, str)}
+                return lambda lhs: lhs in strings
+            return self.__compile_parsed_match(rhs, compile_strings, str)
+
+        elif optype in ANY_PATTERN_MATCH_OPERATORS:
+            caseless, patalg = ANY_PATTERN_MATCH_OPERATORS[optype]
+
+            def compile_patterns(rval: Any) -> Callable[[Any], bool]:
+                rval = rval if isinstance(rval, list) else [rval]
+                if patalg == PATALG_BINARY:
+                    strings = {r.lower() for r in rval if isinstance(r, str)}
+                    return lambda lhs: lhs.lower() in strings
+
+                patterns = [compile_pattern(r, caseless, patalg) for r in rval if isinstance(r, str)]
+                return lambda lhs: any(match(lhs) for match in patterns)
+            return self.__compile_parsed_match(rhs, compile_patterns, str)
+
+        elif optype in ("finds", "finds caseless"):
+            if not isinstance(rhs, str):
+                return lambda lhs: False
 
-            rhs = self.parse_conds_json(rhs)
-            rhs = rhs if isinstance(rhs, list) else [rhs]
-            return lhs in rhs
+            if optype == "finds":
+                def finds(lhs: Any) -> bool:
+                    if isinstance(lhs, list):
+                        return any(isinstance(v, str) and rhs in v for v in lhs)
+                    return isinstance(lhs, str) and rhs in lhs
+            else:
+                rhs_lower = rhs.lower()
 
-        elif optype == "matches any caseless string of":
-            if not isinstance(lhs, str):
-                return False
+                def finds(lhs: Any) -> bool:
+                    if isinstance(lhs, list):
+                        return any(isinstance(v, str) and rhs_lower in v.lower() for v in lhs)
+                    return isinstance(lhs, str) and rhs_lower in lhs.lower()
+            return finds
 
-            rhs = self.parse_conds_json(rhs)
-            rhs = rhs if isinstance(rhs, list) else [rhs]
-            return next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, True, PATALG_BINARY),
-                    rhs),
-                None) is not None
+        elif optype == "contains":
+            if not isinstance(rhs, str):
+                return lambda lhs: False
+            return lambda lhs: rhs in lhs if isinstance(lhs, list) else rhs == lhs
 
-        elif optype == "doesn't match any string of":
-            return not self.match_value(lhs, "matches any string of", rhs)
+        elif optype == "contains caseless":
+            if not isinstance(rhs, str):
+                return lambda lhs: False
+            return compile_pattern(rhs, True, PATALG_BINARY)
 
-        elif optype == "doesn't match any caseless string of":
-            return not self.match_value(
-                lhs, "matches any caseless string of", rhs)
+        elif optype in PATTERN_CONTAINS_OPERATORS:
+            if not isinstance(rhs, str):
+                return lambda lhs: False
 
-        elif optype == "wildcard: matches any string of":
-            if not isinstance(lhs, str):
-                return False
+            match = compile_pattern(rhs, *PATTERN_CONTAINS_OPERATORS[optype])
+            return lambda lhs: match(lhs if isinstance(lhs, list) else [lhs])
 
-            rhs = self.parse_conds_json(rhs)
-            rhs = rhs if isinstance(rhs, list) else [rhs]
-            return next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, False, PATALG_WILDCARD),
-                    rhs),
-                None) is not None
-
-        elif optype == "wildcard: matches any caseless string of":
-            if not isinstance(lhs, str):
-                return False
+        elif optype in ("contains any line of", "contains any caseless line of"):
+            if not isinstance(rhs, str):
+                return lambda lhs: False
 
-            rhs = self.parse_conds_json(rhs)
-            rhs = rhs if isinstance(rhs, list) else [rhs]
-            return next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, True, PATALG_WILDCARD),
-                    rhs),
-                None) is not None
-
-        elif optype == "wildcard: doesn't match any string of":
-            return not self.match_value(
-                lhs, "wildcard: matches any string of", rhs)
-
-        elif optype == "wildcard: doesn't match any caseless string of":
-            return not self.match_value(
-                lhs, "wildcard: matches any caseless string of", rhs)
-
-        elif optype == "regex: matches any string of":
-            if not isinstance(lhs, str):
-                return False
+            if optype == "contains any line of":
+                lines = set(rhs.splitlines())
+                return lambda lhs: any(isinstance(v, str) and v in lines
+                                       for v in (lhs if isinstance(lhs, list) else [lhs]))
+            else:
+                lines = {x.lower() for x in rhs.splitlines()}
+                return lambda lhs: any(isinstance(v, str) and v.lower() in lines
+                                       for v in (lhs if isinstance(lhs, list) else [lhs]))
 
-            rhs = self.parse_conds_json(rhs)
-            rhs = rhs if isinstance(rhs, list) else [rhs]
-            return next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, False, PATALG_REGEX),
-                    rhs),
-                None) is not None
-
-        elif optype == "regex: matches any caseless string of":
-            if not isinstance(lhs, str):
-                return False
+        elif optype == "contains any string of":
+            def compile_strings(rval: Any) -> Callable[[Any], bool]:
+                rval = rval if isinstance(rval, list) else [rval]
+                strings = [r for r in rval if isinstance(r, str)]
 
-            rhs = self.parse_conds_json(rhs)
-            rhs = rhs if isinstance(rhs, list) else [rhs]
-            return next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, True, PATALG_REGEX),
-                    rhs),
-                None) is not None
+                def contains(lhs: Any) -> bool:
+                    lval = lhs if isinstance(lhs, list) else [lhs]
+                    # the first of the strings found in the value is the result, so an empty string isn't a match
+                    return bool(next(filter(lambda r: r in lval, strings), None))
+                return contains
+            return self.__compile_parsed_match(rhs, compile_strings)
 
-        elif optype == "regex: doesn't match any string of":
-            return not self.match_value(
-                lhs, "regex: matches any string of", rhs)
+        elif optype in ANY_PATTERN_CONTAINS_OPERATORS:
+            caseless, patalg = ANY_PATTERN_CONTAINS_OPERATORS[optype]
 
-        elif optype == "regex: doesn't match any caseless string of":
-            return not self.match_value(
-                lhs, "regex: matches any caseless string of", rhs)
+            def compile_patterns(rval: Any) -> Callable[[Any], bool]:
+                rval = rval if isinstance(rval, list) else [rval]
+                patterns = [(r, compile_pattern(r, caseless, patalg)) for r in rval if isinstance(r, str)]
+                # the first of the patterns found in the value is the result, so an empty pattern isn't a match
+                return lambda lhs: bool(next((r for r, match in patterns if match(lhs)), None))
+            return self.__compile_parsed_match(rhs, compile_patterns)
 
-        else:
-            raise RuntimeError(f"Unknown operation name: '{optype}'")
-        return False
+        return compile_error(f"Unknown operation name: '{optype}'")
 
     def filter_with_expressions(self,
                                 root: Any,
@@ -732,72 +859,55 @@ class ExtFilter:
           :param inlist: True if `root` is an element in a list, False otherwise.
           :return: Return the filtered value in Value object if the conditions matches it, otherwise None.
         """
+        return self.compile_expressions(conds, path)(root, inlist)
+
+    def compile_expressions(self,
+                            conds: Union[dict, list],
+                            path: Optional[str] = None) -> Callable[[Any, bool], Optional[Value]]:
+        """ Compile the expressions as filter_with_expressions() evaluates them
+
+          :param self: This instance.
+          :param conds: The expressions to filter the value.
+          :param path: The path to apply the conditions.
+          :return: The function to filter a value with the expressions, given the value and `inlist`.
+        """
         if isinstance(conds, dict):
             # AND conditions
-            parent = None
-            child = root
-            if path:
-                if not isinstance(root, dict):
-                    return None
-                (parent, parent_path),\
-                    (child, child_name) = get_parent_child(root, path)
-
-            for x in conds.items():
-                coptype, cconds = x
-                child = self.filter_value(
-                    child, coptype, cconds, None, inlist and parent is None)
-                if not child:
-                    return None
-                child = child.value
-
-                if parent:
-                    if isinstance(parent, dict):
-                        if not isinstance(child_name, str):
-                            exit_error('Internal error: no child_name')
+            plans = [self.compile_filter(coptype, cconds) for coptype, cconds in conds.items()]
+
+            def filter_and(root: Any, inlist: bool) -> Optional[Value]:
+                parent = None
+                child = root
+                if path:
+                    if not isinstance(root, dict):
+                        return None
+                    (parent, parent_path),\
+                        (child, child_name) = get_parent_child(root, path)
+
+                for plan in plans:
+                    value = plan.apply(child, inlist and parent is None)
+                    if not value:
+                        return None
+                    child = value.value
+
+                    if parent:
+                        if isinstance(parent, dict):
+                            if not isinstance(child_name, str):
+                                exit_error('Internal error: no child_name')
+                            else:
+                                Ddict.set(parent, child_name, child, self.__set_item)
                         else:
-                            Ddict.set(parent, child_name, child)
+                            Ddict.set(root, parent_path, child, self.__set_item)
                     else:
-                        Ddict.set(root, parent_path, child)
-                else:
-                    root = child
+                        root = child
 
-            return Value(root)
+                return Value(root)
+            return filter_and
 
         elif isinstance(conds, list):
             # AND conditions by default
-            ok, lop, neg = (None, None, None)
-            for x in conds:
-                if isinstance(x, str):
-                    if x == 'not':
-                        neg = not neg
-                    elif lop is None and neg is None:
-                        lop = x
-                    else:
-                        exit_error('Invalid logical operators syntax')
-                elif isinstance(x, (dict, list)):
-                    val = None
-                    if ok is None:
-                        val = self.filter_with_expressions(
-                            root, x, path, inlist)
-                        ok = bool(val) ^ (neg or False)
-                    elif lop is None or lop == 'and':
-                        val = self.filter_with_expressions(
-                            root, x, path, inlist)
-                        ok = ok and (bool(val) ^ (neg or False))
-                    elif lop == 'or':
-                        val = self.filter_with_expressions(
-                            root, x, path, inlist)
-                        ok = ok or (bool(val) ^ (neg or False))
-                    else:
-                        exit_error(f'Invalid logical operator: {lop}')
-                    lop, neg = (None, None)
-                    root = val.value if val else root
-                else:
-                    exit_error(f'Invalid conditions format: {x}')
-            return Value(root) if ok is None or ok else None
-        else:
-            exit_error(f'Invalid conditions format: {conds}')
-        return None
+            return self.__compile_logical(conds, lambda x: self.compile_expressions(x, path))
+        return compile_error(f'Invalid conditions format: {conds}')
 
     def filter_with_conditions(
             self, root: Any, conds: Union[dict, list]) -> Optional[Value]:
@@ -833,49 +943,32 @@ class ExtFilter:
           :param conds: The condition expression to filter the value.
           :return: Return the filtered value in Value object if the conditions matches it, otherwise None.
         """
+        return self.compile_conditions(conds)(root, False)
+
+    def compile_conditions(self, conds: Union[dict, list]) -> Callable[[Any, bool], Optional[Value]]:
+        """ Compile the conditions as filter_with_conditions() evaluates them
+
+          :param self: This instance.
+          :param conds: The condition expression to filter the value.
+          :return: The function to filter a value with the conditions, given the value and `inlist`.
+        """
         if isinstance(conds, dict):
             # AND conditions
-            for x in conds.items():
-                if len(x) < 2 or isinstance(x[0], (dict, list)):
-                    exit_error(f'Invalid conditions format: {x}')
+            filters = [self.compile_expressions(expressions, path) for path, expressions in conds.items()]
+
+            def filter_and(root: Any, inlist: bool) -> Optional[Value]:
+                for filter_path in filters:
+                    value = filter_path(root, False)
+                    if not value:
+                        return None
+                    root = value.value
+                return Value(root)
+            return filter_and
 
-                root = self.filter_with_expressions(root, x[1], x[0])
-                if not root:
-                    return None
-                root = root.value
-            return Value(root)
         elif isinstance(conds, list):
             # AND conditions by default
-            ok, lop, neg = (None, None, None)
-            for x in conds:
-                if isinstance(x, str):
-                    if x == 'not':
-                        neg = not neg
-                    elif lop is None and neg is None:
-                        lop = x
-                    else:
-                        exit_error('Invalid logical operators syntax')
-                elif isinstance(x, (dict, list)):
-                    val = None
-                    if ok is None:
-                        val = self.filter_with_conditions(root, x)
-                        ok = bool(val) ^ (neg or False)
-                    elif lop is None or lop == 'and':
-                        val = self.filter_with_conditions(root, x)
-                        ok = ok and (bool(val) ^ (neg or False))
-                    elif lop == 'or':
-                        val = self.filter_with_conditions(root, x)
-                        ok = ok or (bool(val) ^ (neg or False))
-                    else:
-                        exit_error(f'Invalid logical operator: {lop}')
-                    lop, neg = (None, None)
-                    root = val.value if val else root
-                else:
-                    exit_error(f'Invalid conditions format: {x}')
-            return Value(root) if ok is None or ok else None
-        else:
-            exit_error(f'Invalid conditions format: {conds}')
-        return None
+            return self.__compile_logical(conds, self.compile_conditions)
+        return compile_error(f'Invalid conditions format: {conds}')
 
     def filter_values(
             self,
@@ -892,8 +985,7 @@ class ExtFilter:
           :param path: The path to apply the conditions.
           :return: Return the filtered value in Value object if the conditions matches it, otherwise None.
         """
-        return Value([v.value for v in [self.filter_value(
-            r, optype, conds, path, True) for r in root] if v])
+        return self.__filter_values(self.compile_filter(optype, conds, path), root)
 
     def filter_value(
             self,
@@ -912,540 +1004,502 @@ class ExtFilter:
           :param inlist: True if `root` is an element in a list, False otherwise.
           :return: Return the filtered value in Value object if the conditions matches it, otherwise None.
         """
-        if optype == "abort":
-            exit_error(
-                f"ABORT: value = {root}, conds = {conds}, path = {path}")
+        return self.compile_filter(optype, conds, path).apply(root, inlist)
 
-        elif optype == "is transformed with":
-            conds = self.parse_conds_json(conds)
-            conds = conds if isinstance(conds, list) else [conds]
+    def compile_filter(
+            self,
+            optype: str,
+            conds: Any,
+            path: Optional[str] = None) -> FilterPlan:
+        """ Compile the operator with the conditions as filter_value() evaluates them
+
+          The conditions given in JSON strings are parsed once they are applied to the first value, and compiled
+          again only if they are parsed again.
 
-            for operation in conds:
-                if not isinstance(operation, dict):
-                    exit_error(f'Invalid condition format: {operation}')
+          :param self: This instance.
+          :param optype: The conditional operator.
+          :param conds: The condition expression to filter the value.
+          :param path: The path to apply the conditions.
+          :return: The plan to filter values with.
+        """
+        plan = FilterPlan(lambda root, inlist: None)
 
-                for k, v in operation.items():
-                    value = self.filter_value(root, k, v, path, inlist)
-                    root = None if value is None else value.value
+        if optype == "abort":
+            def abort(root: Any, inlist: bool) -> Optional[Value]:
+                exit_error(f"ABORT: value = {root}, conds = {conds}, path = {path}")
+                return None
+            plan.apply = abort
+            return plan
 
-            return Value(root)
+        elif optype == "is transformed with":
+            def compile_transformers(operations: Any) -> Callable[[Any, bool], Optional[Value]]:
+                operations = operations if isinstance(operations, list) else [operations]
+                plans = []
+                for operation in operations:
+                    if not isinstance(operation, dict):
+                        plans.append(FilterPlan(compile_error(f'Invalid condition format: {operation}')))
+                        break
+                    plans.extend(self.compile_filter(k, v, path) for k, v in operation.items())
+
+                def transform(root: Any, inlist: bool) -> Optional[Value]:
+                    for transformer in plans:
+                        value = transformer.apply(root, inlist)
+                        root = None if value is None else value.value
+                    return Value(root)
+                return transform
+
+            get_transform = self.__compile_parsed(conds, compile_transformers)
+            plan.apply = lambda root, inlist: get_transform()(root, inlist)
+            return plan
 
         elif optype == "is filtered with":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
             if path:
-                conds = {"matches conditions of": self.parse_conds_json(conds)}
-                if isinstance(root, dict):
-                    return self.filter_with_expressions(
-                        root, conds, path, inlist)
-                else:
-                    return None
+                plan.apply = self.__filter_values_of(self.__filter_path(self.__compile_parsed(
+                    conds, lambda x: self.compile_expressions({"matches conditions of": x}, path))), plan)
             else:
-                return self.filter_value(root, "matches conditions of", conds)
+                conditions = self.compile_filter("matches conditions of", conds)
+                plan.apply = self.__filter_values_of(lambda root, inlist: conditions.apply(root, False), plan)
+            return plan
 
         elif optype == "value is filtered with":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
             if path:
-                conds = {"value matches expressions of": conds}
-                if isinstance(root, dict):
-                    v = {
-                        k: v for k, f, v in [
-                            (k,
-                             self.filter_with_expressions(
-                                 v,
-                                 conds,
-                                 path,
-                                 False),
-                                v) for k,
-                            v in root.items()] if f and f.value}
-                    return Value(v) if v else None
-                else:
-                    return self.filter_with_expressions(
-                        root, conds, path, inlist)
+                get_expressions = self.__compile_parsed(
+                    conds, lambda x: self.compile_expressions({"value matches expressions of": x}, path))
             else:
+                get_expressions = self.__compile_parsed(conds, self.compile_expressions)
+
+            def filter_dict_values(root: Any, inlist: bool) -> Optional[Value]:
+                expressions = get_expressions()
                 if isinstance(root, dict):
                     v = {
                         k: v for k, f, v in [
-                            (k,
-                             self.filter_with_expressions(
-                                 v,
-                                 conds,
-                                 None,
-                                 False),
-                                v) for k,
-                            v in root.items()] if f and f.value}
+                            (k, expressions(v, False), v) for k, v in root.items()
+                        ] if f and f.value}
                     return Value(v) if v else None
                 else:
-                    return self.filter_with_expressions(
-                        root, conds, None, inlist)
-
-        elif optype in ("is", "isn't"):
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            filstr = conds
-            if isinstance(filstr, str) and filstr == "existing key":
-                if optype == "is":
-                    if path and Ddict.get_value(root, path):
-                        return Value(root)
-                else:  # isn't
-                    if not path or not Ddict.get_value(root, path):
-                        return Value(root)
-                return None
-        if path:
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = {optype: self.parse_conds_json(conds)}
-            if isinstance(root, dict):
-                return self.filter_with_expressions(root, conds, path, inlist)
+                    return expressions(root, inlist)
+            plan.apply = self.__filter_values_of(filter_dict_values, plan)
+            return plan
+
+        elif optype in ("is", "isn't") and isinstance(conds, str) and conds == "existing key":
+            if optype == "is":
+                def has_key(root: Any) -> bool:
+                    return bool(path) and Ddict.get_value(root, path) is not None
+                plan.match = has_key
             else:
-                return None
-
-        elif optype == "if-then-else":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
+                def has_no_key(root: Any) -> bool:
+                    return not path or Ddict.get_value(root, path) is None
+                plan.match = has_no_key
 
-            conds = self.parse_conds_json(conds)
-            if not isinstance(conds, dict):
-                exit_error(f"Invalid conditions: {conds}")
+            match = plan.match
+            plan.apply = self.__filter_values_of(lambda root, inlist: Value(root) if match(root) else None, plan)
+            return plan
 
-            lconds = conds.get("if")
-            if lconds:
-                lconds = self.parse_conds_json(lconds)
-                if not isinstance(lconds, (dict, list)):
-                    exit_error(f"Invalid conditions: {lconds}")
-
-                elif self.filter_with_expressions(
-                        copy.deepcopy(root), lconds, path, inlist) is None:
-                    lconds = conds.get("else")
-                else:
-                    lconds = conds.get("then")
-            else:
-                lconds = conds.get("then")
-
-            if lconds:
-                lconds = self.parse_conds_json(lconds)
-                if not isinstance(lconds, (dict, list)):
-                    exit_error(f"Invalid conditions: {lconds}")
+        if path:
+            plan.apply = self.__filter_values_of(self.__filter_path(self.__compile_parsed(
+                conds, lambda x: self.compile_expressions({optype: x}, path))), plan)
+            return plan
 
-                return self.filter_with_expressions(root, lconds, path, inlist)
-            else:
-                return Value(root)
+        elif optype == "if-then-else":
+            get_if_then_else = self.__compile_parsed(conds, self.__compile_if_then_else)
+            plan.apply = self.__filter_values_of(lambda root, inlist: get_if_then_else()(root, inlist), plan)
+            return plan
 
         elif optype == "keeps":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
-            if not isinstance(root, dict) and not isinstance(conds, list):
-                return None
-            return Value({k: v for k, v in root.items() if k in conds})
+            def keep(root: Any, inlist: bool) -> Optional[Value]:
+                keys = self.parse_conds_json(conds)
+                if not isinstance(root, dict) and not isinstance(keys, list):
+                    return None
+                return Value({k: v for k, v in root.items() if k in keys})
+            plan.apply = self.__filter_values_of(keep, plan)
+            return plan
 
         elif optype == "doesn't keep":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
-            if not isinstance(root, dict) or not isinstance(conds, list):
-                return None
-            return Value({k: v for k, v in root.items() if k not in conds})
-
-        elif optype == "matches expressions of":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
-            return self.filter_with_expressions(root, conds, path, inlist)
-
-        elif optype == "matches conditions of":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
-            return self.filter_with_conditions(root, conds)
-
-        elif optype == "value matches expressions of":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
-            if isinstance(root, dict):
-                v = {
-                    k: v.value for k, v in {
-                        k: self.filter_with_expressions(
-                            v,
-                            conds,
-                            None,
-                            False) for k,
-                        v in root.items()}.items() if v}
-                return Value(v) if v else None
-            else:
-                return self.filter_with_expressions(root, conds, None, inlist)
-
-        elif optype == "value matches conditions of":
-            if not inlist and isinstance(root, list):
-                return self.filter_values(root, optype, conds, path)
-
-            conds = self.parse_conds_json(conds)
-            if isinstance(root, dict):
-                v = {k: v.value
-                     for k, v in
-                     {k: self.filter_with_conditions(v, conds)
-                      for k, v in root.items()}.items() if v}
-                return Value(v) if v else None
-            else:
-                return self.filter_with_conditions(root, conds)
+            def drop(root: Any, inlist: bool) -> Optional[Value]:
+                keys = self.parse_conds_json(conds)
+                if not isinstance(root, dict) or not isinstance(keys, list):
+                    return None
+                return Value({k: v for k, v in root.items() if k not in keys})
+            plan.apply = self.__filter_values_of(drop, plan)
+            return plan
+
+        elif optype in ("matches expressions of", "matches conditions of"):
+            get_filter = self.__compile_parsed(
+                conds, self.compile_expressions if optype == "matches expressions of" else self.compile_conditions)
+            plan.apply = self.__filter_values_of(lambda root, inlist: get_filter()(root, inlist), plan)
+            return plan
+
+        elif optype in ("value matches expressions of", "value matches conditions of"):
+            get_filter = self.__compile_parsed(
+                conds,
+                self.compile_expressions if optype == "value matches expressions of" else self.compile_conditions)
+
+            def filter_dict_values(root: Any, inlist: bool) -> Optional[Value]:
+                filter_value = get_filter()
+                if isinstance(root, dict):
+                    v = {k: v.value
+                         for k, v in
+                         {k: filter_value(v, False) for k, v in root.items()}.items() if v}
+                    return Value(v) if v else None
+                else:
+                    return filter_value(root, inlist)
+            plan.apply = self.__filter_values_of(filter_dict_values, plan)
+            return plan
 
         """
         Filter for an entire value
         """
-        lhs = root
-        rhs = conds
-        if optype == "finds":
-            ok = False
-            try:
-                if isinstance(rhs, str):
-                    if isinstance(lhs, list):
-                        ok = any(isinstance(v, str) and rhs in v
-                                 for v in lhs)
-                    elif isinstance(lhs, str):
-                        ok = rhs in lhs
-            except (ValueError, TypeError):
-                pass
-            return Value(lhs) if ok else None
-
-        elif optype == "finds caseless":
-            ok = False
-            try:
-                if isinstance(rhs, str):
-                    if isinstance(lhs, list):
-                        ok = any(isinstance(v, str) and rhs.lower() in v
-                                 for v in lower(lhs))
-                    elif isinstance(lhs, str):
-                        ok = rhs.lower() in lower(lhs)
-            except (ValueError, TypeError):
-                pass
-            return Value(lhs) if ok else None
+        if optype in ENTIRE_VALUE_OPERATORS:
+            match = self.compile_match(optype, conds)
+            plan.match = match
+            plan.apply = lambda root, inlist: Value(root) if match(root) else None
+            return plan
 
-        elif optype == "doesn't find":
-            if not self.filter_value(lhs, "finds", rhs, path):
-                return Value(lhs)
-            return None
+        elif optype == "is replaced with":
+            # the parsed value is copied, so it is not shared by the values it replaces
+            plan.apply = lambda root, inlist: Value(copy.deepcopy(self.parse_conds_json(conds)))
+            return plan
 
-        elif optype == "doesn't find caseless":
-            if not self.filter_value(lhs, "finds caseless", rhs):
+        elif optype == "is updated with":
+            def update(lhs: Any, inlist: bool) -> Optional[Value]:
+                rval = copy.deepcopy(self.parse_conds_json(conds))
+                if isinstance(lhs, dict) and isinstance(rval, dict):
+                    self.__update_dict(lhs, rval)
+                elif isinstance(lhs, list) and len(lhs) == 1 and isinstance(lhs[0], dict):
+                    self.__update_dict(lhs[0], rval)
+                else:
+                    lhs = rval
                 return Value(lhs)
-            else:
-                return None
+            plan.apply = update
+            return plan
 
-        elif optype == "contains":
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if isinstance(rhs, str) and rhs in lval:
-                return Value(lhs)
-            else:
-                return None
+        elif optype == "appends":
+            def append(lhs: Any, inlist: bool) -> Optional[Value]:
+                rval = copy.deepcopy(self.parse_conds_json(conds))
+                rval = rval if isinstance(rval, list) else [rval]
+                if isinstance(lhs, list):
+                    self.__extend_list(lhs, rval)
+                    return Value(lhs)
+                return Value([lhs] + rval)
+            plan.apply = append
+            return plan
+
+        elif optype in ("json: encode array", "json: encode"):
+            def encode(lhs: Any, inlist: bool) -> Optional[Value]:
+                params = self.parse_conds_json(conds)
+                indent = params.get("indent")
+                return Value(json.dumps(
+                    lhs, indent=None if indent is None else int(indent)))
+            plan.apply = encode if optype == "json: encode array" else self.__filter_values_of(encode, plan)
+            return plan
 
-        elif optype == "contains caseless":
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if isinstance(rhs, str) and rhs.lower() in lower(lval):
-                return Value(lhs)
-            else:
-                return None
+        """
+        Filter for single value
+        """
+        if optype == "json: decode":
+            plan.apply = self.__filter_values_of(lambda lhs, inlist: Value(json.loads(str(lhs))), plan)
 
-        elif optype == "doesn't contain":
-            if not self.filter_value(lhs, "contains", rhs):
-                return Value(lhs)
-            else:
-                return None
+        elif optype == "base64: encode":
+            plan.apply = self.__filter_values_of(lambda lhs, inlist: Value(
+                base64.b64encode(str(lhs).encode('utf-8')).decode('utf-8')), plan)
 
-        elif optype == "doesn't contain caseless":
-            if not self.filter_value(lhs, "contains caseless", rhs):
-                return Value(lhs)
-            else:
-                return None
+        elif optype == "base64: decode":
+            plan.apply = self.__filter_values_of(lambda lhs, inlist: Value(
+                base64.b64decode(lhs.encode('utf-8')).decode('utf-8')), plan)
 
-        elif optype == "wildcard: contains":
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if isinstance(rhs, str) and\
-                    match_pattern(rhs, lval, False, PATALG_WILDCARD):
-                return Value(lhs)
-            else:
-                return None
+        elif optype == "digest":
+            def digest(lhs: Any, inlist: bool) -> Optional[Value]:
+                params = self.parse_conds_json(conds)
+                return Value(
+                    hashdigest(str(lhs), str(params.get('algorithm', 'sha256'))))
+            plan.apply = self.__filter_values_of(digest, plan)
 
-        elif optype == "wildcard: contains caseless":
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if isinstance(rhs, str) and\
-                    match_pattern(rhs, lval, True, PATALG_WILDCARD):
-                return Value(lhs)
-            else:
-                return None
+        else:
+            """
+            Filter for single value (boolean evaluation)
+            """
+            match = self.compile_match(optype, conds)
+            plan.match = match
+            plan.apply = self.__filter_values_of(lambda lhs, inlist: Value(lhs) if match(lhs) else None, plan)
+        return plan
 
-        elif optype == "wildcard: doesn't contain":
-            if not self.filter_value(lhs, "wildcard: contains", rhs):
-                return Value(lhs)
-            else:
-                return None
+    def extract_value(self, source: Any) -> Any:
+        """ Extract value including dt expression
 
-        elif optype == "wildcard: doesn't contain caseless":
-            if not self.filter_value(lhs, "wildcard: contains caseless", rhs):
-                return Value(lhs)
-            else:
-                return None
+          :param self: This instance.
+          :param source: The value to be extracted that may include dt expressions.
+          :return: The value extracted.
+        """
+        return extract_value(source, extract_dt, self.__dx)
 
-        elif optype == "regex: contains":
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if isinstance(rhs, str) and\
-                    match_pattern(rhs, lval, False, PATALG_REGEX):
-                return Value(lhs)
-            else:
-                return None
+    def parse_conds_json(
+            self,
+            jstr: str,
+            only_parse_for_string: bool = True) -> Any:
+        """ parse a json string and extract value
 
-        elif optype == "regex: contains caseless":
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if isinstance(rhs, str) and\
-                    match_pattern(rhs, lval, True, PATALG_REGEX):
-                return Value(lhs)
-            else:
-                return None
+          The parsed value is reused for the same string, unless it includes dt expressions and
+          any of the values being filtered have been changed since it was parsed.
 
-        elif optype == "regex: doesn't contain":
-            if not self.filter_value(lhs, "regex: contains", rhs):
-                return Value(lhs)
-            else:
-                return None
+          :param self: This instance.
+          :param jstr: A json string.
+          :param only_parse_for_string: True: only parse the JSON when jstr is `string`, otherwise returns the raw jstr.
+          :return: The value extracted.
+        """
+        if only_parse_for_string and not isinstance(jstr, str):
+            return jstr
 
-        elif optype == "regex: doesn't contain caseless":
-            if not self.filter_value(lhs, "regex: contains caseless", rhs):
-                return Value(lhs)
-            else:
-                return None
+        parsed = self.__parsed_conds.get(jstr) if isinstance(jstr, str) else None
+        if parsed is not None and parsed[0] in (None, self.__changes):
+            return parsed[1]
 
-        elif optype == "contains any line of":
-            if isinstance(rhs, str) and\
-                    any(self.filter_value(lhs, "contains", x)
-                        for x in rhs.splitlines()):
-                return Value(lhs)
-            else:
-                return None
+        value = json.loads(jstr)
+        if has_dt_expressions(value):
+            value = self.extract_value(value)
+            self.__parsed_conds[jstr] = (self.__changes, value)
+        else:
+            self.__parsed_conds[jstr] = (None, value)
+        return value
 
-        elif optype == "contains any caseless line of":
-            if isinstance(rhs, str) and\
-                any(self.filter_value(lhs, "contains caseless", x)
-                    for x in rhs.splitlines()):
-                return Value(lhs)
-            else:
-                return None
+    def __compile_parsed(self, conds: Any, compile_conds: Callable[[Any], Any]) -> Callable[[], Any]:
+        """ Compile conditions which may be given in a JSON string, once they are parsed
 
-        elif optype == "doesn't contain any line of":
-            if not self.filter_value(lhs, "contains any line of", rhs):
-                return Value(lhs)
-            else:
-                return None
+          :param self: This instance.
+          :param conds: The conditions, or a JSON string of them.
+          :param compile_conds: The function to compile the parsed conditions.
+          :return: The function to get the compiled conditions, which compiles them again only if they are parsed again.
+        """
+        compiled = [NOT_COMPILED, None]
 
-        elif optype == "doesn't contain any caseless line of":
-            if not self.filter_value(
-                    lhs, "contains any caseless line of", rhs):
-                return Value(lhs)
-            else:
-                return None
+        def get_compiled() -> Any:
+            parsed = self.parse_conds_json(conds)
+            if parsed is not compiled[0]:
+                compiled[:] = [parsed, compile_conds(parsed)]
+            return compiled[1]
+        return get_compiled
 
-        elif optype == "contains any string of":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            if next(
-                    filter(lambda r: isinstance(r, str) and r in lval, rval),
-                    None):
-                return Value(lhs)
-            else:
-                return None
+    def __compile_parsed_match(self,
+                               rhs: Any,
+                               compile_match: Callable[[Any], Callable[[Any], bool]],
+                               lhs_type: Optional[type] = None) -> Callable[[Any], bool]:
+        """ Compile a conditional operator whose right hand side value may be given in a JSON string
 
-        elif optype == "contains any caseless string of":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            if next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, True, PATALG_BINARY),
-                    rval),
-                    None):
-                return Value(lhs)
-            else:
-                return None
+          :param self: This instance.
+          :param rhs: The right hand side value, or a JSON string of it.
+          :param compile_match: The function to compile the parsed right hand side value.
+          :param lhs_type: The type of the left hand side values to match, which is checked before parsing the rhs.
+          :return: The function to match a left hand side value.
+        """
+        match: Callable[[Any], bool]
+        if isinstance(rhs, str):
+            get_match = self.__compile_parsed(rhs, compile_match)
 
-        elif optype == "doesn't contain any string of":
-            return Value(lhs) if not self.filter_value(
-                lhs, "contains any string of", rhs) else None
-
-        elif optype == "doesn't contain any caseless string of":
-            return Value(lhs) if not self.filter_value(
-                lhs, "contains any caseless string of", rhs) else None
-
-        elif optype == "wildcard: contains any string of":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            if next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, False, PATALG_WILDCARD),
-                    rval),
-                    None):
-                return Value(lhs)
-            else:
-                return None
+            def match(lhs: Any) -> bool:
+                return get_match()(lhs)
+        else:
+            match = compile_match(rhs)
 
-        elif optype == "wildcard: contains any caseless string of":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            if next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, True, PATALG_WILDCARD),
-                    rval),
-                    None):
-                return Value(lhs)
-            else:
-                return None
+        if lhs_type is None:
+            return match
+        return lambda lhs: isinstance(lhs, lhs_type) and match(lhs)
 
-        elif optype == "wildcard: doesn't contain any string of":
-            return Value(lhs) if not self.filter_value(
-                lhs, "wildcard: contains any string of", rhs) else None
-
-        elif optype == "wildcard: doesn't contain any caseless string of":
-            return Value(lhs) if not self.filter_value(
-                lhs, "wildcard: contains any caseless string of", rhs) else None
-
-        elif optype == "regex: contains any string of":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            if next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, False, PATALG_REGEX),
-                    rval),
-                    None):
-                return Value(lhs)
-            else:
-                return None
+    def __compile_logical(self,
+                          conds: list,
+                          compile_conds: Callable[[Any], Callable[[Any, bool], Optional[Value]]]
+                          ) -> Callable[[Any, bool], Optional[Value]]:
+        """ Compile conditions joined with logical operators
 
-        elif optype == "regex: contains any caseless string of":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            if next(
-                filter(
-                    lambda r:
-                        isinstance(r, str) and match_pattern(r, lhs, True, PATALG_REGEX),
-                    rval),
-                    None):
-                return Value(lhs)
+          :param self: This instance.
+          :param conds: The conditions with `and`, `or` and `not`.
+          :param compile_conds: The function to compile each of the conditions.
+          :return: The function to filter a value with the conditions, given the value and `inlist`.
+        """
+        steps: List[Tuple[Optional[str], bool, Callable[[Any, bool], Optional[Value]]]] = []
+        lop, neg = (None, None)
+        for x in conds:
+            if isinstance(x, str):
+                if x == 'not':
+                    neg = not neg
+                elif lop is None and neg is None:
+                    lop = x
+                else:
+                    steps.append((None, False, compile_error('Invalid logical operators syntax')))
+                    break
+            elif isinstance(x, (dict, list)):
+                if steps and lop not in (None, 'and', 'or'):
+                    steps.append((None, False, compile_error(f'Invalid logical operator: {lop}')))
+                    break
+                steps.append((lop if steps else None, neg or False, compile_conds(x)))
+                lop, neg = (None, None)
             else:
-                return None
+                steps.append((None, False, compile_error(f'Invalid conditions format: {x}')))
+                break
+
+        def filter_logical(root: Any, inlist: bool) -> Optional[Value]:
+            ok = None
+            for lop, neg, filter_conds in steps:
+                val = filter_conds(root, inlist)
+                if ok is None:
+                    ok = bool(val) ^ neg
+                elif lop == 'or':
+                    ok = ok or (bool(val) ^ neg)
+                else:
+                    ok = ok and (bool(val) ^ neg)
+                root = val.value if val else root
+            return Value(root) if ok is None or ok else None
+        return filter_logical
 
-        elif optype == "regex: doesn't contain any string of":
-            if not self.filter_value(
-                    lhs, "regex: contains any string of", rhs):
-                return Value(lhs)
-            else:
-                return None
+    def __compile_if_then_else(self, conds: Any) -> Callable[[Any, bool], Optional[Value]]:
+        """ Compile the conditions of `if-then-else`
 
-        elif optype == "regex: doesn't contain any caseless string of":
-            if not self.filter_value(
-                    lhs, "regex: contains any caseless string of", rhs):
-                return Value(lhs)
-            else:
-                return None
+          :param self: This instance.
+          :param conds: The parsed conditions.
+          :return: The function to filter a value with the conditions, given the value and `inlist`.
+        """
+        if not isinstance(conds, dict):
+            return compile_error(f"Invalid conditions: {conds}")
 
-        elif optype == "is replaced with":
-            return Value(self.parse_conds_json(rhs))
+        def compile_branch(branch: Any) -> Callable[[], Optional[Callable[[Any, bool], Optional[Value]]]]:
+            if not branch:
+                return lambda: None
 
-        elif optype == "is updated with":
-            rval = self.parse_conds_json(rhs)
-            if isinstance(lhs, dict) and isinstance(rval, dict):
-                lhs.update(rval)
-            elif isinstance(lhs, list) and len(lhs) == 1 and isinstance(lhs[0], dict):
-                lhs[0].update(rval)
+            def compile_expressions(lconds: Any) -> Callable[[Any, bool], Optional[Value]]:
+                if not isinstance(lconds, (dict, list)):
+                    return compile_error(f"Invalid conditions: {lconds}")
+                return self.compile_expressions(lconds)
+            return self.__compile_parsed(branch, compile_expressions)
+
+        get_if = compile_branch(conds.get("if"))
+        get_then = compile_branch(conds.get("then"))
+        get_else = compile_branch(conds.get("else"))
+
+        def if_then_else(root: Any, inlist: bool) -> Optional[Value]:
+            get_branch = get_then
+            test = get_if()
+            if test and self.__test(test, root, inlist) is None:
+                get_branch = get_else
+
+            branch = get_branch()
+            if branch:
+                return branch(root, inlist)
             else:
-                lhs = rval
-            return Value(lhs)
+                return Value(root)
+        return if_then_else
 
-        elif optype == "appends":
-            rval = self.parse_conds_json(rhs)
-            rval = rval if isinstance(rval, list) else [rval]
-            lval = lhs if isinstance(lhs, list) else [lhs]
-            lval.extend(rval)
-            return Value(lval)
-
-        elif optype == "json: encode array":
-            params = self.parse_conds_json(rhs)
-            indent = params.get("indent")
-            return Value(json.dumps(
-                lhs, indent=None if indent is None else int(indent)))
+    def __test(self,
+               test: Callable[[Any, bool], Optional[Value]],
+               root: Any,
+               inlist: bool) -> Optional[Value]:
+        """ Filter a value with conditions, then undo the changes they made to the value
 
+          :param self: This instance.
+          :param test: The function to filter the value with the conditions.
+          :param root: The value to filter.
+          :param inlist: True if `root` is an element in a list, False otherwise.
+          :return: Return the filtered value in Value object if the conditions matches it, otherwise None.
         """
-        Filter for individual values
-        """
-        if not inlist and isinstance(lhs, list):
-            return self.filter_values(lhs, optype, rhs)
+        journal = self.__journal
+        self.__journal = []
+        try:
+            return test(root, inlist)
+        finally:
+            if self.__journal:
+                for restore in reversed(self.__journal):
+                    restore()
+                self.__changes += 1
+            self.__journal = journal
+
+    def __filter_path(self,
+                      get_expressions: Callable[[], Callable[[Any, bool], Optional[Value]]]
+                      ) -> Callable[[Any, bool], Optional[Value]]:
+        """ Get the function to filter a dict with expressions applied to the path
 
+          :param self: This instance.
+          :param get_expressions: The function to get the compiled expressions.
+          :return: The function to filter a value, given the value and `inlist`.
         """
-        Filter for single value
+        def filter_path(root: Any, inlist: bool) -> Optional[Value]:
+            expressions = get_expressions()
+            if isinstance(root, dict):
+                return expressions(root, inlist)
+            else:
+                return None
+        return filter_path
+
+    def __filter_values_of(self,
+                           apply: Callable[[Any, bool], Optional[Value]],
+                           plan: FilterPlan) -> Callable[[Any, bool], Optional[Value]]:
+        """ Get the function to filter the values of a list with a plan, and any other value with `apply`
+
+          :param self: This instance.
+          :param apply: The function to filter a value which is not a list, or is an element in a list.
+          :param plan: The plan to filter the values of a list with.
+          :return: The function to filter a value, given the value and `inlist`.
         """
-        if optype == "json: encode":
-            params = self.parse_conds_json(rhs)
-            indent = params.get("indent")
-            return Value(
-                json.dumps(
-                    lhs, indent=None if indent is None else int(indent)))
+        def filter_value(root: Any, inlist: bool) -> Optional[Value]:
+            if not inlist and isinstance(root, list):
+                return self.__filter_values(plan, root)
+            return apply(root, inlist)
+        return filter_value
 
-        elif optype == "json: decode":
-            return Value(json.loads(str(lhs)))
+    def __filter_values(self, plan: FilterPlan, root: List[Any]) -> Optional[Value]:
+        """ Filter values of a list with a plan
 
-        elif optype == "base64: encode":
-            return Value(
-                base64.b64encode(
-                    str(lhs).encode('utf-8')).decode('utf-8'))
+          :param self: This instance.
+          :param plan: The plan to filter the values with.
+          :param root: The values to filter.
+          :return: Return the filtered value in Value object.
+        """
+        match = plan.match
+        if match:
+            return Value([r for r in root if match(r)])
 
-        elif optype == "base64: decode":
-            return Value(base64.b64decode(lhs.encode('utf-8')).decode('utf-8'))
+        apply = plan.apply
+        return Value([v.value for v in [apply(r, True) for r in root] if v])
 
-        elif optype == "digest":
-            params = self.parse_conds_json(rhs)
-            return Value(
-                hashdigest(str(lhs), str(params.get('algorithm', 'sha256'))))
+    def __set_item(self, node: Dict[str, Any], key: str, value: Any):
+        """ Set an item of a dict in a value being filtered
 
+          :param self: This instance.
+          :param node: The dict.
+          :param key: The key of the item.
+          :param value: The value of the item.
         """
-        Filter for single value (boolean evaluation)
-        """
-        return Value(lhs) if self.match_value(lhs, optype, rhs) else None
+        if key in node and node[key] is value:
+            return
+        if self.__journal is not None:
+            self.__journal.append(get_restore_item(node, key))
+        self.__changes += 1
+        node[key] = value
 
-    def extract_value(self, source: Any) -> Any:
-        """ Extract value including dt expression
+    def __update_dict(self, node: Dict[str, Any], values: Any):
+        """ Update a dict in a value being filtered
 
           :param self: This instance.
-          :param source: The value to be extracted that may include dt expressions.
-          :return: The value extracted.
+          :param node: The dict.
+          :param values: The items to update the dict with.
         """
-        return extract_value(source, extract_dt, self.__dx)
+        values = dict(values)
+        if self.__journal is not None:
+            self.__journal.extend(get_restore_item(node, key) for key in values)
+        self.__changes += 1
+        node.update(values)
 
-    def parse_conds_json(
-            self,
-            jstr: str,
-            only_parse_for_string: bool = True) -> Any:
-        """ parse a json string and extract value
+    def __extend_list(self, node: List[Any], values: List[Any]):
+        """ Extend a list in a value being filtered
 
           :param self: This instance.
-          :param jstr: A json string.
-          :param only_parse_for_string: True: only parse the JSON when jstr is `string`, otherwise returns the raw jstr.
-          :return: The value extracted.
+          :param node: The list.
+          :param values: The values to append to the list.
         """
-        if only_parse_for_string and not isinstance(jstr, str):
-            return jstr
-        return self.extract_value(json.loads(jstr))
+        if self.__journal is not None:
+            size = len(node)
+
+            def restore():
+                del node[size:]
+            self.__journal.append(restore)
+        self.__changes += 1
+        node.extend(values)
 
 
 if __name__ in ('__builtin__', 'builtins', '__main__'):
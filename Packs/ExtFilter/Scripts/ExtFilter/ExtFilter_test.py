@@ -0,0 +1,187 @@
+import json
+import random
+import time
+
+import pytest
+
+import demistomock as demisto
+from ExtFilter import ContextData, ExtFilter
+
+
+def filter_value(value, optype, conds, path=None, dx=None):
+    value = ExtFilter(dx or ContextData()).filter_value(value, optype, conds, path)
+    return value.value if value else None
+
+
+@pytest.mark.parametrize('value, optype, conds, path, expected', [
+    ([1, '2', 3.5, 'x', None], '>=', '2', None, ['2', 3.5]),
+    ([1, 5, 10, 20], 'in range', '5,10', None, [5, 10]),
+    ([1, '1', 1.0, True], '===', '1', None, [1, True]),
+    ([1, '1', 2], '!==', 1, None, ['1', 2]),
+    (['a.EXE', 'b.dll', 1], 'ends with caseless', '.exe', None, ['a.EXE']),
+    (['a', 'B', 'c'], 'in caseless list', 'b,C', None, ['B', 'c']),
+    (['a', 'B', 'c'], "doesn't match any caseless line of", 'b\nA', None, ['c']),
+    (['abc', 'ABD', 'b'], 'wildcard: matches caseless', 'ab?', None, ['abc', 'ABD']),
+    (['abc', 'ABD', 'b'], 'regex: matches', 'a.*', None, ['abc']),
+    (['abc', 'ABD', 'b'], 'regex: matches any caseless string of', '["x", "ab."]', None, ['abc', 'ABD']),
+    (['abc', 'ABD', 'b'], "wildcard: doesn't match any string of", ['a*', '?'], None, ['ABD']),
+    (['a', 'b'], 'contains any string of', '["x", "b"]', None, ['a', 'b']),
+    (['', 'b'], 'contains any string of', '["", "b"]', None, None),
+    (['a', 'b'], 'regex: contains caseless', 'B', None, ['a', 'b']),
+    ([{'a': 1}, {'b': 2}], 'is', 'existing key', 'a', [{'a': 1}]),
+    ([{'a': 1}, {'a': 2}], '>', 1, 'a', [{'a': 2}]),
+    ([{'a': 1, 'b': 2}], 'keeps', '["a"]', None, [{'a': 1}]),
+    ({'a': 1, 'b': 'x'}, 'value matches expressions of', {'is': 'integer'}, None, {'a': 1}),
+    ([1, 2, 3], 'is transformed with', [{'json: encode': {}}, {'base64: encode': ''}], None, ['MQ==', 'Mg==', 'Mw==']),
+    ([1, [2]], 'appends', '3', None, [1, [2], 3]),
+])
+def test_filter_value(value, optype, conds, path, expected):
+    """
+    Given:
+    - Values of every kind, and operators of every family with their conditions
+
+    When:
+    - Filtering the values with the conditions
+
+    Then:
+    - Ensure the filtered values are returned
+    """
+    assert filter_value(value, optype, conds, path) == expected
+
+
+def test_invalid_conditions():
+    """
+    Given:
+    - Conditions with an invalid logical operator after a condition, and invalid JSON
+
+    When:
+    - Filtering a value with the conditions
+
+    Then:
+    - Ensure the errors are raised once the conditions are applied
+    """
+    with pytest.raises(RuntimeError, match='Invalid logical operator: xor'):
+        filter_value(1, 'matches expressions of', [{'==': 1}, 'xor', {'==': 2}])
+    with pytest.raises(ValueError):
+        filter_value([1], '===', 'not json')
+    assert filter_value([], '===', 'not json') == []
+
+
+def test_if_then_else_does_not_change_value():
+    """
+    Given:
+    - `if` conditions which update the values they test
+
+    When:
+    - Filtering a list of dicts with `if-then-else`
+
+    Then:
+    - Ensure the `then` or `else` conditions are applied to the values as they were before the test
+    """
+    value = [{'Name': 'a.exe', 'Tags': ['x']}, {'Name': 'b.txt', 'Tags': []}]
+    conds = {
+        'if': [{'is updated with': {'Size': 0}}, {'is filtered with': {'Tags': {'appends': '"y"'}}},
+               {'is filtered with': {'Name': {'ends with': '.exe'}}}],
+        'then': {'is updated with': {'Executable': True}},
+        'else': {'keeps': ['Name']}
+    }
+    assert filter_value(value, 'if-then-else', conds) == [
+        {'Name': 'a.exe', 'Tags': ['x'], 'Executable': True}, {'Name': 'b.txt'}
+    ]
+    assert value[1] == {'Name': 'b.txt', 'Tags': []}
+
+
+def test_parse_conds_json(mocker):
+    """
+    Given:
+    - JSON conditions with and without dt expressions
+
+    When:
+    - Parsing the conditions many times, while a value including the dt expressions is changed
+
+    Then:
+    - Ensure the conditions are parsed once, and the dt expressions are extracted again after the value is changed
+    """
+    local = {'Extension': '.exe'}
+    mocker.patch.object(demisto, 'dt', side_effect=lambda dx, key: dx['local']['Extension'])
+    xfilter = ExtFilter(ContextData(local=local))
+
+    conds = '{"ends with": ".exe"}'
+    assert xfilter.parse_conds_json(conds) is xfilter.parse_conds_json(conds)
+
+    conds = '{"ends with": "${local.Extension}"}'
+    assert xfilter.parse_conds_json(conds) is xfilter.parse_conds_json(conds) == {'ends with': '.exe'}
+    assert demisto.dt.call_count == 1
+
+    xfilter.filter_value(local, 'is updated with', {'Extension': '.dll'})
+    assert xfilter.parse_conds_json(conds) == {'ends with': '.dll'}
+
+    assert filter_value(['a.exe', 'b.dll'], 'matches expressions of', conds, dx=ContextData(local=local)) == ['b.dll']
+
+
+RAND = random.Random(0)
+NAMES = ['file{}.{}'.format(i, RAND.choice(['exe', 'dll', 'txt', 'pdf'])) for i in range(100000)]
+SIZES = [RAND.randrange(1000) for _ in range(100000)]
+OWNERS = [RAND.choice(['alice', 'bob', 'carol']) for _ in range(100000)]
+
+
+@pytest.mark.benchmark
+class TestBenchmark:
+    """
+    Filtering lists of 100,000 values with every family of operators, which are compiled once for all the values
+    """
+    names = NAMES
+    sizes = SIZES
+
+    def records(self):
+        return [{'Name': name, 'Size': size, 'Owner': {'Name': owner}}
+                for name, size, owner in zip(NAMES, SIZES, OWNERS)]
+
+    def assert_filter(self, value, optype, conds, expected, path=None, seconds=10):
+        start = time.time()
+        assert filter_value(value, optype, conds, path) == expected
+        assert time.time() - start < seconds
+
+    def test_comparison(self):
+        self.assert_filter(self.sizes, 'in range', '100,199', [s for s in self.sizes if 100 <= s <= 199])
+        self.assert_filter(self.sizes, '>', 500, [s for s in self.sizes if s > 500])
+
+    def test_string(self):
+        self.assert_filter(self.names, 'ends with caseless', '.EXE', [n for n in self.names if n.endswith('.exe')])
+        self.assert_filter(self.names, 'not in list', ','.join(self.names[:50]), self.names[50:])
+
+    def test_wildcard(self):
+        self.assert_filter(self.names, 'wildcard: matches', 'file1*.exe',
+                           [n for n in self.names if n.startswith('file1') and n.endswith('.exe')])
+
+    def test_regex(self):
+        self.assert_filter(self.names, 'regex: matches caseless', r'FILE\d+\.(exe|dll)',
+                           [n for n in self.names if n.endswith(('.exe', '.dll'))])
+
+    def test_json_operands(self):
+        self.assert_filter(self.names, 'regex: matches any string of', json.dumps([r'.*\.exe', r'.*\.dll']),
+                           [n for n in self.names if n.endswith(('.exe', '.dll'))])
+        self.assert_filter(self.sizes, '===', '10', [s for s in self.sizes if s == 10])
+
+    def test_entire_value(self):
+        self.assert_filter(self.names, 'wildcard: contains any string of', json.dumps(['*.zip', 'file9999.*']),
+                           self.names)
+
+    def test_structure(self):
+        exe = [r for r in self.records() if r['Name'].endswith('.exe')]
+        self.assert_filter(self.records(), 'ends with', '".exe"', exe, path='Name')
+        self.assert_filter(self.records(), 'is filtered with', {'Name': {'ends with': '.exe'}, 'Size': {'<': 500}},
+                           [r for r in exe if r['Size'] < 500])
+        self.assert_filter(self.records(), 'matches expressions of',
+                           [{'is filtered with': {'Owner.Name': {'matches': 'bob'}}}, 'or',
+                            {'is filtered with': {'Size': {'>': 900}}}],
+                           [r for r in self.records() if r['Owner']['Name'] == 'bob' or r['Size'] > 900])
+        self.assert_filter(self.records(), 'if-then-else',
+                           json.dumps({'if': {'is filtered with': {'Name': {'ends with': '.exe'}}},
+                                       'then': {'keeps': ['Name']}, 'else': {'keeps': ['Size']}}),
+                           [{'Name': r['Name']} if r['Name'].endswith('.exe') else {'Size': r['Size']}
+                            for r in self.records()])
+
+    def test_transform(self):
+        self.assert_filter(self.sizes, 'is transformed with', [{'json: encode': {}}, {'json: decode': ''}],
+                           self.sizes)
@@ -10,10 +10,11 @@ def main():
     # when auto_detect does not exist - for previous integration instances
     if params.get('auto_detect_type') is None and not params.get('indicator_type'):
         return_error('Indicator Type cannot be empty')
-    feed_main('CSV', prefix='csv')
+    feed_main('CSV', prefix='csv', indicators_delta_engine=IndicatorsDeltaEngine.from_params(params))
 
 
 from CSVFeedApiModule import *  # noqa: E402
+from IndicatorsDeltaApiModule import *  # noqa: E402
 
 
 if __name__ in ('__builtin__', 'builtins', '__main__'):
@@ -8,6 +8,8 @@ from elasticsearch_dsl import Search
 from elasticsearch_dsl.query import QueryString
 import requests
 import warnings
+import queue
+import threading
 
 # Disable insecure warnings
 requests.packages.urllib3.disable_warnings()
@@ -31,12 +33,17 @@ MODULE_TO_FEEDMAP_KEY = 'moduleToFeedMap'
 FEED_TYPE_GENERIC = 'Generic Feed'
 FEED_TYPE_CORTEX = 'Cortex XSOAR Feed'
 FEED_TYPE_CORTEX_MT = 'Cortex XSOAR MT Shared Feed'
+FETCH_BATCH_SIZE = 2000
+# hits converted by a slice worker before they are handed over to be created
+FETCH_CHUNK_SIZE = 500
+FETCH_QUEUE_CHUNKS_PER_SLICE = 4
+FETCH_QUEUE_PUT_TIMEOUT = 0.1
 
 
 class ElasticsearchClient:
     def __init__(self, insecure=None, server=None, username=None, password=None, api_key=None, api_id=None,
                  time_field=None, time_method=None, fetch_index=None, fetch_time=None, query=None, tags=None,
-                 tlp_color=None):
+                 tlp_color=None, fetch_slices=1):
         self._insecure = insecure
         self._proxy = handle_proxy()
         # _elasticsearch_builder expects _proxy to be None if empty
@@ -54,6 +61,7 @@ class ElasticsearchClient:
         self.es = self._elasticsearch_builder()
         self.tags = tags
         self.tlp_color = tlp_color
+        self.fetch_slices = fetch_slices
 
     def _elasticsearch_builder(self):
         """Builds an Elasticsearch obj with the necessary credentials, proxy settings and secure connection."""
@@ -196,38 +204,153 @@ def get_demisto_indicators(search, tags, tlp_color):
     return ioc_lst, ioc_enrch_lst
 
 
-def fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch):
+def fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch, last_run=None):
     """Implements fetch-indicators command"""
+    last_run = last_run or {}
+    if not last_fetch:
+        # a resumed fetch must use the same time range
+        first_fetch, _ = parse_date_range(date_range=client.fetch_time, utc=False)
+        last_fetch = int(first_fetch.timestamp() * 1000)
     last_fetch_timestamp = get_last_fetch_timestamp(last_fetch, client.time_method, client.fetch_time)
-    now = datetime.now()
-    ioc_lst: list = []
-    ioc_enrch_lst: list = []
+    slices = client.fetch_slices
+    committed_slices: list = []
+    if last_run.get('fetch_until') and last_run.get('slices') == slices:
+        # resume the previous fetch, the slices which were committed are not fetched again
+        now = datetime.fromtimestamp(last_run['fetch_until'] / 1000)
+        committed_slices = list(last_run.get('committed_slices', []))
+    else:
+        now = datetime.now()
     if FEED_TYPE_GENERIC not in feed_type:
         # Insight is the name of the indicator object as it's saved into the database
         search = get_scan_insight_format(client, now, last_fetch_timestamp, feed_type)
-        for hit in search.scan():
-            hit_lst, hit_enrch_lst = extract_indicators_from_insight_hit(hit, tags=client.tags,
-                                                                         tlp_color=client.tlp_color)
-            ioc_lst.extend(hit_lst)
-            ioc_enrch_lst.extend(hit_enrch_lst)
+
+        def hit_to_indicators(hit):
+            return extract_indicators_from_insight_hit(hit, tags=client.tags, tlp_color=client.tlp_color)
     else:
         search = get_scan_generic_format(client, now, last_fetch_timestamp)
-        for hit in search.scan():
-            ioc_lst.extend(extract_indicators_from_generic_hit(hit, src_val, src_type, default_type, client.tags,
-                                                               client.tlp_color))
-
-    if ioc_lst:
-        for b in batch(ioc_lst, batch_size=2000):
-            demisto.createIndicators(b)
-    if ioc_enrch_lst:
-        ioc_enrch_batches = create_enrichment_batches(ioc_enrch_lst)
-        for enrch_batch in ioc_enrch_batches:
-            # ensure batch sizes don't exceed 2000
-            for b in batch(enrch_batch, batch_size=2000):
-                demisto.createIndicators(b)
+
+        def hit_to_indicators(hit):
+            return extract_indicators_from_generic_hit(hit, src_val, src_type, default_type, client.tags,
+                                                       client.tlp_color), []
+
+    searches = {slice_id: slice_search for slice_id, slice_search in enumerate(get_search_slices(search, slices))
+                if slice_id not in committed_slices}
+    for slice_id in scan_search_slices(searches, hit_to_indicators, IndicatorsBatchCreator()):
+        committed_slices.append(slice_id)
+        if len(committed_slices) < slices:
+            # the checkpoint moves forward only once all the slices are committed
+            demisto.setLastRun({'time': last_fetch, 'fetch_until': now.timestamp() * 1000, 'slices': slices,
+                                'committed_slices': sorted(committed_slices)})
     demisto.setLastRun({'time': now.timestamp() * 1000})
 
 
+def get_search_slices(search, slices):
+    """Splits a search to sliced scroll searches, which can be scanned in parallel"""
+    if slices <= 1:
+        return [search]
+    return [search.extra(slice={'id': slice_id, 'max': slices}) for slice_id in range(slices)]
+
+
+def scan_search_slices(searches, hit_to_indicators, batch_creator):
+    """
+    Scans the search slices in parallel, and creates their indicators in batches while the hits are scrolled.
+    Yields the id of every slice once all of its indicators were created.
+    """
+    if not searches:
+        return
+    chunks: queue.Queue = queue.Queue(maxsize=len(searches) * FETCH_QUEUE_CHUNKS_PER_SLICE)
+    stop_scan = threading.Event()
+
+    def put_chunk(chunk):
+        while not stop_scan.is_set():
+            try:
+                chunks.put(chunk, timeout=FETCH_QUEUE_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_worker(slice_id, slice_search):
+        try:
+            ioc_lst: list = []
+            ioc_enrch_lst: list = []
+            for hit in slice_search.scan():
+                hit_lst, hit_enrch_lst = hit_to_indicators(hit)
+                ioc_lst.extend(hit_lst)
+                ioc_enrch_lst.extend(hit_enrch_lst)
+                if len(ioc_lst) >= FETCH_CHUNK_SIZE:
+                    if not put_chunk((slice_id, ioc_lst, ioc_enrch_lst)):
+                        return
+                    ioc_lst = []
+                    ioc_enrch_lst = []
+            if put_chunk((slice_id, ioc_lst, ioc_enrch_lst)):
+                # signals that the slice was fully scanned
+                put_chunk((slice_id, None, None))
+        except Exception as e:
+            put_chunk(e)
+
+    workers = [threading.Thread(target=scan_worker, args=(slice_id, slice_search), daemon=True)
+               for slice_id, slice_search in searches.items()]
+    for worker in workers:
+        worker.start()
+
+    scanning_slices = len(workers)
+    try:
+        while scanning_slices:
+            chunk = chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            slice_id, ioc_lst, ioc_enrch_lst = chunk
+            if ioc_lst is None:
+                # everything that was scanned by the slice is created before it is committed
+                batch_creator.flush()
+                scanning_slices -= 1
+                yield slice_id
+            else:
+                batch_creator.add(ioc_lst, ioc_enrch_lst)
+    finally:
+        stop_scan.set()
+
+
+class IndicatorsBatchCreator:
+    """
+    Creates indicators and their enrichments in bounded batches.
+    The enrichments of an indicator are created after the indicator, each of them in a different batch.
+    """
+
+    def __init__(self, batch_size=FETCH_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.ioc_lst: list = []
+        # the i-th enrichment of every indicator is added to the i-th batch
+        self.enrch_batches: list = []
+
+    def add(self, ioc_lst, ioc_enrch_lst):
+        self.ioc_lst.extend(ioc_lst)
+        if len(self.ioc_lst) >= self.batch_size:
+            self._create_indicators()
+        for ioc_enrch_obj in ioc_enrch_lst:
+            for i, enrichment in enumerate(ioc_enrch_obj):
+                if i == len(self.enrch_batches):
+                    self.enrch_batches.append([])
+                self.enrch_batches[i].append(enrichment)
+                if len(self.enrch_batches[i]) >= self.batch_size:
+                    self._create_indicators(flush=True)
+                    demisto.createIndicators(self.enrch_batches[i])
+                    self.enrch_batches[i] = []
+
+    def flush(self):
+        self._create_indicators(flush=True)
+        for i, enrch_batch in enumerate(self.enrch_batches):
+            if enrch_batch:
+                demisto.createIndicators(enrch_batch)
+                self.enrch_batches[i] = []
+
+    def _create_indicators(self, flush=False):
+        while len(self.ioc_lst) >= self.batch_size or (flush and self.ioc_lst):
+            demisto.createIndicators(self.ioc_lst[:self.batch_size])
+            self.ioc_lst = self.ioc_lst[self.batch_size:]
+
+
 def get_last_fetch_timestamp(last_fetch, time_method, fetch_time):
     """Get the last fetch timestamp"""
     if last_fetch:
@@ -364,19 +487,21 @@ def main():
         fetch_index = params.get('fetch_index')
         fetch_time = params.get('fetch_time', '3 days')
         query = params.get('es_query')
+        fetch_slices = int(params.get('fetch_slices') or 1)
         api_id, api_key = extract_api_from_username_password(username, password)
         client = ElasticsearchClient(insecure, server, username, password, api_key, api_id, time_field, time_method,
-                                     fetch_index, fetch_time, query, tags, tlp_color)
+                                     fetch_index, fetch_time, query, tags, tlp_color, fetch_slices)
         src_val = params.get('src_val')
         src_type = params.get('src_type')
         default_type = params.get('default_type')
-        last_fetch = demisto.getLastRun().get('time')
+        last_run = demisto.getLastRun()
+        last_fetch = last_run.get('time')
 
         if demisto.command() == 'test-module':
             test_command(client, feed_type, src_val, src_type, default_type, time_method, time_field, fetch_time, query,
                          username, password, api_key, api_id)
         elif demisto.command() == 'fetch-indicators':
-            fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch)
+            fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch, last_run)
         elif demisto.command() == 'es-get-indicators':
             get_indicators_command(client, feed_type, src_val, src_type, default_type)
     except Exception as e:
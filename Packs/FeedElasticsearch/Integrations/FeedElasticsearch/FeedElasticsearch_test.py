@@ -1,3 +1,8 @@
+import time
+import pytest
+import demistomock as demisto
+
+
 class MockHit:
     def __init__(self, hit_val):
         self._hit_val = hit_val
@@ -267,3 +272,122 @@ def test_extract_api_from_username_password_username_api_key():
     import FeedElasticsearch as esf
     username = esf.API_KEY_PREFIX + 'api_id'
     assert esf.extract_api_from_username_password(username, 'api_key') == ('api_id', 'api_key')
+
+
+class FakeSearch:
+    """
+    In-process stand-in of a scroll search, a sliced search scrolls only the hits of its slice
+    """
+    def __init__(self, hits, slice_=None, failing_slices=()):
+        self.hits = hits
+        self.slice = slice_
+        self.failing_slices = failing_slices
+
+    def extra(self, slice):
+        return FakeSearch(self.hits, slice, self.failing_slices)
+
+    def scan(self):
+        for i, hit in enumerate(self.hits):
+            if not self.slice or i % self.slice['max'] == self.slice['id']:
+                yield MockHit(hit)
+        if self.slice and self.slice['id'] in self.failing_slices:
+            # the other slices are committed before the scroll fails
+            time.sleep(0.5)
+            raise Exception('Scroll failed')
+
+
+def get_generic_hits(count):
+    return [{CUSTOM_VAL_KEY: f'1.1.{i // 256}.{i % 256}', CUSTOM_TYPE_KEY: 'IP'} for i in range(count)]
+
+
+def get_fetch_client(fetch_slices):
+    import FeedElasticsearch as esf
+    return esf.ElasticsearchClient(time_method='Simple-Date', fetch_time='3 days', tags=[], fetch_slices=fetch_slices)
+
+
+@pytest.mark.parametrize('fetch_slices', [1, 4])
+def test_fetch_indicators_sliced_scroll(mocker, fetch_slices):
+    """
+    Given:
+    - 4500 generic hits
+    When:
+    - fetching indicators with 1 slice and with 4 slices
+    Then:
+    - all the indicators are created in batches of at most 2000
+    - the fetch checkpoint moves forward
+    """
+    import FeedElasticsearch as esf
+    mocker.patch.object(esf, 'get_scan_generic_format', return_value=FakeSearch(get_generic_hits(4500)))
+    create_indicators = mocker.patch.object(demisto, 'createIndicators')
+    set_last_run = mocker.patch.object(demisto, 'setLastRun')
+
+    esf.fetch_indicators_command(get_fetch_client(fetch_slices), esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY,
+                                 CUSTOM_TYPE_KEY, None, None)
+
+    batches = [call_args[0][0] for call_args in create_indicators.call_args_list]
+    assert all(len(b) <= esf.FETCH_BATCH_SIZE for b in batches)
+    assert sorted(ioc['value'] for b in batches for ioc in b) == sorted(hit[CUSTOM_VAL_KEY]
+                                                                        for hit in get_generic_hits(4500))
+    assert list(set_last_run.call_args[0][0].keys()) == ['time']
+
+
+def test_fetch_indicators_failed_slice(mocker):
+    """
+    Given:
+    - 4 slices, where the scroll of slice 2 fails
+    When:
+    - fetching indicators, and then fetching again
+    Then:
+    - the checkpoint doesn't move forward and keeps the committed slices
+    - the next fetch fetches only the slice which wasn't committed, in the same time range
+    """
+    import FeedElasticsearch as esf
+    get_scan = mocker.patch.object(esf, 'get_scan_generic_format',
+                                   return_value=FakeSearch(get_generic_hits(400), failing_slices=(2,)))
+    mocker.patch.object(demisto, 'createIndicators')
+    set_last_run = mocker.patch.object(demisto, 'setLastRun')
+
+    with pytest.raises(Exception, match='Scroll failed'):
+        esf.fetch_indicators_command(get_fetch_client(4), esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY, CUSTOM_TYPE_KEY,
+                                     None, 1000)
+    last_run = set_last_run.call_args[0][0]
+    assert last_run['time'] == 1000
+    assert last_run['slices'] == 4
+    assert 2 not in last_run['committed_slices']
+
+    get_scan.return_value = FakeSearch(get_generic_hits(400))
+    create_indicators = mocker.patch.object(demisto, 'createIndicators')
+    esf.fetch_indicators_command(get_fetch_client(4), esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY, CUSTOM_TYPE_KEY,
+                                 None, 1000, last_run)
+
+    created_values = {ioc['value'] for call_args in create_indicators.call_args_list for ioc in call_args[0][0]}
+    expected_values = {hit[CUSTOM_VAL_KEY] for i, hit in enumerate(get_generic_hits(400))
+                       if i % 4 not in last_run['committed_slices']}
+    assert created_values == expected_values
+    assert get_scan.call_args[0][1].timestamp() * 1000 == last_run['fetch_until']
+    assert set_last_run.call_args[0][0] == {'time': last_run['fetch_until']}
+
+
+def test_indicators_batch_creator(mocker):
+    """
+    Given:
+    - indicators with up to 3 enrichments each
+    When:
+    - creating them in batches of 2
+    Then:
+    - every indicator is created before its enrichments, and its enrichments are in different batches
+    """
+    import FeedElasticsearch as esf
+    create_indicators = mocker.patch.object(demisto, 'createIndicators')
+    batch_creator = esf.IndicatorsBatchCreator(batch_size=2)
+    batch_creator.add(['a', 'b', 'c'], [['a1', 'a2'], ['b1'], ['c1', 'c2', 'c3']])
+    batch_creator.flush()
+
+    batches = [call_args[0][0] for call_args in create_indicators.call_args_list]
+    assert all(len(b) <= 2 for b in batches)
+    created = [ioc for b in batches for ioc in b]
+    assert sorted(created) == ['a', 'a1', 'a2', 'b', 'b1', 'c', 'c1', 'c2', 'c3']
+    for enrichment in ['a1', 'a2', 'b1', 'c1', 'c2', 'c3']:
+        assert created.index(enrichment[0]) < created.index(enrichment)
+    for b in batches:
+        assert len({ioc[0] for ioc in b}) == len(b)
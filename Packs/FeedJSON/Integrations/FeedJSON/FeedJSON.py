@@ -2,6 +2,7 @@ import demistomock as demisto
 from CommonServerPython import *
 
 from JSONFeedApiModule import *  # noqa: E402
+from IndicatorsDeltaApiModule import *  # noqa: E402
 
 
 def test_module(client, params) -> str:  # type: ignore  # pylint: disable=function-redefined
@@ -25,7 +26,7 @@ def main():
             return_error('Indicator Type cannot be empty when Auto Detect Indicator Type is unchecked')
         params['feed_name_to_config'].get(params.get('url'))['indicator_type'] = params.get('indicator_type')
 
-    feed_main(params, 'JSON Feed', 'json')
+    feed_main(params, 'JSON Feed', 'json', indicators_delta_engine=IndicatorsDeltaEngine.from_params(params))
 
 
 if __name__ in ('__main__', '__builtin__', 'builtins'):
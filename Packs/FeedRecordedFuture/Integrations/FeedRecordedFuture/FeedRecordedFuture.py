@@ -2,11 +2,13 @@ from CommonServerPython import *
 # IMPORTS
 import urllib3
 import csv
+import codecs
 import requests
 import itertools
 import traceback
 import urllib.parse
-from typing import Tuple, Optional, List, Dict
+from array import array
+from typing import Tuple, Optional, List, Iterator, Iterable
 
 # Disable insecure warnings
 urllib3.disable_warnings()
@@ -20,6 +22,9 @@ RF_CRITICALITY_LABELS = {
     'Unusual': 5
 }
 
+BATCH_SIZE = 2000
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class Client(BaseClient):
     """
@@ -141,9 +146,10 @@ class Client(BaseClient):
                 return_error(
                     '{} - exception in request: {} {}'.format(self.SOURCE_NAME, response.status_code, response.content))
 
-        data = response.text.split('\n')
+        # the csv is parsed while it is downloaded, so the risk list is never held in memory
+        lines = codecs.iterdecode(response.iter_lines(chunk_size=STREAM_CHUNK_SIZE), response.encoding or 'utf-8')
 
-        csvreader = csv.DictReader(data)
+        csvreader = csv.DictReader(lines)
 
         return csvreader
 
@@ -194,6 +200,66 @@ class Client(BaseClient):
         )
 
 
+class ValuesHashSet:
+    """
+    A compact set of string values, which keeps only the 64 bit hash of every value in an open addressing table.
+    Used to remove duplicate values of a feed without holding the values in memory.
+    """
+    MAX_LOAD_FACTOR = 0.75
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Attributes:
+             initial_capacity: int, the initial size of the table, must be a power of 2.
+        """
+        self._table = array('Q', bytes(8 * initial_capacity))
+        self._mask = initial_capacity - 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        # 0 marks an empty slot
+        return (hash(value) & 0xFFFFFFFFFFFFFFFF) or 1
+
+    def _insert(self, value_hash: int) -> bool:
+        table = self._table
+        mask = self._mask
+        i = value_hash & mask
+        while True:
+            slot = table[i]
+            if not slot:
+                table[i] = value_hash
+                return True
+            if slot == value_hash:
+                return False
+            i = (i + 1) & mask
+
+    def _grow(self):
+        old_table = self._table
+        self._table = array('Q', bytes(16 * len(old_table)))
+        self._mask = 2 * len(old_table) - 1
+        for value_hash in old_table:
+            if value_hash:
+                self._insert(value_hash)
+
+    def add(self, value: str) -> bool:
+        """Adds a value to the set.
+        Args:
+            value (str): The value to add
+        Returns:
+            bool. True if the value was added, False if it was already in the set
+        """
+        if not self._insert(self._hash(value)):
+            return False
+        self._size += 1
+        if self._size > self.MAX_LOAD_FACTOR * len(self._table):
+            self._grow()
+        return True
+
+
 def is_valid_risk_rule(client: Client, risk_rule):
     """Checks if the risk rule is valid by requesting from RF a list of all available rules.
     Returns:
@@ -302,7 +368,18 @@ def fetch_indicators_command(client, indicator_type, limit: Optional[int] = None
     Returns:
         list. List of indicators from the feed
     """
-    indicators = []
+    return list(iter_indicators(client, indicator_type, limit))
+
+
+def iter_indicators(client, indicator_type, limit: Optional[int] = None) -> Iterator[dict]:
+    """Iterates the indicators of the Recorded Future feeds, while the feeds are downloaded.
+    Args:
+        client(Client): Recorded Future Feed client.
+        indicator_type(str): The indicator type
+        limit(int): Optional. The number of the indicators to fetch from every service
+    Returns:
+        generator. The indicators from the feed
+    """
     for service in client.services:
         iterator = client.build_iterator(service, indicator_type)
         for item in itertools.islice(iterator, limit):  # if limit is None the iterator will iterate all of the items.
@@ -339,9 +416,32 @@ def fetch_indicators_command(client, indicator_type, limit: Optional[int] = None
             if client.tlp_color:
                 indicator_obj['fields']['trafficlightprotocol'] = client.tlp_color
 
-            indicators.append(indicator_obj)
+            yield indicator_obj
+
 
-    return indicators
+def create_indicators_in_batches(indicators: Iterable[dict], batch_size: int = BATCH_SIZE) -> int:
+    """Creates the indicators in batches, duplicate values are removed across all the batches.
+    Args:
+        indicators(iterable): The indicators to create
+        batch_size(int): The max number of indicators in a batch
+    Returns:
+        int. The number of created indicators
+    """
+    # remove duplicates due to performance issue -
+    # https://github.com/demisto/etc/issues/25033
+    seen_values = ValuesHashSet()
+    unique_indicators: List[dict] = []
+    for indicator in indicators:
+        indicator_value = indicator.get('value')
+        # each value is created only once
+        if indicator_value and seen_values.add(str(indicator_value).lower()):
+            unique_indicators.append(indicator)
+            if len(unique_indicators) >= batch_size:
+                demisto.createIndicators(unique_indicators)
+                unique_indicators = []
+    if unique_indicators:
+        demisto.createIndicators(unique_indicators)
+    return len(seen_values)
 
 
 def get_indicators_command(client, args) -> Tuple[str, dict, dict]:
@@ -400,20 +500,8 @@ def main():
     }
     try:
         if demisto.command() == 'fetch-indicators':
-            indicators = fetch_indicators_command(client, client.indicator_type)
-            # we submit the indicators in batches
-            for b in batch(indicators, batch_size=2000):
-                # remove duplicates due to performance issue -
-                # https://github.com/demisto/etc/issues/25033
-                non_duplicates_dict: Dict[str, Dict] = dict()
-                for indicator in b:
-                    indicator_value = indicator.get("value")
-                    if indicator_value:
-                        # each value is added to the dict only ones
-                        if not non_duplicates_dict.get(str(indicator_value).lower()):
-                            non_duplicates_dict[str(indicator_value.lower())] = indicator
-                unique_indicators_list = list(non_duplicates_dict.values())
-                demisto.createIndicators(unique_indicators_list)
+            # the indicators are created in batches while the feeds are downloaded
+            create_indicators_in_batches(iter_indicators(client, client.indicator_type))
         else:
             readable_output, outputs, raw_response = commands[command](client, demisto.args())  # type:ignore
             return_outputs(readable_output, outputs, raw_response)
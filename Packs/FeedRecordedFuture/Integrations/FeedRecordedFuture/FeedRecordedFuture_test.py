@@ -1,6 +1,11 @@
 import pytest
+import threading
+import tracemalloc
 from collections import OrderedDict
-from FeedRecordedFuture import get_indicator_type, get_indicators_command, Client, fetch_indicators_command
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from FeedRecordedFuture import get_indicator_type, get_indicators_command, Client, fetch_indicators_command, \
+    iter_indicators, create_indicators_in_batches, ValuesHashSet
+from CommonServerPython import *
 
 GET_INDICATOR_TYPE_INPUTS = [
     ('ip', OrderedDict([('Name', '192.168.1.1'), ('Risk', '89'), ('RiskString', '5/12'),
@@ -153,3 +158,145 @@ def test_feed_tags(mocker, tags):
     )
     indicators = fetch_indicators_command(client, 'ip')
     assert tags == indicators[0]['fields']['tags']
+
+
+RISK_LIST_HEADER = 'Name,Risk,RiskString,EvidenceDetails\r\n'
+
+
+def risk_list_row(i):
+    # every 10th row is a duplicate of the previous row in a different case
+    name = f'Domain{i - 1 if i % 10 == 0 else i}.com'
+    if i % 10 == 0:
+        name = name.lower()
+    evidence_details = '{""EvidenceDetails"": [{""Rule"": ""Rule 1"", ""Criticality"": 3}]}'
+    return f'{name},{i % 100},{i % 37}/37,"{evidence_details}"\r\n'
+
+
+class RiskListHandler(BaseHTTPRequestHandler):
+    """
+    Serves a risk list csv with the number of rows in the path, in chunks
+    """
+    def do_GET(self):
+        rows_count = int(self.path.strip('/'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunk = [RISK_LIST_HEADER]
+        for i in range(1, rows_count + 1):
+            chunk.append(risk_list_row(i))
+            if len(chunk) == 1000 or i == rows_count:
+                data = ''.join(chunk).encode()
+                self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                chunk = []
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def risk_list_server():
+    server = HTTPServer(('127.0.0.1', 0), RiskListHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/'
+    server.shutdown()
+
+
+def mock_risk_list_request(mocker, client, url):
+    mocker.patch.object(client, '_build_request',
+                        side_effect=lambda *_: requests.Request('GET', url).prepare())
+
+
+def test_build_iterator_streams_csv(mocker, risk_list_server):
+    """
+    Given:
+     - A local server which serves a risk list of 2500 rows in chunks
+
+    When:
+     - Iterating the indicators of the feed
+
+    Then:
+     - Verify all the rows are parsed, including the quoted evidence details
+    """
+    client = Client(indicator_type='domain', api_token='dummytoken', services=['connectApi'])
+    mock_risk_list_request(mocker, client, risk_list_server + '2500')
+
+    indicators = list(iter_indicators(client, 'domain'))
+
+    assert len(indicators) == 2500
+    assert indicators[0]['value'] == 'Domain1.com'
+    assert indicators[0]['rawJSON']['RiskString'] == '1 of 37 Risk Rules Triggered'
+    assert indicators[0]['fields']['recordedfutureevidencedetails'] == [{'rule': 'Rule 1', 'criticality': 3}]
+    assert indicators[-1]['value'] == 'domain2499.com'
+
+
+def test_create_indicators_in_batches(mocker):
+    """
+    Given:
+     - 5000 indicators, where every 10th indicator is a duplicate in a different case, and an indicator without value
+
+    When:
+     - Creating the indicators in batches of 2000
+
+    Then:
+     - Verify the duplicates are removed across the batches and the batches are bounded
+    """
+    create_indicators = mocker.patch.object(demisto, 'createIndicators')
+    indicators = [{'value': risk_list_row(i).split(',')[0]} for i in range(1, 5001)] + [{'value': ''}]
+
+    created = create_indicators_in_batches(indicators, batch_size=2000)
+
+    batches = [call_args[0][0] for call_args in create_indicators.call_args_list]
+    assert created == 4500
+    assert [len(b) for b in batches] == [2000, 2000, 500]
+    assert len({indicator['value'].lower() for b in batches for indicator in b}) == 4500
+
+
+def test_values_hash_set():
+    """
+    Given:
+     - A values hash set with a small initial capacity
+
+    When:
+     - Adding 10000 values twice
+
+    Then:
+     - Verify every value is added only once and the set grows
+    """
+    values_set = ValuesHashSet(initial_capacity=8)
+    assert all(values_set.add(f'value{i}') for i in range(10000))
+    assert not any(values_set.add(f'value{i}') for i in range(10000))
+    assert len(values_set) == 10000
+
+
+def fetch_peak_memory(mocker, url):
+    client = Client(indicator_type='domain', api_token='dummytoken', services=['connectApi'])
+    mock_risk_list_request(mocker, client, url)
+    # the created indicators aren't kept, as a mock would keep its calls
+    mocker.patch.object(demisto, 'createIndicators', new=lambda indicators: None)
+    tracemalloc.start()
+    try:
+        created = create_indicators_in_batches(iter_indicators(client, 'domain'))
+        return created, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_fetch_memory_is_bounded(mocker, risk_list_server):
+    """
+    Given:
+     - A local server which serves risk lists of 5k and 50k rows
+
+    When:
+     - Fetching the indicators
+
+    Then:
+     - Verify the peak memory doesn't grow with the size of the risk list
+    """
+    small_created, small_peak = fetch_peak_memory(mocker, risk_list_server + '5000')
+    large_created, large_peak = fetch_peak_memory(mocker, risk_list_server + '50000')
+
+    assert (small_created, large_created) == (4500, 45000)
+    assert large_peak < 2 * small_peak
@@ -78,22 +78,25 @@ def fetch_indicators_command(
     )
 
     if client.collection_to_fetch is None:
-        # fetch all collections
+        # fetch all collections, concurrently - each of them from its own last fetch time
         if client.collections is None:
             raise DemistoException(ERR_NO_COLL)
-        indicators: list = []
-        for collection in client.collections:
-            client.collection_to_fetch = collection
-            filter_args["added_after"] = get_added_after(
-                fetch_full_feed, initial_interval, last_run_ctx.get(collection.id)
+        collections_filter_args = {
+            collection.id: {
+                "added_after": get_added_after(
+                    fetch_full_feed, initial_interval, last_run_ctx.get(collection.id)
+                )
+            }
+            for collection in client.collections
+        }
+        indicators: list = list(
+            client.poll_collections(
+                client.collections, limit, collections_filter_args=collections_filter_args, **filter_args
             )
-            fetched_iocs = client.build_iterator(limit, **filter_args)
-            indicators.extend(fetched_iocs)
-            if limit >= 0:
-                limit -= len(fetched_iocs)
-                if limit <= 0:
-                    break
-            last_run_ctx[collection.id] = client.last_fetched_indicator__modified
+        )
+        for collection in client.collections:
+            if client.collections_last_modified.get(collection.id):
+                last_run_ctx[collection.id] = client.collections_last_modified[collection.id]
     else:
         # fetch from a single collection
         indicators = client.build_iterator(limit, **filter_args)
@@ -145,18 +148,10 @@ def get_indicators_command(
     raw = raw == "true"
 
     if client.collection_to_fetch is None:
-        # fetch all collections
+        # fetch all collections, concurrently
         if client.collections is None:
             raise DemistoException(ERR_NO_COLL)
-        indicators: list = []
-        for collection in client.collections:
-            client.collection_to_fetch = collection
-            fetched_iocs = client.build_iterator(limit, **filter_args)
-            indicators.extend(fetched_iocs)
-            if limit >= 0:
-                limit -= len(fetched_iocs)
-                if limit <= 0:
-                    break
+        indicators: list = list(client.poll_collections(client.collections, limit, **filter_args))
 
     else:
         indicators = client.build_iterator(limit=limit, **filter_args)
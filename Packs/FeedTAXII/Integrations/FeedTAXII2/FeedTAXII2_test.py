@@ -99,10 +99,16 @@ class TestFetchIndicators:
         nondefault_id = 2
         mock_client.collections = [MockCollection(default_id, 'default'), MockCollection(nondefault_id, 'not_default')]
 
-        mocker.patch.object(mock_client, 'build_iterator', side_effect=[CORTEX_IOCS_1, CORTEX_IOCS_2])
+        def poll_collections(collections, limit, collections_filter_args=None, **filter_args):
+            mock_client.collections_last_modified = {default_id: 'time 1', nondefault_id: 'time 2'}
+            return iter(CORTEX_IOCS_1 + CORTEX_IOCS_2)
+
+        poll_collections_mock = mocker.patch.object(mock_client, 'poll_collections', side_effect=poll_collections)
         indicators, last_run = fetch_indicators_command(mock_client, '1 day', -1, {})
         assert len(indicators) == 14
-        assert mock_client.collection_to_fetch.id in last_run
+        assert last_run == {default_id: 'time 1', nondefault_id: 'time 2'}
+        assert poll_collections_mock.call_args[0] == (mock_client.collections, -1)
+        assert set(poll_collections_mock.call_args[1]['collections_filter_args']) == {default_id, nondefault_id}
 
     def test_multi_with_context(self, mocker):
         """
@@ -120,17 +126,24 @@ class TestFetchIndicators:
         Then:
         - fetch 7 indicators
         - update last run with latest collection fetch time
+        - poll every collection from its own last run
+        - don't update the last run of a collection which had no new indicators
         """
         mock_client = Taxii2FeedClient(url='', collection_to_fetch=None, proxies=[], verify=False)
         id_1 = 1
         id_2 = 2
         mock_client.collections = [MockCollection(id_1, 'a'), MockCollection(id_2, 'b')]
 
-        last_run = {mock_client.collections[1]: 'test'}
-        mocker.patch.object(mock_client, 'build_iterator', side_effect=[CORTEX_IOCS_1, CORTEX_IOCS_2])
+        def poll_collections(collections, limit, collections_filter_args=None, **filter_args):
+            mock_client.collections_last_modified = {id_1: 'time 1'}
+            return iter((CORTEX_IOCS_1 + CORTEX_IOCS_2)[:limit])
+
+        last_run = {id_2: 'test'}
+        poll_collections_mock = mocker.patch.object(mock_client, 'poll_collections', side_effect=poll_collections)
         indicators, last_run = fetch_indicators_command(mock_client, '1 day', len(CORTEX_IOCS_1), last_run)
         assert len(indicators) == len(CORTEX_IOCS_1)
-        assert last_run.get(mock_client.collections[1]) == 'test'
+        assert last_run == {id_1: 'time 1', id_2: 'test'}
+        assert poll_collections_mock.call_args[1]['collections_filter_args'][id_2] == {'added_after': 'test'}
 
 
 class TestHelperFunctions:
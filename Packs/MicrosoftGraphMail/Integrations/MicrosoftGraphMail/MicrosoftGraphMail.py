@@ -705,20 +705,49 @@ class MsGraphClient:
 
         return mime_content
 
-    def _get_email_attachments(self, message_id):
+    def _list_emails_attachments(self, message_ids):
+        """
+        Lists the attachments of multiple emails using JSON batching.
+
+        :type message_ids: ``list``
+        :param message_ids: The email ids to list attachments
+
+        :return: Mapping of email id to its attachments, emails which failed are omitted
+        :rtype: ``dict``
+        """
+        requests_data = [
+            {'method': 'GET', 'url': f'/users/{self._mailbox_to_fetch}/messages/{message_id}/attachments'}
+            for message_id in message_ids
+        ]
+        responses = self.ms_client.batch_request(requests_data)
+
+        emails_attachments = {}
+        for message_id, response in zip(message_ids, responses):
+            if response.get('status') == 200:
+                emails_attachments[message_id] = (response.get('body') or {}).get('value', [])
+            else:
+                demisto.info(f"MS-Graph-Listener: failed listing attachments of email {message_id} in batch, "
+                             f"status {response.get('status')}")
+        return emails_attachments
+
+    def _get_email_attachments(self, message_id, attachments=None):
         """
         Get email attachments  and upload to War Room.
 
         :type message_id: ``str``
         :param message_id: The email id to get attachments
 
+        :type attachments: ``list``
+        :param attachments: The email attachments if already listed, otherwise they are retrieved
+
         :return: List of uploaded to War Room data, uploaded file path and name
         :rtype: ``list``
         """
 
         attachment_results = []  # type: ignore
-        suffix_endpoint = f'/users/{self._mailbox_to_fetch}/messages/{message_id}/attachments'
-        attachments = self.ms_client.http_request('Get', suffix_endpoint).get('value', [])
+        if attachments is None:
+            suffix_endpoint = f'/users/{self._mailbox_to_fetch}/messages/{message_id}/attachments'
+            attachments = self.ms_client.http_request('Get', suffix_endpoint).get('value', [])
 
         for attachment in attachments:
             attachment_type = attachment.get('@odata.type', '')
@@ -768,20 +797,24 @@ class MsGraphClient:
 
         return labels
 
-    def _parse_email_as_incident(self, email):
+    def _parse_email_as_incident(self, email, attachments=None):
         """
         Parses fetched emails as incidents.
 
         :type email: ``dict``
         :param email: Fetched email to parse
 
+        :type attachments: ``list``
+        :param attachments: The email attachments if already listed, otherwise they are retrieved
+
         :return: Parsed email
         :rtype: ``dict``
         """
         parsed_email = MsGraphClient._parse_item_as_dict(email)
 
         if email.get('hasAttachments', False):  # handling attachments of fetched email
-            parsed_email['Attachments'] = self._get_email_attachments(message_id=email.get('id', ''))
+            parsed_email['Attachments'] = self._get_email_attachments(message_id=email.get('id', ''),
+                                                                      attachments=attachments)
 
         incident = {
             'name': parsed_email['Subject'],
@@ -848,7 +881,11 @@ class MsGraphClient:
 
         fetched_emails, fetched_emails_ids = self._fetch_last_emails(folder_id=folder_id, last_fetch=last_fetch,
                                                                      exclude_ids=exclude_ids)
-        incidents = list(map(self._parse_email_as_incident, fetched_emails))
+        # list the attachments of all the fetched emails in batches instead of a request per email
+        emails_attachments = self._list_emails_attachments(
+            [email.get('id', '') for email in fetched_emails if email.get('hasAttachments', False)])
+        incidents = [self._parse_email_as_incident(email, emails_attachments.get(email.get('id', '')))
+                     for email in fetched_emails]
         next_run_time = MsGraphClient._get_next_run_time(fetched_emails, start_time)
         next_run = {
             'LAST_RUN_TIME': next_run_time,
@@ -204,6 +204,45 @@ def test_fetch_incidents_detect_initial(mocker, client, emails_data):
     mocker_folder_by_path.assert_called_once_with('dummy@mailbox.com', "Phishing")
 
 
+@pytest.mark.parametrize('client', [oproxy_client(), self_deployed_client()])
+def test_fetch_incidents_batch_attachments(mocker, requests_mock, client, last_run_data):
+    """
+    Given
+    - 45 fetched emails with attachments
+    When
+    - fetching incidents against a stub Graph API
+    Then
+    - the attachments of all the emails are listed in 3 batch calls instead of 45 calls
+    - every incident gets the attachment of its own email
+    """
+    mocker.patch('MicrosoftGraphMail.get_now_utc', return_value='2019-11-12T15:01:00Z')
+    mocker.patch.object(client.ms_client, 'get_access_token', return_value='token')
+    mocker.patch.object(demisto, 'info')
+    upload_mock = mocker.patch('MicrosoftGraphMail.upload_file')
+    emails = [{'id': f'id_{i}', 'subject': f'subject_{i}', 'hasAttachments': True,
+               'lastModifiedDateTime': '2019-11-12T15:00:30Z'} for i in range(45)]
+    requests_mock.get(f'{client.ms_client._base_url}/users/dummy@mailbox.com/mailFolders/last_run_dummy_folder_id/'
+                      f'messages', json={'value': emails})
+
+    def batch_callback(request, context):
+        return {'responses': [
+            {'id': sub_request['id'], 'status': 200, 'body': {'value': [{
+                '@odata.type': MsGraphClient.FILE_ATTACHMENT,
+                'name': sub_request['url'].split('/')[-2],
+                'contentBytes': 'YQ=='
+            }]}} for sub_request in request.json()['requests']
+        ]}
+
+    batch_mock = requests_mock.post(f'{client.ms_client._base_url}/$batch', json=batch_callback)
+
+    _, incidents = client.fetch_incidents(last_run_data)
+
+    assert len(incidents) == 45
+    assert batch_mock.call_count == 3
+    assert requests_mock.call_count == 4
+    assert [call[0][0] for call in upload_mock.call_args_list] == [f'id_{i}' for i in range(45)]
+
+
 def test_add_second_to_str_date():
     assert add_second_to_str_date("2019-11-12T15:00:00Z") == "2019-11-12T15:00:01Z"
     assert add_second_to_str_date("2019-11-12T15:00:00Z", 10) == "2019-11-12T15:00:10Z"
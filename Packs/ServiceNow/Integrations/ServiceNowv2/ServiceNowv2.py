@@ -1,3 +1,4 @@
+import concurrent.futures
 import os
 import shutil
 import dateparser
@@ -97,6 +98,14 @@ MIRROR_DIRECTION = {
     'Incoming And Outgoing': 'Both'
 }
 
+# max number of tickets to query in a single request when fetching incidents
+FETCH_PAGE_SIZE = 1000
+# max number of ids to query records by in a single request, to keep the query url short
+QUERY_BY_IDS_BATCH_SIZE = 100
+QUERY_BY_IDS_PAGE_SIZE = 1000
+# max concurrent attachment downloads
+MAX_DOWNLOAD_WORKERS = 8
+
 
 def arg_to_timestamp(arg: Any, arg_name: str, required: bool = False) -> int:
     """
@@ -600,22 +609,90 @@ class Client(BaseClient):
         Returns:
             Array of attachments entries.
         """
-        entries = []
-        links = []  # type: List[Tuple[str, str]]
         attachments_res = self.get_ticket_attachments(ticket_id, sys_created_on)
-        if 'result' in attachments_res and len(attachments_res['result']) > 0:
-            attachments = attachments_res['result']
-            links = [(attachment.get('download_link', ''), attachment.get('file_name', ''))
-                     for attachment in attachments]
+        attachments = attachments_res.get('result', []) if isinstance(attachments_res, dict) else []
+        return self.download_attachments(attachments)
+
+    def query_by_ids(self, path: str, id_field: str, ids: List[str], sys_param_query: str = '',
+                     order_by: str = 'sys_id') -> list:
+        """Query the records whose id field is one of the given ids, with a single request per batch of ids and page
+        of records.
 
-        for link in links:
-            file_res = requests.get(link[0], auth=(self._username, self._password), verify=self._verify,
-                                    proxies=self._proxies)
-            if file_res is not None:
-                entries.append(fileResult(link[1], file_res.content))
+        Args:
+            path: API path - of a table or of the attachment API
+            id_field: the field to match the ids with
+            ids: the ids to query the records of
+            sys_param_query: additional query of the records
+            order_by: the field to order the records by, so the pages are stable
 
+        Returns:
+            The records of all the ids.
+        """
+        records = []
+        for i in range(0, len(ids), QUERY_BY_IDS_BATCH_SIZE):
+            query = f'{id_field}IN{",".join(ids[i:i + QUERY_BY_IDS_BATCH_SIZE])}^ORDERBY{order_by}'
+            if sys_param_query:
+                query += f'^{sys_param_query}'
+            offset = 0
+            while True:
+                res = self.send_request(path, 'GET', params={
+                    'sysparm_query': query, 'sysparm_limit': QUERY_BY_IDS_PAGE_SIZE, 'sysparm_offset': offset})
+                page = res.get('result', []) if isinstance(res, dict) else []
+                records.extend(page)
+                if len(page) < QUERY_BY_IDS_PAGE_SIZE:
+                    break
+                offset += len(page)
+        return records
+
+    def get_tickets_attachment_entries(self, ticket_ids: List[str], sys_created_on: Optional[str] = None) \
+            -> Dict[str, list]:
+        """Get the attachments entries of many tickets. The attachments metadata is queried for all the tickets at
+        once, and the files are downloaded concurrently.
+
+        Args:
+            ticket_ids: tickets sys ids
+            sys_created_on: string, get only the attachments which were created after this time
+
+        Returns:
+            The attachments entries of every ticket.
+        """
+        attachments = self.query_by_ids('attachment', 'table_sys_id', ticket_ids,
+                                        f'sys_created_on>{sys_created_on}' if sys_created_on else '',
+                                        order_by='sys_created_on')
+        entries: Dict[str, list] = {ticket_id: [] for ticket_id in ticket_ids}
+        for attachment, entry in zip(attachments, self.download_attachments(attachments)):
+            entries.setdefault(attachment.get('table_sys_id', ''), []).append(entry)
         return entries
 
+    def download_attachments(self, attachments: list) -> list:
+        """Download attachments files, concurrently if there are several of them.
+
+        Args:
+            attachments: attachments metadata, as returned from the attachment API
+
+        Returns:
+            Array of the attachments file entries, in the order of the attachments.
+        """
+        # a single session, so the connections are reused by the downloads
+        session = requests.Session()
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_DOWNLOAD_WORKERS))
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=MAX_DOWNLOAD_WORKERS))
+
+        def download(attachment: dict) -> requests.Response:
+            return session.get(attachment.get('download_link', ''), auth=(self._username, self._password),
+                               verify=self._verify, proxies=self._proxies)
+
+        with session:
+            if len(attachments) > 1:
+                with concurrent.futures.ThreadPoolExecutor(
+                        max_workers=min(MAX_DOWNLOAD_WORKERS, len(attachments))) as executor:
+                    files_res = list(executor.map(download, attachments))
+            else:
+                files_res = [download(attachment) for attachment in attachments]
+
+        return [fileResult(attachment.get('file_name', ''), file_res.content)
+                for attachment, file_res in zip(attachments, files_res)]
+
     def get(self, table_name: str, record_id: str, custom_fields: dict = {}, number: str = None) -> dict:
         """Get a ticket by sending a GET request.
 
@@ -1776,94 +1853,105 @@ def document_route_to_table(client: Client, args: dict) -> Tuple[Any, Dict[Any,
 
 
 def fetch_incidents(client: Client) -> list:
-    query_params = {}
-    incidents = []
+    """Fetches the tickets which were created (or updated, by the timestamp field) since the last fetch.
 
+    The tickets are queried in pages until the fetch limit is reached, and the attachments of all of them are
+    retrieved at once. The last run is set only once all the incidents are created, to the time of the last fetched
+    ticket and the ids of the tickets fetched at that time - which are skipped by the next fetch, as it queries
+    from that time inclusive.
+    """
     last_run = demisto.getLastRun()
     if 'time' not in last_run:
         snow_time, _ = parse_date_range(client.fetch_time, '%Y-%m-%d %H:%M:%S')
     else:
         snow_time = last_run['time']
+    # a last run of a former version has no fetched ids, and its time is exclusive
+    fetched_ids = set(last_run.get('last_fetched_ids', []))
+    time_operator = '>=' if 'last_fetched_ids' in last_run else '>'
 
     query = ''
     if client.sys_param_query:
         query += f'{client.sys_param_query}^'
-    query += f'ORDERBY{client.timestamp_field}^{client.timestamp_field}>{snow_time}'
-
-    if query:
-        query_params['sysparm_query'] = query
-    query_params['sysparm_limit'] = str(client.sys_param_limit)
+    query += f'ORDERBY{client.timestamp_field}^ORDERBYsys_id^{client.timestamp_field}{time_operator}{snow_time}'
 
-    demisto.info(f'Fetching ServiceNow incidents. with the query params: {str(query_params)}')
-    res = client.send_request(f'table/{client.ticket_type}', 'GET', params=query_params)
-
-    count = 0
     parsed_snow_time = datetime.strptime(snow_time, '%Y-%m-%d %H:%M:%S')
+    # the tickets which were already fetched are queried again, and skipped
+    page_size = min(client.sys_param_limit, FETCH_PAGE_SIZE) + len(fetched_ids)
+    offset = 0
+    tickets: List[dict] = []
+    while len(tickets) < client.sys_param_limit:
+        query_params = {'sysparm_query': query, 'sysparm_limit': str(page_size), 'sysparm_offset': str(offset)}
+        demisto.info(f'Fetching ServiceNow incidents. with the query params: {str(query_params)}')
+        page = client.send_request(f'table/{client.ticket_type}', 'GET', params=query_params).get('result', [])
+
+        for ticket in page:
+            if client.timestamp_field not in ticket:
+                raise ValueError(f"The timestamp field [{client.timestamp_field}] does not exist in the ticket")
+
+            if ticket[client.timestamp_field] == snow_time and ticket.get('sys_id') in fetched_ids:
+                continue
 
-    severity_map = {'1': 3, '2': 2, '3': 1}  # Map SNOW severity to Demisto severity for incident creation
+            try:
+                if datetime.strptime(ticket[client.timestamp_field], '%Y-%m-%d %H:%M:%S') < parsed_snow_time:
+                    continue
+            except Exception:
+                pass
+
+            tickets.append(ticket)
+            if len(tickets) == client.sys_param_limit:
+                break
 
-    for result in res.get('result', []):
-        labels = []
+        if len(page) < page_size:
+            break
+        offset += len(page)
 
-        result['mirror_direction'] = MIRROR_DIRECTION.get(demisto.params().get('mirror_direction'))
-        result['mirror_tags'] = [
-            demisto.params().get('comment_tag'),
-            demisto.params().get('file_tag'),
-            demisto.params().get('work_notes_tag')
-        ]
-        result['mirror_instance'] = demisto.integrationInstance()
+    file_entries: Dict[str, list] = {}
+    if client.get_attachments and tickets:
+        file_entries = client.get_tickets_attachment_entries([ticket.get('sys_id', '') for ticket in tickets])
 
-        if client.timestamp_field not in result:
-            raise ValueError(f"The timestamp field [{client.timestamp_field}] does not exist in the ticket")
+    params = demisto.params()
+    mirror_direction = MIRROR_DIRECTION.get(params.get('mirror_direction'))
+    mirror_tags = [params.get('comment_tag'), params.get('file_tag'), params.get('work_notes_tag')]
+    mirror_instance = demisto.integrationInstance()
 
-        if count > client.sys_param_limit:
-            break
+    severity_map = {'1': 3, '2': 2, '3': 1}  # Map SNOW severity to Demisto severity for incident creation
 
-        try:
-            if datetime.strptime(result[client.timestamp_field], '%Y-%m-%d %H:%M:%S') < parsed_snow_time:
-                continue
-        except Exception:
-            pass
-
-        for k, v in result.items():
-            if isinstance(v, str):
-                labels.append({
-                    'type': k,
-                    'value': v
-                })
-            else:
-                labels.append({
-                    'type': k,
-                    'value': json.dumps(v)
-                })
+    incidents = []
+    for ticket in tickets:
+        ticket['mirror_direction'] = mirror_direction
+        ticket['mirror_tags'] = mirror_tags
+        ticket['mirror_instance'] = mirror_instance
 
-        severity = severity_map.get(result.get('severity', ''), 0)
+        labels = [{'type': k, 'value': v if isinstance(v, str) else json.dumps(v)} for k, v in ticket.items()]
 
         file_names = []
-        if client.get_attachments:
-            file_entries = client.get_ticket_attachment_entries(result.get('sys_id', ''))
-            if isinstance(file_entries, list):
-                for file_result in file_entries:
-                    if file_result['Type'] == entryTypes['error']:
-                        raise Exception(f"Error getting attachment: {str(file_result.get('Contents', ''))}")
-                    file_names.append({
-                        'path': file_result.get('FileID', ''),
-                        'name': file_result.get('File', '')
-                    })
+        for file_result in file_entries.get(ticket.get('sys_id', ''), []):
+            if file_result['Type'] == entryTypes['error']:
+                raise Exception(f"Error getting attachment: {str(file_result.get('Contents', ''))}")
+            file_names.append({
+                'path': file_result.get('FileID', ''),
+                'name': file_result.get('File', '')
+            })
 
+        raw_json = json.dumps(ticket)
         incidents.append({
-            'name': f"ServiceNow Incident {result.get(client.incident_name)}",
+            'name': f"ServiceNow Incident {ticket.get(client.incident_name)}",
             'labels': labels,
-            'details': json.dumps(result),
-            'severity': severity,
+            'details': raw_json,
+            'severity': severity_map.get(ticket.get('severity', ''), 0),
             'attachment': file_names,
-            'rawJSON': json.dumps(result)
+            'rawJSON': raw_json
         })
 
-        count += 1
-        snow_time = result.get(client.timestamp_field)
+        if ticket[client.timestamp_field] != snow_time:
+            snow_time = ticket[client.timestamp_field]
+            fetched_ids = set()
+        fetched_ids.add(ticket.get('sys_id'))
 
-    demisto.setLastRun({'time': snow_time})
+    next_run = {'time': snow_time}
+    if tickets or 'last_fetched_ids' in last_run:
+        next_run['last_fetched_ids'] = sorted(fetched_ids)
+    demisto.setLastRun(next_run)
     return incidents
 
 
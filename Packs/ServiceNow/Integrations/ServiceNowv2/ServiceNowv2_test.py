@@ -1,3 +1,13 @@
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
 import pytest
 from ServiceNowv2 import get_server_url, get_ticket_context, get_ticket_human_readable, \
     generate_body, split_fields, Client, update_ticket_command, create_ticket_command, delete_ticket_command, \
@@ -5,7 +15,7 @@ from ServiceNowv2 import get_server_url, get_ticket_context, get_ticket_human_re
     get_record_command, update_record_command, create_record_command, delete_record_command, query_table_command, \
     list_table_fields_command, query_computers_command, get_table_name_command, add_tag_command, query_items_command, \
     get_item_details_command, create_order_item_command, document_route_to_table, fetch_incidents, main, \
-    get_mapping_fields_command, get_remote_data_command, update_remote_system_command
+    get_mapping_fields_command, get_remote_data_command, update_remote_system_command, QUERY_BY_IDS_BATCH_SIZE
 from ServiceNowv2 import test_module as module
 from test_data.response_constants import RESPONSE_TICKET, RESPONSE_MULTIPLE_TICKET, RESPONSE_UPDATE_TICKET, \
     RESPONSE_UPDATE_TICKET_SC_REQ, RESPONSE_CREATE_TICKET, RESPONSE_QUERY_TICKETS, RESPONSE_ADD_LINK, \
@@ -201,7 +211,7 @@ def test_fetch_incidents_with_attachments(mocker):
     When
     - mock the parse_date_range.
     - mock the Client's send_request.
-    - mock the Client's get_ticket_attachment_entries.
+    - mock the Client's get_tickets_attachment_entries.
     Then
     - run the fetch incidents command using the Client
     Validate The length of the results and the attachment content.
@@ -211,7 +221,9 @@ def test_fetch_incidents_with_attachments(mocker):
                     'sysparm_query', sysparm_limit=10, timestamp_field='opened_at',
                     ticket_type='incident', get_attachments=True, incident_name='number')
     mocker.patch.object(client, 'send_request', return_value=RESPONSE_FETCH_ATTACHMENTS_TICKET)
-    mocker.patch.object(client, 'get_ticket_attachment_entries', return_value=RESPONSE_FETCH_ATTACHMENTS_FILE)
+    mocker.patch.object(client, 'get_tickets_attachment_entries',
+                        return_value={RESPONSE_FETCH_ATTACHMENTS_TICKET['result'][0]['sys_id']:
+                                      RESPONSE_FETCH_ATTACHMENTS_FILE})
 
     incidents = fetch_incidents(client)
 
@@ -242,6 +254,221 @@ def test_fetch_incidents_with_incident_name(mocker):
     assert incidents[0].get('name') == 'ServiceNow Incident Unable to access Oregon mail server. Is it down?'
 
 
+class FakeServiceNowHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        service_now: FakeServiceNow = self.server  # type: ignore
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path[len('/api/now/'):]
+        table = re.match(r'table/(\w+)$', path)
+        record = re.match(r'table/(\w+)/(\w+)$', path)
+        download = re.match(r'attachment/(\w+)/file$', path)
+        service_now.requests.append((path, params))
+        if table:
+            body = json.dumps({'result': service_now.query(service_now.tables.get(table.group(1), []), params)})
+        elif record:
+            records = [record_ for record_ in service_now.tables.get(record.group(1), [])
+                       if record_['sys_id'] == record.group(2)]
+            body = json.dumps({'result': records[0]} if records else {'error': {'message': 'No Record found'}})
+        elif path == 'attachment':
+            body = json.dumps({'result': service_now.query(service_now.attachments, params)})
+        elif download:
+            time.sleep(service_now.download_latency)
+            body = download.group(1)
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeServiceNow(ThreadingHTTPServer):
+    """A local fake ServiceNow instance, which serves records from the Table API and attachments from the Attachment
+    API, with the query semantics the integration relies on - ORDERBY, >, >=, =, IN, ^OR, sysparm_limit and
+    sysparm_offset.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, tables, attachments, download_latency=0.0):
+        super().__init__(('127.0.0.1', 0), FakeServiceNowHandler)
+        self.url = f'http://127.0.0.1:{self.server_port}/api/now/'
+        self.tables = tables
+        self.attachments = attachments
+        self.download_latency = download_latency
+        self.requests: list = []
+        for attachment in attachments:
+            attachment['download_link'] = f'{self.url}attachment/{attachment["sys_id"]}/file'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def count_requests(self, path):
+        return sum(1 for path_, _ in self.requests if path_ == path)
+
+    @staticmethod
+    def query(records, params):
+        def parse_condition(term):
+            field, operator, value = re.match(r'(\w+?)(>=|>|=|IN)(.*)', term).groups()  # type: ignore
+            return field, operator, set(value.split(',')) if operator == 'IN' else value
+
+        def condition_matches(record, field, operator, value):
+            return record[field] >= value if operator == '>=' else record[field] > value if operator == '>' \
+                else record[field] == value if operator == '=' else record[field] in value
+
+        order_by = []
+        conditions: list = []
+        for term in params.get('sysparm_query', '').split('^'):
+            if term.startswith('ORDERBY'):
+                order_by.append(term[len('ORDERBY'):])
+            elif term.startswith('OR'):
+                conditions[-1].append(parse_condition(term[len('OR'):]))
+            else:
+                conditions.append([parse_condition(term)])
+
+        records = sorted((record for record in records if all(
+            any(condition_matches(record, *condition) for condition in or_conditions) for or_conditions in conditions
+        )), key=lambda record: [record[field] for field in order_by])
+        offset = int(params.get('sysparm_offset', 0))
+        return records[offset:offset + int(params.get('sysparm_limit', 10000))]
+
+
+def create_backlog(tickets_count, attachments_every=5):
+    """Creates a backlog of tickets, three of them opened in every second, and two attachments to some of them.
+    The tickets are returned in the order they are fetched - by their opening time and sys id.
+    """
+    start_time = datetime(2020, 1, 1)
+    tickets = []
+    attachments = []
+    for i in range(tickets_count):
+        sys_id = hashlib.md5(str(i).encode()).hexdigest()  # nosec
+        tickets.append({
+            'sys_id': sys_id,
+            'number': f'INC{i:07d}',
+            'opened_at': (start_time + timedelta(seconds=i // 3)).strftime('%Y-%m-%d %H:%M:%S'),
+            'severity': '2',
+            'assigned_to': {'link': 'http://server_url/api/now/table/sys_user/1', 'value': '1'},
+        })
+        if i % attachments_every == 0:
+            for j in range(2):
+                attachment_id = hashlib.md5(f'{i}_{j}'.encode()).hexdigest()  # nosec
+                attachments.append({
+                    'sys_id': attachment_id,
+                    'table_sys_id': sys_id,
+                    'file_name': f'file_{i}_{j}',
+                    'sys_created_on': tickets[-1]['opened_at'],
+                })
+    return sorted(tickets, key=lambda ticket: (ticket['opened_at'], ticket['sys_id'])), attachments
+
+
+def fetch_backlog(mocker, service_now, fetch_limit, last_run=None):
+    """Runs fetch incidents from the fake ServiceNow until no new incidents are fetched, and returns the incidents"""
+    mocker.patch('ServiceNowv2.parse_date_range', return_value=('2019-12-31 00:00:00', 'never mind'))
+    mocker.patch.object(demisto, 'getLastRun', side_effect=lambda: last_run)
+    mocker.patch.object(demisto, 'setLastRun', side_effect=lambda next_run: last_run.update(next_run))
+    mocker.patch('ServiceNowv2.fileResult', side_effect=lambda file_name, data: {
+        'Type': 3, 'File': file_name, 'FileID': data.decode()})
+    last_run = {} if last_run is None else last_run
+    client = Client(service_now.url, 'sc_server_url', 'username', 'password', False, 'fetch_time', None,
+                    sysparm_limit=fetch_limit, timestamp_field='opened_at', ticket_type='incident',
+                    get_attachments=True, incident_name='number')
+    all_incidents = []
+    while True:
+        incidents = fetch_incidents(client)
+        if not incidents:
+            return all_incidents
+        all_incidents.extend(incidents)
+
+
+@pytest.mark.parametrize('fetch_limit, page_size', [(1000, 1000), (1000, 400), (7, 1000)])
+def test_fetch_incidents_pages(mocker, fetch_limit, page_size):
+    """
+    Given
+    - A backlog of tickets, several of them opened in the same second, and some of them with attachments
+
+    When
+    - Fetching incidents until there are no new ones, with a fetch limit which splits tickets opened in the same second
+
+    Then
+    - Ensure every ticket is fetched once, in the order of its opening time, with its attachments
+    - Ensure the attachments of every fetch are queried at once
+    """
+    mocker.patch('ServiceNowv2.FETCH_PAGE_SIZE', page_size)
+    tickets, attachments = create_backlog(100 if fetch_limit < 10 else 2500)
+    with FakeServiceNow({'incident': tickets}, attachments) as service_now:
+        incidents = fetch_backlog(mocker, service_now, fetch_limit)
+
+    assert [incident['name'] for incident in incidents] == \
+        [f'ServiceNow Incident {ticket["number"]}' for ticket in tickets]
+    incidents_attachments = [[attachment['path'] for attachment in incident['attachment']] for incident in incidents]
+    assert incidents_attachments == [
+        [attachment['sys_id'] for attachment in attachments if attachment['table_sys_id'] == ticket['sys_id']]
+        for ticket in tickets
+    ]
+    fetches_count = sum(1 for path, params in service_now.requests
+                        if path == 'table/incident' and params['sysparm_offset'] == '0')
+    assert service_now.count_requests('attachment') <= fetches_count * math.ceil(fetch_limit / QUERY_BY_IDS_BATCH_SIZE)
+
+
+def test_fetch_incidents_former_last_run(mocker):
+    """
+    Given
+    - A last run of a former version, without the ids of the last fetched tickets
+
+    When
+    - Fetching incidents
+
+    Then
+    - Ensure the tickets opened in the time of the last run are not fetched again
+    """
+    tickets, attachments = create_backlog(9)
+    with FakeServiceNow({'incident': tickets}, attachments) as service_now:
+        incidents = fetch_backlog(mocker, service_now, 10, last_run={'time': tickets[2]['opened_at']})
+
+    assert [incident['name'] for incident in incidents] == \
+        [f'ServiceNow Incident {ticket["number"]}' for ticket in tickets[3:]]
+
+
+@pytest.mark.benchmark
+def test_fetch_incidents_backlog_benchmark(mocker):
+    """
+    Given
+    - A backlog of 10,000 tickets, with 800 attachments which take 20 milliseconds each to download
+
+    When
+    - Fetching incidents until there are no new ones, 1,000 at a time
+
+    Then
+    - Ensure all the tickets are fetched, with 10 attachments queries and concurrent downloads
+    """
+    tickets, attachments = create_backlog(10000, attachments_every=25)
+    with FakeServiceNow({'incident': tickets}, attachments, download_latency=0.02) as service_now:
+        start = time.time()
+        incidents = fetch_backlog(mocker, service_now, 1000)
+        duration = time.time() - start
+
+    assert len(incidents) == 10000
+    assert sum(len(incident['attachment']) for incident in incidents) == 800
+    assert service_now.count_requests('table/incident') == 11
+    assert service_now.count_requests('attachment') == 100
+    # downloading the attachments one after the other takes 16 seconds alone
+    assert duration < 12
+
+
 def test_incident_name_is_initialized(mocker, requests_mock):
     """
     Given:
@@ -586,6 +813,88 @@ def test_get_remote_data_no_entries(mocker):
     assert 'test_mirrored_from_xsoar.txt' not in res
 
 
+def create_mirrored_tickets(tickets_count):
+    """Creates tickets to mirror since 2020-03-01 - every other ticket was updated since then, and every ticket has
+    comments, work notes and attachments from before and after that time, some of them mirrored from XSOAR.
+    Returns the tables of the tickets, and their attachments.
+    """
+    before, after = '2020-01-01 10:00:00', '2020-06-01 10:00:00'
+    tables: dict = {'incident': [], 'sys_journal_field': [], 'sys_user': [], 'sys_user_group': []}
+    attachments = []
+    for i in range(tickets_count):
+        sys_id = hashlib.md5(str(i).encode()).hexdigest()  # nosec
+        tables['sys_user'].append({'sys_id': f'{sys_id}u', 'email': f'user{i}@example.com'})
+        tables['sys_user_group'].append({'sys_id': f'{sys_id}g', 'name': f'group {i % 10}'})
+        tables['incident'].append({
+            'sys_id': sys_id,
+            'number': f'INC{i:07d}',
+            'sys_updated_on': after if i % 2 else before,
+            'assigned_to': {'link': f'http://server_url/api/now/table/sys_user/{sys_id}u', 'value': f'{sys_id}u'},
+            'caller_id': '',
+            'assignment_group': {'link': f'http://server_url/api/now/table/sys_user_group/{sys_id}g',
+                                 'value': f'{sys_id}g'},
+            'closed_at': after if i % 3 == 0 else '',
+            'close_notes': f'closed {i}',
+        })
+        for j, (element, created_on, value) in enumerate([
+            ('comments', before, f'old comment {i}'),
+            ('comments', after, f'comment {i}'),
+            ('work_notes', after, f'work note {i}'),
+            ('work_notes', after, f'work note {i}\n\n Mirrored from Cortex XSOAR'),
+            ('approval_history', after, f'approval {i}'),
+        ]):
+            tables['sys_journal_field'].append({'sys_id': f'{sys_id}j{j}', 'element_id': sys_id, 'element': element,
+                                                'sys_created_on': created_on, 'value': value, 'name': 'incident'})
+        if i % 4 == 0:
+            for j, (created_on, file_name) in enumerate([(before, f'old_{i}.txt'), (after, f'file_{i}.txt'),
+                                                         (after, f'file_{i}_mirrored_from_xsoar.txt')]):
+                attachments.append({'sys_id': f'{sys_id}a{j}', 'table_sys_id': sys_id, 'file_name': file_name,
+                                    'sys_created_on': created_on})
+    return tables, attachments
+
+
+def test_get_remote_data_fake_instance(mocker):
+    """
+    Given:
+        -  Tickets to mirror on a ServiceNow instance, and an id of a ticket which does not exist
+    When:
+        - running get_remote_data_command for every ticket.
+    Then:
+        - Only the updated tickets are returned, with the users and groups they refer to.
+        - Only the new comments, work notes and attachments are returned, without the ones mirrored from XSOAR.
+        - The ticket which does not exist is not found.
+    """
+    mocker.patch('ServiceNowv2.fileResult', side_effect=lambda file_name, data: {
+        'Type': 3, 'File': file_name, 'FileID': data.decode()})
+    tables, attachments = create_mirrored_tickets(12)
+    last_update = int(datetime(2020, 3, 1).timestamp())
+    params = {'close_incident': True}
+
+    with FakeServiceNow(tables, attachments) as service_now:
+        client = Client(service_now.url, 'sc_server_url', 'username', 'password', False, 'fetch_time', None,
+                        sysparm_limit=10, timestamp_field='opened_at', ticket_type='incident',
+                        get_attachments=False, incident_name='number')
+        assert get_remote_data_command(client, {'id': 'not_found', 'lastUpdate': str(last_update)}, params) == \
+            'Ticket was not found.'
+        results = [get_remote_data_command(client, {'id': ticket['sys_id'], 'lastUpdate': str(last_update)}, params)
+                   for ticket in tables['incident']]
+
+    for i, (ticket, result) in enumerate(zip(tables['incident'], results)):
+        mirrored_ticket, *entries = result
+        if i % 2:
+            assert mirrored_ticket['number'] == ticket['number']
+            assert mirrored_ticket['assigned_to'] == f'user{i}@example.com'
+            assert mirrored_ticket['assignment_group'] == f'group {i % 10}'
+            assert mirrored_ticket['caller_id'] == ''
+        else:
+            assert mirrored_ticket == {}
+        expected_entries = [f'file_{i}.txt'] if i % 4 == 0 else []
+        expected_entries += [f'comment {i}', f'work note {i}']
+        if i % 2 and i % 3 == 0:
+            expected_entries.append({'dbotIncidentClose': True, 'closeReason': f'From ServiceNow: closed {i}'})
+        assert [entry.get('File') or entry['Contents'] for entry in entries] == expected_entries
+
+
 def upload_file_request(*args):
     assert 'test_mirrored_from_xsoar.txt' == args[2]
     return {'id': "sys_id", 'file_id': "entry_id", 'file_name': 'test.txt'}
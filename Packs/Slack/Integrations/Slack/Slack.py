@@ -55,6 +55,7 @@ OBJECTS_TO_KEYS = {
     'users': 'id'
 }
 SYNC_CONTEXT = True
+STATE_CACHE_MIN_REFRESH_SECONDS = 1
 
 ''' GLOBALS '''
 
@@ -76,10 +77,219 @@ BOT_NAME: str
 BOT_ICON_URL: str
 MAX_LIMIT_TIME: int
 PAGINATED_COUNT: int
+STATE_CACHE: 'SlackStateCache'
 
 ''' HELPER FUNCTIONS '''
 
 
+class SlackStateIndexes:
+    """
+    Indexes of the users, conversations, mirrors and questions stored in the integration context.
+
+    The indexes are changed in place, and are read and changed only under the lock of the cache.
+    """
+
+    INDEXES = {
+        'users': ('users_by_id', 'users_by_name', 'users_by_email', 'users_by_real_name'),
+        'conversations': ('conversations_by_id',),
+        'mirrors': ('mirrors_by_investigation', 'mirrors_by_channel'),
+        'questions': ('questions_by_thread',),
+    }
+
+    def __init__(self):
+        self.users_by_id: Dict[str, dict] = {}
+        self.users_by_name: Dict[str, dict] = {}
+        self.users_by_email: Dict[str, dict] = {}
+        self.users_by_real_name: Dict[str, dict] = {}
+        self.conversations_by_id: Dict[str, dict] = {}
+        self.mirrors_by_investigation: Dict[str, dict] = {}
+        self.mirrors_by_channel: Dict[str, Dict[str, dict]] = {}
+        self.questions_by_thread: Dict[str, dict] = {}
+
+    def replace(self, keys: Tuple[str, ...], other: 'SlackStateIndexes'):
+        """
+        Replaces the indexes of the keys with the indexes of the other object.
+        """
+        for key in keys:
+            for name in self.INDEXES[key]:
+                setattr(self, name, getattr(other, name))
+
+    def index(self, key: str, obj: dict):
+        if key == 'users':
+            self._index_user(obj)
+        elif key == 'conversations':
+            self.conversations_by_id.setdefault(obj.get('id', ''), obj)
+        elif key == 'mirrors':
+            self._index_mirror(obj)
+        elif key == 'questions':
+            self._index_question(obj)
+
+    def _index_user(self, user: dict):
+        self.users_by_id[user.get('id', '')] = user
+        name = user.get('name', '').lower()
+        if name:
+            self.users_by_name.setdefault(name, user)
+        email = user.get('profile', {}).get('email', '').lower()
+        if email:
+            self.users_by_email.setdefault(email, user)
+        real_name = user.get('real_name', '').lower()
+        if real_name:
+            self.users_by_real_name.setdefault(real_name, user)
+
+    def _index_mirror(self, mirror: dict):
+        investigation_id = mirror.get('investigation_id', '')
+        previous = self.mirrors_by_investigation.get(investigation_id)
+        if previous:
+            self.mirrors_by_channel.get(previous.get('channel_id'), {}).pop(investigation_id, None)
+        if mirror.get('remove'):
+            self.mirrors_by_investigation.pop(investigation_id, None)
+            return
+        self.mirrors_by_investigation[investigation_id] = mirror
+        self.mirrors_by_channel.setdefault(mirror.get('channel_id', ''), {})[investigation_id] = mirror
+
+    def _index_question(self, question: dict):
+        thread = question.get('thread')
+        if not thread:
+            return
+        if question.get('remove'):
+            if self.questions_by_thread.get(thread, {}).get('entitlement') == question.get('entitlement'):
+                self.questions_by_thread.pop(thread)
+        else:
+            self.questions_by_thread.setdefault(thread, question)
+
+
+class SlackStateCache:
+    """
+    In-memory index of the users, conversations, mirrors and questions stored in the integration context.
+
+    Once started by the long running execution, lookups are served from memory in constant time. The cache is
+    refreshed from the integration context and its changes are written back in batches by the long running loop,
+    outside of the event loop. Before it is started, every lookup reads the list it needs from the integration context
+    and every change is written immediately.
+    """
+
+    def __init__(self):
+        self.started = False
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._pending: Dict[str, Dict[str, dict]] = {}
+        self._indexes = SlackStateIndexes()
+
+    def start(self):
+        """
+        Loads the integration context and starts serving lookups from memory.
+        """
+        self.refresh()
+        self.started = True
+
+    def refresh(self, keys: Tuple[str, ...] = tuple(SlackStateIndexes.INDEXES)):
+        """
+        Rebuilds the indexes of the keys from the integration context, keeping the changes which were not written yet.
+        """
+        integration_context = get_integration_context(SYNC_CONTEXT)
+        loaded = SlackStateIndexes()
+        for key in keys:
+            for obj in json.loads(integration_context.get(key) or '[]'):
+                loaded.index(key, obj)
+        with self._lock:
+            for key in keys:
+                for obj in self._pending.get(key, {}).values():
+                    loaded.index(key, obj)
+            self._indexes.replace(keys, loaded)
+            self._refreshed_at = time.time()
+
+    async def refresh_if_stale(self) -> bool:
+        """
+        Refreshes a started cache outside of the event loop, if it was not refreshed recently.
+
+        Returns:
+            Whether the cache was refreshed.
+        """
+        if not self.started or time.time() - self._refreshed_at < STATE_CACHE_MIN_REFRESH_SECONDS:
+            return False
+        self._refreshed_at = time.time()
+        await asyncio.get_running_loop().run_in_executor(None, self.refresh)
+        return True
+
+    def flush(self):
+        """
+        Writes the changes made since the last flush to the integration context.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            set_to_integration_context_with_retries({key: list(objects.values()) for key, objects in pending.items()},
+                                                    OBJECTS_TO_KEYS, SYNC_CONTEXT)
+        except Exception:
+            # Keep the changes for the next flush, unless they were changed again in the meantime
+            with self._lock:
+                for key, objects in pending.items():
+                    for object_id, obj in objects.items():
+                        self._pending.setdefault(key, {}).setdefault(object_id, obj)
+            raise
+
+    def get_user(self, user_id: str) -> dict:
+        self._load('users')
+        with self._lock:
+            return self._indexes.users_by_id.get(user_id, {})
+
+    def get_user_by_name(self, user_to_search: str) -> dict:
+        """
+        Gets a user by its name, email or real name.
+        """
+        self._load('users')
+        user_to_search = user_to_search.lower()
+        with self._lock:
+            return (self._indexes.users_by_name.get(user_to_search) or self._indexes.users_by_email.get(user_to_search)
+                    or self._indexes.users_by_real_name.get(user_to_search) or {})
+
+    def get_conversation(self, conversation_id: str) -> dict:
+        self._load('conversations')
+        with self._lock:
+            return self._indexes.conversations_by_id.get(conversation_id, {})
+
+    def get_mirrors_by_channel(self, channel_id: str) -> List[dict]:
+        self._load('mirrors')
+        with self._lock:
+            return list(self._indexes.mirrors_by_channel.get(channel_id, {}).values())
+
+    def get_question_by_thread(self, thread_id: str) -> dict:
+        self._load('questions')
+        with self._lock:
+            return self._indexes.questions_by_thread.get(thread_id, {})
+
+    def update_user(self, user: dict):
+        self.update({'users': [user]})
+
+    def update_mirror(self, mirror: dict):
+        self.update({'mirrors': [mirror]})
+
+    def update_question(self, question: dict):
+        self.update({'questions': [question]})
+
+    def update(self, changes: Dict[str, List[dict]]):
+        """
+        Indexes new or changed objects of the keys, and writes them to the integration context at once if the cache is
+        not started. The indexed objects are not changed in place, so a changed object must be a new dict.
+        """
+        with self._lock:
+            for key, objects in changes.items():
+                for obj in objects:
+                    self._indexes.index(key, obj)
+                    self._pending.setdefault(key, {})[obj[OBJECTS_TO_KEYS[key]]] = obj
+        if not self.started:
+            self.flush()
+
+    def _load(self, key: str):
+        """
+        Loads the list of the key from the integration context, if the cache is not started.
+        """
+        if not self.started:
+            self.refresh((key,))
+
+
 def get_bot_id() -> str:
     """
     Gets the app bot ID
@@ -133,18 +343,8 @@ def get_user_by_name(user_to_search: str, add_to_context: bool = True) -> dict:
         A slack user object
     """
 
-    user: dict = {}
-    users: list = []
-    integration_context = get_integration_context(SYNC_CONTEXT)
-
     user_to_search = user_to_search.lower()
-    if integration_context.get('users'):
-        users = json.loads(integration_context['users'])
-        users_filter = list(filter(lambda u: u.get('name', '').lower() == user_to_search
-                                             or u.get('profile', {}).get('email', '').lower() == user_to_search
-                                             or u.get('real_name', '').lower() == user_to_search, users))
-        if users_filter:
-            user = users_filter[0]
+    user = STATE_CACHE.get_user_by_name(user_to_search)
     if not user:
         body = {
             'limit': PAGINATED_COUNT
@@ -167,8 +367,7 @@ def get_user_by_name(user_to_search: str, add_to_context: bool = True) -> dict:
         if users_filter:
             user = users_filter[0]
             if add_to_context:
-                users.append(user)
-                set_to_integration_context_with_retries({'users': users}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+                STATE_CACHE.update_user(user)
         else:
             return {}
 
@@ -343,18 +542,12 @@ async def get_slack_name(slack_id: str, client) -> str:
     if not slack_id:
         return ''
 
-    integration_context = get_integration_context(SYNC_CONTEXT)
     prefix = slack_id[0]
     slack_name = ''
 
     if prefix in ['C', 'D', 'G']:
         slack_id = slack_id.split('|')[0]
-        conversation: dict = {}
-        if integration_context.get('conversations'):
-            conversations = list(filter(lambda c: c['id'] == slack_id,
-                                        json.loads(integration_context['conversations'])))
-            if conversations:
-                conversation = conversations[0]
+        conversation = STATE_CACHE.get_conversation(slack_id)
         if not conversation:
             body = {
                 'channel': slack_id
@@ -364,11 +557,7 @@ async def get_slack_name(slack_id: str, client) -> str:
                                                            body=body)).get('channel', {})
         slack_name = conversation.get('name', '')
     elif prefix == 'U':
-        user: dict = {}
-        if integration_context.get('users'):
-            users = list(filter(lambda u: u['id'] == slack_id, json.loads(integration_context['users'])))
-            if users:
-                user = users[0]
+        user = STATE_CACHE.get_user(slack_id)
         if not user:
             body = {
                 'user': slack_id
@@ -602,8 +791,10 @@ def long_running_loop():
     while True:
         error = ''
         try:
+            STATE_CACHE.flush()
             check_for_mirrors()
             check_for_answers()
+            STATE_CACHE.refresh()
         except requests.exceptions.ConnectionError as e:
             error = f'Could not connect to the Slack endpoint: {str(e)}'
         except Exception as e:
@@ -777,17 +968,14 @@ def check_for_mirrors():
                         except Exception as error:
                             demisto.error(f"Could not invite investigation users to the mirrored channel: {error}")
 
-                    mirror['mirrored'] = True
-                    updated_mirrors.append(mirror)
+                    updated_mirrors.append(dict(mirror, mirrored=True))
                 else:
                     demisto.info(f'Could not mirror {investigation_id}')
 
         if updated_mirrors:
-            context = {'mirrors': updated_mirrors}
-            if updated_users:
-                context['users'] = updated_users
-
-            set_to_integration_context_with_retries(context, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+            # the changes are made through the state cache, so its indexes are updated along with the integration context
+            STATE_CACHE.update({'mirrors': updated_mirrors, 'users': updated_users})
+            STATE_CACHE.flush()
 
 
 def invite_to_mirrored_channel(channel_id: str, users: List[Dict]) -> list:
@@ -902,6 +1090,7 @@ async def start_listening():
     """
     executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, STATE_CACHE.start)
     loop.run_in_executor(executor, long_running_loop)
     await slack_loop()
 
@@ -1105,12 +1294,10 @@ async def listen(**payload: Any):
             await handle_dm(user, text, client)
         else:
             channel_id = data.get('channel')
-            integration_context = get_integration_context(SYNC_CONTEXT)
-            if not integration_context or 'mirrors' not in integration_context:
-                return
-
-            mirrors = json.loads(integration_context['mirrors'])
-            mirror_filter = list(filter(lambda m: m['channel_id'] == channel_id, mirrors))
+            mirror_filter = STATE_CACHE.get_mirrors_by_channel(channel_id)
+            if not mirror_filter and await STATE_CACHE.refresh_if_stale():
+                # The channel might have been mirrored since the cache was last refreshed
+                mirror_filter = STATE_CACHE.get_mirrors_by_channel(channel_id)
             if not mirror_filter:
                 return
 
@@ -1120,7 +1307,6 @@ async def listen(**payload: Any):
 
                 if not mirror['mirrored']:
                     # In case the investigation is not mirrored yet
-                    mirror = mirrors.pop(mirrors.index(mirror))
                     if mirror['mirror_to'] and mirror['mirror_direction'] and mirror['mirror_type']:
                         investigation_id = mirror['investigation_id']
                         mirror_type = mirror['mirror_type']
@@ -1130,9 +1316,8 @@ async def listen(**payload: Any):
                             auto_close = bool(strtobool(auto_close))
                         demisto.info(f'Mirroring: {investigation_id}')
                         demisto.mirrorInvestigation(investigation_id, f'{mirror_type}:{direction}', auto_close)
-                        mirror['mirrored'] = True
-                        mirrors.append(mirror)
-                        set_to_integration_context_with_retries({'mirrors': mirrors}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+                        mirror = dict(mirror, mirrored=True)
+                        STATE_CACHE.update_mirror(mirror)
 
                 investigation_id = mirror['investigation_id']
                 await handle_text(client, investigation_id, text, user)
@@ -1152,21 +1337,13 @@ async def get_user_by_id_async(client: slack.WebClient, user_id: str) -> dict:
     Returns:
         The slack user.
     """
-    user: dict = {}
-    users: list = []
-    integration_context = get_integration_context(SYNC_CONTEXT)
-    if integration_context.get('users'):
-        users = json.loads(integration_context['users'])
-        user_filter = list(filter(lambda u: u['id'] == user_id, users))
-        if user_filter:
-            user = user_filter[0]
+    user = STATE_CACHE.get_user(user_id)
     if not user:
         body = {
             'user': user_id
         }
         user = (await send_slack_request_async(client, 'users.info', http_verb='GET', body=body)).get('user', {})
-        users.append(user)
-        set_to_integration_context_with_retries({'users': users}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+        STATE_CACHE.update_user(user)
 
     return user
 
@@ -1211,21 +1388,19 @@ async def check_and_handle_entitlement(text: str, user: dict, thread_id: str) ->
 
         return 'Thank you for your response.'
     else:
-        integration_context = get_integration_context(SYNC_CONTEXT)
-        questions = integration_context.get('questions', [])
-        if questions and thread_id:
-            questions = json.loads(questions)
-            question_filter = list(filter(lambda q: q.get('thread') == thread_id, questions))
-            if question_filter:
-                question = question_filter[0]
+        if thread_id:
+            question = STATE_CACHE.get_question_by_thread(thread_id)
+            if not question and await STATE_CACHE.refresh_if_stale():
+                # The question might have been sent since the cache was last refreshed
+                question = STATE_CACHE.get_question_by_thread(thread_id)
+            if question:
                 demisto.info('Slack - handling entitlement in thread.')
                 entitlement = question.get('entitlement')
                 reply = question.get('reply', 'Thank you for your response.')
                 content, guid, incident_id, task_id = extract_entitlement(entitlement, text)
                 demisto.handleEntitlementForUser(incident_id, guid, user.get('profile', {}).get('email'), content,
                                                  task_id)
-                question['remove'] = True
-                set_to_integration_context_with_retries({'questions': questions}, OBJECTS_TO_KEYS, SYNC_CONTEXT)
+                STATE_CACHE.update_question(dict(question, remove=True))
 
                 return reply
 
@@ -1902,7 +2077,7 @@ def init_globals(command_name: str = ''):
     """
     global BOT_TOKEN, ACCESS_TOKEN, PROXY_URL, PROXIES, DEDICATED_CHANNEL, CLIENT, CHANNEL_CLIENT
     global SEVERITY_THRESHOLD, ALLOW_INCIDENTS, NOTIFY_INCIDENTS, INCIDENT_TYPE, VERIFY_CERT
-    global BOT_NAME, BOT_ICON_URL, MAX_LIMIT_TIME, PAGINATED_COUNT, SSL_CONTEXT
+    global BOT_NAME, BOT_ICON_URL, MAX_LIMIT_TIME, PAGINATED_COUNT, SSL_CONTEXT, STATE_CACHE
 
     VERIFY_CERT = not demisto.params().get('unsecure', False)
     if not VERIFY_CERT:
@@ -1935,6 +2110,7 @@ def init_globals(command_name: str = ''):
     BOT_ICON_URL = demisto.params().get('bot_icon')  # Bot default icon url defined by the slack plugin (3-rd party)
     MAX_LIMIT_TIME = int(demisto.params().get('max_limit_time', '60'))
     PAGINATED_COUNT = int(demisto.params().get('paginated_count', '200'))
+    STATE_CACHE = SlackStateCache()
 
 
 def print_thread_dump():
@@ -2000,6 +2000,174 @@ async def test_get_user_by_id_async_user_doesnt_exist(mocker):
     assert user['name'] == 'spengler'
 
 
+@pytest.mark.asyncio
+async def test_listen_started_state_cache_burst(mocker):
+    """
+    Given:
+        - A started state cache.
+    When:
+        - Receiving a burst of messages in a mirrored channel.
+    Then:
+        - Ensure the integration context is read only when the cache is started and is never written.
+        - Ensure every message is added to the mirrored investigation.
+    """
+    import Slack
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(demisto, 'updateModuleHealth')
+    mocker.patch.object(slack.WebClient, 'api_call')
+    handle_text_mock = mocker.patch.object(Slack, 'handle_text', side_effect=mock_handle_text)
+
+    Slack.STATE_CACHE.start()
+    for i in range(1000):
+        await Slack.listen(data={'user': 'U012A3CDE', 'channel': 'GKNEJU4P9', 'text': f'message {i}'},
+                           web_client=slack.WebClient)
+
+    assert demisto.getIntegrationContext.call_count == 1
+    assert demisto.setIntegrationContext.call_count == 0
+    assert slack.WebClient.api_call.call_count == 0
+    assert handle_text_mock.call_count == 1000
+    assert handle_text_mock.call_args[0][1] == '713'
+
+
+async def mock_handle_text(client, investigation_id, text, user):
+    return
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_id_async_started_state_cache(mocker):
+    """
+    Given:
+        - A started state cache.
+    When:
+        - Getting users which are not in the cache.
+    Then:
+        - Ensure the users are written to the integration context only when the cache is flushed, in a single write.
+    """
+    import Slack
+
+    async def api_call(method: str, http_verb: str = 'POST', file: str = None, params=None, json=None, data=None):
+        return {'user': {'id': params['user'], 'name': params['user'].lower()}}
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(slack.WebClient, 'api_call', side_effect=api_call)
+
+    Slack.STATE_CACHE.start()
+    for _ in range(2):
+        for user_id in ['U1', 'U2', 'U3']:
+            await Slack.get_user_by_id_async(slack.WebClient, user_id)
+
+    assert slack.WebClient.api_call.call_count == 3
+    assert demisto.setIntegrationContext.call_count == 0
+
+    # Changes which were not written yet are kept when refreshing
+    Slack.STATE_CACHE.refresh()
+    assert Slack.STATE_CACHE.get_user('U2') == {'id': 'U2', 'name': 'u2'}
+    assert Slack.STATE_CACHE.get_user_by_name('U3') == {'id': 'U3', 'name': 'u3'}
+
+    Slack.STATE_CACHE.flush()
+    Slack.STATE_CACHE.flush()
+
+    assert demisto.setIntegrationContext.call_count == 1
+    users = js.loads(demisto.getIntegrationContext()['users'])
+    assert [user['id'] for user in users] == [user['id'] for user in js.loads(USERS)] + ['U1', 'U2', 'U3']
+
+
+@pytest.mark.asyncio
+async def test_check_and_handle_entitlement_started_state_cache(mocker):
+    """
+    Given:
+        - A started state cache.
+        - A question which was saved to the integration context after the cache was started.
+    When:
+        - Receiving a reply in the question thread.
+    Then:
+        - Ensure the cache is refreshed and the entitlement is handled.
+        - Ensure the question is removed from the integration context when the cache is flushed.
+    """
+    import Slack
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+    mocker.patch.object(demisto, 'handleEntitlementForUser')
+    mocker.patch.object(Slack, 'STATE_CACHE_MIN_REFRESH_SECONDS', 0)
+
+    Slack.STATE_CACHE.start()
+    integration_context = get_integration_context()
+    integration_context['questions'] = js.dumps([{
+        'thread': 'cool',
+        'entitlement': '4404dae8-2d45-46bd-85fa-64779c12abe8@22|43',
+        'reply': 'Thanks'
+    }])
+    set_integration_context(integration_context)
+
+    reply = await Slack.check_and_handle_entitlement('hola', {'profile': {'email': 'a@b.com'}}, 'cool')
+
+    assert reply == 'Thanks'
+    assert demisto.handleEntitlementForUser.call_count == 1
+    assert not Slack.STATE_CACHE.get_question_by_thread('cool')
+
+    Slack.STATE_CACHE.flush()
+
+    assert js.loads(demisto.getIntegrationContext()['questions']) == []
+
+
+def test_state_cache_not_started_loads_needed_list(mocker):
+    """
+    Given:
+        - A state cache which is not started.
+    When:
+        - Looking up a user and the mirrors of a channel.
+    Then:
+        - Ensure only the list of each lookup is loaded from the integration context.
+    """
+    import Slack
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    loads = mocker.spy(Slack.json, 'loads')
+
+    assert Slack.STATE_CACHE.get_user('U012A3CDE')['name'] == 'spengler'
+    assert [call[0][0] for call in loads.call_args_list] == [USERS]
+
+    loads.reset_mock()
+    assert Slack.STATE_CACHE.get_mirrors_by_channel('GKNEJU4P9')
+    assert [call[0][0] for call in loads.call_args_list] == [MIRRORS]
+
+
+def test_state_cache_keeps_updates_on_refresh(mocker):
+    """
+    Given:
+        - A started state cache.
+    When:
+        - Updating a mirror, and refreshing the cache before the change is written.
+    Then:
+        - Ensure the lookups are served from the updated indexes, and the change is kept by the refresh.
+        - Ensure the mirror objects returned by the lookups before the update are not changed.
+    """
+    import Slack
+
+    mocker.patch.object(demisto, 'getIntegrationContext', side_effect=get_integration_context)
+    mocker.patch.object(demisto, 'setIntegrationContext', side_effect=set_integration_context)
+
+    Slack.STATE_CACHE.start()
+    old_mirror = Slack.STATE_CACHE.get_mirrors_by_channel('GKNEJU4P9')[0]
+    mirror = dict(old_mirror, channel_id='new_channel')
+    Slack.STATE_CACHE.update_mirror(mirror)
+
+    assert not Slack.STATE_CACHE.get_mirrors_by_channel('GKNEJU4P9')
+    assert Slack.STATE_CACHE.get_mirrors_by_channel('new_channel') == [mirror]
+    assert old_mirror['channel_id'] == 'GKNEJU4P9'
+
+    Slack.STATE_CACHE.refresh()
+    assert Slack.STATE_CACHE.get_mirrors_by_channel('new_channel') == [mirror]
+    assert not Slack.STATE_CACHE.get_mirrors_by_channel('GKNEJU4P9')
+
+    Slack.STATE_CACHE.flush()
+    assert mirror in js.loads(demisto.getIntegrationContext()['mirrors'])
+
+
 @pytest.mark.asyncio
 async def test_handle_text(mocker):
     import Slack
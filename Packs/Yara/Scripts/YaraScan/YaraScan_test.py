@@ -1,5 +1,13 @@
 
-from YaraScan import main
+import os
+import random
+import time
+
+import pytest
+import yara
+
+import YaraScan
+from YaraScan import main, get_rules
 import demistomock as demisto
 from CommonServerPython import entryTypes
 
@@ -19,26 +27,15 @@ def test_main(mocker):
         $MZ at 0
 }'''
 
-    def executeCommand(name, args=None):
-        if name == 'getFilePath':
-            return [
-                {
-                    'Type': entryTypes['note'],
-                    'Contents': {
-                        'path': 'test_data/unzip.exe',
-                        'name': 'unzip.exe',
-                        'ID': 'testfileid'
-                    }
-                }
-            ]
-        else:
-            raise ValueError('Unimplemented command called: {}'.format(name))
-
     mocker.patch.object(demisto, 'args', return_value={
         'entryIDs': 'test',
         'yaraRule': rule
     })
-    mocker.patch.object(demisto, 'executeCommand', side_effect=executeCommand)
+    mocker.patch.object(demisto, 'getFilePath', return_value={
+        'path': 'test_data/unzip.exe',
+        'name': 'unzip.exe',
+        'id': 'testfileid'
+    })
     mocker.patch.object(demisto, 'results')
     main()
     results = demisto.results.call_args[0]
@@ -46,3 +43,89 @@ def test_main(mocker):
     assert results[0]['Type'] == entryTypes['note']
     assert results[0]['Contents'][0]['HasMatch']
     assert results[0]['Contents'][0]['Matches'][0]['RuleName'] == 'PE_file_identifier'
+
+
+def test_get_rules_cache(mocker, tmp_path):
+    """
+    Given
+    - Rules which were compiled by a previous run of the script
+    When
+    - Getting the same rules, and other rules
+    Then
+    - Ensure the same rules are loaded instead of compiled, and other rules are compiled
+    """
+    mocker.patch.object(YaraScan, 'COMPILED_RULES_DIR', str(tmp_path))
+    compile_spy = mocker.spy(yara, 'compile')
+    rule = 'rule test { strings: $a = "test" condition: $a }'
+    get_rules(rule)
+    rules = get_rules(rule)
+    assert compile_spy.call_count == 1
+    assert rules.match(data=b'a test')[0].rule == 'test'
+    get_rules(rule.replace('test', 'other'))
+    assert compile_spy.call_count == 2
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_main_compile_error(mocker):
+    """
+    Given
+    - An invalid rule
+    When
+    - Scanning 2 files
+    Then
+    - Ensure both files are returned with the compile error
+    """
+    mocker.patch.object(demisto, 'args', return_value={'entryIDs': 'test1,test2', 'yaraRule': 'rule {'})
+    mocker.patch.object(demisto, 'getFilePath', side_effect=lambda entry_id: {
+        'path': 'test_data/unzip.exe', 'name': 'unzip.exe', 'id': entry_id
+    })
+    mocker.patch.object(demisto, 'results')
+    main()
+    entries = demisto.results.call_args[0][0]['Contents']
+    assert [entry['entryID'] for entry in entries] == ['test1', 'test2']
+    assert all(entry['HasError'] and entry['Errors'] for entry in entries)
+
+
+@pytest.mark.benchmark
+def test_main_benchmark(mocker, tmp_path):
+    """
+    Given
+    - 300 rules, and 8 files of 16MB, each with the strings of a single rule
+    When
+    - Scanning the files
+    Then
+    - Ensure every file matches its rule, as when compiling the rules and reading the file for every file
+    - Ensure the rules are compiled once, and the files are scanned in a few seconds
+    """
+    rand = random.Random(0)
+    rules_bytes = [bytes([0x4D, 0x5A, rand.randrange(256), rand.randrange(256), 0x11, 0x00]) for _ in range(300)]
+    rules = '\n'.join(
+        'rule rule_{0} {{ strings: $text = "marker_{0}_text" $hex = {{ 4D 5A {1:02X} {2:02X} ?? 00 }} '
+        'condition: $text and $hex }}'.format(i, rule_bytes[2], rule_bytes[3]) for i, rule_bytes in enumerate(rules_bytes))
+    compiled_rules = yara.compile(source=rules)
+    paths = []
+    for i in range(8):
+        paths.append(str(tmp_path / 'file_{}.bin'.format(i)))
+        with open(paths[-1], 'wb') as f:
+            f.write(rand.getrandbits(16 * 1024 * 1024 * 8).to_bytes(16 * 1024 * 1024, 'little'))
+            f.write('marker_{0}_text'.format(i * 30).encode('utf-8'))
+            f.write(rules_bytes[i * 30])
+    mocker.patch.object(YaraScan, 'COMPILED_RULES_DIR', str(tmp_path / 'rules'))
+    mocker.patch.object(demisto, 'args', return_value={'entryIDs': ','.join(paths), 'yaraRule': rules})
+    mocker.patch.object(demisto, 'getFilePath', side_effect=lambda entry_id: {
+        'path': entry_id, 'name': os.path.basename(entry_id), 'id': entry_id
+    })
+    mocker.patch.object(demisto, 'results')
+    compile_spy = mocker.spy(yara, 'compile')
+
+    start = time.time()
+    main()
+    duration = time.time() - start
+
+    entries = demisto.results.call_args[0][0]['Contents']
+    for i, (path, entry) in enumerate(zip(paths, entries)):
+        with open(path, 'rb') as f:
+            expected_rules = [match.rule for match in compiled_rules.match(data=f.read())]
+        assert [match['RuleName'] for match in entry['Matches']] == expected_rules == ['rule_{}'.format(i * 30)]
+    assert compile_spy.call_count == 1
+    assert duration < 30
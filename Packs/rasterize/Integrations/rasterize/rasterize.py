@@ -6,16 +6,26 @@ from selenium import webdriver
 from selenium.common.exceptions import NoSuchElementException, InvalidArgumentException, TimeoutException
 from PyPDF2 import PdfFileReader
 from pdf2image import convert_from_path
-import numpy as np
 from PIL import Image
 import tempfile
 from io import BytesIO
+import atexit
 import base64
+import math
 import time
 import subprocess
+import threading
 import traceback
+import types
 import re
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ssl import SSLContext, SSLError, PROTOCOL_TLSv1_2
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 
 # Chrome respects proxy env params
 handle_proxy()
@@ -25,6 +35,29 @@ os.environ['no_proxy'] = 'localhost,127.0.0.1'
 WITH_ERRORS = demisto.params().get('with_error', True)
 DEFAULT_WAIT_TIME = max(int(demisto.params().get('wait_time', 0)), 0)
 DEFAULT_PAGE_LOAD_TIME = int(demisto.params().get('max_page_load_time', 180))
+CHROME_POOL_SIZE = max(int(demisto.params().get('chrome_pool_size', 4)), 1)
+# the chrome pool is kept in a module of its own, which outlives the re-execution of the script in the docker loop
+CHROME_POOL_CACHE_MODULE = '_rasterize_chrome_pool_cache'
+# the page is ready once it has loaded, and no resource was loaded by it for this time
+NETWORK_IDLE_TIME = 0.5
+READINESS_POLL_INTERVAL = 0.1
+# the resources loaded by the page are counted by an observer, as the resource timing buffer of the page is limited
+# (to 250 entries by default), and its count stops changing once it is full
+PAGE_READINESS_SCRIPT = """
+if (window.rasterizeResourcesCount === undefined) {
+    window.rasterizeResourcesCount = 0;
+    new PerformanceObserver(function (list) {
+        window.rasterizeResourcesCount += list.getEntries().length;
+    }).observe({type: 'resource', buffered: true});
+}
+return [document.readyState, window.rasterizeResourcesCount];
+"""
+# the pages of a PDF are rendered at this DPI, and the image of all the pages is rendered at a lower DPI if it has more
+# than MAX_PDF_IMAGE_PIXELS pixels, or is longer than a jpeg image can be
+PDF_DPI = 200
+MAX_PDF_IMAGE_PIXELS = 50 * 1000 * 1000
+MAX_JPEG_DIMENSION = 65500
+PDF_RENDER_WORKERS = 4
 
 URL_ERROR_MSG = "Can't access the URL. It might be malicious, or unreachable for one of several reasons. " \
                 "You can choose to receive this message as error/warning in the instance settings\n"
@@ -50,10 +83,44 @@ DEFAULT_CHROME_OPTIONS = [
 USER_CHROME_OPTIONS = demisto.params().get('chrome_options', "")
 
 
+# the demisto functions are not thread-safe, so the threads of the chrome pool and of the server log under this lock
+LOG_LOCK = threading.Lock()
+
+
+def log_debug(msg: str):
+    with LOG_LOCK:
+        demisto.debug(msg)
+
+
+def log_info(msg: str):
+    with LOG_LOCK:
+        demisto.info(msg)
+
+
+def log_error(msg: str):
+    with LOG_LOCK:
+        demisto.error(msg)
+
+
+class EmptyResponseError(Exception):
+    pass
+
+
 def return_err_or_warn(msg):
     return_error(msg) if WITH_ERRORS else return_warning(msg, exit=True)
 
 
+def err_or_warn_entry(msg: str) -> dict:
+    """
+    Creates the error/warning entry of return_err_or_warn, without exiting
+    """
+    return {
+        'Type': entryTypes['error'] if WITH_ERRORS else entryTypes['warning'],
+        'ContentsFormat': formats['text'],
+        'Contents': msg,
+    }
+
+
 def opt_name(opt):
     return opt.split('=', 1)[0]
 
@@ -71,7 +138,7 @@ def merge_options(default_options, user_options):
     user_options = re.split(r'(?<!\\),', user_options) if user_options else list()
     if not user_options:  # nothing to do
         return default_options
-    demisto.debug(f'user chrome options: {user_options}')
+    log_debug(f'user chrome options: {user_options}')
     options = []
     remove_opts = []
     for opt in user_options:
@@ -90,14 +157,14 @@ def merge_options(default_options, user_options):
 def check_response(driver):
     EMPTY_PAGE = '<html><head></head><body></body></html>'
     if driver.page_source == EMPTY_PAGE:
-        return_err_or_warn(EMPTY_RESPONSE_ERROR_MSG)
+        raise EmptyResponseError(EMPTY_RESPONSE_ERROR_MSG)
 
 
 def init_driver(offline_mode=False):
     """
     Creates headless Google Chrome Web Driver
     """
-    demisto.debug(f'Creating chrome driver. Mode: {"OFFLINE" if offline_mode else "ONLINE"}')
+    log_debug(f'Creating chrome driver. Mode: {"OFFLINE" if offline_mode else "ONLINE"}')
     try:
         chrome_options = webdriver.ChromeOptions()
         for opt in merge_options(DEFAULT_CHROME_OPTIONS, USER_CHROME_OPTIONS):
@@ -106,14 +173,18 @@ def init_driver(offline_mode=False):
             f'--log-path={DRIVER_LOG}',
         ])
         if offline_mode:
-            driver.set_network_conditions(offline=True, latency=5, throughput=500 * 1024)
+            set_offline(driver)
     except Exception as ex:
         return_error(f'Unexpected exception: {ex}\nTrace:{traceback.format_exc()}')
 
-    demisto.debug('Creating chrome driver - COMPLETED')
+    log_debug('Creating chrome driver - COMPLETED')
     return driver
 
 
+def set_offline(driver):
+    driver.set_network_conditions(offline=True, latency=5, throughput=500 * 1024)
+
+
 def find_zombie_processes():
     """find zombie proceses
     Returns:
@@ -138,65 +209,230 @@ def quit_driver_and_reap_children(driver):
     :param driver: The driver
     :return: None
     """
-    demisto.debug(f'Quitting driver session: {driver.session_id}')
+    log_debug(f'Quitting driver session: {driver.session_id}')
     driver.quit()
     try:
         zombies, ps_out = find_zombie_processes()
         if zombies:
-            demisto.info(f'Found zombie processes will waitpid: {ps_out}')
+            log_info(f'Found zombie processes will waitpid: {ps_out}')
             for pid in zombies:
                 waitres = os.waitpid(int(pid), os.WNOHANG)[1]
-                demisto.info(f'waitpid result: {waitres}')
+                log_info(f'waitpid result: {waitres}')
         else:
-            demisto.debug(f'No zombie processes found for ps output: {ps_out}')
+            log_debug(f'No zombie processes found for ps output: {ps_out}')
     except Exception as e:
-        demisto.error(f'Failed checking for zombie processes: {e}. Trace: {traceback.format_exc()}')
+        log_error(f'Failed checking for zombie processes: {e}. Trace: {traceback.format_exc()}')
 
 
-def rasterize(path: str, width: int, height: int, r_type: str = 'png', wait_time: int = 0,
-              offline_mode: bool = False, max_page_load_time: int = 180):
+class ChromePool:
+    """
+    A pool of long-lived Chrome drivers, so a rendering doesn't pay for the start of a browser. A driver renders a
+    single page at a time, so up to `size` pages are rendered concurrently.
+
+    Usage:
+        with get_chrome_pool().driver() as driver, new_browser_context(driver) as page_driver:
+            page_driver.get(url)
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle_drivers: list = []
+        self._drivers_count = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def driver(self):
+        """
+        Yields an idle driver of the pool, and creates one if there is none and the pool isn't full. A driver which
+        failed (and not just the page it rendered) is quit, and isn't returned to the pool.
+        """
+        with self._condition:
+            while not self._idle_drivers and self._drivers_count >= self.size:
+                self._condition.wait()
+            driver = self._idle_drivers.pop() if self._idle_drivers else None
+            if driver is None:
+                self._drivers_count += 1
+
+        healthy = False
+        try:
+            if driver is None:
+                driver = init_driver()
+            yield driver
+            healthy = True
+        except (InvalidArgumentException, NoSuchElementException, TimeoutException):
+            healthy = True
+            raise
+        finally:
+            with self._condition:
+                if healthy:
+                    self._idle_drivers.append(driver)
+                else:
+                    self._drivers_count -= 1
+                self._condition.notify()
+            if driver is not None and not healthy:
+                quit_driver_and_reap_children(driver)
+
+    def start(self):
+        """
+        Starts the drivers the pool doesn't have yet, concurrently
+        """
+        with self._condition:
+            missing_drivers_count = self.size - self._drivers_count
+            self._drivers_count = self.size
+        with ThreadPoolExecutor(max_workers=max(missing_drivers_count, 1)) as executor:
+            futures = [executor.submit(init_driver) for _ in range(missing_drivers_count)]
+        for future in futures:
+            with self._condition:
+                if future.exception() is None:
+                    self._idle_drivers.append(future.result())
+                else:
+                    self._drivers_count -= 1
+                self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            drivers, self._idle_drivers = self._idle_drivers, []
+            self._drivers_count -= len(drivers)
+        for driver in drivers:
+            quit_driver_and_reap_children(driver)
+
+
+def get_chrome_pool() -> ChromePool:
+    """
+    Returns the chrome pool of the process, which is created once per process for the same chrome options
+    """
+    chrome_options = merge_options(DEFAULT_CHROME_OPTIONS, USER_CHROME_OPTIONS)
+    cache_module = sys.modules.get(CHROME_POOL_CACHE_MODULE)
+    if cache_module is None:
+        cache_module = types.ModuleType(CHROME_POOL_CACHE_MODULE)
+        cache_module.pools = {}  # type: ignore[attr-defined]
+        sys.modules[CHROME_POOL_CACHE_MODULE] = cache_module
+    pools = cache_module.pools  # type: ignore[attr-defined]
+    pool_key = (tuple(chrome_options), CHROME_POOL_SIZE)
+    pool = pools.get(pool_key)
+    if pool is None:
+        # the drivers of other options aren't used anymore
+        for other_pool in pools.values():
+            other_pool.close()
+        pools.clear()
+        pool = ChromePool(CHROME_POOL_SIZE)
+        pools[pool_key] = pool
+        atexit.register(pool.close)
+    return pool
+
+
+@contextmanager
+def new_browser_context(driver, offline_mode: bool = False):
+    """
+    Opens a tab in a fresh browser context (like an incognito window) of the driver, so the page doesn't share
+    cookies, cache or storage with the pages the driver rendered before. The context is disposed on exit.
+    :param driver: the driver
+    :param offline_mode: when set to True, will block any outgoing communication of the tab
+    :return: the driver, switched to the new tab
+    """
+    main_handle = driver.current_window_handle
+    handles = set(driver.window_handles)
+    context_id = driver.execute_cdp_cmd('Target.createBrowserContext', {})['browserContextId']
+    try:
+        driver.execute_cdp_cmd('Target.createTarget', {'url': 'about:blank', 'browserContextId': context_id})
+        driver.switch_to.window((set(driver.window_handles) - handles).pop())
+        try:
+            if offline_mode:
+                set_offline(driver)
+            yield driver
+        finally:
+            if offline_mode:
+                driver.delete_network_conditions()
+            driver.close()
+            driver.switch_to.window(main_handle)
+    finally:
+        driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context_id})
+
+
+def wait_for_page_ready(driver, max_wait_time: float):
+    """
+    Waits until the page has loaded, and its network is idle - no resource was loaded by it in the last
+    NETWORK_IDLE_TIME seconds - but no longer than the given time
+    :param driver: the driver, after navigating to the page
+    :param max_wait_time: max time in seconds to wait
+    """
+    end_time = time.monotonic() + max_wait_time
+    resources_count = None
+    idle_since = time.monotonic()
+    while time.monotonic() < end_time:
+        ready_state, page_resources_count = driver.execute_script(PAGE_READINESS_SCRIPT)
+        now = time.monotonic()
+        if ready_state != 'complete' or page_resources_count != resources_count:
+            resources_count = page_resources_count
+            idle_since = now
+        elif now - idle_since >= NETWORK_IDLE_TIME:
+            return
+        time.sleep(READINESS_POLL_INTERVAL)
+
+
+def render(driver, path: str, width: int, height: int, r_type: str = 'png', wait_time: int = 0,
+           page_load_time: int = DEFAULT_PAGE_LOAD_TIME):
     """
-    Capturing a snapshot of a path (url/file), using Chrome Driver
+    Renders a path (url/file) in the current tab of the driver
+    :return: the .png/.pdf file of the path
+    """
+    log_debug(f'Navigating to path: {path}. page load: {page_load_time}')
+    driver.set_page_load_timeout(page_load_time)
+    driver.get(path)
+    driver.implicitly_wait(5)
+    if wait_time > 0 or DEFAULT_WAIT_TIME > 0:
+        wait_for_page_ready(driver, wait_time or DEFAULT_WAIT_TIME)
+    check_response(driver)
+    log_debug('Navigating to path - COMPLETED')
+
+    if r_type.lower() == 'pdf':
+        return get_pdf(driver, width, height)
+    return get_image(driver, width, height)
+
+
+def try_rasterize(path: str, width: int, height: int, r_type: str = 'png', wait_time: int = 0,
+                  offline_mode: bool = False, max_page_load_time: int = 180) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Capturing a snapshot of a path (url/file), using a Chrome Driver of the chrome pool.
+    Doesn't exit on errors, so it can be called by the threads of the chrome pool
     :param offline_mode: when set to True, will block any outgoing communication
     :param path: file path, or website url
     :param width: desired snapshot width in pixels
     :param height: desired snapshot height in pixels
     :param r_type: result type: .png/.pdf
-    :param wait_time: time in seconds to wait before taking a screenshot
+    :param wait_time: max time in seconds to wait for the page to be idle before taking a screenshot
+    :return: the .png/.pdf file of the path, or the error message of rasterizing it
     """
-    driver = init_driver(offline_mode)
     page_load_time = max_page_load_time if max_page_load_time > 0 else DEFAULT_PAGE_LOAD_TIME
     try:
-        demisto.debug(f'Navigating to path: {path}. Mode: {"OFFLINE" if offline_mode else "ONLINE"}. page load: {page_load_time}')
-        driver.set_page_load_timeout(page_load_time)
-        driver.get(path)
-        driver.implicitly_wait(5)
-        if wait_time > 0 or DEFAULT_WAIT_TIME > 0:
-            time.sleep(wait_time or DEFAULT_WAIT_TIME)
-        check_response(driver)
-        demisto.debug('Navigating to path - COMPLETED')
-
-        if r_type.lower() == 'pdf':
-            output = get_pdf(driver, width, height)
-        else:
-            output = get_image(driver, width, height)
-
-        return output
+        log_debug(f'Rasterizing path: {path}. Mode: {"OFFLINE" if offline_mode else "ONLINE"}')
+        with get_chrome_pool().driver() as driver, new_browser_context(driver, offline_mode) as page_driver:
+            return render(page_driver, path, width, height, r_type, wait_time, page_load_time), None
 
     except (InvalidArgumentException, NoSuchElementException) as ex:
         if 'invalid argument' in str(ex):
-            err_msg = URL_ERROR_MSG + str(ex)
-            return_err_or_warn(err_msg)
-        else:
-            return_err_or_warn(f'Invalid exception: {ex}\nTrace:{traceback.format_exc()}')
+            return None, URL_ERROR_MSG + str(ex)
+        return None, f'Invalid exception: {ex}\nTrace:{traceback.format_exc()}'
     except TimeoutException as ex:
-        return_err_or_warn(f'Timeout exception with max load time of: {page_load_time} seconds. {ex}')
+        return None, f'Timeout exception with max load time of: {page_load_time} seconds. {ex}'
+    except EmptyResponseError as ex:
+        return None, str(ex)
     except Exception as ex:
         err_str = f'General error: {ex}\nTrace:{traceback.format_exc()}'
-        demisto.error(err_str)
-        return_err_or_warn(err_str)
-    finally:
-        quit_driver_and_reap_children(driver)
+        log_error(err_str)
+        return None, err_str
+
+
+def rasterize(path: str, width: int, height: int, r_type: str = 'png', wait_time: int = 0,
+              offline_mode: bool = False, max_page_load_time: int = 180):
+    """
+    Capturing a snapshot of a path (url/file), using a Chrome Driver of the chrome pool.
+    Returns an error/warning, and exits on errors
+    """
+    output, error = try_rasterize(path, width, height, r_type, wait_time, offline_mode, max_page_load_time)
+    if error:
+        return_err_or_warn(error)
+    return output
 
 
 def get_image(driver, width: int, height: int):
@@ -204,15 +440,14 @@ def get_image(driver, width: int, height: int):
     Uses the Chrome driver to generate an image out of a currently loaded path
     :return: .png file of the loaded path
     """
-    demisto.debug('Capturing screenshot')
+    log_debug('Capturing screenshot')
 
     # Set windows size
     driver.set_window_size(width, height)
 
     image = driver.get_screenshot_as_png()
-    driver.quit()
 
-    demisto.debug('Capturing screenshot - COMPLETED')
+    log_debug('Capturing screenshot - COMPLETED')
 
     return image
 
@@ -222,7 +457,7 @@ def get_pdf(driver, width: int, height: int):
     Uses the Chrome driver to generate an pdf file out of a currently loaded path
     :return: .pdf file of the loaded path
     """
-    demisto.debug('Generating PDF')
+    log_debug('Generating PDF')
 
     driver.set_window_size(width, height)
     resource = f'{driver.command_executor._url}/session/{driver.session_id}/chromium/send_command_and_get_result'
@@ -234,75 +469,139 @@ def get_pdf(driver, width: int, height: int):
         return_error(response.get('value'))
 
     data = base64.b64decode(response.get('value').get('data'))
-    demisto.debug('Generating PDF - COMPLETED')
+    log_debug('Generating PDF - COMPLETED')
 
     return data
 
 
-def convert_pdf_to_jpeg(path: str, max_pages: int, password: str, horizontal: bool = False):
+def get_pdf_pages_sizes(path: str, max_pages: int, password: str) -> List[Tuple[float, float]]:
+    """
+    Reads the sizes of the first pages of a PDF file, without rendering them
+    :param path: file's path
+    :param max_pages: max pages to read
+    :param password: PDF password
+    :return: the width and height in points of every page, as it is displayed
+    """
+    with open(path, 'rb') as pdf_file:
+        input_pdf = PdfFileReader(pdf_file)
+        if input_pdf.isEncrypted and not input_pdf.decrypt(password or ''):
+            raise DemistoException('Failed decrypting the PDF file. Please check the PDF password.')
+        pages_sizes = []
+        for page_number in range(min(max_pages, input_pdf.numPages)):
+            page = input_pdf.getPage(page_number)
+            width, height = float(page.mediaBox.getWidth()), float(page.mediaBox.getHeight())
+            if int(page.get('/Rotate', 0)) % 180 == 90:
+                width, height = height, width
+            pages_sizes.append((width, height))
+        return pages_sizes
+
+
+def get_pdf_page_shape(pages_sizes: List[Tuple[float, float]], horizontal: bool = False) -> Tuple[int, int]:
+    """
+    Returns the shape in pixels of every page in the combined image - the shape of the smallest page at PDF_DPI,
+    scaled down so the combined image has no more than MAX_PDF_IMAGE_PIXELS pixels, and fits in a jpeg image
+    :param pages_sizes: the width and height in points of every page
+    :param horizontal: whether the pages are combined horizontally
+    """
+    width, height = min((width + height, (width, height)) for width, height in pages_sizes)[1]
+    width, height = width * PDF_DPI / 72, height * PDF_DPI / 72
+    length = (width if horizontal else height) * len(pages_sizes)
+    scale = min(1.0, math.sqrt(MAX_PDF_IMAGE_PIXELS / (width * height * len(pages_sizes))),
+                MAX_JPEG_DIMENSION / length, MAX_JPEG_DIMENSION / max(width, height))
+    return max(int(width * scale), 1), max(int(height * scale), 1)
+
+
+def convert_pdf_to_jpeg(path: str, max_pages: int, password: str, horizontal: bool = False, output=None):
     """
-    Converts a PDF file into a jpeg image
+    Converts a PDF file into a jpeg image. The pages are rendered in parallel straight at the shape they have in the
+    image, and are pasted into the image one by one - so only a single page is loaded at a time.
     :param path: file's path
     :param max_pages: max pages to render
     :param password: PDF password
     :param horizontal: if True, will combine the pages horizontally
-    :return: stream of combined image
+    :param output: a file to encode the image into, instead of returning it
+    :return: the combined image, if no output file was given
     """
-    demisto.debug(f'Loading file at Path: {path}')
-    input_pdf = PdfFileReader(open(path, "rb"))
-    pages = min(max_pages, input_pdf.numPages)
+    log_debug(f'Loading file at Path: {path}')
+    pages_sizes = get_pdf_pages_sizes(path, max_pages, password)
+    if not pages_sizes:
+        raise DemistoException('The PDF file has no pages.')
+    page_width, page_height = get_pdf_page_shape(pages_sizes, horizontal)
 
     with tempfile.TemporaryDirectory() as output_folder:
-        demisto.debug('Converting PDF')
-        convert_from_path(
+        log_debug(f'Converting PDF - {len(pages_sizes)} pages of {page_width}x{page_height} pixels')
+        pages_paths = convert_from_path(
             pdf_path=path,
             fmt='jpeg',
             first_page=1,
-            last_page=pages,
+            last_page=len(pages_sizes),
             output_folder=output_folder,
             userpw=password,
-            output_file='converted_pdf_'
+            output_file='converted_pdf_',
+            size=(page_width, page_height),
+            thread_count=min(PDF_RENDER_WORKERS, len(pages_sizes)),
+            paths_only=True
         )
-        demisto.debug('Converting PDF - COMPLETED')
-
-        demisto.debug('Combining all pages')
-        images = []
-        for page in sorted(os.listdir(output_folder)):
-            if os.path.isfile(os.path.join(output_folder, page)) and 'converted_pdf_' in page:
-                images.append(Image.open(os.path.join(output_folder, page)))
-        min_shape = min([(np.sum(page_.size), page_.size) for page_ in images])[1]  # get the minimal width
+        log_debug('Converting PDF - COMPLETED')
 
+        log_debug('Combining all pages')
         if horizontal:
-            imgs_comb = np.hstack([np.asarray(i.resize(min_shape)) for i in images])
+            imgs_comb = Image.new('RGB', (page_width * len(pages_paths), page_height), 'white')
         else:
-            imgs_comb = np.vstack([np.asarray(i.resize(min_shape)) for i in images])
-
-        imgs_comb = Image.fromarray(imgs_comb)
+            imgs_comb = Image.new('RGB', (page_width, page_height * len(pages_paths)), 'white')
+        for i, page_path in enumerate(pages_paths):
+            with Image.open(page_path) as page:
+                if page.size != (page_width, page_height):
+                    page = page.resize((page_width, page_height))
+                imgs_comb.paste(page, (i * page_width, 0) if horizontal else (0, i * page_height))
+            os.remove(page_path)
+
+        if output:
+            imgs_comb.save(output, 'JPEG')
+            log_debug('Combining all pages - COMPLETED')
+            return None
         output = BytesIO()
         imgs_comb.save(output, 'JPEG')
-        demisto.debug('Combining all pages - COMPLETED')
+        log_debug('Combining all pages - COMPLETED')
 
         return output.getvalue()
 
 
 def rasterize_command():
     url = demisto.getArg('url')
+    # a url may include commas, so only the urls argument is split to a list
+    urls = ([url] if url else []) + argToList(demisto.getArg('urls'))
+    if not urls:
+        raise ValueError('Please provide a url or a list of urls to rasterize.')
     w = demisto.args().get('width', DEFAULT_W_WIDE).rstrip('px')
     h = demisto.args().get('height', DEFAULT_H).rstrip('px')
     r_type = demisto.args().get('type', 'png')
     wait_time = int(demisto.args().get('wait_time', 0))
     page_load = int(demisto.args().get('max_page_load_time', DEFAULT_PAGE_LOAD_TIME))
 
-    if not (url.startswith('http')):
-        url = f'http://{url}'
-    filename = f'url.{"pdf" if r_type == "pdf" else "png"}'  # type: ignore
-
-    output = rasterize(path=url, r_type=r_type, width=w, height=h, wait_time=wait_time, max_page_load_time=page_load)
-    res = fileResult(filename=filename, data=output)
-    if r_type == 'png':
-        res['Type'] = entryTypes['image']
+    urls = [url if url.startswith('http') else f'http://{url}' for url in urls]
+    file_extension = "pdf" if r_type == "pdf" else "png"
+
+    # the urls are rendered concurrently, by the drivers of the chrome pool. the workers don't exit on errors, so
+    # the error of a url is returned only after all the urls are rendered
+    with ThreadPoolExecutor(max_workers=CHROME_POOL_SIZE) as executor:
+        outputs = list(executor.map(lambda url: try_rasterize(path=url, r_type=r_type, width=w, height=h,
+                                                              wait_time=wait_time, max_page_load_time=page_load),
+                                    urls))
+    if len(urls) == 1 and outputs[0][1]:
+        return_err_or_warn(outputs[0][1])
+    results = []
+    for i, (output, error) in enumerate(outputs):
+        if error:
+            results.append(err_or_warn_entry(f'Failed rasterizing {urls[i]}: {error}'))
+            continue
+        filename = f'url.{file_extension}' if len(urls) == 1 else f'url_{i + 1}.{file_extension}'
+        res = fileResult(filename=filename, data=output)
+        if r_type == 'png':
+            res['Type'] = entryTypes['image']
+        results.append(res)
 
-    demisto.results(res)
+    demisto.results(results[0] if len(results) == 1 else results)
 
 
 def rasterize_image_command():
@@ -350,13 +649,156 @@ def rasterize_pdf_command():
 
     filename = 'image.jpeg'  # type: ignore
 
-    with open(file_path, 'rb') as f:
-        output = convert_pdf_to_jpeg(path=os.path.realpath(f.name), max_pages=max_pages, password=password,
-                                     horizontal=horizontal)
-        res = fileResult(filename=filename, data=output)
-        res['Type'] = entryTypes['image']
+    # the image is encoded straight into the file of the entry, as fileResult would write it
+    file_id = demisto.uniqueFile()
+    with open(f'{demisto.investigation()["id"]}_{file_id}', 'wb') as output:
+        convert_pdf_to_jpeg(path=os.path.realpath(file_path), max_pages=max_pages, password=password,
+                            horizontal=horizontal, output=output)
+    demisto.results({'Contents': '', 'ContentsFormat': formats['text'], 'Type': entryTypes['image'], 'File': filename,
+                     'FileID': file_id})
 
-        demisto.results(res)
+
+def validate_basic_authentication(authorization: str, username: str, password: str) -> bool:
+    """
+    Checks whether the basic authentication of a request is valid.
+    :param authorization: The Authorization header of the http request
+    :param username: The integration's username
+    :param password: The integration's password
+    :return: Boolean which indicates whether the authentication is valid or not
+    """
+    if not authorization.startswith('Basic '):
+        return False
+    try:
+        credentials = base64.b64decode(authorization[len('Basic '):]).decode('utf-8')
+    except ValueError:
+        return False
+    user, sep, pwd = credentials.partition(':')
+    return bool(sep) and user == username and pwd == password
+
+
+class RasterizeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Renders the url of a GET request by the chrome pool, with the arguments of the rasterize command:
+    GET /?url=https://example.com&width=1024&height=800&type=png
+    The requests must use basic authentication with the username and password.
+    """
+
+    def __init__(self, *args, username: str = '', password: str = '', **kwargs):
+        self.username = username
+        self.password = password
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if not validate_basic_authentication(self.headers.get('Authorization', ''), self.username, self.password):
+            log_debug('Basic authentication failed. Make sure you are using the right credentials.')
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Basic realm="Rasterize"')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        args = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        url = args.get('url', '')
+        r_type = args.get('type', 'png').lower()
+        # local files of the integration are not served
+        if urlparse(url).scheme not in ('http', 'https') or r_type not in ('png', 'pdf'):
+            self.send_error(400, 'url must be an http(s) url, and type must be png or pdf')
+            return
+        try:
+            page_load_time = int(args.get('max_page_load_time', 0)) or DEFAULT_PAGE_LOAD_TIME
+            with get_chrome_pool().driver() as driver, new_browser_context(driver) as page_driver:
+                output = render(page_driver, url, args.get('width', DEFAULT_W_WIDE).rstrip('px'),
+                                args.get('height', DEFAULT_H).rstrip('px'), r_type, int(args.get('wait_time', 0)),
+                                page_load_time)
+        except (InvalidArgumentException, NoSuchElementException, TimeoutException) as ex:
+            self.send_error(502, f'{URL_ERROR_MSG}{ex}')
+            return
+        except EmptyResponseError as ex:
+            self.send_error(502, str(ex))
+            return
+        except BaseException as ex:  # the errors of the page are returned, and don't stop the server
+            log_error(f'Failed rasterizing {url}: {ex}\nTrace:{traceback.format_exc()}')
+            self.send_error(500, f'Failed rasterizing the url: {ex}')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf' if r_type == 'pdf' else 'image/png')
+        self.send_header('Content-Length', str(len(output)))
+        self.end_headers()
+        self.wfile.write(output)
+
+    def log_message(self, format, *args):
+        log_debug(f'{self.address_string()} - {format % args}')
+
+
+def get_params_port(params: dict = demisto.params()) -> int:
+    """
+    Gets port from the integration parameters
+    """
+    port_mapping: str = params.get('longRunningPort', '')
+    if not port_mapping:
+        raise ValueError('Please provide a Listen Port.')
+    try:
+        return int(port_mapping.split(':')[-1])
+    except ValueError:
+        raise ValueError(f'Listen Port must be an integer. {port_mapping} is not valid.')
+
+
+def run_long_running(params: dict, server_ready: Optional[threading.Event] = None):
+    """
+    Keeps the drivers of the chrome pool running, and renders the urls of requests by them on the listen port.
+    The requests must use basic authentication with the credentials, and the server uses HTTPS when the
+    certificate and private key are set
+    """
+    port = get_params_port(params)
+    credentials = params.get('credentials') or {}
+    username: str = credentials.get('identifier', '')
+    password: str = credentials.get('password', '')
+    if not username or not password:
+        raise DemistoException('Please provide a username and password, which the requests to the long running '
+                               'instance must use.')
+    certificate: str = params.get('certificate', '')
+    private_key: str = params.get('key', '')
+    if (certificate and not private_key) or (private_key and not certificate):
+        raise DemistoException('If using HTTPS connection, both certificate and private key should be provided.')
+
+    certificate_path = ''
+    private_key_path = ''
+    try:
+        context = None
+        if certificate and private_key:
+            certificate_file = tempfile.NamedTemporaryFile(delete=False)
+            certificate_path = certificate_file.name
+            certificate_file.write(bytes(certificate, 'utf-8'))
+            certificate_file.close()
+
+            private_key_file = tempfile.NamedTemporaryFile(delete=False)
+            private_key_path = private_key_file.name
+            private_key_file.write(bytes(private_key, 'utf-8'))
+            private_key_file.close()
+            context = SSLContext(PROTOCOL_TLSv1_2)
+            context.load_cert_chain(certificate_path, private_key_path)
+
+        pool = get_chrome_pool()
+        # the drivers are started in advance, so the first requests don't wait for them
+        pool.start()
+        handler = partial(RasterizeRequestHandler, username=username, password=password)
+        with ThreadingHTTPServer(('0.0.0.0', port), handler) as server:
+            if context:
+                # the TLS handshake is done by the thread of the request, so a slow client doesn't block the server
+                server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+            log_debug(f'Rasterize {"HTTPS" if context else "HTTP"} server is listening on port {port}, '
+                      f'with {pool.size} chrome drivers')
+            if server_ready:
+                server_ready.set()
+            server.serve_forever()
+    except SSLError as e:
+        ssl_err_message = f'Failed to validate certificate and/or private key: {str(e)}'
+        log_error(ssl_err_message)
+        raise ValueError(ssl_err_message)
+    finally:
+        if certificate_path:
+            os.unlink(certificate_path)
+        if private_key_path:
+            os.unlink(private_key_path)
 
 
 def module_test():
@@ -392,6 +834,9 @@ def main():
         elif demisto.command() == 'rasterize':
             rasterize_command()
 
+        elif demisto.command() == 'long-running-execution':
+            run_long_running(demisto.params())
+
         else:
             return_error('Unrecognized command')
 
@@ -399,9 +844,9 @@ def main():
         return_err_or_warn(f'Unexpected exception: {ex}\nTrace:{traceback.format_exc()}')
     finally:
         if is_debug_mode():
-            demisto.debug(f'os.environ: {os.environ}')
+            log_debug(f'os.environ: {os.environ}')
             with open(DRIVER_LOG, 'r') as log:
-                demisto.debug('Driver log:' + log.read())
+                log_debug('Driver log:' + log.read())
 
 
 if __name__ in ["__builtin__", "builtins", '__main__']:
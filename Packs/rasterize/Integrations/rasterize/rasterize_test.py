@@ -1,7 +1,11 @@
-from rasterize import rasterize, find_zombie_processes, merge_options, DEFAULT_CHROME_OPTIONS, rasterize_image_command
+from rasterize import rasterize, find_zombie_processes, merge_options, DEFAULT_CHROME_OPTIONS, rasterize_image_command, \
+    ChromePool, get_chrome_pool, new_browser_context, wait_for_page_ready, run_long_running, convert_pdf_to_jpeg, \
+    get_pdf_page_shape, rasterize_command, validate_basic_authentication
+import rasterize as rasterize_module
 import demistomock as demisto
 from CommonServerPython import entryTypes
-from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 import subprocess
 import os
 import logging
@@ -9,6 +13,9 @@ import http.server
 import time
 import threading
 import pytest
+import requests
+from io import BytesIO
+from PIL import Image
 
 # disable warning from urllib3. these are emitted when python driver can't connect to chrome yet
 logging.getLogger("urllib3").setLevel(logging.ERROR)
@@ -172,3 +179,379 @@ def test_rasterize_image_to_pdf(mocker):
     results = demisto.results.call_args[0]
     assert len(results) == 1
     assert results[0]['Type'] == entryTypes['entryInfoFile']
+
+
+def test_chrome_pool(mocker):
+    """
+    Given
+    - A chrome pool of 2 drivers
+    When
+    - Rendering 6 pages concurrently, where one of them fails the driver
+    Then
+    - Ensure no more than 2 drivers render at once, and the drivers are reused
+    - Ensure the failed driver is quit, and replaced by a new one
+    """
+    drivers = []
+    mocker.patch.object(rasterize_module, 'init_driver', side_effect=lambda: drivers.append(object()) or drivers[-1])
+    quit_driver = mocker.patch.object(rasterize_module, 'quit_driver_and_reap_children')
+    pool = ChromePool(2)
+    rendering = set()
+    max_rendering = []
+
+    def render_page(page):
+        with pool.driver() as driver:
+            rendering.add(driver)
+            max_rendering.append(len(rendering))
+            time.sleep(0.05)
+            rendering.remove(driver)
+            if page == 2:
+                raise ValueError('driver failed')
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [executor.submit(render_page, page) for page in range(6)]
+    assert [type(future.exception()) for future in futures].count(ValueError) == 1
+    assert max(max_rendering) == 2
+    assert len(drivers) == 3
+    assert quit_driver.call_count == 1
+    pool.close()
+    assert quit_driver.call_count == 3
+
+
+def test_wait_for_page_ready(mocker):
+    """
+    Given
+    - A page which loads resources for 0.5 seconds after it is loaded
+    When
+    - Waiting for the page to be ready, for 10 seconds at most
+    Then
+    - Ensure the wait ends once no resource was loaded in the last NETWORK_IDLE_TIME seconds
+    """
+    start = time.monotonic()
+    driver = mocker.Mock()
+    driver.execute_script.side_effect = lambda script: ['complete', int(min(time.monotonic() - start, 0.5) * 10)]
+    wait_for_page_ready(driver, 10)
+    assert 1 <= time.monotonic() - start < 2
+
+
+def test_rasterize_pool_reuses_drivers(mocker):
+    """
+    Given
+    - The chrome pool of the process
+    When
+    - Rasterizing pages one after the other
+    Then
+    - Ensure all the pages are rendered by a single driver
+    """
+    init_driver = mocker.spy(rasterize_module, 'init_driver')
+    get_chrome_pool().close()
+    path = os.path.realpath('test_data/large.html')
+    for _ in range(3):
+        assert rasterize(path=f'file://{path}', width=250, height=250, r_type='png')
+    assert init_driver.call_count == 1
+
+
+@pytest.fixture
+def http_cookie_server():
+    # Simple http handler which returns the cookies of the request, and sets a cookie
+    class CookieHandler(http.server.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = f'<html><body><p id="cookie">{self.headers.get("Cookie", "")}</p></body></html>'.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html')
+            self.send_header('Set-Cookie', 'session=1')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with http.server.ThreadingHTTPServer(('', 10889), CookieHandler) as server:
+        server_thread = threading.Thread(target=server.serve_forever)
+        server_thread.start()
+        yield 'http://localhost:10889'
+        server.shutdown()
+        server_thread.join()
+
+
+def test_new_browser_context_isolation(http_cookie_server):
+    """
+    Given
+    - A driver which rendered a page that set a cookie
+    When
+    - Rendering the page again in a new browser context of the same driver
+    Then
+    - Ensure the page doesn't get the cookie of the previous context
+    """
+    with get_chrome_pool().driver() as driver:
+        for _ in range(2):
+            with new_browser_context(driver) as page_driver:
+                page_driver.get(http_cookie_server)
+                assert page_driver.find_element_by_id('cookie').text == ''
+                page_driver.get(http_cookie_server)
+                assert page_driver.find_element_by_id('cookie').text == 'session=1'
+
+
+@pytest.mark.benchmark
+def test_rasterize_benchmark(mocker):
+    """
+    Given
+    - 40 local HTML files, and a warm chrome pool of 4 drivers
+    When
+    - Rasterizing all the files concurrently, offline
+    Then
+    - Ensure all the files are rendered by the 4 drivers, much faster than starting a driver per file
+    """
+    mocker.patch.object(rasterize_module, 'CHROME_POOL_SIZE', 4)
+    pool = get_chrome_pool()
+    pool.start()
+    init_driver = mocker.spy(rasterize_module, 'init_driver')
+    with TemporaryDirectory() as html_dir:
+        paths = []
+        for i in range(40):
+            paths.append(os.path.join(html_dir, f'{i}.html'))
+            with open(paths[-1], 'w') as f:
+                f.write(f'<html><body><h1>Page {i}</h1>{"<p>paragraph</p>" * 200}</body></html>')
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            images = list(executor.map(lambda path: rasterize(path=f'file://{path}', width=600, height=800,
+                                                              offline_mode=True), paths))
+        duration = time.time() - start
+
+    assert all(image.startswith(b'\x89PNG') for image in images)
+    assert init_driver.call_count == 0
+    # without the pool, a driver is started and quit for every file
+    assert duration < 20
+
+
+def test_run_long_running(http_cookie_server):
+    """
+    Given
+    - A long running instance with a listen port and credentials
+    When
+    - Requesting to render urls
+    Then
+    - Ensure http urls are rendered only with the credentials, and local files are not
+    """
+    server_ready = threading.Event()
+    params = {'longRunningPort': '10890', 'credentials': {'identifier': 'user', 'password': 'pass'}}
+    threading.Thread(target=run_long_running, args=(params, server_ready), daemon=True).start()
+    assert server_ready.wait(60)
+
+    assert requests.get('http://localhost:10890', params={'url': http_cookie_server}).status_code == 401
+    assert requests.get('http://localhost:10890', params={'url': http_cookie_server},
+                        auth=('user', 'wrong')).status_code == 401
+
+    res = requests.get('http://localhost:10890', params={'url': http_cookie_server, 'width': '250px'},
+                       auth=('user', 'pass'))
+    assert res.status_code == 200
+    assert res.headers['Content-Type'] == 'image/png'
+    assert res.content.startswith(b'\x89PNG')
+
+    path = os.path.realpath('test_data/large.html')
+    assert requests.get('http://localhost:10890', params={'url': f'file://{path}'},
+                        auth=('user', 'pass')).status_code == 400
+
+
+@pytest.mark.parametrize('authorization, expected', [
+    ('Basic dXNlcjpwYXNz', True),  # user:pass
+    ('Basic dXNlcjpwYXNzOg==', False),  # user:pass:
+    ('Basic dXNlcg==', False),  # user
+    ('Basic not base64', False),
+    ('Bearer dXNlcjpwYXNz', False),
+    ('', False),
+])
+def test_validate_basic_authentication(authorization, expected):
+    assert validate_basic_authentication(authorization, 'user', 'pass') == expected
+
+
+def test_run_long_running_partial_credentials():
+    """
+    Given
+    - A long running instance with a username and without a password
+    When
+    - Running the long running instance
+    Then
+    - Ensure an error is raised, before the server is started
+    """
+    params = {'longRunningPort': '10891', 'credentials': {'identifier': 'user', 'password': ''}}
+    with pytest.raises(Exception, match='provide a username and password'):
+        run_long_running(params)
+
+
+def test_run_long_running_without_credentials():
+    """
+    Given
+    - A long running instance without credentials
+    When
+    - Running the long running instance
+    Then
+    - Ensure an error is raised, as the server doesn't accept unauthenticated requests
+    """
+    with pytest.raises(Exception, match='provide a username and password'):
+        run_long_running({'longRunningPort': '10891'})
+
+
+def test_run_long_running_partial_certificate():
+    """
+    Given
+    - A long running instance with a certificate and without a private key
+    When
+    - Running the long running instance
+    Then
+    - Ensure an error is raised, before the server is started
+    """
+    params = {'longRunningPort': '10891', 'credentials': {'identifier': 'user', 'password': 'pass'},
+              'certificate': 'cert'}
+    with pytest.raises(Exception, match='both certificate and private key'):
+        run_long_running(params)
+
+
+@pytest.mark.parametrize('args, expected_urls', [
+    ({'url': 'https://example.com/?a=1,2'}, ['https://example.com/?a=1,2']),
+    ({'urls': 'https://example.com/a,example.com/b'}, ['https://example.com/a', 'http://example.com/b']),
+    ({'url': 'https://example.com/a', 'urls': ['https://example.com/b']},
+     ['https://example.com/a', 'https://example.com/b']),
+])
+def test_rasterize_command_urls(mocker, args, expected_urls):
+    """
+    Given
+    - A url which includes a comma, and a list of urls
+    When
+    - Running the rasterize command
+    Then
+    - Ensure the url is rendered as is, and every url of the list is rendered
+    """
+    mocker.patch.object(demisto, 'args', return_value=args)
+    mocker.patch.object(demisto, 'getArg', side_effect=args.get)
+    rasterize_mock = mocker.patch.object(rasterize_module, 'try_rasterize', return_value=(b'\x89PNG', None))
+    mocker.patch.object(rasterize_module, 'fileResult', side_effect=lambda filename, data: {'File': filename})
+    results_mock = mocker.patch.object(demisto, 'results')
+
+    rasterize_command()
+
+    assert [call[1]['path'] for call in rasterize_mock.call_args_list] == expected_urls
+    results = results_mock.call_args[0][0]
+    assert len(results) == len(expected_urls) if isinstance(results, list) else len(expected_urls) == 1
+
+
+def test_rasterize_command_url_error(mocker):
+    """
+    Given
+    - A list of urls, one of which fails rendering
+    When
+    - Running the rasterize command
+    Then
+    - Ensure the images of the other urls are returned, along with an error entry of the failed url
+    """
+    args = {'urls': 'https://example.com/a,https://example.com/b,https://example.com/c'}
+    mocker.patch.object(demisto, 'args', return_value=args)
+    mocker.patch.object(demisto, 'getArg', side_effect=args.get)
+    mocker.patch.object(rasterize_module, 'try_rasterize', side_effect=lambda path, **kwargs: (
+        (None, 'Timeout exception') if path.endswith('/b') else (b'\x89PNG', None)))
+    mocker.patch.object(rasterize_module, 'fileResult', side_effect=lambda filename, data: {'File': filename})
+    results_mock = mocker.patch.object(demisto, 'results')
+
+    rasterize_command()
+
+    results = results_mock.call_args[0][0]
+    assert [res.get('File') for res in results] == ['url_1.png', None, 'url_3.png']
+    assert results[1]['Type'] in (entryTypes['error'], entryTypes['warning'])
+    assert 'https://example.com/b: Timeout exception' in results[1]['Contents']
+
+
+def test_rasterize_command_single_url_error(mocker):
+    """
+    Given
+    - A single url, which fails rendering
+    When
+    - Running the rasterize command
+    Then
+    - Ensure the error of the url is returned
+    """
+    args = {'url': 'https://example.com'}
+    mocker.patch.object(demisto, 'args', return_value=args)
+    mocker.patch.object(demisto, 'getArg', side_effect=args.get)
+    mocker.patch.object(rasterize_module, 'try_rasterize', return_value=(None, 'Timeout exception'))
+    return_err_or_warn = mocker.patch.object(rasterize_module, 'return_err_or_warn', side_effect=SystemExit)
+
+    with pytest.raises(SystemExit):
+        rasterize_command()
+
+    return_err_or_warn.assert_called_once_with('Timeout exception')
+
+
+def create_pdf(path, pages_sizes):
+    """Creates a PDF file of pages of the given sizes in points, each page with its number"""
+    pages = []
+    for i, size in enumerate(pages_sizes):
+        page = Image.new('RGB', size, 'white')
+        page.paste((i * 5 % 256, 0, 0), (0, 0, size[0] // 4, size[1] // 4))
+        pages.append(page)
+    pages[0].save(path, 'PDF', resolution=72, save_all=True, append_images=pages[1:])
+
+
+@pytest.mark.parametrize('pages_sizes, horizontal, expected_shape', [
+    ([(612, 792), (595, 842)], False, (1700, 2200)),  # the smallest page, at 200 DPI
+    ([(612, 792)] * 50, False, (879, 1137)),  # scaled to the max pixels
+    ([(612, 792)] * 20, True, (1389, 1798)),
+    ([(100, 300)] * 100, False, (218, 655)),  # scaled to the max height of a jpeg image
+])
+def test_get_pdf_page_shape(pages_sizes, horizontal, expected_shape):
+    assert get_pdf_page_shape(pages_sizes, horizontal) == expected_shape
+
+
+def test_convert_pdf_to_jpeg(mocker):
+    """
+    Given
+    - A PDF file of 3 pages of different sizes
+    When
+    - Converting the first 2 pages to an image
+    Then
+    - Ensure the pages are rendered in parallel at the size of the smallest page, and are stacked in the image
+    """
+    def convert_from_path(pdf_path, output_folder, first_page, last_page, size, **kwargs):
+        # renders the pages as pdftoppm does, the first page in red
+        paths = []
+        for page in range(first_page, last_page + 1):
+            paths.append(os.path.join(output_folder, f'{kwargs["output_file"]}-{page}.jpg'))
+            Image.new('RGB', size, 'red' if page == 1 else 'white').save(paths[-1], 'JPEG')
+        return paths
+
+    convert_from_path_mock = mocker.patch('rasterize.convert_from_path', side_effect=convert_from_path)
+    with TemporaryDirectory() as pdf_dir:
+        path = os.path.join(pdf_dir, 'test.pdf')
+        create_pdf(path, [(612, 792), (595, 842), (300, 300)])
+        output = BytesIO()
+        assert convert_pdf_to_jpeg(path, max_pages=2, password=None, output=output) is None
+
+    assert convert_from_path_mock.call_args[1]['size'] == (1700, 2200)
+    assert convert_from_path_mock.call_args[1]['thread_count'] == 2
+    assert convert_from_path_mock.call_args[1]['last_page'] == 2
+    image = Image.open(BytesIO(output.getvalue()))
+    assert image.size == (1700, 2200 * 2)
+    assert image.getpixel((800, 1000))[0] > 200 > image.getpixel((800, 1000))[1]
+    assert min(image.getpixel((800, 3000))) > 200
+
+
+@pytest.mark.benchmark
+def test_convert_pdf_to_jpeg_benchmark():
+    """
+    Given
+    - A PDF file of 50 letter pages
+    When
+    - Converting all the pages to an image
+    Then
+    - Ensure the image of all the pages is scaled to the max pixels, and is converted in a few seconds
+    """
+    with TemporaryDirectory() as pdf_dir:
+        path = os.path.join(pdf_dir, 'test.pdf')
+        create_pdf(path, [(612, 792)] * 50)
+        start = time.time()
+        output = convert_pdf_to_jpeg(path, max_pages=50, password=None)
+        duration = time.time() - start
+
+    assert Image.open(BytesIO(output)).size == (879, 1137 * 50)
+    assert duration < 30
@@ -5,7 +5,7 @@ import os
 import random
 from unittest.mock import mock_open
 from Tests.Marketplace.marketplace_services import Pack, Metadata, input_to_list, get_valid_bool, convert_price, \
-    get_higher_server_version, GCPConfig
+    get_higher_server_version, GCPConfig, ModifiedPacksCache
 
 
 @pytest.fixture(scope="module")
@@ -883,3 +883,85 @@ class TestSetDependencies:
         p.set_pack_dependencies(metadata, generated_dependencies)
 
         assert metadata['dependencies'] == dependencies
+
+
+class TestContentHash:
+    @staticmethod
+    def create_pack_folder(pack_path, changelog='{}'):
+        os.makedirs(os.path.join(pack_path, 'Integrations'))
+        with open(os.path.join(pack_path, 'Integrations', 'integration-Test.yml'), 'w') as integration_file:
+            integration_file.write('name: Test')
+        with open(os.path.join(pack_path, Pack.CHANGELOG_JSON), 'w') as changelog_file:
+            changelog_file.write(changelog)
+
+    def test_calculate_content_hash(self, tmp_path):
+        """
+           Given:
+               - Two folders of the same pack content, with a different changelog.json
+           When:
+               - Calculating the content hash of the packs, and then changing an integration of one of them
+           Then:
+               - Ensure the content hash is the same, and changes once the integration changed
+       """
+        first_pack_path, second_pack_path = str(tmp_path / 'first' / 'Test'), str(tmp_path / 'second' / 'Test')
+        self.create_pack_folder(first_pack_path)
+        self.create_pack_folder(second_pack_path, changelog='{"1.0.0": {}}')
+        first_pack, second_pack = Pack('Test', first_pack_path), Pack('Test', second_pack_path)
+
+        assert first_pack.calculate_content_hash()[0]
+        assert second_pack.calculate_content_hash() == (True, first_pack.content_hash)
+
+        with open(os.path.join(second_pack_path, 'Integrations', 'integration-Test.yml'), 'a') as integration_file:
+            integration_file.write('\ndescription: Test')
+        assert second_pack.calculate_content_hash()[1] != first_pack.content_hash
+
+    @pytest.mark.parametrize('blob_metadata, expected_result', [
+        ({Pack.CONTENT_HASH_METADATA_KEY: 'content_hash'}, True),
+        ({Pack.CONTENT_HASH_METADATA_KEY: 'other_content_hash'}, False),
+        (None, False)
+    ])
+    def test_is_uploaded_with_same_content(self, mocker, blob_metadata, expected_result):
+        """
+           Given:
+               - A pack zip blob in storage with the given metadata
+           When:
+               - Checking whether the pack was uploaded with the same content
+           Then:
+               - Ensure the pack is uploaded with the same content only when the content hash matches
+       """
+        dummy_storage_bucket = mocker.MagicMock()
+        dummy_storage_bucket.get_blob.return_value.metadata = blob_metadata
+        pack = Pack('Test', 'dummy_path')
+        pack._content_hash = 'content_hash'
+
+        assert pack.is_uploaded_with_same_content('1.0.0', dummy_storage_bucket) == expected_result
+        dummy_storage_bucket.get_blob.assert_called_once_with(
+            os.path.join(GCPConfig.STORAGE_BASE_PATH, 'Test', '1.0.0', 'Test.zip'))
+
+
+class TestModifiedPacksCache:
+    def test_get_modified_packs(self, mocker):
+        """
+           Given:
+               - A diff with modified files in 2 packs and a modified file outside of the packs folder
+           When:
+               - Detecting modified files of 3 packs that were uploaded at the same previous commit
+           Then:
+               - Ensure the diff is done once, and only the packs with modified files are detected
+       """
+        modified_paths = ['Packs/First/pack_metadata.json', 'Packs/Second/Integrations/Second.py', 'Tests/conf.json']
+        modified_files = [mocker.MagicMock(a_path=path) for path in modified_paths]
+        content_repo = mocker.MagicMock()
+        diff = content_repo.commit.return_value.diff
+        diff.return_value.iter_change_type.return_value = modified_files
+        mocker.patch('builtins.open', mock_open(read_data='{"commit": "previous_commit"}'))
+        mocker.patch('os.path.exists', return_value=True)
+        modified_packs_cache = ModifiedPacksCache(content_repo, 'current_commit')
+
+        results = [Pack(pack_name, 'dummy_path').detect_modified(content_repo, 'dummy_index_path', 'current_commit',
+                                                                 'remote_previous_commit', modified_packs_cache)
+                   for pack_name in ['First', 'Second', 'Third']]
+
+        assert results == [(True, True), (True, True), (True, False)]
+        diff.assert_called_once()
+        assert modified_packs_cache.get_modified_packs('previous_commit') == {'First', 'Second'}
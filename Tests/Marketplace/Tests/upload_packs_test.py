@@ -547,3 +547,194 @@ class TestCleanPacks:
 
         assert not skipped_cleanup
         shutil.rmtree.assert_called_once_with(os.path.join(index_folder_path, invalid_pack))
+
+
+class LocalBlob:
+    """ Local filesystem stand-in for google.cloud.storage.blob.Blob.
+    """
+
+    def __init__(self, bucket, name, metadata=None):
+        self.bucket = bucket
+        self.name = name
+        self.metadata = metadata
+        self.cache_control = None
+
+    @property
+    def path(self):
+        import os
+        return os.path.join(self.bucket.path, self.name)
+
+    @property
+    def public_url(self):
+        return f'file://{self.path}'
+
+    def upload_from_file(self, file_obj):
+        import os
+        import shutil
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'wb') as blob_file:
+            shutil.copyfileobj(file_obj, blob_file)
+        self.bucket.blobs_metadata[self.name] = self.metadata
+
+
+class LocalStorageBucket:
+    """ Local filesystem stand-in for google.cloud.storage.bucket.Bucket, blobs are kept under the bucket path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = 'local-bucket'
+        self.blobs_metadata = {}
+
+    def blob(self, name):
+        return LocalBlob(self, name)
+
+    def get_blob(self, name):
+        import os
+        return LocalBlob(self, name, self.blobs_metadata.get(name)) if os.path.isfile(os.path.join(self.path, name)) \
+            else None
+
+    def list_blobs(self, prefix=''):
+        import os
+
+        for root, _, files in os.walk(self.path):
+            for blob_file in files:
+                name = os.path.relpath(os.path.join(root, blob_file), self.path)
+                if name.startswith(prefix):
+                    yield self.get_blob(name)
+
+
+class TestPacksUploadPipeline:
+    @staticmethod
+    def extract_packs(extract_path, packs_names, modified_packs=()):
+        """ Creates pack folders as they are extracted from the packs artifacts.
+        """
+        import os
+        from Tests.Marketplace.marketplace_services import Pack
+
+        packs = []
+        for pack_name in packs_names:
+            pack_path = os.path.join(extract_path, pack_name)
+            os.makedirs(os.path.join(pack_path, 'Integrations'))
+            with open(os.path.join(pack_path, 'Integrations', f'integration-{pack_name}.yml'), 'w') as integration:
+                integration.write(f'name: {pack_name}\n')
+                if pack_name in modified_packs:
+                    integration.write('description: modified\n')
+            with open(os.path.join(pack_path, Pack.CHANGELOG_JSON), 'w') as changelog:
+                changelog.write('{"1.0.0": {"releaseNotes": "Initial release"}}')
+            packs.append(Pack(pack_name, pack_path))
+        return packs
+
+    @pytest.fixture
+    def pipeline_env(self, mocker, monkeypatch, tmp_path):
+        """ Mocks the pack steps which need the content repo and creates a local storage bucket and index folder.
+        """
+        import json
+        import os
+        from Tests.Marketplace.marketplace_services import Pack
+
+        def format_metadata(self, commit_hash, **kwargs):
+            with open(os.path.join(self.path, Pack.METADATA), 'w') as metadata_file:
+                json.dump({'name': self.name, 'commit': commit_hash}, metadata_file)
+            return True
+
+        mocker.patch.object(Pack, 'load_user_metadata', return_value=(True, {}))
+        mocker.patch.object(Pack, 'collect_content_items', return_value=(True, {}))
+        mocker.patch.object(Pack, 'upload_integration_images', return_value=(True, []))
+        mocker.patch.object(Pack, 'upload_author_image', return_value=(True, ''))
+        mocker.patch.object(Pack, 'format_metadata', format_metadata)
+        mocker.patch.object(Pack, 'prepare_release_notes', return_value=(True, False))
+        monkeypatch.setenv('CIRCLE_BRANCH', 'master')
+        monkeypatch.setenv('CIRCLE_BUILD_NUM', '1')
+        os.mkdir(tmp_path / 'index')
+        return LocalStorageBucket(str(tmp_path / 'bucket'))
+
+    @staticmethod
+    def run_pipeline(mocker, storage_bucket, index_folder_path, packs, modified_files=(), **kwargs):
+        from Tests.Marketplace.upload_packs import PacksUploadPipeline
+
+        content_repo = mocker.MagicMock()
+        content_repo.commit.return_value.diff.return_value.iter_change_type.return_value = \
+            [mocker.MagicMock(a_path=path) for path in modified_files]
+        PacksUploadPipeline(storage_bucket=storage_bucket, index_folder_path=index_folder_path,
+                            content_repo=content_repo, current_commit_hash='current_commit',
+                            remote_previous_commit_hash='previous_commit', build_number='1', **kwargs).run(packs)
+        return content_repo
+
+    def test_skip_unchanged_packs(self, mocker, tmp_path, pipeline_env):
+        """
+           Given:
+               - 3 packs that were uploaded in a previous build
+           When:
+               - Uploading the packs again, when only the content of 1 pack was modified
+           Then:
+               - Ensure only the modified pack is zipped and uploaded again, and the git diff is done once
+        """
+        from Tests.Marketplace.marketplace_services import Pack, PackStatus, GCPConfig
+
+        packs_names = ['First', 'Second', 'Third']
+        index_folder_path = str(tmp_path / 'index')
+        packs = self.extract_packs(str(tmp_path / 'first_build'), packs_names)
+        self.run_pipeline(mocker, pipeline_env, index_folder_path, packs)
+
+        assert [pack.status for pack in packs] == [PackStatus.SUCCESS.name] * 3
+        first_zip_path = f'{GCPConfig.STORAGE_BASE_PATH}/First/1.0.0/First.zip'
+        assert pipeline_env.get_blob(first_zip_path).metadata == {
+            Pack.CONTENT_HASH_METADATA_KEY: packs[0].content_hash}
+
+        zip_pack = mocker.spy(Pack, 'zip_pack')
+        packs = self.extract_packs(str(tmp_path / 'second_build'), packs_names, modified_packs=['Second'])
+        content_repo = self.run_pipeline(mocker, pipeline_env, index_folder_path, packs,
+                                         modified_files=['Packs/Second/Integrations/Second/Second.yml'])
+
+        assert [pack.status for pack in packs] == [PackStatus.PACK_ALREADY_EXISTS.name, PackStatus.SUCCESS.name,
+                                                   PackStatus.PACK_ALREADY_EXISTS.name]
+        assert zip_pack.call_count == 1
+        content_repo.commit.return_value.diff.assert_called_once()
+        assert pipeline_env.get_blob(f'{GCPConfig.STORAGE_BASE_PATH}/Second/1.0.0/Second.zip').metadata == {
+            Pack.CONTENT_HASH_METADATA_KEY: packs[1].content_hash}
+
+    def test_stages_concurrency(self, mocker, tmp_path, pipeline_env):
+        """
+           Given:
+               - 16 packs, 8 workers and a zip stage limited to 2 packs at once
+           When:
+               - Uploading the packs
+           Then:
+               - Ensure all the packs are uploaded, no more than 2 packs are zipped at once,
+                 packs are uploaded concurrently, and packs are zipped while others are uploaded
+        """
+        import threading
+        import time
+        from Tests.Marketplace.marketplace_services import Pack, PackStatus
+
+        lock = threading.Lock()
+        active = {'zip': 0, 'upload': 0}
+        max_active = {'zip': 0, 'upload': 0, 'zip_while_upload': 0}
+
+        def run_stage(stage, func, seconds):
+            with lock:
+                active[stage] += 1
+                max_active[stage] = max(max_active[stage], active[stage])
+                max_active['zip_while_upload'] = max(max_active['zip_while_upload'], min(active.values()))
+            time.sleep(seconds)
+            with lock:
+                active[stage] -= 1
+            return func()
+
+        zip_pack = Pack.zip_pack
+        upload_to_storage = Pack.upload_to_storage
+        mocker.patch.object(Pack, 'zip_pack', lambda self, *args, **kwargs: run_stage(
+            'zip', lambda: zip_pack(self, *args, **kwargs), 0.05))
+        mocker.patch.object(Pack, 'upload_to_storage', lambda self, *args, **kwargs: run_stage(
+            'upload', lambda: upload_to_storage(self, *args, **kwargs), 0.1))
+        packs = self.extract_packs(str(tmp_path / 'build'), [f'Pack{i}' for i in range(16)])
+
+        self.run_pipeline(mocker, pipeline_env, str(tmp_path / 'index'), packs, max_workers=8,
+                          stages_concurrency={'zip': 2})
+
+        assert all(pack.status == PackStatus.SUCCESS.name for pack in packs)
+        assert max_active['zip'] == 2
+        assert max_active['upload'] > 1
+        assert max_active['zip_while_upload'] >= 1
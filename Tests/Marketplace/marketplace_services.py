@@ -11,6 +11,8 @@ from google.cloud import storage
 from google.cloud import bigquery
 import enum
 import base64
+import hashlib
+import threading
 import urllib.parse
 import warnings
 from distutils.util import strtobool
@@ -113,6 +115,7 @@ class PackStatus(enum.Enum):
     FAILED_COLLECT_ITEMS = "Failed to collect pack content items data"
     FAILED_ZIPPING_PACK_ARTIFACTS = "Failed zipping pack artifacts"
     FAILED_SIGNING_PACKS = "Failed to sign the packs"
+    FAILED_CALCULATING_CONTENT_HASH = "Failed to calculate the pack content hash"
     FAILED_PREPARING_INDEX_FOLDER = "Failed in preparing and cleaning necessary index files"
     FAILED_UPDATING_INDEX_FOLDER = "Failed updating index folder"
     FAILED_UPLOADING_PACK = "Failed in uploading pack zip to gcs"
@@ -140,6 +143,9 @@ class Pack(object):
         EXCLUDE_DIRECTORIES (list): list of directories to excluded before uploading pack zip to storage.
         AUTHOR_IMAGE_NAME (str): author image file name.
         RELEASE_NOTES (str): release notes folder name.
+        SIGNATURE_FILE (str): signature file name, created by signing the pack.
+        CONTENT_HASH_METADATA_KEY (str): pack zip blob metadata key of the pack content hash.
+        CONTENT_HASH_EXCLUDED_FILES (list): list of files that are excluded from the pack content hash.
 
     """
     PACK_INITIAL_VERSION = "1.0.0"
@@ -150,6 +156,10 @@ class Pack(object):
     AUTHOR_IMAGE_NAME = "Author_image.png"
     EXCLUDE_DIRECTORIES = [PackFolders.TEST_PLAYBOOKS.value]
     RELEASE_NOTES = "ReleaseNotes"
+    SIGNATURE_FILE = "signatures.sf"
+    CONTENT_HASH_METADATA_KEY = "content_hash"
+    # files that are regenerated in every build, and are therefore excluded from the pack content hash
+    CONTENT_HASH_EXCLUDED_FILES = [CHANGELOG_JSON, METADATA, SIGNATURE_FILE]
 
     def __init__(self, pack_name, pack_path):
         self._pack_name = pack_name
@@ -167,6 +177,7 @@ class Pack(object):
         self._is_feed = False  # a flag that specifies if pack is a feed pack
         self._downloads_count = 0  # number of pack downloads
         self._bucket_url = None  # URL of where the pack was uploaded.
+        self._content_hash = None  # initialized in calculate_content_hash function
 
     @property
     def name(self):
@@ -308,6 +319,12 @@ class Pack(object):
         """
         self._downloads_count = download_count_value
 
+    @property
+    def content_hash(self):
+        """ str: pack content hash, initialized in calculate_content_hash function.
+        """
+        return self._content_hash
+
     @property
     def bucket_url(self):
         """ str: pack bucket_url.
@@ -663,6 +680,68 @@ class Pack(object):
         finally:
             return task_status
 
+    def calculate_content_hash(self):
+        """ Calculates the pack content hash, a sha256 of the relative paths and contents of the pack files.
+        Files that are regenerated in every build (metadata, changelog and signature) are excluded, so the hash is
+        the same in every build of the same pack content. Should be called after removing the unwanted files.
+
+        Returns:
+            bool: whether the operation succeeded.
+            str: pack content hash.
+        """
+        task_status = False
+        content_hash = hashlib.sha256()
+
+        try:
+            pack_files = []
+            for root, dirs, files in os.walk(self._pack_path):
+                for pack_file in files:
+                    relative_file_path = os.path.relpath(os.path.join(root, pack_file), self._pack_path)
+                    if relative_file_path not in Pack.CONTENT_HASH_EXCLUDED_FILES:
+                        pack_files.append(relative_file_path)
+
+            for relative_file_path in sorted(pack_files):
+                content_hash.update(relative_file_path.encode('utf-8') + b'\0')
+                with open(os.path.join(self._pack_path, relative_file_path), 'rb') as pack_file:
+                    for chunk in iter(lambda: pack_file.read(1024 * 1024), b''):
+                        content_hash.update(chunk)
+                content_hash.update(b'\0')
+
+            self._content_hash = content_hash.hexdigest()
+            task_status = True
+        except Exception as e:
+            print_error(f"Failed in calculating {self._pack_name} pack content hash. Additional info:\n {e}")
+        finally:
+            return task_status, self._content_hash
+
+    def is_uploaded_with_same_content(self, latest_version, storage_bucket):
+        """ Checks whether the pack zip of the latest version in storage was uploaded with the current content hash,
+        in which case signing, zipping and uploading the pack again can be skipped.
+
+        Args:
+            latest_version (str): pack latest version.
+            storage_bucket (google.cloud.storage.bucket.Bucket): google cloud storage bucket.
+
+        Returns:
+            bool: whether the uploaded pack zip has the same content hash.
+        """
+        if not self._content_hash:
+            return False
+
+        try:
+            pack_full_path = os.path.join(GCPConfig.STORAGE_BASE_PATH, self._pack_name, latest_version,
+                                          f"{self._pack_name}.zip")
+            blob = storage_bucket.get_blob(pack_full_path)
+            uploaded_content_hash = (blob.metadata or {}).get(Pack.CONTENT_HASH_METADATA_KEY) if blob else None
+        except Exception as e:
+            print_warning(f"Failed in getting the uploaded {self._pack_name} pack content hash. Additional info:\n {e}")
+            return False
+
+        if uploaded_content_hash == self._content_hash:
+            print(f"{self._pack_name} pack content did not change since version {latest_version} was uploaded")
+            return True
+        return False
+
     def sign_pack(self, signature_string=None):
         """ Signs pack folder and creates signature file.
 
@@ -676,11 +755,16 @@ class Pack(object):
 
         try:
             if signature_string:
-                with open("keyfile", "wb") as keyfile:
+                # every pack has its own key file, as packs may be signed concurrently
+                keyfile_path = f"{self._pack_path}_keyfile"
+                with open(keyfile_path, "wb") as keyfile:
                     keyfile.write(signature_string.encode())
-                arg = f'./signDirectory {self._pack_path} keyfile base64'
-                signing_process = subprocess.Popen(arg, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-                output, err = signing_process.communicate()
+                try:
+                    arg = f'./signDirectory {self._pack_path} {keyfile_path} base64'
+                    signing_process = subprocess.Popen(arg, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+                    output, err = signing_process.communicate()
+                finally:
+                    os.remove(keyfile_path)
 
                 if err:
                     print_error(f"Failed to sign pack for {self._pack_name} - {str(err)}")
@@ -735,7 +819,8 @@ class Pack(object):
         finally:
             return task_status, zip_pack_path
 
-    def detect_modified(self, content_repo, index_folder_path, current_commit_hash, remote_previous_commit_hash):
+    def detect_modified(self, content_repo, index_folder_path, current_commit_hash, remote_previous_commit_hash,
+                        modified_packs_cache=None):
         """ Detects pack modified files.
 
         The diff is done between current commit and previous commit that was saved in metadata that was downloaded from
@@ -747,6 +832,8 @@ class Pack(object):
             index_folder_path (str): full path to downloaded index folder.
             current_commit_hash (str): last commit hash of head.
             remote_previous_commit_hash (str): previous commit of origin/master (origin/master~1)
+            modified_packs_cache (ModifiedPacksCache): modified packs cache that is shared between packs, in order to
+                diff every previous commit only once. A new cache is used if not provided.
 
         Returns:
             bool: whether the operation succeeded.
@@ -767,18 +854,13 @@ class Pack(object):
                 downloaded_metadata = json.load(metadata_file)
 
             previous_commit_hash = downloaded_metadata.get('commit', remote_previous_commit_hash)
-            # set 2 commits by hash value in order to check the modified files of the diff
-            current_commit = content_repo.commit(current_commit_hash)
-            previous_commit = content_repo.commit(previous_commit_hash)
-
-            for modified_file in current_commit.diff(previous_commit).iter_change_type('M'):
-                if modified_file.a_path.startswith(PACKS_FOLDER):
-                    modified_file_path_parts = os.path.normpath(modified_file.a_path).split(os.sep)
+            if modified_packs_cache is None:
+                modified_packs_cache = ModifiedPacksCache(content_repo, current_commit_hash)
 
-                    if modified_file_path_parts[1] and modified_file_path_parts[1] == self._pack_name:
-                        print(f"Detected modified files in {self._pack_name} pack")
-                        task_status, pack_was_modified = True, True
-                        return
+            if self._pack_name in modified_packs_cache.get_modified_packs(previous_commit_hash):
+                print(f"Detected modified files in {self._pack_name} pack")
+                task_status, pack_was_modified = True, True
+                return
 
             task_status = True
         except Exception as e:
@@ -819,6 +901,8 @@ class Pack(object):
             pack_full_path = f"{version_pack_path}/{self._pack_name}.zip"
             blob = storage_bucket.blob(pack_full_path)
             blob.cache_control = "no-cache,max-age=0"  # disabling caching for pack blob
+            if self._content_hash:
+                blob.metadata = {Pack.CONTENT_HASH_METADATA_KEY: self._content_hash}
 
             with open(zip_pack_path, "rb") as pack_zip:
                 blob.upload_from_file(pack_zip)
@@ -1480,6 +1564,53 @@ class Pack(object):
             print(f"Cleanup {self._pack_name} pack from: {self._pack_path}")
 
 
+class ModifiedPacksCache(object):
+    """ Detects the modified packs of a diff between the current commit and a previous commit. Every previous commit
+    is diffed only once, and the result is shared between all the packs (and threads) that were uploaded at it.
+
+    Args:
+        content_repo (git.repo.base.Repo): content repo object.
+        current_commit_hash (str): last commit hash of head.
+
+    """
+
+    def __init__(self, content_repo, current_commit_hash):
+        self._content_repo = content_repo
+        self._current_commit_hash = current_commit_hash
+        self._modified_packs = {}
+        # git repo objects are not thread safe, so the diffs are done one at a time
+        self._lock = threading.Lock()
+
+    def get_modified_packs(self, previous_commit_hash):
+        """ Returns the names of the packs that have modified files between the previous commit and current commit.
+
+        Args:
+            previous_commit_hash (str): previous commit hash to diff with.
+
+        Returns:
+            set: modified packs names.
+        """
+        with self._lock:
+            if previous_commit_hash not in self._modified_packs:
+                self._modified_packs[previous_commit_hash] = self._diff_modified_packs(previous_commit_hash)
+            return self._modified_packs[previous_commit_hash]
+
+    def _diff_modified_packs(self, previous_commit_hash):
+        # set 2 commits by hash value in order to check the modified files of the diff
+        current_commit = self._content_repo.commit(self._current_commit_hash)
+        previous_commit = self._content_repo.commit(previous_commit_hash)
+        modified_packs = set()
+
+        for modified_file in current_commit.diff(previous_commit).iter_change_type('M'):
+            if modified_file.a_path.startswith(PACKS_FOLDER):
+                modified_file_path_parts = os.path.normpath(modified_file.a_path).split(os.sep)
+
+                if len(modified_file_path_parts) > 1 and modified_file_path_parts[1]:
+                    modified_packs.add(modified_file_path_parts[1])
+
+        return modified_packs
+
+
 # HELPER FUNCTIONS
 
 def init_storage_client(service_account=None):
@@ -11,13 +11,25 @@ import requests
 from datetime import datetime
 from zipfile import ZipFile
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from Tests.scripts.utils.log_util import install_logging
 from Tests.Marketplace.marketplace_services import init_storage_client, init_bigquery_client, Pack, PackStatus, \
     GCPConfig, PACKS_FULL_PATH, IGNORED_FILES, PACKS_FOLDER, IGNORED_PATHS, Metadata, CONTENT_ROOT_PATH, \
-    get_packs_statistics_dataframe
+    get_packs_statistics_dataframe, ModifiedPacksCache
 from demisto_sdk.commands.common.tools import run_command, str2bool
 
+DEFAULT_PACKS_WORKERS = 8  # number of packs that go through the upload pipeline concurrently
+# maximal number of packs in every stage of the upload pipeline at once
+PACKS_STAGES_CONCURRENCY = {
+    'images': 8,  # uploading integration and author images to storage
+    'sign': os.cpu_count() or 1,
+    'zip': os.cpu_count() or 1,
+    'upload': 8,  # uploading pack zip to storage
+    'index': 1,  # reading and updating the shared index folder
+}
+
 
 def get_packs_names(target_packs):
     """Detects and returns packs names to upload.
@@ -649,6 +661,224 @@ Total number of packs: {len(packs_list)}
         add_pr_comment(pr_comment)
 
 
+class PacksUploadPipeline(object):
+    """ Takes packs through the upload steps on a pool of workers, where every stage of the pipeline has its own
+    concurrency limit. The git diff of modified packs is shared between the packs, and a pack whose content hash
+    matches the pack zip that was uploaded for its latest version is not signed, zipped or uploaded again.
+
+    Args:
+        storage_bucket (google.cloud.storage.bucket.Bucket): google cloud storage bucket.
+        index_folder_path (str): full path to downloaded index folder.
+        content_repo (git.repo.base.Repo): content repo object.
+        current_commit_hash (str): last commit hash of head.
+        remote_previous_commit_hash (str): previous commit of origin/master (origin/master~1).
+        build_number (str): CI build number.
+        packs_dependencies_mapping (dict): packs dependencies mapping.
+        packs_statistic_df (pandas.core.frame.DataFrame): packs downloads statistics table.
+        signature_key (str): Base64 encoded signature key used for signing packs.
+        override_all_packs (bool): whether to override all existing packs in storage.
+        remove_test_playbooks (bool): whether to remove test playbooks from packs.
+        max_workers (int): number of packs that go through the pipeline concurrently.
+        stages_concurrency (dict): maximal number of packs in every stage at once, overrides PACKS_STAGES_CONCURRENCY.
+
+    """
+
+    def __init__(self, storage_bucket, index_folder_path, content_repo, current_commit_hash,
+                 remote_previous_commit_hash, build_number, packs_dependencies_mapping=None, packs_statistic_df=None,
+                 signature_key=None, override_all_packs=False, remove_test_playbooks=True,
+                 max_workers=DEFAULT_PACKS_WORKERS, stages_concurrency=None):
+        self.storage_bucket = storage_bucket
+        self.index_folder_path = index_folder_path
+        self.content_repo = content_repo
+        self.current_commit_hash = current_commit_hash
+        self.remote_previous_commit_hash = remote_previous_commit_hash
+        self.build_number = build_number
+        self.packs_dependencies_mapping = packs_dependencies_mapping or {}
+        self.packs_statistic_df = packs_statistic_df
+        self.signature_key = signature_key
+        self.override_all_packs = override_all_packs
+        self.remove_test_playbooks = remove_test_playbooks
+        self.max_workers = max_workers
+        self.modified_packs_cache = ModifiedPacksCache(content_repo, current_commit_hash)
+        stages_concurrency = dict(PACKS_STAGES_CONCURRENCY, **(stages_concurrency or {}))
+        self._stages = {stage: threading.BoundedSemaphore(limit) for stage, limit in stages_concurrency.items()}
+
+    def run(self, packs_list):
+        """ Uploads the packs, the status of every pack is set on the pack object.
+
+        Args:
+            packs_list (list): list of Pack objects to upload.
+
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _ in executor.map(self.upload_pack, packs_list):
+                pass
+
+    def upload_pack(self, pack):
+        """ Takes a pack through all the upload steps, and sets its status.
+
+        Args:
+            pack (Pack): pack to upload.
+
+        """
+        task_status, user_metadata = pack.load_user_metadata()
+        if not task_status:
+            pack.status = PackStatus.FAILED_LOADING_USER_METADATA.value
+            pack.cleanup()
+            return
+
+        task_status, pack_content_items = pack.collect_content_items()
+        if not task_status:
+            pack.status = PackStatus.FAILED_COLLECT_ITEMS.name
+            pack.cleanup()
+            return
+
+        with self._stages['images']:
+            task_status, integration_images = pack.upload_integration_images(self.storage_bucket)
+        if not task_status:
+            pack.status = PackStatus.FAILED_IMAGES_UPLOAD.name
+            pack.cleanup()
+            return
+
+        with self._stages['images']:
+            task_status, author_image = pack.upload_author_image(self.storage_bucket)
+        if not task_status:
+            pack.status = PackStatus.FAILED_AUTHOR_IMAGE_UPLOAD.name
+            pack.cleanup()
+            return
+
+        # the dependencies metadata is read from the index folder, which other packs update
+        with self._stages['index']:
+            task_status = pack.format_metadata(user_metadata=user_metadata, pack_content_items=pack_content_items,
+                                               integration_images=integration_images, author_image=author_image,
+                                               index_folder_path=self.index_folder_path,
+                                               packs_dependencies_mapping=self.packs_dependencies_mapping,
+                                               build_number=self.build_number, commit_hash=self.current_commit_hash,
+                                               packs_statistic_df=self.packs_statistic_df)
+        if not task_status:
+            pack.status = PackStatus.FAILED_METADATA_PARSING.name
+            pack.cleanup()
+            return
+
+        task_status, not_updated_build = pack.prepare_release_notes(self.index_folder_path, self.build_number)
+        if not task_status:
+            pack.status = PackStatus.FAILED_RELEASE_NOTES.name
+            pack.cleanup()
+            return
+
+        if not_updated_build:
+            pack.status = PackStatus.PACK_IS_NOT_UPDATED_IN_RUNNING_BUILD.name
+            pack.cleanup()
+            return
+
+        task_status = pack.remove_unwanted_files(self.remove_test_playbooks)
+        if not task_status:
+            pack.status = PackStatus.FAILED_REMOVING_PACK_SKIPPED_FOLDERS
+            pack.cleanup()
+            return
+
+        task_status, _ = pack.calculate_content_hash()
+        if not task_status:
+            pack.status = PackStatus.FAILED_CALCULATING_CONTENT_HASH.name
+            pack.cleanup()
+            return
+
+        with self._stages['upload']:
+            same_content_uploaded = not self.override_all_packs and \
+                pack.is_uploaded_with_same_content(pack.latest_version, self.storage_bucket)
+
+        if same_content_uploaded:
+            skipped_pack_uploading = True
+        else:
+            task_status, skipped_pack_uploading = self._sign_zip_and_upload_pack(pack)
+            if not task_status:
+                return
+
+        task_status, exists_in_index = pack.check_if_exists_in_index(self.index_folder_path)
+        if not task_status:
+            pack.status = PackStatus.FAILED_SEARCHING_PACK_IN_INDEX.name
+            pack.cleanup()
+            return
+
+        # in case that pack already exist at cloud storage path and in index, skipped further steps
+        if skipped_pack_uploading and exists_in_index:
+            pack.status = PackStatus.PACK_ALREADY_EXISTS.name
+            pack.cleanup()
+            return
+
+        task_status = pack.prepare_for_index_upload()
+        if not task_status:
+            pack.status = PackStatus.FAILED_PREPARING_INDEX_FOLDER.name
+            pack.cleanup()
+            return
+
+        with self._stages['index']:
+            task_status = update_index_folder(index_folder_path=self.index_folder_path, pack_name=pack.name,
+                                              pack_path=pack.path, pack_version=pack.latest_version,
+                                              hidden_pack=pack.hidden)
+        if not task_status:
+            pack.status = PackStatus.FAILED_UPDATING_INDEX_FOLDER.name
+            pack.cleanup()
+            return
+
+        pack.status = PackStatus.SUCCESS.name
+
+    def _sign_zip_and_upload_pack(self, pack):
+        """ Signs, zips and uploads the pack to storage, sets the pack status in case of a failure.
+
+        Args:
+            pack (Pack): pack to upload.
+
+        Returns:
+            bool: whether the operation succeeded.
+            bool: True in case of pack existence at targeted path and upload was skipped, otherwise returned False.
+
+        """
+        with self._stages['sign']:
+            task_status = pack.sign_pack(self.signature_key)
+        if not task_status:
+            pack.status = PackStatus.FAILED_SIGNING_PACKS.name
+            pack.cleanup()
+            return False, False
+
+        with self._stages['zip']:
+            task_status, zip_pack_path = pack.zip_pack()
+        if not task_status:
+            pack.status = PackStatus.FAILED_ZIPPING_PACK_ARTIFACTS.name
+            pack.cleanup()
+            return False, False
+
+        task_status, pack_was_modified = pack.detect_modified(self.content_repo, self.index_folder_path,
+                                                              self.current_commit_hash,
+                                                              self.remote_previous_commit_hash,
+                                                              self.modified_packs_cache)
+        if not task_status:
+            pack.status = PackStatus.FAILED_DETECTING_MODIFIED_FILES.name
+            pack.cleanup()
+            return False, False
+
+        with self._stages['upload']:
+            (task_status, skipped_pack_uploading, full_pack_path) = \
+                pack.upload_to_storage(zip_pack_path, pack.latest_version,
+                                       self.storage_bucket, self.override_all_packs
+                                       or pack_was_modified)
+        if full_pack_path is not None:
+            branch_name = os.environ['CIRCLE_BRANCH']
+            build_num = os.environ['CIRCLE_BUILD_NUM']
+            bucket_path = f'https://console.cloud.google.com/storage/browser/' \
+                          f'marketplace-ci-build/{branch_name}/{build_num}'
+            bucket_url = bucket_path.join(full_pack_path)
+        else:
+            bucket_url = 'Pack was not uploaded.'
+        if not task_status:
+            pack.status = PackStatus.FAILED_UPLOADING_PACK.name
+            pack.bucket_url = bucket_url
+            pack.cleanup()
+            return False, False
+
+        return True, skipped_pack_uploading
+
+
 def option_handler():
     """Validates and parses script arguments.
 
@@ -687,6 +917,8 @@ def option_handler():
                         required=False)
     parser.add_argument('-rt', '--remove_test_playbooks', type=str2bool,
                         help='Should remove test playbooks from content packs or not.', default=True)
+    parser.add_argument('-w', '--max_workers', type=int,
+                        help="Number of packs that are uploaded concurrently.", default=DEFAULT_PACKS_WORKERS)
     # disable-secrets-detection-end
     return parser.parse_args()
 
@@ -785,122 +1017,16 @@ def main():
     clean_non_existing_packs(index_folder_path, private_packs, storage_bucket)
 
     # starting iteration over packs
-    for pack in packs_list:
-        task_status, user_metadata = pack.load_user_metadata()
-        if not task_status:
-            pack.status = PackStatus.FAILED_LOADING_USER_METADATA.value
-            pack.cleanup()
-            continue
-
-        task_status, pack_content_items = pack.collect_content_items()
-        if not task_status:
-            pack.status = PackStatus.FAILED_COLLECT_ITEMS.name
-            pack.cleanup()
-            continue
-
-        task_status, integration_images = pack.upload_integration_images(storage_bucket)
-        if not task_status:
-            pack.status = PackStatus.FAILED_IMAGES_UPLOAD.name
-            pack.cleanup()
-            continue
-
-        task_status, author_image = pack.upload_author_image(storage_bucket)
-        if not task_status:
-            pack.status = PackStatus.FAILED_AUTHOR_IMAGE_UPLOAD.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.format_metadata(user_metadata=user_metadata, pack_content_items=pack_content_items,
-                                           integration_images=integration_images, author_image=author_image,
-                                           index_folder_path=index_folder_path,
-                                           packs_dependencies_mapping=packs_dependencies_mapping,
-                                           build_number=build_number, commit_hash=current_commit_hash,
-                                           packs_statistic_df=packs_statistic_df)
-        if not task_status:
-            pack.status = PackStatus.FAILED_METADATA_PARSING.name
-            pack.cleanup()
-            continue
-
-        task_status, not_updated_build = pack.prepare_release_notes(index_folder_path, build_number)
-        if not task_status:
-            pack.status = PackStatus.FAILED_RELEASE_NOTES.name
-            pack.cleanup()
-            continue
-
-        if not_updated_build:
-            pack.status = PackStatus.PACK_IS_NOT_UPDATED_IN_RUNNING_BUILD.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.remove_unwanted_files(remove_test_playbooks)
-        if not task_status:
-            pack.status = PackStatus.FAILED_REMOVING_PACK_SKIPPED_FOLDERS
-            pack.cleanup()
-            continue
-
-        task_status = pack.sign_pack(signature_key)
-        if not task_status:
-            pack.status = PackStatus.FAILED_SIGNING_PACKS.name
-            pack.cleanup()
-            continue
-
-        task_status, zip_pack_path = pack.zip_pack()
-        if not task_status:
-            pack.status = PackStatus.FAILED_ZIPPING_PACK_ARTIFACTS.name
-            pack.cleanup()
-            continue
-
-        task_status, pack_was_modified = pack.detect_modified(content_repo, index_folder_path, current_commit_hash,
-                                                              remote_previous_commit_hash)
-        if not task_status:
-            pack.status = PackStatus.FAILED_DETECTING_MODIFIED_FILES.name
-            pack.cleanup()
-            continue
-
-        (task_status, skipped_pack_uploading, full_pack_path) = \
-            pack.upload_to_storage(zip_pack_path, pack.latest_version,
-                                   storage_bucket, override_all_packs
-                                   or pack_was_modified)
-        if full_pack_path is not None:
-            branch_name = os.environ['CIRCLE_BRANCH']
-            build_num = os.environ['CIRCLE_BUILD_NUM']
-            bucket_path = f'https://console.cloud.google.com/storage/browser/' \
-                          f'marketplace-ci-build/{branch_name}/{build_num}'
-            bucket_url = bucket_path.join(full_pack_path)
-        else:
-            bucket_url = 'Pack was not uploaded.'
-        if not task_status:
-            pack.status = PackStatus.FAILED_UPLOADING_PACK.name
-            pack.bucket_url = bucket_url
-            pack.cleanup()
-            continue
-
-        task_status, exists_in_index = pack.check_if_exists_in_index(index_folder_path)
-        if not task_status:
-            pack.status = PackStatus.FAILED_SEARCHING_PACK_IN_INDEX.name
-            pack.cleanup()
-            continue
-
-        # in case that pack already exist at cloud storage path and in index, skipped further steps
-        if skipped_pack_uploading and exists_in_index:
-            pack.status = PackStatus.PACK_ALREADY_EXISTS.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.prepare_for_index_upload()
-        if not task_status:
-            pack.status = PackStatus.FAILED_PREPARING_INDEX_FOLDER.name
-            pack.cleanup()
-            continue
-
-        task_status = update_index_folder(index_folder_path=index_folder_path, pack_name=pack.name, pack_path=pack.path,
-                                          pack_version=pack.latest_version, hidden_pack=pack.hidden)
-        if not task_status:
-            pack.status = PackStatus.FAILED_UPDATING_INDEX_FOLDER.name
-            pack.cleanup()
-            continue
-
-        pack.status = PackStatus.SUCCESS.name
+    packs_upload_pipeline = PacksUploadPipeline(storage_bucket=storage_bucket, index_folder_path=index_folder_path,
+                                                content_repo=content_repo, current_commit_hash=current_commit_hash,
+                                                remote_previous_commit_hash=remote_previous_commit_hash,
+                                                build_number=build_number,
+                                                packs_dependencies_mapping=packs_dependencies_mapping,
+                                                packs_statistic_df=packs_statistic_df, signature_key=signature_key,
+                                                override_all_packs=override_all_packs,
+                                                remove_test_playbooks=remove_test_playbooks,
+                                                max_workers=option.max_workers)
+    packs_upload_pipeline.run(packs_list)
 
     # upload core packs json to bucket
     upload_core_packs_config(storage_bucket, build_number, index_folder_path)
@@ -958,7 +958,7 @@ def createIndicators(indicators_batch):
     return ""
 
 
-def searchIndicators(fromDate='', query='', size=100, page=0, toDate='', value=''):
+def searchIndicators(fromDate='', query='', size=100, page=0, toDate='', value='', searchAfter=None):
     """Searches for indicators according to given query
 
     Args:
@@ -968,6 +968,7 @@ def searchIndicators(fromDate='', query='', size=100, page=0, toDate='', value='
       page (int): Response paging (Default value = 0)
       todate (str): The end date to search until to (Default value = '')
       value (str): The indicator value to search (Default value = '')
+      searchAfter (list): The searchAfter cursor of the previous page, to continue the search from (Default value = None)
 
     Returns:
       dict: Object contains the search results
@@ -12,8 +12,7 @@ import argparse
 import logging
 from Tests.scripts.utils.log_util import install_logging
 from distutils.version import LooseVersion
-from copy import deepcopy
-from typing import Dict, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from Tests.Marketplace.marketplace_services import IGNORED_FILES
 import demisto_sdk.commands.common.tools as tools
 from demisto_sdk.commands.common.constants import *  # noqa: E402
@@ -27,6 +26,7 @@ class TestConf(object):
     def __init__(self, conf: dict) -> None:
 
         self._conf = conf
+        self._tests_by_playbook_id = None  # type: Optional[Dict[str, List[dict]]]
 
     def get_skipped_integrations(self):
         return list(self._conf['skipped_integrations'].keys())
@@ -37,6 +37,15 @@ class TestConf(object):
     def get_tests(self):
         return self._conf.get('tests', {})
 
+    def get_tests_by_playbook_id(self, playbook_id):
+        """Returns the tests configurations of a test playbook, the tests are indexed by playbook ID on the first call"""
+        if self._tests_by_playbook_id is None:
+            self._tests_by_playbook_id = {}
+            for test in self.get_tests():
+                self._tests_by_playbook_id.setdefault(test.get('playbookID'), []).append(test)
+
+        return self._tests_by_playbook_id.get(playbook_id, [])
+
     def get_test_playbook_ids(self):
         conf_tests = self._conf['tests']
         test_ids = []
@@ -79,20 +88,20 @@ class TestConf(object):
     def get_packs_of_collected_tests(self, collected_tests, id_set):
         packs = set([])
         if collected_tests:
-            for test_obj in id_set.get('TestPlaybooks', []):
-                for test_id, test_data in test_obj.items():
-                    test_obj_name = test_obj[test_id].get('name')
-                    test_obj_pack = test_obj[test_id].get('pack')
-                    if test_obj_name in collected_tests and test_obj_pack:
-                        packs.add(test_obj_pack)
+            id_set_index = get_id_set_index(id_set)
+            for _, test_data in id_set_index.find('TestPlaybooks', names=collected_tests):
+                test_obj_pack = test_data.get('pack')
+                if test_obj_pack:
+                    packs.add(test_obj_pack)
         return packs
 
     def get_packs_of_tested_integrations(self, collected_tests, id_set):
         packs = set([])
+        id_set_index = get_id_set_index(id_set)
         tested_integrations = self.get_tested_integrations_for_collected_tests(collected_tests)
         for integration in tested_integrations:
             try:
-                int_path = id_set__get_integration_file_path(id_set, integration)
+                int_path = id_set__get_integration_file_path(id_set_index, integration)
                 pack = tools.get_pack_name(int_path)
                 if pack:
                     packs.add(pack)
@@ -115,6 +124,91 @@ class TestConf(object):
         return test_playbooks
 
 
+class IdSetIndex(object):
+    """Read-only indexed view of id_set.json, used throughout the test collection instead of scanning its lists.
+
+    Every id_set entity is a single key dict of the entity ID to its data. The entities of every type are indexed by
+    ID and by name, all the entities are indexed by file path, and the dependency fields (e.g. `implementing_scripts`
+    or `command_to_integration`) are indexed in reverse - from the dependency to the entities depending on it.
+    The lookups return the entities in their id_set order.
+    """
+    DEPENDENCY_FIELDS = ('implementing_scripts', 'implementing_playbooks', 'script_executions', 'depends_on',
+                         'command_to_integration', 'api_modules')
+
+    def __init__(self, id_set: dict) -> None:
+        self.id_set = id_set
+        self._entities = {}  # type: Dict[str, List[Tuple[str, dict]]]
+        self._by_id = {}  # type: Dict[str, Dict[str, List[int]]]
+        self._by_name = {}  # type: Dict[str, Dict[str, List[int]]]
+        self._by_file_path = {}  # type: Dict[str, List[dict]]
+        self._dependents = {}  # type: Dict[Tuple[str, str], Dict[str, List[int]]]
+
+        for entity_type, entity_set in id_set.items():
+            entities = self._entities[entity_type] = []
+            by_id = self._by_id[entity_type] = {}
+            by_name = self._by_name[entity_type] = {}
+            for entity in entity_set:
+                if not entity or not isinstance(entity, dict):
+                    continue
+                entity_id, entity_data = next(iter(entity.items()))
+                position = len(entities)
+                entities.append((entity_id, entity_data))
+                by_id.setdefault(entity_id, []).append(position)
+                by_name.setdefault(entity_data.get('name', ''), []).append(position)
+                if entity_data.get('file_path'):
+                    self._by_file_path.setdefault(entity_data['file_path'], []).append(entity_data)
+
+                for field in self.DEPENDENCY_FIELDS:
+                    dependencies = entity_data.get(field)
+                    if not dependencies:
+                        continue
+                    if isinstance(dependencies, str):
+                        dependencies = [dependencies]
+                    dependents = self._dependents.setdefault((entity_type, field), {})
+                    for dependency in set(dependencies):
+                        dependents.setdefault(dependency, []).append(position)
+
+    def _get_entities(self, entity_type: str, positions: Iterable[int]) -> List[Tuple[str, dict]]:
+        entities = self._entities[entity_type]
+        return [entities[position] for position in sorted(set(positions))]
+
+    def get(self, entity_type: str, entity_id: str) -> Optional[dict]:
+        """Returns the data of the first entity with the given ID, or None if there's no such entity"""
+        positions = self._by_id.get(entity_type, {}).get(entity_id)
+        return self._entities[entity_type][positions[0]][1] if positions else None
+
+    def find(self, entity_type: str, ids: Iterable[str] = (), names: Iterable[str] = ()) -> List[Tuple[str, dict]]:
+        """Returns the (ID, data) of the entities with any of the given IDs or names"""
+        by_id = self._by_id.get(entity_type, {})
+        by_name = self._by_name.get(entity_type, {})
+        positions = [position for entity_id in ids for position in by_id.get(entity_id, [])]
+        positions.extend(position for name in names for position in by_name.get(name, []))
+        return self._get_entities(entity_type, positions)
+
+    def find_dependents(self, entity_type: str, **dependencies_by_field: Iterable[str]) -> List[Tuple[str, dict]]:
+        """Returns the (ID, data) of the entities with any of the given dependencies in their dependency fields,
+        e.g. find_dependents('playbooks', implementing_scripts=['ScriptA'], implementing_playbooks=['PlaybookB'])"""
+        positions = []  # type: List[int]
+        for field, dependencies in dependencies_by_field.items():
+            dependents = self._dependents.get((entity_type, field), {})
+            positions.extend(position for dependency in dependencies for position in dependents.get(dependency, []))
+        return self._get_entities(entity_type, positions)
+
+    def find_by_file_paths(self, file_paths: Iterable[str]) -> List[dict]:
+        """Returns the data of the entities of all types in the given file paths"""
+        return [entity_data for file_path in file_paths for entity_data in self._by_file_path.get(file_path, [])]
+
+    def find_matching_object(self, entity_type: str, obj_id: str, server_version: str = '0') -> Optional[dict]:
+        """Gets first occurrence of object with matching id/name and valid from/to version"""
+        for _, obj in self.find(entity_type, ids=[obj_id], names=[obj_id]):
+            # check if object is runnable
+            fromversion = obj.get('fromversion', '0.0')
+            toversion = obj.get('toversion', '99.99.99')
+            if is_runnable_in_server_version(from_v=fromversion, server_v=server_version, to_v=toversion):
+                return obj
+        return None
+
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CONTENT_DIR = os.path.abspath(SCRIPT_DIR + '/../..')
 sys.path.append(CONTENT_DIR)
@@ -181,6 +275,9 @@ _FAILED = False
 AMI_BUILDS = {}
 ID_SET = {}
 CONF = {}
+_ID_SET_INDEX = None
+# the modified yml files, parsed once per collection
+_PARSED_YAML_FILES: Dict[str, dict] = {}
 if os.path.isfile('./Tests/ami_builds.json'):
     with open('./Tests/ami_builds.json', 'r') as ami_builds_file:
         # get versions to check if tests are runnable on those envs
@@ -195,6 +292,23 @@ if os.path.isfile('./Tests/conf.json'):
         CONF = TestConf(json.load(conf_file))
 
 
+def get_id_set_index(id_set=None):
+    """Returns an indexed view of the given id_set, or of the repo id_set.json if no id_set is given.
+
+    :param id_set: The id_set json, or an already indexed view of it.
+
+    :return: IdSetIndex of the id_set.
+    """
+    global _ID_SET_INDEX
+    if isinstance(id_set, IdSetIndex):
+        return id_set
+    if id_set is None:
+        if _ID_SET_INDEX is None:
+            _ID_SET_INDEX = IdSetIndex(ID_SET)
+        return _ID_SET_INDEX
+    return IdSetIndex(id_set)
+
+
 def is_runnable_in_server_version(from_v, server_v, to_v):
     """
     Checks whether an obj is runnable in a version
@@ -297,8 +411,39 @@ def get_modified_files_for_testing(files_string):
             modified_metadata_list, is_reputations_json, is_indicator_json)
 
 
+def get_yaml(file_path):
+    """Parses a yml file once per collection, as its name, id, tests and versions are all read from it"""
+    if file_path not in _PARSED_YAML_FILES:
+        _PARSED_YAML_FILES[file_path] = tools.get_yaml(file_path)
+    return _PARSED_YAML_FILES[file_path]
+
+
+def get_script_or_integration_id(file_path):
+    data_dictionary = get_yaml(file_path)
+
+    if data_dictionary:
+        commonfields = data_dictionary.get('commonfields', {})
+        return commonfields.get('id', ['-', ])
+
+
+def get_versions(file_path):
+    """Returns the fromversion and toversion of a yml file, as the sdk get_from_version and get_to_version"""
+    data_dictionary = get_yaml(file_path)
+    if not data_dictionary:
+        return '0.0.0', '99.99.99'
+
+    from_version = data_dictionary.get('fromversion', '0.0.0') or '0.0.0'
+    to_version = data_dictionary.get('toversion', '99.99.99')
+    for version_key, version in (('fromversion', from_version), ('toversion', to_version)):
+        if not re.match(r"^\d{1,2}\.\d{1,2}\.\d{1,2}$", version):
+            raise ValueError('{} {} is invalid "{}". Should be of format: "x.x.x". for example: "4.5.0"'.format(
+                file_path, version_key, version))
+
+    return from_version, to_version
+
+
 def get_name(file_path):
-    data_dictionary = tools.get_yaml(file_path)
+    data_dictionary = get_yaml(file_path)
 
     if data_dictionary:
         return data_dictionary.get('name', '-')
@@ -306,7 +451,7 @@ def get_name(file_path):
 
 def get_tests(file_path):
     """Collect tests mentioned in file_path"""
-    data_dictionary = tools.get_yaml(file_path)
+    data_dictionary = get_yaml(file_path)
     # inject no tests to whitelist so adding values to white list will not force all tests
     if data_dictionary:
         return data_dictionary.get('tests', [])
@@ -319,8 +464,8 @@ def collect_tests_and_content_packs(
         catched_scripts,
         catched_playbooks,
         tests_set,
-        id_set=deepcopy(ID_SET),
-        conf=deepcopy(CONF)
+        id_set=None,
+        conf=None
 ):
     """Collect tests for the affected script_ids,playbook_ids,integration_ids.
 
@@ -330,26 +475,31 @@ def collect_tests_and_content_packs(
     :param catched_scripts: The names of the scripts we already identified a test for.
     :param catched_playbooks: The names of the scripts we already v a test for.
     :param tests_set: The names of the tests we alredy identified.
-    :param id_set: The id_set json.
+    :param id_set: The id_set json, or its indexed view.
     :param conf: The conf json.
 
     :return: (test_ids, missing_ids) - All the names of possible tests, the ids we didn't match a test for.
     """
     caught_missing_test = False
     catched_intergrations = set([])
+    id_set_index = get_id_set_index(id_set)
+    conf = CONF if conf is None else conf
 
     test_ids = conf.get_test_playbook_ids()
+    conf_test_ids = set(test_ids)
     skipped_tests = conf.get_skipped_tests()
     skipped_integrations = conf.get_skipped_integrations()
 
-    integration_set = id_set['integrations']
-    test_playbooks_set = id_set['TestPlaybooks']
-    integration_to_command, _ = get_integration_commands(integration_ids, integration_set)
+    integration_to_command, _ = get_integration_commands(integration_ids, id_set_index)
+    all_integration_commands = {command for commands in integration_to_command.values() for command in commands}
 
-    for test_playbook in test_playbooks_set:
+    # only the test playbooks which use the affected ids are checked
+    test_playbooks = id_set_index.find_dependents('TestPlaybooks', implementing_scripts=script_ids,
+                                                  implementing_playbooks=playbook_ids,
+                                                  command_to_integration=all_integration_commands)
+
+    for test_playbook_id, test_playbook_data in test_playbooks:
         detected_usage = False
-        test_playbook_id = list(test_playbook.keys())[0]
-        test_playbook_data = list(test_playbook.values())[0]
         test_playbook_name = test_playbook_data.get('name')
         for script in test_playbook_data.get('implementing_scripts', []):
             if script in script_ids:
@@ -374,7 +524,7 @@ def collect_tests_and_content_packs(
                             tests_set.add(test_playbook_id)
                             catched_intergrations.add(integration_id)
 
-        if detected_usage and test_playbook_id not in test_ids and test_playbook_id not in skipped_tests:
+        if detected_usage and test_playbook_id not in conf_test_ids and test_playbook_id not in skipped_tests:
             caught_missing_test = True
             logging.error("The playbook {} does not appear in the conf.json file,"
                           " which means no test with it will run. please update the conf.json file accordingly"
@@ -387,18 +537,14 @@ def collect_tests_and_content_packs(
     missing_ids = missing_ids - set(skipped_integrations)
 
     packs_to_install = set()
-    id_set_test_playbooks = id_set.get('TestPlaybooks', [])
-    for test_playbook in id_set_test_playbooks:
-        test_playbook_id = list(test_playbook.keys())[0]
-        test_playbook_object = test_playbook[test_playbook_id]
-        if test_playbook_id in tests_set:
-            test_playbook_pack = test_playbook_object.get('pack')
-            if test_playbook_pack:
-                logging.info(
-                    f'Found test playbook {test_playbook_id} in pack {test_playbook_pack} - adding to packs to install')
-                packs_to_install.add(test_playbook_pack)
-            else:
-                logging.warning(f'Found test playbook {test_playbook_id} without pack - not adding to packs to install')
+    for test_playbook_id, test_playbook_object in id_set_index.find('TestPlaybooks', ids=tests_set):
+        test_playbook_pack = test_playbook_object.get('pack')
+        if test_playbook_pack:
+            logging.info(
+                f'Found test playbook {test_playbook_id} in pack {test_playbook_pack} - adding to packs to install')
+            packs_to_install.add(test_playbook_pack)
+        else:
+            logging.warning(f'Found test playbook {test_playbook_id} without pack - not adding to packs to install')
 
     return test_ids, missing_ids, caught_missing_test, packs_to_install
 
@@ -412,22 +558,19 @@ def update_missing_sets(catched_intergrations, catched_playbooks, catched_script
     return missing_ids
 
 
-def get_integration_commands(integration_ids, integration_set):
+def get_integration_commands(integration_ids, id_set_index):
     integration_to_command = {}
     deprecated_message = ''
     deprecated_commands_string = ''
-    for integration in integration_set:
-        integration_id = list(integration.keys())[0]
-        integration_data = list(integration.values())[0]
-        if integration_id in integration_ids:
-            integration_commands = set(integration_data.get('commands', []))
-            integration_deprecated_commands = set(integration_data.get('deprecated_commands', []))
-            if integration_deprecated_commands:
-                deprecated_names = ', '.join(integration_deprecated_commands)
-                deprecated_commands_string += '{}: {}\n'.format(integration_id, deprecated_names)
-
-            relevant_commands = list(integration_commands - integration_deprecated_commands)
-            integration_to_command[integration_id] = relevant_commands
+    for integration_id, integration_data in id_set_index.find('integrations', ids=integration_ids):
+        integration_commands = set(integration_data.get('commands', []))
+        integration_deprecated_commands = set(integration_data.get('deprecated_commands', []))
+        if integration_deprecated_commands:
+            deprecated_names = ', '.join(integration_deprecated_commands)
+            deprecated_commands_string += '{}: {}\n'.format(integration_id, deprecated_names)
+
+        relevant_commands = list(integration_commands - integration_deprecated_commands)
+        integration_to_command[integration_id] = relevant_commands
 
     if deprecated_commands_string:
         deprecated_message = 'The following integration commands are deprecated and are not taken ' \
@@ -437,21 +580,19 @@ def get_integration_commands(integration_ids, integration_set):
 
 
 def is_integration_fetching_incidents(integration_yml_path):
-    integration_yml_dict = tools.get_yaml(integration_yml_path)
+    integration_yml_dict = get_yaml(integration_yml_path)
 
     return integration_yml_dict.get('script').get('isfetch', False) is True
 
 
 def id_set__get_test_playbook(id_set, test_playbook_id):
-    for test_playbook in id_set.get('TestPlaybooks', []):
-        if test_playbook_id in test_playbook.keys():
-            return test_playbook[test_playbook_id]
+    return get_id_set_index(id_set).get('TestPlaybooks', test_playbook_id)
 
 
 def id_set__get_integration_file_path(id_set, integration_id):
-    for integration in id_set.get('integrations', []):
-        if integration_id in integration.keys():
-            return integration[integration_id]['file_path']
+    integration = get_id_set_index(id_set).get('integrations', integration_id)
+    if integration is not None:
+        return integration['file_path']
 
 
 def check_if_fetch_incidents_is_tested(missing_ids, integration_ids, id_set, conf, tests_set):
@@ -481,22 +622,26 @@ def check_if_fetch_incidents_is_tested(missing_ids, integration_ids, id_set, con
     return missing_ids, tests_set
 
 
-def find_tests_and_content_packs_for_modified_files(modified_files, conf=deepcopy(CONF), id_set=deepcopy(ID_SET)):
+def find_tests_and_content_packs_for_modified_files(modified_files, conf=None, id_set=None):
     script_names = set([])
     playbook_names = set([])
     integration_ids = set([])
+    conf = CONF if conf is None else conf
+    id_set_index = get_id_set_index(id_set)
 
     tests_set, catched_scripts, catched_playbooks, packs_to_install = collect_changed_ids(
-        integration_ids, playbook_names, script_names, modified_files, id_set)
+        integration_ids, playbook_names, script_names, modified_files, id_set_index)
 
     test_ids, missing_ids, caught_missing_test, test_packs_to_install = collect_tests_and_content_packs(
-        script_names, playbook_names, integration_ids, catched_scripts, catched_playbooks, tests_set, id_set, conf)
+        script_names, playbook_names, integration_ids, catched_scripts, catched_playbooks, tests_set, id_set_index,
+        conf)
 
     packs_to_install.update(test_packs_to_install)
 
     missing_ids = update_with_tests_sections(missing_ids, modified_files, test_ids, tests_set)
 
-    missing_ids, tests_set = check_if_fetch_incidents_is_tested(missing_ids, integration_ids, id_set, conf, tests_set)
+    missing_ids, tests_set = check_if_fetch_incidents_is_tested(missing_ids, integration_ids, id_set_index, conf,
+                                                                tests_set)
 
     if len(missing_ids) > 0:
         test_string = '\n'.join(missing_ids)
@@ -518,7 +663,7 @@ def update_with_tests_sections(missing_ids, modified_files, test_ids, tests):
         for test in tests_from_file:
             if test in test_ids or re.match(NO_TESTS_FORMAT, test, re.IGNORECASE):
                 if checked_type(file_path, INTEGRATION_REGEXES):
-                    _id = tools.get_script_or_integration_id(file_path)
+                    _id = get_script_or_integration_id(file_path)
 
                 else:
                     _id = get_name(file_path)
@@ -539,7 +684,7 @@ def collect_content_packs_to_install(id_set: Dict, integration_ids: set, playboo
     """Iterates all content entities in the ID set and extract the pack names for the modified ones.
 
     Args:
-        id_set (Dict): Structure which holds all content entities to extract pack names from.
+        id_set (Dict): Structure which holds all content entities to extract pack names from, or its indexed view.
         integration_ids (set): Set of integration IDs to get pack names for.
         playbook_names (set): Set of playbook names to get pack names for.
         script_names (set): Set of script names to get pack names for.
@@ -548,62 +693,51 @@ def collect_content_packs_to_install(id_set: Dict, integration_ids: set, playboo
         set. Pack names to install.
     """
     packs_to_install = set()
+    id_set_index = get_id_set_index(id_set)
 
-    id_set_integrations = id_set.get('integrations', [])
-    for integration in id_set_integrations:
-        integration_id = list(integration.keys())[0]
-        integration_object = integration[integration_id]
-        if integration_id in integration_ids:
-            integration_pack = integration_object.get('pack')
-            if integration_pack:
-                logging.info(f'Found integration {integration_id} in pack {integration_pack} - adding to packs to install')
-                packs_to_install.add(integration_object.get('pack'))
-            else:
-                logging.warning(f'Found integration {integration_id} without pack - not adding to packs to install')
+    for integration_id, integration_object in id_set_index.find('integrations', ids=integration_ids):
+        integration_pack = integration_object.get('pack')
+        if integration_pack:
+            logging.info(f'Found integration {integration_id} in pack {integration_pack} - adding to packs to install')
+            packs_to_install.add(integration_object.get('pack'))
+        else:
+            logging.warning(f'Found integration {integration_id} without pack - not adding to packs to install')
 
-    id_set_playbooks = id_set.get('playbooks', [])
-    for playbook in id_set_playbooks:
-        playbook_object = list(playbook.values())[0]
+    for _, playbook_object in id_set_index.find('playbooks', names=playbook_names):
         playbook_name = playbook_object.get('name')
-        if playbook_name in playbook_names:
-            playbook_pack = playbook_object.get('pack')
-            if playbook_pack:
-                logging.info(f'Found playbook {playbook_name} in pack {playbook_pack} - adding to packs to install')
-                packs_to_install.add(playbook_pack)
-            else:
-                logging.warning(f'Found playbook {playbook_name} without pack - not adding to packs to install')
-
-    id_set_script = id_set.get('scripts', [])
-    for script in id_set_script:
-        script_id = list(script.keys())[0]
-        script_object = script[script_id]
-        if script_id in script_names:
-            script_pack = script_object.get('pack')
-            if script_pack:
-                logging.info(f'Found script {script_id} in pack {script_pack} - adding to packs to install')
-                packs_to_install.add(script_object.get('pack'))
-            else:
-                logging.warning(f'Found script {script_id} without pack - not adding to packs to install')
+        playbook_pack = playbook_object.get('pack')
+        if playbook_pack:
+            logging.info(f'Found playbook {playbook_name} in pack {playbook_pack} - adding to packs to install')
+            packs_to_install.add(playbook_pack)
+        else:
+            logging.warning(f'Found playbook {playbook_name} without pack - not adding to packs to install')
+
+    for script_id, script_object in id_set_index.find('scripts', ids=script_names):
+        script_pack = script_object.get('pack')
+        if script_pack:
+            logging.info(f'Found script {script_id} in pack {script_pack} - adding to packs to install')
+            packs_to_install.add(script_object.get('pack'))
+        else:
+            logging.warning(f'Found script {script_id} without pack - not adding to packs to install')
 
     return packs_to_install
 
 
-def get_api_module_integrations(changed_api_modules, integration_set):
+def get_api_module_integrations(changed_api_modules, id_set_index):
     integration_to_version = {}
     integration_ids_to_test = set([])
-    for integration in integration_set:
-        integration_data = list(integration.values())[0]
+    for _, integration_data in id_set_index.find_dependents('integrations', api_modules=changed_api_modules):
         if integration_data.get('api_modules', '') in changed_api_modules:
             file_path = integration_data.get('file_path')
-            integration_id = tools.get_script_or_integration_id(file_path)
+            integration_id = get_script_or_integration_id(file_path)
             integration_ids_to_test.add(integration_id)
-            integration_to_version[integration_id] = (tools.get_from_version(file_path),
-                                                      tools.get_to_version(file_path))
+            integration_to_version[integration_id] = get_versions(file_path)
 
     return integration_ids_to_test, integration_to_version
 
 
-def collect_changed_ids(integration_ids, playbook_names, script_names, modified_files, id_set=deepcopy(ID_SET)):
+def collect_changed_ids(integration_ids, playbook_names, script_names, modified_files, id_set=None):
+    id_set_index = get_id_set_index(id_set)
     tests_set = set([])
     updated_script_names = set([])
     updated_playbook_names = set([])
@@ -617,7 +751,7 @@ def collect_changed_ids(integration_ids, playbook_names, script_names, modified_
         if checked_type(file_path, SCRIPT_REGEXES + YML_SCRIPT_REGEXES):
             name = get_name(file_path)
             script_names.add(name)
-            script_to_version[name] = (tools.get_from_version(file_path), tools.get_to_version(file_path))
+            script_to_version[name] = get_versions(file_path)
 
             package_name = os.path.dirname(file_path)
             if glob.glob(package_name + "/*_test.py"):
@@ -627,44 +761,38 @@ def collect_changed_ids(integration_ids, playbook_names, script_names, modified_
         elif checked_type(file_path, YML_PLAYBOOKS_NO_TESTS_REGEXES):
             name = get_name(file_path)
             playbook_names.add(name)
-            playbook_to_version[name] = (tools.get_from_version(file_path), tools.get_to_version(file_path))
+            playbook_to_version[name] = get_versions(file_path)
 
         elif checked_type(file_path, INTEGRATION_REGEXES + YML_INTEGRATION_REGEXES):
-            _id = tools.get_script_or_integration_id(file_path)
+            _id = get_script_or_integration_id(file_path)
             integration_ids.add(_id)
-            integration_to_version[_id] = (tools.get_from_version(file_path), tools.get_to_version(file_path))
+            integration_to_version[_id] = get_versions(file_path)
 
         if checked_type(file_path, API_MODULE_REGEXES):
-            api_module_name = tools.get_script_or_integration_id(file_path)
+            api_module_name = get_script_or_integration_id(file_path)
             changed_api_modules.add(api_module_name)
 
-    script_set = id_set['scripts']
-    playbook_set = id_set['playbooks']
-    integration_set = id_set['integrations']
-
     if changed_api_modules:
         integration_ids_to_test, integration_to_version_to_add = get_api_module_integrations(changed_api_modules,
-                                                                                             integration_set)
+                                                                                             id_set_index)
         integration_ids = integration_ids.union(integration_ids_to_test)
         integration_to_version = {**integration_to_version, **integration_to_version_to_add}
 
-    deprecated_msgs = exclude_deprecated_entities(script_set, script_names,
-                                                  playbook_set, playbook_names,
-                                                  integration_set, integration_ids)
+    deprecated_msgs = exclude_deprecated_entities(id_set_index, script_names, playbook_names, integration_ids)
 
     for script_id in script_names:
-        enrich_for_script_id(script_id, script_to_version[script_id], script_names, script_set, playbook_set,
-                             playbook_names, updated_script_names, updated_playbook_names, catched_scripts,
-                             catched_playbooks, tests_set)
+        enrich_for_script_id(script_id, script_to_version[script_id], script_names, id_set_index, playbook_names,
+                             updated_script_names, updated_playbook_names, catched_scripts, catched_playbooks,
+                             tests_set)
 
-    integration_to_command, deprecated_commands_message = get_integration_commands(integration_ids, integration_set)
+    integration_to_command, deprecated_commands_message = get_integration_commands(integration_ids, id_set_index)
     for integration_id, integration_commands in integration_to_command.items():
         enrich_for_integration_id(integration_id, integration_to_version[integration_id], integration_commands,
-                                  script_set, playbook_set, playbook_names, script_names, updated_script_names,
+                                  id_set_index, playbook_names, script_names, updated_script_names,
                                   updated_playbook_names, catched_scripts, catched_playbooks, tests_set)
 
     for playbook_id in playbook_names:
-        enrich_for_playbook_id(playbook_id, playbook_to_version[playbook_id], playbook_names, script_set, playbook_set,
+        enrich_for_playbook_id(playbook_id, playbook_to_version[playbook_id], playbook_names, id_set_index,
                                updated_playbook_names, catched_playbooks, tests_set)
 
     for new_script in updated_script_names:
@@ -693,21 +821,17 @@ def collect_changed_ids(integration_ids, playbook_names, script_names, modified_
     if deprecated_commands_message:
         logging.warning(deprecated_commands_message)
 
-    packs_to_install = collect_content_packs_to_install(id_set, integration_ids, playbook_names, script_names)
+    packs_to_install = collect_content_packs_to_install(id_set_index, integration_ids, playbook_names, script_names)
 
     return tests_set, catched_scripts, catched_playbooks, packs_to_install
 
 
-def exclude_deprecated_entities(script_set, script_names,
-                                playbook_set, playbook_names,
-                                integration_set, integration_ids):
+def exclude_deprecated_entities(id_set_index, script_names, playbook_names, integration_ids):
     """Removes deprecated entities from the affected entities sets.
 
-    :param script_set: The set of existing scripts within Content repo.
+    :param id_set_index: The indexed view of the existing entities within Content repo.
     :param script_names: The names of the affected scripts in your change set.
-    :param playbook_set: The set of existing playbooks within Content repo.
     :param playbook_names: The ids of the affected playbooks in your change set.
-    :param integration_set: The set of existing integrations within Content repo.
     :param integration_ids: The ids of the affected integrations in your change set.
 
     :return: deprecated_messages_dict - A dict of messages specifying of all the deprecated entities.
@@ -725,18 +849,19 @@ def exclude_deprecated_entities(script_set, script_names,
     }
 
     # Iterates over three types of entities: scripts, playbooks and integrations and removes deprecated entities
-    for entity_set, entity_names, entity_type in [(script_set, script_names, 'scripts'),
-                                                  (playbook_set, playbook_names, 'playbooks'),
-                                                  (integration_set, integration_ids, 'integrations')]:
-        for entity in entity_set:
-            # integrations are defined by their ids while playbooks and scripts and scripts are defined by names
-            if entity_type == 'integrations':
-                entity_name = list(entity.keys())[0]
-            else:
-                entity_name = list(entity.values())[0].get('name', '')
+    for entity_names, entity_type in [(script_names, 'scripts'),
+                                      (playbook_names, 'playbooks'),
+                                      (integration_ids, 'integrations')]:
+        # integrations are defined by their ids while playbooks and scripts and scripts are defined by names
+        if entity_type == 'integrations':
+            entities = id_set_index.find(entity_type, ids=entity_names)
+        else:
+            entities = id_set_index.find(entity_type, names=entity_names)
+
+        for entity_id, entity_data in entities:
+            entity_name = entity_id if entity_type == 'integrations' else entity_data.get('name', '')
 
             if entity_name in entity_names:
-                entity_data = list(entity.values())[0]
                 if entity_data.get('deprecated', False):
                     deprecated_entities_strings_dict[entity_type] += entity_name + '\n'
                     entity_names.remove(entity_name)
@@ -750,16 +875,15 @@ def exclude_deprecated_entities(script_set, script_names,
     return deprecated_messages_dict
 
 
-def enrich_for_integration_id(integration_id, given_version, integration_commands, script_set, playbook_set,
-                              playbook_names, script_names, updated_script_names, updated_playbook_names,
-                              catched_scripts, catched_playbooks, tests_set):
+def enrich_for_integration_id(integration_id, given_version, integration_commands, id_set_index, playbook_names,
+                              script_names, updated_script_names, updated_playbook_names, catched_scripts,
+                              catched_playbooks, tests_set):
     """Enrich the list of affected scripts/playbooks by your change set.
 
     :param integration_id: The name of the integration we changed.
     :param given_version: the version of the integration we changed.
     :param integration_commands: The commands of the changed integation
-    :param script_set: The set of existing scripts within Content repo.
-    :param playbook_set: The set of existing playbooks within Content repo.
+    :param id_set_index: The indexed view of the existing scripts and playbooks within Content repo.
     :param playbook_names: The names of the playbooks affected by your changes.
     :param script_names: The names of the scripts affected by your changes.
     :param updated_script_names: The names of scripts we identify as affected to your change set.
@@ -768,8 +892,7 @@ def enrich_for_integration_id(integration_id, given_version, integration_command
     :param catched_playbooks: The names of playbooks we found tests for.
     :param tests_set: The names of the caught tests.
     """
-    for playbook in playbook_set:
-        playbook_data = list(playbook.values())[0]
+    for _, playbook_data in id_set_index.find_dependents('playbooks', command_to_integration=integration_commands):
         if playbook_data.get('deprecated', False):
             continue
         playbook_name = playbook_data.get('name')
@@ -790,11 +913,10 @@ def enrich_for_integration_id(integration_id, given_version, integration_command
 
                         updated_playbook_names.add(playbook_name)
                         new_versions = (playbook_fromversion, playbook_toversion)
-                        enrich_for_playbook_id(playbook_name, new_versions, playbook_names, script_set, playbook_set,
+                        enrich_for_playbook_id(playbook_name, new_versions, playbook_names, id_set_index,
                                                updated_playbook_names, catched_playbooks, tests_set)
 
-    for script in script_set:
-        script_data = list(script.values())[0]
+    for _, script_data in id_set_index.find_dependents('scripts', depends_on=integration_commands):
         if script_data.get('deprecated', False):
             continue
         script_name = script_data.get('name')
@@ -821,15 +943,14 @@ def enrich_for_integration_id(integration_id, given_version, integration_command
 
                         updated_script_names.add(script_name)
                         new_versions = (script_fromversion, script_toversion)
-                        enrich_for_script_id(script_name, new_versions, script_names, script_set, playbook_set,
-                                             playbook_names, updated_script_names, updated_playbook_names,
-                                             catched_scripts, catched_playbooks, tests_set)
+                        enrich_for_script_id(script_name, new_versions, script_names, id_set_index, playbook_names,
+                                             updated_script_names, updated_playbook_names, catched_scripts,
+                                             catched_playbooks, tests_set)
 
 
-def enrich_for_playbook_id(given_playbook_id, given_version, playbook_names, script_set, playbook_set,
-                           updated_playbook_names, catched_playbooks, tests_set):
-    for playbook in playbook_set:
-        playbook_data = list(playbook.values())[0]
+def enrich_for_playbook_id(given_playbook_id, given_version, playbook_names, id_set_index, updated_playbook_names,
+                           catched_playbooks, tests_set):
+    for _, playbook_data in id_set_index.find_dependents('playbooks', implementing_playbooks=[given_playbook_id]):
         if playbook_data.get('deprecated', False):
             continue
         playbook_name = playbook_data.get('name')
@@ -846,14 +967,13 @@ def enrich_for_playbook_id(given_playbook_id, given_version, playbook_names, scr
 
                 updated_playbook_names.add(playbook_name)
                 new_versions = (playbook_fromversion, playbook_toversion)
-                enrich_for_playbook_id(playbook_name, new_versions, playbook_names, script_set, playbook_set,
+                enrich_for_playbook_id(playbook_name, new_versions, playbook_names, id_set_index,
                                        updated_playbook_names, catched_playbooks, tests_set)
 
 
-def enrich_for_script_id(given_script_id, given_version, script_names, script_set, playbook_set, playbook_names,
+def enrich_for_script_id(given_script_id, given_version, script_names, id_set_index, playbook_names,
                          updated_script_names, updated_playbook_names, catched_scripts, catched_playbooks, tests_set):
-    for script in script_set:
-        script_data = list(script.values())[0]
+    for _, script_data in id_set_index.find_dependents('scripts', script_executions=[given_script_id]):
         if script_data.get('deprecated', False):
             continue
         script_name = script_data.get('name')
@@ -874,12 +994,11 @@ def enrich_for_script_id(given_script_id, given_version, script_names, script_se
 
                 updated_script_names.add(script_name)
                 new_versions = (script_fromversion, script_toversion)
-                enrich_for_script_id(script_name, new_versions, script_names, script_set, playbook_set, playbook_names,
+                enrich_for_script_id(script_name, new_versions, script_names, id_set_index, playbook_names,
                                      updated_script_names, updated_playbook_names, catched_scripts, catched_playbooks,
                                      tests_set)
 
-    for playbook in playbook_set:
-        playbook_data = list(playbook.values())[0]
+    for _, playbook_data in id_set_index.find_dependents('playbooks', implementing_scripts=[given_script_id]):
         if playbook_data.get('deprecated', False):
             continue
         playbook_name = playbook_data.get('name')
@@ -894,7 +1013,7 @@ def enrich_for_script_id(given_script_id, given_version, script_names, script_se
 
                 updated_playbook_names.add(playbook_name)
                 new_versions = (playbook_fromversion, playbook_toversion)
-                enrich_for_playbook_id(playbook_name, new_versions, playbook_names, script_set, playbook_set,
+                enrich_for_playbook_id(playbook_name, new_versions, playbook_names, id_set_index,
                                        updated_playbook_names, catched_playbooks, tests_set)
 
 
@@ -903,43 +1022,20 @@ def update_test_set(tests, tests_set):
         tests_set.add(test)
 
 
-def get_test_conf_from_conf(test_id, server_version, conf=deepcopy(CONF)):
+def get_test_conf_from_conf(test_id, server_version, conf=None):
     """Gets first occurrence of test conf with matching playbookID value to test_id with a valid from/to version"""
-    test_conf_lst = conf.get_tests()
+    conf = CONF if conf is None else conf
+    test_conf_lst = conf.get_tests_by_playbook_id(test_id)
     # return None if nothing is found
     test_conf = next((test_conf for test_conf in test_conf_lst if (
-        test_conf.get('playbookID') == test_id
-        and is_runnable_in_server_version(from_v=test_conf.get('fromversion', '0.0'),
-                                          server_v=server_version,
-                                          to_v=test_conf.get('toversion', '99.99.99')))), None)
+        is_runnable_in_server_version(from_v=test_conf.get('fromversion', '0.0'),
+                                      server_v=server_version,
+                                      to_v=test_conf.get('toversion', '99.99.99')))), None)
     return test_conf
 
 
-def extract_matching_object_from_id_set(obj_id, obj_set, server_version='0'):
-    """Gets first occurrence of object in the object's id_set with matching id/name and valid from/to version"""
-    for obj_wrpr in obj_set:
-        # try to get object by id
-        if obj_id in obj_wrpr:
-            obj = obj_wrpr.get(obj_id)
-
-        # try to get object by name
-        else:
-            obj_keys = list(obj_wrpr.keys())
-            if not obj_keys:
-                continue
-            obj = obj_wrpr[obj_keys[0]]
-            if obj.get('name') != obj_id:
-                continue
-
-        # check if object is runnable
-        fromversion = obj.get('fromversion', '0.0')
-        toversion = obj.get('toversion', '99.99.99')
-        if is_runnable_in_server_version(from_v=fromversion, server_v=server_version, to_v=toversion):
-            return obj
-    return None
-
-
-def get_test_from_conf(branch_name, conf=deepcopy(CONF)):
+def get_test_from_conf(branch_name, conf=None):
+    conf = CONF if conf is None else conf
     tests = set([])
     changed = set([])
     change_string = tools.run_command("git diff origin/master...{} Tests/conf.json".format(branch_name))
@@ -998,8 +1094,8 @@ def is_test_runnable(test_id, id_set, conf, server_version):
         return False
     conf_fromversion = test_conf.get('fromversion', '0.0')
     conf_toversion = test_conf.get('toversion', '99.99.99')
-    test_playbooks_set = id_set.get('TestPlaybooks', [])
-    test_playbook_obj = extract_matching_object_from_id_set(test_id, test_playbooks_set, server_version)
+    id_set_index = get_id_set_index(id_set)
+    test_playbook_obj = id_set_index.find_matching_object('TestPlaybooks', test_id, server_version)
 
     # check whether the test is runnable in id_set
     if not test_playbook_obj:
@@ -1007,7 +1103,7 @@ def is_test_runnable(test_id, id_set, conf, server_version):
         return False
 
     # check used integrations available
-    if not is_test_integrations_available(server_version, test_conf, conf, id_set):
+    if not is_test_integrations_available(server_version, test_conf, conf, id_set_index):
         logging.debug(f'{warning_prefix} - no active integration found')
         return False
 
@@ -1030,16 +1126,16 @@ def is_test_integrations_available(server_version, test_conf, conf, id_set):
         if not is_test_uses_active_integration(test_integration_ids, conf):
             return False
         # check if all integration from/toversion is valid with server_version
-        integrations_set = id_set.get('integrations', [])
-        if any(extract_matching_object_from_id_set(integration_id, integrations_set, server_version) is None for
-               integration_id in
-               test_integration_ids):
+        id_set_index = get_id_set_index(id_set)
+        if any(id_set_index.find_matching_object('integrations', integration_id, server_version) is None for
+               integration_id in test_integration_ids):
             return False
     return True
 
 
-def is_test_uses_active_integration(integration_ids, conf=deepcopy(CONF)):
+def is_test_uses_active_integration(integration_ids, conf=None):
     """Checks whether there's an an integration in test_integration_ids that's not skipped"""
+    conf = CONF if conf is None else conf
     skipped_integrations = conf.get_skipped_integrations()
     # check if all integrations are skipped
     if all(integration_id in skipped_integrations for integration_id in integration_ids):
@@ -1048,10 +1144,13 @@ def is_test_uses_active_integration(integration_ids, conf=deepcopy(CONF)):
     return True
 
 
-def get_random_tests(tests_num, rand, conf=deepcopy(CONF), id_set=deepcopy(ID_SET), server_version='0'):
+def get_random_tests(tests_num, rand, conf=None, id_set=None, server_version='0'):
     """Gets runnable tests for the server version"""
+    conf = CONF if conf is None else conf
+    id_set_index = get_id_set_index(id_set)
     all_test_ids = conf.get_test_playbook_ids()
-    runnable_test_ids = [test_id for test_id in all_test_ids if is_test_runnable(test_id, id_set, conf, server_version)]
+    runnable_test_ids = [test_id for test_id in all_test_ids
+                         if is_test_runnable(test_id, id_set_index, conf, server_version)]
     if len(runnable_test_ids) <= tests_num:
         random_test_ids_to_run = runnable_test_ids
     else:
@@ -1072,23 +1171,17 @@ def get_content_pack_name_of_test(tests: set, id_set: Dict = None) -> set:
 
     Args:
         tests (set): The names of the tests to find their content packs.
-        id_set (Dict): Structure which holds all content entities to extract pack names from.
+        id_set (Dict): Structure which holds all content entities to extract pack names from, or its indexed view.
 
     Returns:
         str. The content pack name in which the test playbook is in.
     """
     content_packs = set()
 
-    for test_playbook_object in id_set.get('TestPlaybooks', []):
-        test_playbook_name = list(test_playbook_object.keys())[0]
-        test_playbook_data = list(test_playbook_object.values())[0]
-        if test_playbook_name in tests:
-            pack_name = test_playbook_data.get('pack')
-            if pack_name:
-                content_packs.add(pack_name)
-                if len(tests) == len(content_packs):
-                    # we found all content packs for all tests we were looking for
-                    break
+    for _, test_playbook_data in get_id_set_index(id_set).find('TestPlaybooks', ids=tests):
+        pack_name = test_playbook_data.get('pack')
+        if pack_name:
+            content_packs.add(pack_name)
 
     return content_packs
 
@@ -1140,9 +1233,13 @@ def remove_ignored_tests(tests: set, content_packs: set) -> set:
 
 
 def get_test_list_and_content_packs_to_install(files_string, branch_name, minimum_server_version='0',
-                                               conf=deepcopy(CONF),
-                                               id_set=deepcopy(ID_SET)):
+                                               conf=None,
+                                               id_set=None):
     """Create a test list that should run"""
+    conf = CONF if conf is None else conf
+    # the id_set is indexed once and shared by the whole collection
+    id_set = get_id_set_index(id_set)
+    _PARSED_YAML_FILES.clear()
 
     (modified_files_with_relevant_tests, modified_tests_list, changed_common, is_conf_json, sample_tests,
      modified_metadata_list, is_reputations_json, is_indicator_json) = get_modified_files_for_testing(files_string)
@@ -1227,7 +1324,7 @@ def get_from_version_and_to_version_bounderies(all_modified_files_paths: set, id
     In case that max_from_version is higher than max to version - to version will be the the highest default.
     Args:
         all_modified_files_paths: All modified files
-        id_set: the content of the id.set_json
+        id_set: the content of the id.set_json, or its indexed view
 
     Returns:
         (string, string). The boundaries of the lowest from version (defaults to 0.0.0)
@@ -1236,17 +1333,14 @@ def get_from_version_and_to_version_bounderies(all_modified_files_paths: set, id
     max_to_version = LooseVersion('0.0.0')
     min_from_version = LooseVersion('99.99.99')
     max_from_version = LooseVersion('0.0.0')
-    for artifacts in id_set.values():
-        for artifact_dict in artifacts:
-            for artifact_details in artifact_dict.values():
-                if artifact_details.get('file_path') in all_modified_files_paths:
-                    from_version = artifact_details.get('fromversion')
-                    to_version = artifact_details.get('toversion')
-                    if from_version:
-                        min_from_version = min(min_from_version, LooseVersion(from_version))
-                        max_from_version = max(max_from_version, LooseVersion(from_version))
-                    if to_version:
-                        max_to_version = max(max_to_version, LooseVersion(to_version))
+    for artifact_details in get_id_set_index(id_set).find_by_file_paths(all_modified_files_paths):
+        from_version = artifact_details.get('fromversion')
+        to_version = artifact_details.get('toversion')
+        if from_version:
+            min_from_version = min(min_from_version, LooseVersion(from_version))
+            max_from_version = max(max_from_version, LooseVersion(from_version))
+        if to_version:
+            max_to_version = max(max_to_version, LooseVersion(to_version))
     if max_to_version.vstring == '0.0.0' or max_to_version < max_from_version:
         max_to_version = LooseVersion('99.99.99')
     if min_from_version.vstring == '99.99.99':
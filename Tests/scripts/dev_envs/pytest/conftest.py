@@ -50,3 +50,31 @@ def check_std_out_err(capfd):
         pytest.fail("Found output in stdout: [{}]".format(out.strip()))
     if err:
         pytest.fail("Found output in stderr: [{}]".format(err.strip()))
+
+
+def pytest_addoption(parser):
+    parser.addoption('--run-benchmarks', action='store_true', default=False,
+                     help='Run the tests marked as benchmark, which are skipped by default')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: a test of large inputs with time bounds, '
+                                       'skipped unless --run-benchmarks is given')
+
+
+def pytest_collection_modifyitems(config, items):
+    '''
+    Skips the benchmark tests, so the default test run stays fast and isn't affected by the load of the machine.
+
+    For example:
+
+    @pytest.mark.benchmark
+    def test_foo_benchmark():
+        ...
+    '''
+    if config.getoption('--run-benchmarks'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='benchmark, use --run-benchmarks to run it')
+    for item in items:
+        if item.get_closest_marker('benchmark'):
+            item.add_marker(skip_benchmark)
@@ -6,7 +6,7 @@ import demisto_sdk.commands.common.tools as demisto_sdk_tools
 from ruamel.yaml import YAML
 
 from Tests.scripts.collect_tests_and_content_packs import (
-    RANDOM_TESTS_NUM, TestConf, create_filter_envs_file, get_modified_files_for_testing,
+    RANDOM_TESTS_NUM, IdSetIndex, TestConf, create_filter_envs_file, get_modified_files_for_testing,
     get_test_list_and_content_packs_to_install, collect_content_packs_to_install,
     get_from_version_and_to_version_bounderies)
 
@@ -1033,3 +1033,94 @@ def test_collect_test_playbooks_no_results():
     test_conf = TestConf(MOCK_CONF)
     content_packs = test_conf.get_packs_of_collected_tests(['TestCommonPython'], MOCK_ID_SET)
     assert set() == content_packs
+
+
+class TestIdSetIndex:
+    ID_SET = {
+        'scripts': [
+            {'ScriptA': {'name': 'ScriptA', 'file_path': 'Packs/A/Scripts/ScriptA.yml', 'depends_on': ['a-command'],
+                         'command_to_integration': {'a-command': 'IntegrationA'}}},
+            {'ScriptB': {'name': 'ScriptB', 'file_path': 'Packs/B/Scripts/ScriptB.yml', 'script_executions': ['ScriptA']}}
+        ],
+        'playbooks': [
+            {'PlaybookA': {'name': 'PlaybookA', 'file_path': 'Packs/A/Playbooks/PlaybookA.yml',
+                           'implementing_scripts': ['ScriptA', 'ScriptB'], 'toversion': '4.9.9'}},
+            {'playbook_b_id': {'name': 'PlaybookB', 'implementing_playbooks': ['PlaybookA']}},
+            {'PlaybookA': {'name': 'PlaybookA', 'file_path': 'Packs/A/Playbooks/PlaybookA_5.yml',
+                           'implementing_scripts': ['ScriptA'], 'fromversion': '5.0.0'}}
+        ],
+        'integrations': [
+            {'IntegrationA': {'name': 'IntegrationA', 'file_path': 'Packs/A/Integrations/IntegrationA.yml',
+                              'api_modules': 'HTTPFeedApiModule'}}
+        ]
+    }
+
+    def test_lookups(self):
+        """
+        Given
+        - An id_set with scripts, playbooks (one of them in 2 versions) and integrations
+
+        When
+        - Looking up entities by id, name, file path and dependencies
+
+        Then
+        - Ensure the matching entities are found in their id_set order
+        """
+        id_set_index = IdSetIndex(self.ID_SET)
+
+        assert id_set_index.get('scripts', 'ScriptA')['file_path'] == 'Packs/A/Scripts/ScriptA.yml'
+        assert id_set_index.get('scripts', 'ScriptC') is None
+        assert [data['file_path'] for _, data in id_set_index.find('playbooks', ids=['PlaybookA'])] == \
+            ['Packs/A/Playbooks/PlaybookA.yml', 'Packs/A/Playbooks/PlaybookA_5.yml']
+        assert [entity_id for entity_id, _ in id_set_index.find('playbooks', names=['PlaybookB'])] == ['playbook_b_id']
+        assert [entity_id for entity_id, _ in id_set_index.find_dependents(
+            'playbooks', implementing_scripts=['ScriptA'], implementing_playbooks=['PlaybookA'])] == \
+            ['PlaybookA', 'playbook_b_id', 'PlaybookA']
+        assert [entity_id for entity_id, _ in id_set_index.find_dependents('scripts', depends_on=['a-command'])] == \
+            ['ScriptA']
+        assert [entity_id for entity_id, _ in id_set_index.find_dependents(
+            'integrations', api_modules=['HTTPFeedApiModule'])] == ['IntegrationA']
+        assert [data['name'] for data in id_set_index.find_by_file_paths(
+            ['Packs/B/Scripts/ScriptB.yml', 'Packs/A/Integrations/IntegrationA.yml'])] == ['ScriptB', 'IntegrationA']
+
+    def test_find_matching_object(self):
+        """
+        Given
+        - An id_set with a playbook in 2 versions
+
+        When
+        - Looking for the playbook by its id and by its name on different server versions
+
+        Then
+        - Ensure the playbook version which is runnable on the server version is found
+        """
+        id_set_index = IdSetIndex(self.ID_SET)
+
+        assert id_set_index.find_matching_object('playbooks', 'PlaybookA', '4.5.0')['toversion'] == '4.9.9'
+        assert id_set_index.find_matching_object('playbooks', 'PlaybookA', '5.5.0')['fromversion'] == '5.0.0'
+        assert id_set_index.find_matching_object('playbooks', 'PlaybookB', '5.5.0')['name'] == 'PlaybookB'
+        assert id_set_index.find_matching_object('playbooks', 'PlaybookC') is None
+
+    def test_collection_with_index(self):
+        """
+        Given
+        - The mock id_set and its indexed view
+
+        When
+        - Collecting content packs to install and version boundaries with each of them
+
+        Then
+        - Ensure the results are the same, and the id_set isn't modified
+        """
+        id_set = copy.deepcopy(MOCK_ID_SET)
+        id_set_index = IdSetIndex(id_set)
+        integration_ids = {'PagerDuty v2', 'fake_integration'}
+        playbook_names = {'fake_playbook', 'Calculate Severity By Highest DBotScore'}
+        script_names = {'fake-script', 'CommonServerPython'}
+        file_paths = {list(entity.values())[0]['file_path'] for entity in MOCK_ID_SET['integrations']}
+
+        assert collect_content_packs_to_install(id_set_index, integration_ids, playbook_names, script_names) == \
+            collect_content_packs_to_install(id_set, integration_ids, playbook_names, script_names) == {'FakePack'}
+        assert get_from_version_and_to_version_bounderies(file_paths, id_set_index) == \
+            get_from_version_and_to_version_bounderies(file_paths, id_set) == ('4.1.0', '99.99.99')
+        assert id_set == MOCK_ID_SET
@@ -16,7 +16,6 @@ import pytz
 
 from google.cloud import storage
 from google.api_core.exceptions import PreconditionFailed
-from queue import Queue
 from contextlib import contextmanager
 
 import urllib3
@@ -36,6 +35,7 @@ except ModuleNotFoundError:
 from Tests.mock_server import MITMProxy, AMIConnection
 from Tests.test_integration import Docker, check_integration, disable_all_integrations
 from Tests.test_dependencies import get_used_integrations, get_tests_allocation_for_threads
+from Tests.tests_scheduler import IntegrationsLocksBackend, TestsScheduler
 from demisto_sdk.commands.common.constants import RUN_ALL_TESTS_FORMAT, FILTER_CONF, PB_Status
 from demisto_sdk.commands.common.tools import print_color, print_error, print_warning, \
     LOG_COLORS, str2bool
@@ -332,7 +332,7 @@ def run_test_logic(conf_json_test_details, tests_queue, tests_settings, c, faile
                            test_options.get('timeout'),
                            prints_manager,
                            thread_index,
-                           tests_settings.conf_path) as lock:
+                           tests_queue.scheduler) as lock:
         if lock:
             status, inc_id = check_integration(c, server_url, integrations, playbook_id, prints_manager, test_options,
                                                is_mock_run, thread_index=thread_index)
@@ -816,7 +816,7 @@ def get_json_file(path):
 
 
 def execute_testing(tests_settings, server_ip, mockable_tests_names, unmockable_tests_names,
-                    tests_data_keeper, prints_manager, thread_index=0, is_ami=True):
+                    tests_data_keeper, prints_manager, thread_index=0, is_ami=True, tests_scheduler=None):
     server = SERVER_URL.format(server_ip)
     server_numeric_version = tests_settings.serverNumericVersion
     start_message = "Executing tests with the server {} - and the server ip {}".format(server, server_ip)
@@ -841,6 +841,8 @@ def execute_testing(tests_settings, server_ip, mockable_tests_names, unmockable_
     unmockable_integrations = conf['unmockable_integrations']
 
     secret_params = secret_conf['integrations'] if secret_conf else []
+    if tests_scheduler is None:
+        tests_scheduler = create_tests_scheduler(conf, prints_manager)
 
     filtered_tests, is_filter_configured, run_all_tests = extract_filtered_tests()
     if is_filter_configured and not run_all_tests:
@@ -885,14 +887,9 @@ def execute_testing(tests_settings, server_ip, mockable_tests_names, unmockable_
             proxy.configure_proxy_in_demisto(proxy=proxy.ami.docker_ip + ':' + proxy.PROXY_PORT,
                                              username=demisto_user, password=demisto_pass,
                                              server=server)
-            executed_in_current_round, mockable_tests_queue = initialize_queue_and_executed_tests_set(mockable_tests)
+            mockable_tests_queue = tests_scheduler.create_queue(mockable_tests)
             while not mockable_tests_queue.empty():
                 t = mockable_tests_queue.get()
-                executed_in_current_round = update_round_set_and_sleep_if_round_completed(executed_in_current_round,
-                                                                                          prints_manager,
-                                                                                          t,
-                                                                                          thread_index,
-                                                                                          mockable_tests_queue)
                 run_test_scenario(mockable_tests_queue, tests_settings, t, proxy, default_test_timeout, skipped_tests_conf,
                                   nightly_integrations, skipped_integrations_conf, skipped_integration, is_nightly,
                                   run_all_tests, is_filter_configured, filtered_tests,
@@ -906,14 +903,9 @@ def execute_testing(tests_settings, server_ip, mockable_tests_names, unmockable_
             reset_containers(server, demisto_user, demisto_pass, prints_manager, thread_index)
 
         prints_manager.add_print_job("\nRunning mock-disabled tests", print, thread_index)
-        executed_in_current_round, unmockable_tests_queue = initialize_queue_and_executed_tests_set(unmockable_tests)
+        unmockable_tests_queue = tests_scheduler.create_queue(unmockable_tests)
         while not unmockable_tests_queue.empty():
             t = unmockable_tests_queue.get()
-            executed_in_current_round = update_round_set_and_sleep_if_round_completed(executed_in_current_round,
-                                                                                      prints_manager,
-                                                                                      t,
-                                                                                      thread_index,
-                                                                                      unmockable_tests_queue)
             run_test_scenario(unmockable_tests_queue, tests_settings, t, proxy, default_test_timeout,
                               skipped_tests_conf, nightly_integrations, skipped_integrations_conf, skipped_integration,
                               is_nightly, run_all_tests, is_filter_configured, filtered_tests, skipped_tests,
@@ -980,47 +972,17 @@ def execute_testing(tests_settings, server_ip, mockable_tests_names, unmockable_
             prints_manager.add_print_job("Failed to save proxy metrics", print, thread_index)
 
 
-def update_round_set_and_sleep_if_round_completed(executed_in_current_round: set,
-                                                  prints_manager: ParallelPrintsManager,
-                                                  t: dict,
-                                                  thread_index: int,
-                                                  unmockable_tests_queue: Queue) -> set:
+def create_tests_scheduler(conf, prints_manager):
     """
-    Checks if the string representation of the current test configuration is already in
-    the executed_in_current_round set.
-    If it is- it means we have already executed this test and the we have reached a round and there are tests that
-    were not able to be locked by this execution..
-    In that case we want to start a new round monitoring by emptying the 'executed_in_current_round' set and sleep
-    in order to let the tests be unlocked
+    Creates the scheduler which dispatches the tests of all the servers, and locks their integrations in GCS
     Args:
-        executed_in_current_round: A set containing the string representation of all tests configuration as they appear
-        in conf.json file that were already executed in the current round
+        conf: The content of conf.json file
         prints_manager: ParallelPrintsManager object
-        t: test configuration as it appears in conf.json file
-        thread_index: Currently executing thread
-        unmockable_tests_queue: The queue of remaining tests
 
     Returns:
-        A new executed_in_current_round set which contains only the current tests configuration if a round was completed
-        else it just adds the new test to the set.
+        TestsScheduler object
     """
-    if str(t) in executed_in_current_round:
-        prints_manager.add_print_job(
-            'all tests in the queue were executed, sleeping for 30 seconds to let locked tests get unlocked.',
-            print,
-            thread_index)
-        executed_in_current_round = set()
-        time.sleep(30)
-    executed_in_current_round.add(str(t))
-    return executed_in_current_round
-
-
-def initialize_queue_and_executed_tests_set(tests):
-    tests_queue = Queue()
-    already_executed_test_playbooks = set()
-    for t in tests:
-        tests_queue.put(t)
-    return already_executed_test_playbooks, tests_queue
+    return TestsScheduler(GCSLocksBackend(prints_manager), parallel_integrations=conf['parallel_integrations'])
 
 
 def get_unmockable_tests(tests_settings):
@@ -1064,6 +1026,9 @@ def manage_tests(tests_settings):
     number_of_instances = len(instances_ips)
     prints_manager = ParallelPrintsManager(number_of_instances)
     tests_data_keeper = DataKeeperTester()
+    conf, _ = load_conf_files(tests_settings.conf_path, None)
+    # a single scheduler is shared by all the servers, so a test is dispatched once its integrations are unlocked
+    tests_scheduler = create_tests_scheduler(conf, prints_manager)
 
     if tests_settings.server:
         # If the user supplied a server - all tests will be done on that server.
@@ -1075,7 +1040,7 @@ def manage_tests(tests_settings):
         print(tests_settings.specific_tests_to_run)
         unmockable_tests = tests_settings.specific_tests_to_run if tests_settings.specific_tests_to_run else all_tests
         execute_testing(tests_settings, server_ip, mockable_tests, unmockable_tests, tests_data_keeper, prints_manager,
-                        thread_index=0, is_ami=False)
+                        thread_index=0, is_ami=False, tests_scheduler=tests_scheduler)
 
     elif tests_settings.isAMI:
         # Running tests in AMI configuration.
@@ -1100,7 +1065,8 @@ def manage_tests(tests_settings):
 
                     if number_of_instances == 1:
                         execute_testing(tests_settings, current_instance, mockable_tests, unmockable_tests,
-                                        tests_data_keeper, prints_manager, thread_index=0, is_ami=True)
+                                        tests_data_keeper, prints_manager, thread_index=0, is_ami=True,
+                                        tests_scheduler=tests_scheduler)
                     else:
                         thread_kwargs = {
                             "tests_settings": tests_settings,
@@ -1110,6 +1076,7 @@ def manage_tests(tests_settings):
                             "thread_index": current_thread_index,
                             "prints_manager": prints_manager,
                             "tests_data_keeper": tests_data_keeper,
+                            "tests_scheduler": tests_scheduler,
                         }
                         t = threading.Thread(target=execute_testing, kwargs=thread_kwargs)
                         threads_array.append(t)
@@ -1128,7 +1095,8 @@ def manage_tests(tests_settings):
                     unmockable_tests = get_unmockable_tests(tests_settings)
                     mockable_tests = [test for test in all_tests if test not in unmockable_tests]
                     execute_testing(tests_settings, ami_instance_ip, mockable_tests, unmockable_tests,
-                                    tests_data_keeper, prints_manager, thread_index=0, is_ami=True)
+                                    tests_data_keeper, prints_manager, thread_index=0, is_ami=True,
+                                    tests_scheduler=tests_scheduler)
                     sleep(8)
 
     else:
@@ -1141,7 +1109,8 @@ def manage_tests(tests_settings):
         instance_ip = instances_ips[0][1]
         all_tests = get_all_tests(tests_settings)
         execute_testing(tests_settings, instance_ip, [], all_tests,
-                        tests_data_keeper, prints_manager, thread_index=0, is_ami=False)
+                        tests_data_keeper, prints_manager, thread_index=0, is_ami=False,
+                        tests_scheduler=tests_scheduler)
 
     print_test_summary(tests_data_keeper, tests_settings.isAMI)
     create_result_files(tests_data_keeper)
@@ -1189,7 +1158,7 @@ def acquire_test_lock(integrations_details: list,
                       test_timeout: int,
                       prints_manager: ParallelPrintsManager,
                       thread_index: int,
-                      conf_json_path: str) -> None:
+                      tests_scheduler: TestsScheduler) -> None:
     """
     This is a context manager that handles all the locking and unlocking of integrations.
     Execution is as following:
@@ -1201,22 +1170,39 @@ def acquire_test_lock(integrations_details: list,
         test_timeout: test timeout in seconds
         prints_manager: ParallelPrintsManager object
         thread_index: The index of the thread that executes the unlocking
-        conf_json_path: Path to conf.json file
+        tests_scheduler: The scheduler which tracks the integrations locked by this build
     Yields:
         A boolean indicating the lock attempt result
     """
-    locked = safe_lock_integrations(test_timeout,
-                                    prints_manager,
-                                    integrations_details,
-                                    thread_index,
-                                    conf_json_path)
+    integration_names = tests_scheduler.get_integrations_to_lock(get_integrations_list(integrations_details))
+    if integration_names:
+        print_msg = f'Attempting to lock integrations {sorted(integration_names)}, with timeout {test_timeout}'
+    else:
+        print_msg = 'No integrations to lock'
+    prints_manager.add_print_job(print_msg, print, thread_index, include_timestamp=True)
+    locked = False
     try:
-        yield locked
+        with tests_scheduler.acquire_test_lock(integration_names, test_timeout, thread_index) as locked:
+            yield locked
     finally:
-        if not locked:
-            return
-        safe_unlock_integrations(prints_manager, integrations_details, thread_index)
-        prints_manager.execute_thread_prints(thread_index)
+        if locked:
+            prints_manager.execute_thread_prints(thread_index)
+
+
+class GCSLocksBackend(IntegrationsLocksBackend):
+    """
+    Locks integrations across builds with lock files in the GCS artifacts bucket
+    """
+    def __init__(self, prints_manager: ParallelPrintsManager):
+        self.prints_manager = prints_manager
+
+    def lock(self, integrations: list, timeout: int, thread_index: int = 0) -> bool:
+        integrations_details = [{'name': integration} for integration in integrations]
+        return safe_lock_integrations(timeout, self.prints_manager, integrations_details, thread_index)
+
+    def unlock(self, integrations: list, thread_index: int = 0) -> None:
+        integrations_details = [{'name': integration} for integration in integrations]
+        safe_unlock_integrations(self.prints_manager, integrations_details, thread_index)
 
 
 def safe_unlock_integrations(prints_manager: ParallelPrintsManager, integrations_details: list, thread_index: int):
@@ -1242,34 +1228,22 @@ def safe_unlock_integrations(prints_manager: ParallelPrintsManager, integrations
 def safe_lock_integrations(test_timeout: int,
                            prints_manager: ParallelPrintsManager,
                            integrations_details: list,
-                           thread_index: int,
-                           conf_json_path: str) -> bool:
+                           thread_index: int) -> bool:
     """
     This integration safely locks the test's integrations and return it's result
     If an unexpected error occurs - this method will log it's details and return False
     Args:
         test_timeout: Test timeout in seconds
         prints_manager: ParallelPrintsManager object
-        integrations_details: test integrations details
+        integrations_details: test integrations details, without the parallel integrations
         thread_index: The index of the thread that executes the unlocking
-        conf_json_path: Path to conf.json file
 
     Returns:
         A boolean indicating the lock attempt result
     """
-    conf, _ = load_conf_files(conf_json_path, None)
-    parallel_integrations_names = conf['parallel_integrations']
-    filtered_integrations_details = [integration for integration in integrations_details if
-                                     integration['name'] not in parallel_integrations_names]
-    integration_names = get_integrations_list(filtered_integrations_details)
-    if integration_names:
-        print_msg = f'Attempting to lock integrations {integration_names}, with timeout {test_timeout}'
-    else:
-        print_msg = 'No integrations to lock'
-    prints_manager.add_print_job(print_msg, print, thread_index, include_timestamp=True)
     try:
         storage_client = storage.Client()
-        locked = lock_integrations(filtered_integrations_details, test_timeout, storage_client, prints_manager, thread_index)
+        locked = lock_integrations(integrations_details, test_timeout, storage_client, prints_manager, thread_index)
     except Exception as e:
         prints_manager.add_print_job(f'attempt to lock integration failed for unknown reason.\nError: {e}',
                                      print_warning,
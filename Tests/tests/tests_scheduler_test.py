@@ -0,0 +1,142 @@
+import threading
+import time
+
+from Tests.test_dependencies import get_used_integrations
+from Tests.tests_scheduler import LocalLocksBackend, TestsScheduler
+
+
+class RecordingCondition(threading.Condition):
+    """A condition which counts the waits that ended by their timeout, rather than by a notification"""
+
+    def __init__(self):
+        super().__init__()
+        self.timed_out_waits = 0
+
+    def wait(self, timeout=None):
+        notified = super().wait(timeout)
+        if not notified:
+            self.timed_out_waits += 1
+        return notified
+
+
+class OtherBuildLocksBackend(LocalLocksBackend):
+    """A local locks backend, where the integrations locked by another build are unlocked after the first attempt to
+    lock them, and every lock attempt is recorded.
+    """
+
+    def __init__(self, locked_by_other_builds):
+        super().__init__(locked_by_other_builds={integration: 60 for integration in locked_by_other_builds})
+        self.attempts: list = []
+
+    def lock(self, integrations, timeout, thread_index=0):
+        locked = super().lock(integrations, timeout, thread_index)
+        self.attempts.append((integrations, locked))
+        if not locked:
+            # the other build is done with the integrations
+            self.unlock(integrations, thread_index)
+        return locked
+
+
+def create_scheduler(locks_backend, **kwargs):
+    scheduler = TestsScheduler(locks_backend, **kwargs)
+    scheduler._condition = RecordingCondition()
+    return scheduler
+
+
+def run_server_tests(tests_queue, running_integrations, executed_tests, test_duration=0.02):
+    """Runs the tests of a server, as the test runner does - a test whose integrations are locked is put back"""
+    scheduler = tests_queue.scheduler
+    while not tests_queue.empty():
+        test = tests_queue.get()
+        integrations = scheduler.get_integrations_to_lock(get_used_integrations(test))
+        with scheduler.acquire_test_lock(integrations, test_timeout=10) as locked:
+            if not locked:
+                tests_queue.put(test)
+                continue
+            assert not integrations & running_integrations, 'an integration is tested by two tests at once'
+            running_integrations.update(integrations)
+            time.sleep(test_duration)
+            running_integrations.difference_update(integrations)
+            executed_tests.append(test['playbookID'])
+
+
+def run_servers(scheduler, tests_per_server, test_duration=0.02):
+    running_integrations: set = set()
+    executed_tests: list = []
+    threads = [threading.Thread(target=run_server_tests,
+                                args=(scheduler.create_queue(tests), running_integrations, executed_tests,
+                                      test_duration))
+               for tests in tests_per_server]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return executed_tests
+
+
+def test_integrations_are_tested_exclusively():
+    """
+    Given
+    - 4 servers, each with 10 tests, where every test uses one of 3 shared integrations or a parallel integration.
+    When
+    - Running the tests of all servers at once.
+    Then
+    - Ensure all the tests run, no integration is tested by two tests at once, and the parallel integration isn't locked.
+    - Ensure no test waits for a retry, as all the locks are held by this build.
+    """
+    integrations = ['Shared1', 'Shared2', 'Shared3', 'Parallel']
+    tests_per_server = [[{'playbookID': f'test_{server}_{i}', 'integrations': integrations[(server + i) % 4]}
+                         for i in range(10)] for server in range(4)]
+    locks_backend = LocalLocksBackend()
+    scheduler = create_scheduler(locks_backend, parallel_integrations=['Parallel'], retry_interval=60)
+
+    executed_tests = run_servers(scheduler, tests_per_server)
+
+    assert sorted(executed_tests) == sorted(test['playbookID'] for tests in tests_per_server for test in tests)
+    assert 'Parallel' not in locks_backend.locks
+    assert locks_backend.locks == {}
+    # every test of a shared integration is locked once, and the tests of the parallel integration aren't locked
+    assert locks_backend.lock_attempts == 30
+    assert scheduler._condition.timed_out_waits == 0
+
+
+def test_integration_locked_by_another_build():
+    """
+    Given
+    - A server with a test of an integration which is locked by another build, and 5 other tests.
+    When
+    - Running the tests of the server.
+    Then
+    - Ensure the other tests run first, without waiting for the locked integration.
+    - Ensure the locked integration test runs once it is unlocked by the other build, after a single retry.
+    """
+    tests = [{'playbookID': 'locked_test', 'integrations': 'LockedByOtherBuild'}] + \
+        [{'playbookID': f'test_{i}', 'integrations': [f'Integration{i}']} for i in range(5)]
+    locks_backend = OtherBuildLocksBackend(locked_by_other_builds=['LockedByOtherBuild'])
+    scheduler = create_scheduler(locks_backend, retry_interval=0.05)
+
+    executed_tests = run_servers(scheduler, [tests])
+
+    assert executed_tests == ['test_0', 'test_1', 'test_2', 'test_3', 'test_4', 'locked_test']
+    assert locks_backend.attempts == [(['LockedByOtherBuild'], False)] + \
+        [([f'Integration{i}'], True) for i in range(5)] + [(['LockedByOtherBuild'], True)]
+
+
+def test_dispatch_on_unlock():
+    """
+    Given
+    - 2 servers, each with a single test of the same integration, and a retry interval of 60 seconds.
+    When
+    - Running the tests of both servers at once.
+    Then
+    - Ensure the second test is dispatched as soon as the first one unlocks the integration, and not after a retry.
+    """
+    tests_per_server = [[{'playbookID': f'test_{server}', 'integrations': ['Shared']}] for server in range(2)]
+    locks_backend = LocalLocksBackend()
+    scheduler = create_scheduler(locks_backend, retry_interval=60)
+
+    executed_tests = run_servers(scheduler, tests_per_server, test_duration=0.1)
+
+    assert sorted(executed_tests) == ['test_0', 'test_1']
+    assert locks_backend.lock_attempts == 2
+    assert scheduler._condition.timed_out_waits == 0
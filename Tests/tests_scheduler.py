@@ -0,0 +1,210 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from Tests.test_dependencies import get_used_integrations
+
+# how long to wait before retrying to lock integrations which are locked by other builds
+DEFAULT_RETRY_INTERVAL = 30
+
+
+class IntegrationsLocksBackend(ABC):
+    """Base class of the integrations locks backends, which lock integrations exclusively across builds.
+
+    Every method is called by the thread which runs the test, with the index of that thread.
+    """
+
+    @abstractmethod
+    def lock(self, integrations: List[str], timeout: int, thread_index: int = 0) -> bool:
+        """Locks all of the given integrations, or none of them.
+
+        Args:
+            integrations: Names of the integrations to lock.
+            timeout: Test timeout in seconds, after which the locks expire.
+            thread_index: The index of the thread that executes the locking.
+
+        Returns:
+            True if all the integrations were locked, else False.
+        """
+
+    @abstractmethod
+    def unlock(self, integrations: List[str], thread_index: int = 0) -> None:
+        """Unlocks the given integrations, which were locked by this build.
+
+        Args:
+            integrations: Names of the integrations to unlock.
+            thread_index: The index of the thread that executes the unlocking.
+        """
+
+
+class LocalLocksBackend(IntegrationsLocksBackend):
+    """An in memory locks backend, used to run and simulate the tests scheduling offline.
+
+    Attributes:
+        locks (dict): Integration name to the monotonic time its lock expires at.
+    """
+
+    def __init__(self, locked_by_other_builds: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            locked_by_other_builds: Integration name to the number of seconds it is locked by other builds for.
+        """
+        now = time.monotonic()
+        self._lock = threading.Lock()
+        self.locks = {integration: now + seconds for integration, seconds in (locked_by_other_builds or {}).items()}
+        self.lock_attempts = 0
+
+    def lock(self, integrations: List[str], timeout: int, thread_index: int = 0) -> bool:
+        with self._lock:
+            self.lock_attempts += 1
+            now = time.monotonic()
+            if any(self.locks.get(integration, 0) > now for integration in integrations):
+                return False
+            for integration in integrations:
+                self.locks[integration] = now + timeout
+            return True
+
+    def unlock(self, integrations: List[str], thread_index: int = 0) -> None:
+        with self._lock:
+            for integration in integrations:
+                self.locks.pop(integration, None)
+
+
+class TestsScheduler:
+    """Dispatches the tests of all the servers of a build, so a test runs as soon as its integrations are free.
+
+    Every server gets its own queue of tests, and all the queues share the integrations locks:
+    * A queue hands out the first test whose integrations are not locked by this build, and were not found locked by
+      other builds in the last `retry_interval` seconds.
+    * When no test can run, the queue waits until integrations are unlocked by this build, or the next retry is due,
+      instead of sleeping a fixed time between rounds.
+
+    Attributes:
+        locks_backend (IntegrationsLocksBackend): The backend which locks the integrations across builds.
+        parallel_integrations (set): Integrations which can be tested in parallel, and are not locked.
+        retry_interval (float): Seconds to wait before retrying integrations which are locked by other builds.
+    """
+
+    def __init__(self, locks_backend: IntegrationsLocksBackend, parallel_integrations: Iterable[str] = (),
+                 retry_interval: float = DEFAULT_RETRY_INTERVAL):
+        self.locks_backend = locks_backend
+        self.parallel_integrations = set(parallel_integrations)
+        self.retry_interval = retry_interval
+        self._condition = threading.Condition()
+        # integrations which are locked (or being locked) by the tests of this build
+        self._locked_integrations: set = set()
+        # integrations sets which were locked by other builds, to the monotonic time to retry locking them at
+        self._retry_at: Dict[FrozenSet[str], float] = {}
+
+    def get_integrations_to_lock(self, integrations: Iterable[str]) -> FrozenSet[str]:
+        return frozenset(integration for integration in integrations if integration not in self.parallel_integrations)
+
+    def create_queue(self, tests: Iterable[dict]) -> 'TestsQueue':
+        """Creates the tests queue of a server.
+
+        Args:
+            tests: The tests configurations as they appear in conf.json file.
+
+        Returns:
+            TestsQueue of the tests.
+        """
+        return TestsQueue(self, tests)
+
+    def _get_wait_time(self, integrations: FrozenSet[str], now: float) -> Optional[float]:
+        """Returns 0 if the integrations may be locked now, the seconds until they may be locked if they are
+        locked by other builds, or None if they are locked by this build.
+        """
+        if integrations & self._locked_integrations:
+            return None
+        return max(self._retry_at.get(integrations, 0) - now, 0)
+
+    @contextmanager
+    def acquire_test_lock(self, integrations: Iterable[str], test_timeout: int, thread_index: int = 0):
+        """Locks the test integrations for the duration of the context, and yields whether they were locked.
+
+        Args:
+            integrations: Names of the test integrations.
+            test_timeout: Test timeout in seconds.
+            thread_index: The index of the thread that executes the test.
+
+        Yields:
+            A boolean indicating the lock attempt result.
+        """
+        integrations = self.get_integrations_to_lock(integrations)
+        with self._condition:
+            locked = not integrations & self._locked_integrations
+            if locked:
+                # reserved before the backend is called, so the queues won't hand out tests of these integrations
+                self._locked_integrations |= integrations
+
+        if locked and integrations:
+            try:
+                locked = self.locks_backend.lock(sorted(integrations), test_timeout, thread_index)
+            except Exception:
+                locked = False
+            if not locked:
+                with self._condition:
+                    self._locked_integrations -= integrations
+                    self._retry_at[integrations] = time.monotonic() + self.retry_interval
+                    self._condition.notify_all()
+
+        try:
+            yield locked
+        finally:
+            if locked and integrations:
+                try:
+                    self.locks_backend.unlock(sorted(integrations), thread_index)
+                finally:
+                    with self._condition:
+                        self._locked_integrations -= integrations
+                        self._retry_at.pop(integrations, None)
+                        self._condition.notify_all()
+
+
+class TestsQueue:
+    """The queue of the tests of a single server, with the interface of `queue.Queue` the test runner uses.
+
+    A test whose integrations could not be locked is put back in the queue, and is handed out again once its
+    integrations may be free.
+    """
+
+    def __init__(self, scheduler: TestsScheduler, tests: Iterable[dict]):
+        self.scheduler = scheduler
+        self._tests = [(test, scheduler.get_integrations_to_lock(get_used_integrations(test))) for test in tests]
+
+    def empty(self) -> bool:
+        with self.scheduler._condition:
+            return not self._tests
+
+    def qsize(self) -> int:
+        with self.scheduler._condition:
+            return len(self._tests)
+
+    def put(self, test: dict):
+        with self.scheduler._condition:
+            self._tests.append((test, self.scheduler.get_integrations_to_lock(get_used_integrations(test))))
+
+    def get(self) -> dict:
+        """Returns the first test in the queue whose integrations may be locked, waiting until there is one.
+
+        Returns:
+            The test configuration as it appears in conf.json file.
+        """
+        scheduler = self.scheduler
+        with scheduler._condition:
+            while True:
+                if not self._tests:
+                    raise IndexError('get from an empty tests queue')
+                now = time.monotonic()
+                wait_time: Optional[float] = None
+                for index, (test, integrations) in enumerate(self._tests):
+                    test_wait_time = scheduler._get_wait_time(integrations, now)
+                    if test_wait_time == 0:
+                        del self._tests[index]
+                        return test
+                    if test_wait_time is not None:
+                        wait_time = test_wait_time if wait_time is None else min(wait_time, test_wait_time)
+                # woken up when integrations are unlocked by this build, or when a retry is due
+                scheduler._condition.wait(scheduler.retry_interval if wait_time is None else wait_time)